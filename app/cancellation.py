@@ -0,0 +1,36 @@
+# app/cancellation.py
+"""Chạy pipeline blocking trong thread và huỷ RequestContext khi client HTTP ngắt kết nối"""
+import asyncio
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+
+from domain.services.request_context import RequestCancelled, RequestContext
+
+DISCONNECT_POLL_SECONDS = 0.25
+
+
+async def run_until_disconnected(request: Request, func: Callable[..., Any], *args,
+                                 deadline_seconds: Optional[float] = None,
+                                 poll_seconds: float = DISCONNECT_POLL_SECONDS, **kwargs) -> Any:
+    """Gọi `func(*args, context=..., **kwargs)` trong thread; client ngắt kết nối -> RequestCancelled.
+    deadline_seconds: budget thời gian của request, các bước pipeline tự bỏ qua khi gần hết.
+
+    Thread không bị dừng cưỡng bức: nó thoát ở checkpoint kế tiếp của pipeline, không gọi thêm
+    T5 / Gemini. Kết quả (nếu có) bị bỏ.
+    """
+    context = RequestContext(deadline_seconds=deadline_seconds)
+    work = asyncio.ensure_future(asyncio.to_thread(func, *args, context=context, **kwargs))
+    work.add_done_callback(lambda f: f.cancelled() or f.exception())  # kết quả bị bỏ không cảnh báo
+    try:
+        while True:
+            done, _ = await asyncio.wait({work}, timeout=poll_seconds)
+            if done:
+                return work.result()
+            if await request.is_disconnected():
+                context.cancel("client disconnected")
+                print(f"🛑 Client disconnected, cancelling {request.url.path}")
+                raise RequestCancelled(context.cancel_reason)
+    except asyncio.CancelledError:
+        context.cancel("request cancelled")
+        raise
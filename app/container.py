@@ -0,0 +1,320 @@
+# app/container.py
+"""
+Service container: mỗi component nặng (TrendPredictor, GeminiClient, reference snapshot,
+ContextAwareRecipeService, TrendForecastService, RecipeGenerationService + T5, JobManager, WebhookDispatcher, IdempotencyManager) được tạo
+đúng một lần mỗi process và inject vào routers qua FastAPI dependencies.
+
+Lifespan trong app/main.py tạo container và warm up lúc startup, close() lúc shutdown.
+Nếu lifespan không chạy (ví dụ TestClient không dùng `with`), get_services() tạo lazy.
+"""
+import asyncio
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from fastapi import Request
+
+from app.memo import MemoCache
+from app.snapshots import MaterializedViews, ResponseSnapshot
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+
+def _build_trend_predictor(services: "ServiceContainer"):
+    from configs.settings import settings
+    from infrastructure.ml_models.trend_predictor import TrendPredictor
+
+    predictor = TrendPredictor()
+    monitor = predictor.drift_monitor
+    monitor.psi_threshold = settings.DRIFT_PSI_THRESHOLD
+    monitor.min_samples = settings.DRIFT_MIN_SAMPLES
+    monitor.cooldown_seconds = settings.DRIFT_RETRAIN_COOLDOWN_SECONDS
+    if settings.DRIFT_AUTO_RETRAIN:
+        monitor.on_drift = services.retrain_on_drift
+    return predictor
+
+
+def _build_gemini(services: "ServiceContainer"):
+    from infrastructure.ai.gemini_client import GeminiClient
+
+    return GeminiClient()
+
+
+def _build_reference(services: "ServiceContainer"):
+    from domain.services.context_aware_recipe_service import RAW_DATA_DIR, REFERENCE_SNAPSHOT_PATH
+    from infrastructure.data.reference_snapshot import load_or_build_snapshot
+
+    return load_or_build_snapshot(RAW_DATA_DIR, REFERENCE_SNAPSHOT_PATH)
+
+
+def _build_context_service(services: "ServiceContainer"):
+    from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+
+    return ContextAwareRecipeService(
+        reference=services.reference,
+        gemini=services.gemini,
+        trend_predictor=services.trend_predictor,
+    )
+
+
+def _build_trend_forecaster(services: "ServiceContainer"):
+    from domain.services.trend_forecast_service import TrendForecastService
+
+    return TrendForecastService(services.context_service, services.trend_predictor)
+
+
+def _build_recipe_service(services: "ServiceContainer"):
+    from domain.services.recipe_generation_service import RecipeGenerationService
+
+    return RecipeGenerationService(gemini=services.gemini)
+
+
+def _build_recipe_use_case(services: "ServiceContainer"):
+    from application.use_cases.generate_personalized_recipe_use_case import GeneratePersonalizedRecipeUseCase
+
+    return GeneratePersonalizedRecipeUseCase(recipe_service=services.recipe_service)
+
+
+def _build_jobs(services: "ServiceContainer"):
+    from app.jobs import JobManager
+    from configs.settings import settings
+    from infrastructure.db.job_store import build_job_store
+
+    return JobManager(
+        build_job_store(settings.JOB_STORE_URL),
+        max_workers=settings.JOB_MAX_WORKERS,
+        max_queue=settings.JOB_MAX_QUEUE,
+        ttl_seconds=settings.JOB_TTL_SECONDS,
+        on_complete=services.webhooks.enqueue_job,
+    )
+
+
+def _build_idempotency(services: "ServiceContainer"):
+    from app.idempotency import IdempotencyManager
+    from configs.settings import settings
+    from infrastructure.db.job_store import build_job_store
+
+    return IdempotencyManager(
+        build_job_store(settings.IDEMPOTENCY_STORE_URL),
+        retention_seconds=settings.IDEMPOTENCY_RETENTION_SECONDS,
+        lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+    )
+
+
+def _build_webhooks(services: "ServiceContainer"):
+    from app.webhooks import WebhookDispatcher
+    from configs.settings import settings
+
+    return WebhookDispatcher(
+        settings.WEBHOOK_SECRET,
+        max_queue=settings.WEBHOOK_MAX_QUEUE,
+        workers=settings.WEBHOOK_WORKERS,
+        max_attempts=settings.WEBHOOK_MAX_ATTEMPTS,
+        backoff_seconds=settings.WEBHOOK_BACKOFF_SECONDS,
+        backoff_max_seconds=settings.WEBHOOK_BACKOFF_MAX_SECONDS,
+        per_endpoint_concurrency=settings.WEBHOOK_PER_ENDPOINT_CONCURRENCY,
+        timeout_seconds=settings.WEBHOOK_TIMEOUT_SECONDS,
+        dead_letter_path=settings.LOG_DIR / "webhook_dead_letters.jsonl",
+        allowed_hosts=settings.WEBHOOK_ALLOWED_HOSTS,
+    )
+
+
+DEFAULT_FACTORIES: Dict[str, Callable[["ServiceContainer"], Any]] = {
+    'trend_predictor': _build_trend_predictor,
+    'gemini': _build_gemini,
+    'reference': _build_reference,
+    'context_service': _build_context_service,
+    'trend_forecaster': _build_trend_forecaster,
+    'recipe_service': _build_recipe_service,
+    'recipe_use_case': _build_recipe_use_case,
+    'webhooks': _build_webhooks,
+    'jobs': _build_jobs,
+    'idempotency': _build_idempotency,
+}
+
+
+class ServiceContainer:
+    """Registry các component dùng chung, tạo lazy và đúng một lần (thread-safe)"""
+
+    def __init__(self, factories: Optional[Dict[str, Callable[["ServiceContainer"], Any]]] = None):
+        self._factories = {**DEFAULT_FACTORIES, **(factories or {})}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._retrain_lock = threading.Lock()
+        # Response tính sẵn (ResponseSnapshot / MaterializedViews) theo tên
+        self.snapshots: Dict[str, Any] = {}
+        # Memo cache cho các phép tính thuần (analytics, market insights) theo tên
+        self.memos: Dict[str, MemoCache] = {}
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._factories[name](self)
+                    self._instances[name] = instance
+        return instance
+
+    @property
+    def trend_predictor(self):
+        return self.get('trend_predictor')
+
+    @property
+    def gemini(self):
+        return self.get('gemini')
+
+    @property
+    def reference(self):
+        return self.get('reference')
+
+    @property
+    def context_service(self):
+        return self.get('context_service')
+
+    @property
+    def trend_forecaster(self):
+        return self.get('trend_forecaster')
+
+    @property
+    def recipe_service(self):
+        return self.get('recipe_service')
+
+    @property
+    def recipe_use_case(self):
+        return self.get('recipe_use_case')
+
+    @property
+    def webhooks(self):
+        return self.get('webhooks')
+
+    @property
+    def jobs(self):
+        return self.get('jobs')
+
+    @property
+    def idempotency(self):
+        return self.get('idempotency')
+
+    @property
+    def created(self) -> list:
+        return list(self._instances)
+
+    def warm_up(self):
+        """Tạo trước toàn bộ component (gọi ở startup để request đầu không bị chậm)"""
+        for name in self._factories:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"⚠️ Could not initialize {name}: {e}")
+
+    def snapshot(self, name: str, builder: Callable[[], Dict[str, Any]],
+                 max_age_seconds: float, stale_seconds: float) -> ResponseSnapshot:
+        """Response snapshot dùng chung theo tên (tạo ở lần gọi đầu)"""
+        snapshot = self.snapshots.get(name)
+        if snapshot is None:
+            with self._lock:
+                snapshot = self.snapshots.setdefault(
+                    name, ResponseSnapshot(name, builder, max_age_seconds, stale_seconds)
+                )
+        return snapshot
+
+    def views(self, name: str, keys: Callable[[], Iterable[str]], builder: Callable[[str], Dict[str, Any]],
+              epoch: Callable[[], Hashable]) -> MaterializedViews:
+        """Materialized views dùng chung theo tên (tạo ở lần gọi đầu)"""
+        views = self.snapshots.get(name)
+        if views is None:
+            with self._lock:
+                views = self.snapshots.setdefault(name, MaterializedViews(name, keys, builder, epoch))
+        return views
+
+    def memo(self, name: str, maxsize: int = 1024) -> MemoCache:
+        """Memo cache dùng chung theo tên (tạo ở lần gọi đầu)"""
+        memo = self.memos.get(name)
+        if memo is None:
+            with self._lock:
+                memo = self.memos.setdefault(name, MemoCache(name, maxsize))
+        return memo
+
+    def memo_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: memo.stats() for name, memo in list(self.memos.items())}
+
+    def invalidate_snapshots(self):
+        for snapshot in list(self.snapshots.values()):
+            snapshot.invalidate()
+
+    async def refresh_snapshots_forever(self, interval_seconds: float):
+        """Background task (lifespan): refresh các snapshot đã hết hạn hoặc bị invalidate"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            for snapshot in list(self.snapshots.values()):
+                if snapshot.needs_refresh:
+                    try:
+                        await asyncio.to_thread(snapshot.refresh)
+                    except Exception as e:
+                        print(f"⚠️ Snapshot '{snapshot.name}' refresh failed: {e}")
+
+    def reload_models(self):
+        """Load lại trend models từ disk, đánh dấu các snapshot cần tính lại và xoá memo"""
+        self.trend_predictor.load_models()
+        self.invalidate_snapshots()
+        for memo in list(self.memos.values()):
+            memo.clear()
+
+    def run_training_script(self) -> subprocess.CompletedProcess:
+        """Chạy train_models.py bằng python hiện tại, reload models nếu thành công"""
+        return self._run_model_script("train_models.py")
+
+    def run_update_script(self) -> subprocess.CompletedProcess:
+        """Chạy update_models.py (incremental update), reload models nếu thành công"""
+        return self._run_model_script("update_models.py")
+
+    def _run_model_script(self, name: str) -> subprocess.CompletedProcess:
+        """Blocking: router gọi qua asyncio.to_thread. Train / update không chạy song song"""
+        script_path = ROOT_DIR / name
+        if not script_path.exists():
+            raise FileNotFoundError(f"Không tìm thấy {name}")
+
+        with self._retrain_lock:
+            proc = subprocess.run([sys.executable, str(script_path)], capture_output=True, text=True)
+        if proc.returncode == 0:
+            self.reload_models()
+        return proc
+
+    def retrain_on_drift(self, report: Dict[str, Any]):
+        """Callback của drift monitor: retrain ở background thread, bỏ qua nếu đang train"""
+        if self._retrain_lock.locked():
+            return
+        print(f"⚠️ Drift detected (max PSI={report['max_psi']}): {report['drifted_columns']} -> retraining")
+        threading.Thread(target=self.run_training_script, name="drift-retrain", daemon=True).start()
+
+    def close(self):
+        """Giải phóng component (gọi ở shutdown)"""
+        with self._lock:
+            monitor = getattr(self._instances.get('trend_predictor'), 'drift_monitor', None)
+            if monitor is not None:
+                monitor.on_drift = None
+
+            recipe_service = self._instances.get('recipe_service')
+            t5_client = getattr(recipe_service, 't5_client', None)
+            if t5_client is not None:
+                type(t5_client).release()
+
+            self._instances.clear()
+
+
+_fallback_lock = threading.Lock()
+
+
+def get_services(request: Request) -> ServiceContainer:
+    """FastAPI dependency: container của app (tạo lazy nếu lifespan chưa chạy)"""
+    services = getattr(request.app.state, 'services', None)
+    if services is None:
+        with _fallback_lock:
+            services = getattr(request.app.state, 'services', None)
+            if services is None:
+                services = ServiceContainer()
+                request.app.state.services = services
+    return services
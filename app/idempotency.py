@@ -0,0 +1,114 @@
+# app/idempotency.py
+"""
+Idempotency-Key cho các endpoint sinh công thức (mỗi lần chạy tốn T5 + Gemini).
+
+- Cùng key, request đầu còn đang chạy  -> request sau chờ và dùng chung kết quả (không gọi upstream lần nữa)
+- Cùng key, request đầu đã xong        -> trả lại đúng response đã lưu (từng byte), header Idempotent-Replayed
+- Cùng key nhưng payload khác          -> IdempotencyKeyReused
+- Lỗi (exception) không được lưu: client retry sẽ chạy lại
+
+Response lưu ở JobStore (memory / SQLite / Redis, xem infrastructure/db/job_store.py) trong `retention_seconds`.
+Với store dùng chung nhiều process, request trùng key đang chạy ở process khác -> IdempotencyInProgress.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+
+from domain.services.request_context import RequestCancelled
+from infrastructure.db.job_store import JobStore
+
+StoredResponse = Tuple[int, bytes]
+
+
+class IdempotencyKeyReused(ValueError):
+    """Key đã dùng cho một payload khác"""
+
+
+class IdempotencyInProgress(RuntimeError):
+    """Request cùng key đang được xử lý ở process khác"""
+
+
+class IdempotencyManager:
+    def __init__(self, store: JobStore, retention_seconds: float = 86400, lock_seconds: float = 300,
+                 purge_interval_seconds: float = 60):
+        self.store = store
+        self.retention_seconds = retention_seconds
+        # Bản ghi 'in_progress' tự hết hạn sau lock_seconds (process chết giữa chừng không khoá key mãi)
+        self.lock_seconds = lock_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._last_purge = time.monotonic()
+        self._counters = {'executed': 0, 'joined': 0, 'replayed': 0, 'conflicts': 0}
+
+    async def run(self, scope: str, key: str, fingerprint: str,
+                  compute: Callable[[], Awaitable[StoredResponse]]) -> Tuple[StoredResponse, bool]:
+        """Chạy `compute` tối đa một lần cho mỗi (scope, key); trả về ((status_code, body), replayed)"""
+        record_id = f"idem:{scope}:{key}"
+        while True:
+            inflight = self._inflight.get(record_id)
+            if inflight is None:
+                break
+            self._check_fingerprint(inflight[0], fingerprint)
+            self._counters['joined'] += 1
+            try:
+                return await asyncio.shield(inflight[1]), True
+            except asyncio.CancelledError:
+                if not inflight[1].cancelled():
+                    raise  # chính request này bị huỷ
+                # Request đầu bị huỷ: request này chạy thay
+
+        # claim() atomic trên store: hai process cùng key chỉ một bên được chạy
+        while not self.store.claim({'id': record_id, 'state': 'in_progress', 'fingerprint': fingerprint,
+                                    'expires_at': time.time() + self.lock_seconds}):
+            record = self.store.load(record_id)
+            if record is None:
+                continue  # vừa bị xoá / hết hạn giữa claim và load: claim lại
+            self._check_fingerprint(record['fingerprint'], fingerprint)
+            if record['state'] == 'completed':
+                self._counters['replayed'] += 1
+                return (record['status_code'], record['body'].encode('utf-8')), True
+            self._counters['conflicts'] += 1
+            raise IdempotencyInProgress(f"A request with Idempotency-Key '{key}' is still in progress")
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())  # không có ai chờ cũng không cảnh báo
+        self._inflight[record_id] = (fingerprint, future)
+        self._counters['executed'] += 1
+        try:
+            status_code, body = await compute()
+        except (asyncio.CancelledError, RequestCancelled):
+            # Client của request đầu ngắt kết nối: request đang chờ cùng key sẽ chạy thay
+            self.store.delete(record_id)
+            future.cancel()
+            raise
+        except Exception as e:
+            self.store.delete(record_id)
+            future.set_exception(e)
+            raise
+        else:
+            self.store.save({'id': record_id, 'state': 'completed', 'fingerprint': fingerprint,
+                             'status_code': status_code, 'body': body.decode('utf-8'),
+                             'expires_at': time.time() + self.retention_seconds})
+            future.set_result((status_code, body))
+        finally:
+            self._inflight.pop(record_id, None)
+            self._maybe_purge()
+        return (status_code, body), False
+
+    def metrics(self) -> Dict[str, int]:
+        return {'inflight': len(self._inflight), **self._counters}
+
+    def _check_fingerprint(self, stored: str, fingerprint: str):
+        if stored != fingerprint:
+            self._counters['conflicts'] += 1
+            raise IdempotencyKeyReused("Idempotency-Key was already used with a different request payload")
+
+    def _maybe_purge(self):
+        if time.monotonic() - self._last_purge < self.purge_interval_seconds:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            self.store.purge_expired()
+        except Exception as e:
+            print(f"⚠️ Idempotency store purge failed: {e}")
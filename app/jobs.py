@@ -0,0 +1,191 @@
+# app/jobs.py
+"""
+Background jobs cho các endpoint chạy lâu (forecast-and-generate, generate-smart-recipe).
+
+Client submit -> nhận job id ngay (HTTP 202), rồi poll / long-poll kết quả. Job chạy trên một
+pool cố định `max_workers` coroutine lấy việc từ hàng đợi giới hạn `max_queue` (đầy thì từ chối);
+trạng thái + kết quả lưu ở JobStore (memory / SQLite / Redis), hết hạn sau `ttl_seconds`.
+"""
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from infrastructure.db.job_store import JobStore
+
+TERMINAL_STATUSES = frozenset({'succeeded', 'failed', 'cancelled'})
+
+
+class JobQueueFull(RuntimeError):
+    """Hàng đợi job đã đầy"""
+
+
+class JobManager:
+    """Worker pool + hàng đợi có giới hạn, trạng thái lưu ở JobStore"""
+
+    def __init__(self, store: JobStore, max_workers: int = 2, max_queue: int = 100,
+                 ttl_seconds: float = 3600, purge_interval_seconds: float = 60,
+                 on_complete: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.store = store
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval_seconds = purge_interval_seconds
+        # Gọi khi job kết thúc (succeeded / failed / cancelled), ví dụ gửi webhook
+        self.on_complete = on_complete
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._done_events: Dict[str, asyncio.Event] = {}
+        self._counters = {'submitted': 0, 'rejected': 0, 'succeeded': 0, 'failed': 0, 'cancelled': 0}
+
+    async def start(self):
+        """Khởi động workers trên event loop hiện tại (gọi ở lifespan; submit() tự gọi nếu chưa chạy)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"job-worker-{i}") for i in range(self.max_workers)]
+        self._tasks.append(asyncio.create_task(self._purge_forever(), name="job-purge"))
+
+    async def stop(self):
+        for task in [*self._tasks, *self._running.values()]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._running.clear()
+
+    def _save(self, job: Dict[str, Any]):
+        job['expires_at'] = time.time() + self.ttl_seconds
+        self.store.save(job)
+
+    async def submit(self, kind: str, run: Callable[[], Awaitable[Any]],
+                     callback_url: Optional[str] = None) -> Dict[str, Any]:
+        """Đưa job vào hàng đợi; `run` là coroutine function không tham số trả về kết quả.
+        callback_url: nhận kết quả qua webhook khi job kết thúc (xem app/webhooks.py)"""
+        await self.start()
+        job = {
+            'id': uuid.uuid4().hex, 'kind': kind, 'status': 'queued', 'created_at': time.time(),
+            'started_at': None, 'finished_at': None, 'result': None, 'error': None,
+            'callback_url': callback_url,
+        }
+        try:
+            self._queue.put_nowait((job['id'], run))
+        except asyncio.QueueFull:
+            self._counters['rejected'] += 1
+            raise JobQueueFull(f"Job queue is full ({self.max_queue} pending)")
+        self._done_events[job['id']] = asyncio.Event()
+        self._save(job)
+        self._counters['submitted'] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.load(job_id)
+
+    async def wait(self, job_id: str, timeout: float, poll_seconds: float = 0.5) -> Optional[Dict[str, Any]]:
+        """Long-poll: chờ tới khi job kết thúc hoặc hết `timeout`, trả về trạng thái mới nhất"""
+        deadline = time.monotonic() + timeout
+        event = self._done_events.get(job_id)
+        if event is not None:  # job của process này
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return self.get(job_id)
+
+        # Job do process khác chạy (store dùng chung): poll store
+        job = self.get(job_id)
+        while job is not None and job['status'] not in TERMINAL_STATUSES and time.monotonic() < deadline:
+            await asyncio.sleep(min(poll_seconds, max(0.0, deadline - time.monotonic())))
+            job = self.get(job_id)
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Huỷ job đang chờ hoặc đang chạy (việc blocking trong thread vẫn chạy nốt, kết quả bị bỏ)"""
+        job = self.get(job_id)
+        if job is None or job['status'] in TERMINAL_STATUSES:
+            return job
+        job.update(status='cancelled', finished_at=time.time())
+        self._save(job)
+        self._counters['cancelled'] += 1
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        else:
+            self._finished(job)
+        return job
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue': self.max_queue,
+            'workers': self.max_workers,
+            'running': len(self._running),
+            **self._counters,
+        }
+
+    def _finished(self, job: Dict[str, Any]):
+        event = self._done_events.pop(job['id'], None)
+        if event is not None:
+            event.set()
+        if self.on_complete is not None:
+            try:
+                self.on_complete(job)
+            except Exception as e:
+                print(f"⚠️ Job {job['id']} completion hook failed: {e}")
+
+    async def _worker(self):
+        while True:
+            job_id, run = await self._queue.get()
+            try:
+                await self._run_job(job_id, run)
+            except Exception as e:
+                print(f"⚠️ Job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str, run: Callable[[], Awaitable[Any]]):
+        job = self.get(job_id)
+        if job is None or job['status'] != 'queued':
+            return  # đã huỷ / hết hạn khi còn trong hàng đợi
+
+        job.update(status='running', started_at=time.time())
+        self._save(job)
+        task = asyncio.create_task(run())
+        self._running[job_id] = task
+        try:
+            result = await task
+            job.update(status='succeeded', result=jsonable_encoder(result))
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise  # worker bị dừng (shutdown)
+            job.update(status='cancelled')
+        except Exception as e:
+            job.update(status='failed', error=str(getattr(e, 'detail', None) or e))
+        finally:
+            self._running.pop(job_id, None)
+
+        latest = self.get(job_id)
+        if latest is not None and latest['status'] == 'cancelled':
+            job = latest  # bị huỷ trong lúc chạy: giữ trạng thái huỷ
+        else:
+            job['finished_at'] = time.time()
+            self._save(job)
+            self._counters[job['status']] += 1
+        self._finished(job)
+
+    async def _purge_forever(self):
+        while True:
+            await asyncio.sleep(self.purge_interval_seconds)
+            try:
+                removed = await asyncio.to_thread(self.store.purge_expired)
+            except Exception as e:
+                print(f"⚠️ Job store purge failed: {e}")
+                continue
+            if removed:
+                print(f"🧹 Purged {removed} expired jobs")
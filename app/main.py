@@ -24,10 +24,12 @@ for key in ['GEMINI_API_KEY', 'DATABASE_URL', 'REDIS_URL', 'YOUTUBE_API_KEY']:
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from configs.settings import settings
-from app.routers import recipes, trends, segments, analytics
+from app.container import ServiceContainer
+from app.routers import recipes, trends, segments, analytics, jobs
 
 # Ensure log directory exists before configuring logging
 settings.LOG_DIR.mkdir(parents=True, exist_ok=True)
@@ -49,9 +51,24 @@ print("GEMINI_API_KEY set:",(settings.GEMINI_API_KEY))
 async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
+    # Models / reference data load một lần mỗi process, dùng chung cho mọi request
+    services = ServiceContainer()
+    app.state.services = services
+    await asyncio.to_thread(services.warm_up)
+    try:
+        await asyncio.to_thread(analytics.warm_precomputed, services)
+    except Exception as e:
+        logger.warning(f"Could not precompute analytics responses: {e}")
+    refresher = asyncio.create_task(services.refresh_snapshots_forever(settings.TRENDING_REFRESH_SECONDS / 4))
+    await services.webhooks.start()
+    await services.jobs.start()
     yield
     # Shutdown
     logger.info("Shutting down...")
+    refresher.cancel()
+    await services.jobs.stop()
+    await services.webhooks.stop()
+    services.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -73,6 +90,7 @@ app.include_router(recipes.router, prefix=settings.API_V1_PREFIX)
 app.include_router(trends.router, prefix=settings.API_V1_PREFIX)
 app.include_router(segments.router, prefix=settings.API_V1_PREFIX)
 app.include_router(analytics.router, prefix=settings.API_V1_PREFIX)
+app.include_router(jobs.router, prefix=settings.API_V1_PREFIX)
 
 @app.get("/")
 async def root():
@@ -1,22 +1,28 @@
 # app/routers/analytics.py
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional, Dict, Any
 from datetime import datetime, timedelta
-from domain.services.context_aware_recipe_service import ContextAwareRecipeService
-from domain.services.recipe_generation_service import RecipeGenerationService
-from infrastructure.ml_models.trend_predictor import TrendPredictor
-import subprocess
-import sys
-from pathlib import Path
+from app.container import ServiceContainer, get_services
+from app.snapshots import MaterializedViews, ResponseSnapshot
+from configs.settings import settings
+from domain.entities.recipe import Recipe
+from domain.services.context_aware_recipe_service import SEGMENT_MAPPING, ContextAwareRecipeService
+from domain.services.keyword_matcher import keyword_matcher, normalize_text
+from domain.services.recipe_scoring import (
+    COMPLEXITY_SCORES, COST_CATEGORIES, EVENT_TAGS, FEASIBILITY_DIFFICULTY_SCORES, SEASONAL_INGREDIENTS,
+    SEGMENT_COMPLEXITY_SCORES, SUCCESS_FACTOR_RULES, TRENDING_INGREDIENTS, VIRAL_TITLE_KEYWORDS, VIRAL_WEIGHTS,
+    RecipeFeatures, ScoringContext, difficulty_key, price_fit_score, score_recipes, time_feasibility_score,
+    total_minutes,
+)
+from domain.services.request_context import RequestContext
+from domain.services.trend_forecast_service import MAX_HORIZON_DAYS, TrendForecast
+from infrastructure.data.event_calendar import EventCalendar
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
-# Initialize services
-context_service = ContextAwareRecipeService()
-trend_predictor = TrendPredictor()
-recipe_service = RecipeGenerationService()
-
 class TrendPredictionRequest(BaseModel):
     target_date: Optional[str] = None  # Format: "2025-10-31"
     user_segment: str = "gen_z"
@@ -36,6 +42,10 @@ class RecipeAnalyticsRequest(BaseModel):
     target_date: Optional[str] = None
     trend_keywords: Optional[List[str]] = None
     include_market_analysis: bool = True
+    # Sinh K công thức song song, trả về công thức điểm cao nhất
+    candidates: int = Field(1, ge=1, le=settings.SMART_RECIPE_MAX_CANDIDATES)
+    # Deadline chung cho K candidate (mặc định theo settings)
+    deadline_seconds: Optional[float] = Field(None, gt=0, le=settings.SMART_RECIPE_DEADLINE_MAX_SECONDS)
 
 class RecipeAnalyticsResponse(BaseModel):
     recipe: Dict[str, Any]
@@ -43,14 +53,32 @@ class RecipeAnalyticsResponse(BaseModel):
     market_insights: Dict[str, Any]
     success_factors: List[str]
     viral_potential_score: float
+    candidates: List[Dict[str, Any]] = []
 
 class ForecastAndGenerateRequest(BaseModel):
     user_segment: str
-    horizon_days: int = 30
+    horizon_days: int = 30  # Tối đa 365
     top_k: int = 3
     include_market_analysis: bool = True
     location: str = "vietnam"
     custom_context: Optional[Dict[str, Any]] = None
+    resolution: Literal["daily", "weekly"] = "weekly"
+    max_points: Optional[int] = None  # Gộp series ngày còn tối đa max_points điểm
+
+class ForecastRequest(BaseModel):
+    user_segment: str = "gen_z"
+    start_date: Optional[str] = None  # Format: "2025-10-31"
+    horizon_days: int = 365
+    custom_context: Optional[Dict[str, Any]] = None
+    resolution: Literal["daily", "weekly"] = "daily"
+    max_points: Optional[int] = None
+
+class RankRecipesRequest(BaseModel):
+    recipes: List[Recipe]
+    user_segment: str = "gen_z"
+    target_date: Optional[str] = None  # Format: "2025-10-31"
+    top_k: Optional[int] = 10          # None: trả toàn bộ thứ hạng
+    include_market_analysis: bool = True
 
 class ForecastAndGenerateResponse(BaseModel):
     forecast_window: Dict[str, Any]
@@ -66,7 +94,7 @@ class MarketInsightResponse(BaseModel):
     recommended_strategies: List[str]
 
 @router.post("/predict-trends", response_model=TrendPredictionResponse)
-async def predict_future_trends(request: TrendPredictionRequest):
+async def predict_future_trends(request: TrendPredictionRequest, services: ServiceContainer = Depends(get_services)):
     """
     🔮 Dự đoán xu hướng bánh ngọt trong tương lai
     
@@ -84,10 +112,10 @@ async def predict_future_trends(request: TrendPredictionRequest):
             target_date = datetime.now()
         
         # Get contexts
-        seasonal_ctx, market_ctx = context_service.get_current_context(target_date)
+        seasonal_ctx, market_ctx = services.context_service.get_current_context(target_date)
         
         # Update market context with requested segment
-        market_ctx = context_service._get_market_context(request.user_segment)
+        market_ctx = services.context_service._get_market_context(request.user_segment)
         
         # Prepare ML context
         ml_context = {
@@ -106,7 +134,7 @@ async def predict_future_trends(request: TrendPredictionRequest):
         
         # Get ML predictions
         try:
-            predictions = trend_predictor.predict_trends(ml_context)
+            predictions = services.trend_predictor.predict_trends(ml_context)
         except Exception as e:
             print(f"ML prediction failed: {e}")
             predictions = {
@@ -117,7 +145,7 @@ async def predict_future_trends(request: TrendPredictionRequest):
             }
         
         # Analyze recommended ingredients based on season and trends
-        recommended_ingredients = context_service._get_recommended_ingredients(
+        recommended_ingredients = services.context_service._get_recommended_ingredients(
             seasonal_ctx, market_ctx, predictions['overall_trend_strength']
         )
         
@@ -146,7 +174,7 @@ async def predict_future_trends(request: TrendPredictionRequest):
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 @router.post("/forecast-and-generate", response_model=ForecastAndGenerateResponse)
-async def forecast_and_generate(request: ForecastAndGenerateRequest):
+async def forecast_and_generate(request: ForecastAndGenerateRequest, services: ServiceContainer = Depends(get_services)):
     """
     📈 Dự báo xu hướng trong tương lai gần và tạo danh sách công thức đề xuất.
     - Dự báo context 4 tuần tới (mặc định 30 ngày)
@@ -155,98 +183,74 @@ async def forecast_and_generate(request: ForecastAndGenerateRequest):
     """
     try:
         now = datetime.now()
-        horizon_days = max(7, min(request.horizon_days, 90))
-
-        # Quét từng tuần trong horizon để dự báo
-        weekly_points = []
-        for delta in range(0, horizon_days, 7):
-            target_date = now + timedelta(days=delta)
-            seasonal_ctx, market_ctx = context_service.get_current_context(target_date)
-
-            ml_context = {
-                'month': seasonal_ctx.month,
-                'temperature': seasonal_ctx.temperature,
-                'user_segment': request.user_segment,
-                'season': seasonal_ctx.season,
-                'market_potential': market_ctx.market_potential,
-                'competition_level': market_ctx.competition_level,
-                'bakery_demand': seasonal_ctx.demand_factor
-            }
-            if request.custom_context:
-                ml_context.update(request.custom_context)
-
-            try:
-                preds = trend_predictor.predict_trends(ml_context)
-            except Exception as e:
-                # fallback khi model chưa train
-                preds = {
-                    'popularity_score': 0.65,
-                    'engagement_score': 0.6,
-                    'trend_score': 0.55,
-                    'overall_trend_strength': 0.6
-                }
-
-            weekly_points.append({
-                'date': target_date.strftime("%Y-%m-%d"),
-                'events': seasonal_ctx.events,
-                'trending_flavors': seasonal_ctx.trending_flavors,
-                'overall_trend_strength': preds['overall_trend_strength'],
-                'season': seasonal_ctx.season
-            })
+        horizon_days = max(7, min(request.horizon_days, MAX_HORIZON_DAYS))
 
-        # Xếp hạng sự kiện theo trend strength trung bình trong horizon
-        event_scores: Dict[str, float] = {}
-        for point in weekly_points:
-            for evt in point['events']:
-                event_scores.setdefault(evt, 0.0)
-                event_scores[evt] += point['overall_trend_strength']
+        # Dự báo theo ngày cho cả horizon (một lần batch predict), trả về series tuần hoặc ngày
+        forecast = services.trend_forecaster.forecast(
+            request.user_segment, start=now, horizon_days=horizon_days, custom_context=request.custom_context
+        )
+        points = _forecast_points(forecast, request.resolution, request.max_points)
 
-        # Top-k sự kiện
-        top_events = sorted(event_scores.items(), key=lambda x: x[1], reverse=True)
-        top_events = [e for e, _ in top_events[:max(1, request.top_k)]] or ["Regular season"]
+        # Xếp hạng sự kiện theo tổng trend strength trên các ngày sự kiện diễn ra
+        top_events = forecast.top_events(max(1, request.top_k)) or ["Regular season"]
 
-        # Sinh công thức đề xuất cho mỗi sự kiện top bằng pipeline Gemini generate-from-trend
-        recommended_recipes = []
-        for evt in top_events:
+        # Sinh công thức đề xuất cho mỗi sự kiện top bằng pipeline Gemini generate-from-trend.
+        # Các event chạy song song (giới hạn concurrency, timeout riêng); event lỗi trả về kèm error
+        async def _generate_for_event(evt: str, run_blocking) -> Dict[str, Any]:
             # Lấy ngày đại diện (ngày đầu tiên có evt)
-            rep_date = next((p['date'] for p in weekly_points if evt in p['events']), weekly_points[0]['date'])
+            rep_date = forecast.event_date(evt).isoformat()
             rep_dt = datetime.strptime(rep_date, "%Y-%m-%d")
 
             # Kết hợp trend string từ event + flavors
-            seasonal_ctx, _ = context_service.get_current_context(rep_dt)
-            trend_text = " ".join([evt] + (seasonal_ctx.trending_flavors[:3] if seasonal_ctx.trending_flavors else [])) if evt != "Regular season" else " ".join(seasonal_ctx.trending_flavors[:3] or [])
+            seasonal_ctx, _ = services.context_service.get_current_context(rep_dt)
+            trend_text = " ".join([evt, *seasonal_ctx.trending_flavors[:3]]) if evt != "Regular season" else " ".join(seasonal_ctx.trending_flavors[:3] or [])
 
-            # Gọi pipeline generate-from-trend (Gemini) để tạo recipe chi tiết tiếng Việt
-            gen_recipe = recipe_service.generate_from_trend(
+            # Gọi pipeline generate-from-trend (Gemini, blocking) trên executor của batch;
+            # event quá hạn bị huỷ qua RequestContext nên không gọi thêm Gemini
+            gen_recipe = await run_blocking(
+                services.recipe_service.generate_from_trend,
                 trend=trend_text.strip() or "seasonal",
                 user_segment=request.user_segment,
                 occasion=evt if evt != "Regular season" else seasonal_ctx.season,
                 language='vi'
             )
 
-            analytics = await _analyze_recipe_performance(gen_recipe, request.user_segment, rep_dt)
-            market_insights = await _get_market_insights(request.user_segment, rep_dt) if request.include_market_analysis else {}
+            analytics = await _memoized_recipe_performance(services, gen_recipe, request.user_segment, rep_dt)
+            market_insights = await _memoized_market_insights(services, request.user_segment, rep_dt) if request.include_market_analysis else {}
             viral_score = _calculate_viral_potential(gen_recipe, analytics, market_insights)
 
-            recommended_recipes.append({
+            return {
                 'event': evt,
                 'date': rep_date,
+                'status': 'success',
                 'viral_potential': viral_score,
                 'recipe': gen_recipe.dict(),
                 'analytics': analytics,
                 'market_insights': market_insights
-            })
+            }
+
+        recommended_recipes = await _gather_bounded(
+            top_events,
+            _generate_for_event,
+            limit=settings.FORECAST_MAX_CONCURRENCY,
+            timeout=settings.FORECAST_EVENT_TIMEOUT_SECONDS,
+        )
+        for evt, result in zip(top_events, recommended_recipes):
+            if result['status'] != 'success':
+                result.setdefault('event', evt)
 
         response = ForecastAndGenerateResponse(
             forecast_window={
                 'start': now.strftime("%Y-%m-%d"),
                 'end': (now + timedelta(days=horizon_days)).strftime("%Y-%m-%d"),
-                'points': weekly_points
+                'resolution': request.resolution,
+                'points': points
             },
             top_forecasted_events=top_events,
             trends_summary={
-                'avg_trend_strength': round(sum(p['overall_trend_strength'] for p in weekly_points) / len(weekly_points), 3),
-                'seasons_in_window': sorted(list({p['season'] for p in weekly_points}))
+                **forecast.summary(),
+                'event_scores': {name: round(score, 3) for name, score in forecast.event_scores.items()},
+                'failed_events': [r['event'] for r in recommended_recipes if r['status'] != 'success']
             },
             recommended_recipes=recommended_recipes
         )
@@ -255,28 +259,86 @@ async def forecast_and_generate(request: ForecastAndGenerateRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Forecast and generate failed: {str(e)}")
 
+@router.post("/forecast")
+async def forecast_trends(request: ForecastRequest, services: ServiceContainer = Depends(get_services)):
+    """
+    📅 Dự báo trend strength theo ngày (tới 365 ngày) cho một segment.
+    - resolution=daily|weekly, max_points để gộp series ngày cho payload nhỏ
+    - Kèm điểm và ngày bắt đầu của các sự kiện trong horizon
+    """
+    try:
+        start = datetime.strptime(request.start_date, "%Y-%m-%d") if request.start_date else datetime.now()
+        forecast = services.trend_forecaster.forecast(
+            request.user_segment, start=start, horizon_days=request.horizon_days,
+            custom_context=request.custom_context
+        )
+        return {
+            'start': forecast.start.isoformat(),
+            'horizon_days': forecast.horizon_days,
+            'resolution': request.resolution,
+            'points': _forecast_points(forecast, request.resolution, request.max_points),
+            'events': [
+                {'name': name, 'score': round(score, 3), 'first_date': forecast.event_date(name).isoformat()}
+                for name, score in sorted(forecast.event_scores.items(), key=lambda item: item[1], reverse=True)
+            ],
+            'summary': forecast.summary()
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecast failed: {str(e)}")
+
+@router.post("/rank-recipes")
+async def rank_recipes(request: RankRecipesRequest, services: ServiceContainer = Depends(get_services)):
+    """
+    🏆 Xếp hạng nhiều công thức theo viral potential cho segment / ngày.
+    Chấm cả batch bằng NumPy (cùng công thức với generate-smart-recipe).
+    """
+    try:
+        target_date = datetime.strptime(request.target_date, "%Y-%m-%d") if request.target_date else datetime.now()
+        context = _scoring_context(services.context_service, request.user_segment, target_date,
+                                   request.include_market_analysis)
+        scores = score_recipes(RecipeFeatures.from_recipes(request.recipes), context)
+
+        ranked = []
+        for rank, index in enumerate(scores.ranking(request.top_k), start=1):
+            recipe = request.recipes[index]
+            ranked.append({
+                'rank': rank,
+                'index': int(index),
+                'title': recipe.title,
+                'fingerprint': recipe.fingerprint(),
+                'viral_potential_score': float(scores.viral_potential[index]),
+                'scores': scores.row(index),
+                'success_factors': scores.success_factors(index),
+            })
+        return {
+            'user_segment': request.user_segment,
+            'target_date': target_date.strftime("%Y-%m-%d"),
+            'total_recipes': len(request.recipes),
+            'ranked': ranked,
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ranking failed: {str(e)}")
+
 @router.post("/train")
-async def train_models():
+async def train_models(services: ServiceContainer = Depends(get_services)):
     """
     🧠 Khởi chạy pipeline huấn luyện ML từ dữ liệu trong data/raw và cập nhật artifacts.
     Trả về log cơ bản và trạng thái.
     """
     try:
-        # Chạy train_models.py bằng python hiện tại
-        project_root = Path(__file__).resolve().parents[2]
-        script_path = project_root / "train_models.py"
-        if not script_path.exists():
-            raise HTTPException(status_code=500, detail="Không tìm thấy train_models.py")
-
-        proc = subprocess.run([sys.executable, str(script_path)], capture_output=True, text=True)
+        # Chạy train_models.py và reload models nếu train thành công
+        try:
+            proc = await asyncio.to_thread(services.run_training_script)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=500, detail=str(e))
         success = proc.returncode == 0
         output = (proc.stdout or "")[-4000:]  # Giới hạn log trả về
         error = (proc.stderr or "")[-4000:]
 
-        # Reload models nếu train thành công
-        if success:
-            trend_predictor.load_models()
-
         return {
             'status': 'success' if success else 'failed',
             'return_code': proc.returncode,
@@ -288,8 +350,54 @@ async def train_models():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Train failed: {str(e)}")
 
+@router.post("/update-models")
+async def update_models(services: ServiceContainer = Depends(get_services)):
+    """
+    🔄 Cập nhật incremental models từ đơn hàng / đánh giá mới (update_models.py),
+    rồi reload version mới qua load_models().
+    """
+    try:
+        try:
+            proc = await asyncio.to_thread(services.run_update_script)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        return {
+            'status': 'success' if proc.returncode == 0 else 'failed',
+            'return_code': proc.returncode,
+            'model_version': services.trend_predictor.model_metadata.get('version'),
+            'samples_seen': services.trend_predictor.model_metadata.get('samples_seen'),
+            'stdout_tail': (proc.stdout or "")[-4000:],
+            'stderr_tail': (proc.stderr or "")[-4000:]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
+
+@router.get("/drift")
+async def get_drift_report(services: ServiceContainer = Depends(get_services)):
+    """📉 PSI / KS của feature và prediction lúc serving so với baseline lúc train"""
+    return services.trend_predictor.drift_monitor.report()
+
+@router.post("/drift/reset")
+async def reset_drift_monitor(services: ServiceContainer = Depends(get_services)):
+    """Bỏ thống kê serving hiện tại (ví dụ sau khi đã xử lý drift)"""
+    services.trend_predictor.drift_monitor.reset()
+    return services.trend_predictor.drift_monitor.report()
+
+@router.get("/memo-stats")
+async def get_memo_stats(services: ServiceContainer = Depends(get_services)):
+    """🧮 Hit rate của các memo cache (recipe analytics, market insights)"""
+    return services.memo_stats()
+
+@router.get("/model-version")
+async def get_model_version(services: ServiceContainer = Depends(get_services)):
+    """📦 Version model đang phục vụ và số mẫu đã học"""
+    return services.trend_predictor.model_metadata
+
 @router.post("/generate-smart-recipe", response_model=RecipeAnalyticsResponse)
-async def generate_smart_recipe(request: RecipeAnalyticsRequest):
+async def generate_smart_recipe(request: RecipeAnalyticsRequest, services: ServiceContainer = Depends(get_services)):
     """
     🤖 Tạo công thức thông minh với phân tích toàn diện
     
@@ -298,6 +406,8 @@ async def generate_smart_recipe(request: RecipeAnalyticsRequest):
     - Market analysis
     - Viral potential scoring
     - Success factor identification
+    - candidates=K: sinh K công thức song song (temperature khác nhau), trả về công thức
+      viral score cao nhất trong các candidate xong trước deadline
     """
     try:
         # Parse target date
@@ -306,25 +416,16 @@ async def generate_smart_recipe(request: RecipeAnalyticsRequest):
         else:
             target_date = datetime.now()
         
-        # Generate context-aware recipe
         custom_trend = " ".join(request.trend_keywords) if request.trend_keywords else None
+        deadline = (request.deadline_seconds if request.deadline_seconds is not None
+                    else settings.SMART_RECIPE_DEADLINE_SECONDS)
         
-        recipe = context_service.generate_context_aware_recipe(
-            user_segment=request.user_segment,
-            target_date=target_date,
-            custom_trend=custom_trend
+        # Generate K context-aware candidates, score them, keep the best
+        best, candidates = await _generate_best_candidate(
+            services, request.user_segment, target_date, custom_trend, request.candidates, deadline,
+            include_market_analysis=request.include_market_analysis
         )
-        
-        # Get detailed analytics
-        analytics = await _analyze_recipe_performance(recipe, request.user_segment, target_date)
-        
-        # Get market insights nếu được yêu cầu
-        market_insights = {}
-        if request.include_market_analysis:
-            market_insights = await _get_market_insights(request.user_segment, target_date)
-        
-        # Calculate viral potential
-        viral_score = _calculate_viral_potential(recipe, analytics, market_insights)
+        recipe, analytics, market_insights, viral_score = best
         
         # Identify success factors
         success_factors = _identify_success_factors(recipe, analytics, market_insights)
@@ -334,9 +435,12 @@ async def generate_smart_recipe(request: RecipeAnalyticsRequest):
             analytics=analytics,
             market_insights=market_insights,
             success_factors=success_factors,
-            viral_potential_score=viral_score
+            viral_potential_score=viral_score,
+            candidates=candidates
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Recipe generation failed: {str(e)}")
 
@@ -344,7 +448,8 @@ async def generate_smart_recipe(request: RecipeAnalyticsRequest):
 async def get_market_insights(
     segment: str,
     target_date: Optional[str] = Query(None, description="Target date (YYYY-MM-DD)"),
-    include_competition: bool = Query(True, description="Include competition analysis")
+    include_competition: bool = Query(True, description="Include competition analysis"),
+    services: ServiceContainer = Depends(get_services)
 ):
     """
     📊 Phân tích sâu insights thị trường cho segment cụ thể
@@ -365,7 +470,7 @@ async def get_market_insights(
         
         # Get market insights
         insights = await _get_comprehensive_market_insights(
-            segment, parsed_date, include_competition
+            services.context_service, segment, parsed_date, include_competition
         )
         
         return insights
@@ -374,7 +479,7 @@ async def get_market_insights(
         raise HTTPException(status_code=500, detail=f"Market insights failed: {str(e)}")
 
 @router.get("/trending-now")
-async def get_trending_now():
+async def get_trending_now(request: Request, services: ServiceContainer = Depends(get_services)):
     """
     🔥 Lấy xu hướng hot nhất hiện tại
     
@@ -383,36 +488,24 @@ async def get_trending_now():
     - Flavors đang hot
     - Events sắp tới
     - Seasonal opportunities
+
+    Payload được tính sẵn và refresh định kỳ (xem app/snapshots.py); hỗ trợ ETag / If-None-Match.
     """
     try:
-        now = datetime.now()
-        seasonal_ctx, _ = context_service.get_current_context(now)
-        
-        # Get trending data from recent analysis
-        trending_data = {
-            'current_season': seasonal_ctx.season,
-            'hot_events': seasonal_ctx.events,
-            'trending_flavors': seasonal_ctx.trending_flavors,
-            'popular_occasions': seasonal_ctx.popular_occasions,
-            'temperature_context': f"{seasonal_ctx.temperature}°C",
-            'demand_factor': seasonal_ctx.demand_factor,
-            'month_insights': _get_month_specific_insights(now.month),
-            'week_forecast': _get_weekly_forecast(now),
-            'viral_keywords': _get_viral_keywords_now(),
-            'opportunity_score': _calculate_current_opportunity_score(seasonal_ctx)
-        }
-        
-        return {
-            'status': 'success',
-            'timestamp': now.isoformat(),
-            'data': trending_data
-        }
-        
+        snapshot = _trending_snapshot(services)
+        payload = snapshot.get_nowait()
+        if payload is None:  # chưa có / quá stale: build ngoài event loop
+            payload = await asyncio.to_thread(snapshot.get)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Trending analysis failed: {str(e)}")
 
+    headers = {'ETag': payload.etag, 'Cache-Control': snapshot.cache_control}
+    if request.headers.get('if-none-match') == payload.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
 @router.get("/segment-recommendations/{segment}")
-async def get_segment_recommendations(segment: str):
+async def get_segment_recommendations(segment: str, services: ServiceContainer = Depends(get_services)):
     """
     🎯 Gợi ý chi tiết cho segment cụ thể
     
@@ -421,40 +514,273 @@ async def get_segment_recommendations(segment: str):
     - Price points optimal
     - Marketing strategies
     - Timing recommendations
+
+    Segment đã biết được tính sẵn theo tháng (materialized view); segment lạ tính trực tiếp.
     """
     try:
-        # Get market context cho segment
-        market_ctx = context_service._get_market_context(segment)
-        seasonal_ctx, _ = context_service.get_current_context()
-        
-        recommendations = {
-            'segment_profile': {
-                'name': market_ctx.target_segment,
-                'market_potential': market_ctx.market_potential,
-                'competition_level': market_ctx.competition_level,
-                'growth_trend': market_ctx.growth_trend,
-                'preferred_flavors': market_ctx.preferred_flavors,
-                'price_sensitivity': market_ctx.price_sensitivity
-            },
-            'current_opportunities': _get_segment_opportunities(market_ctx, seasonal_ctx),
-            'recommended_products': _get_recommended_products(segment, seasonal_ctx),
-            'pricing_strategy': _get_pricing_strategy(market_ctx),
-            'marketing_tips': _get_marketing_tips(market_ctx, seasonal_ctx),
-            'success_metrics': _get_success_metrics(segment),
-            'timing_optimization': _get_timing_optimization(seasonal_ctx)
-        }
-        
-        return {
-            'status': 'success',
-            'segment': segment,
-            'data': recommendations
-        }
+        views = _segment_views(services)
+        body = await asyncio.to_thread(views.get, segment) if views.needs_refresh else views.get(segment)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+        return _build_segment_recommendations(services.context_service, segment)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Segment recommendations failed: {str(e)}")
 
+# Response tính sẵn
+def _trending_snapshot(services: ServiceContainer) -> ResponseSnapshot:
+    return services.snapshot(
+        'trending-now',
+        lambda: _build_trending_now(services.context_service),
+        max_age_seconds=settings.TRENDING_REFRESH_SECONDS,
+        stale_seconds=settings.TRENDING_STALE_SECONDS,
+    )
+
+def _segment_views(services: ServiceContainer) -> MaterializedViews:
+    return services.views(
+        'segment-recommendations',
+        keys=lambda: _known_segments(services.context_service),
+        builder=lambda segment: _build_segment_recommendations(services.context_service, segment),
+        epoch=lambda: datetime.now().strftime("%Y-%m"),  # seasonal context đổi theo tháng
+    )
+
+def warm_precomputed(services: ServiceContainer):
+    """Tính sẵn trending-now và segment views (gọi ở startup)"""
+    _trending_snapshot(services).refresh()
+    _segment_views(services).refresh()
+
+def _known_segments(context_service) -> List[str]:
+    """Segment code của API (/segments, alias) và tên nhóm trong dữ liệu thị trường"""
+    return [*SEGMENT_MAPPING, *SEGMENT_MAPPING.values(), *context_service.market_data]
+
 # Helper functions
-async def _analyze_recipe_performance(recipe, segment: str, target_date: datetime) -> Dict[str, Any]:
+def _build_segment_recommendations(context_service, segment: str) -> Dict[str, Any]:
+    """Response của /segment-recommendations/{segment}"""
+    market_ctx = context_service._get_market_context(segment)
+    seasonal_ctx, _ = context_service.get_current_context()
+    
+    recommendations = {
+        'segment_profile': {
+            'name': market_ctx.target_segment,
+            'market_potential': market_ctx.market_potential,
+            'competition_level': market_ctx.competition_level,
+            'growth_trend': market_ctx.growth_trend,
+            'preferred_flavors': market_ctx.preferred_flavors,
+            'price_sensitivity': market_ctx.price_sensitivity
+        },
+        'current_opportunities': _get_segment_opportunities(market_ctx, seasonal_ctx),
+        'recommended_products': _get_recommended_products(segment, seasonal_ctx),
+        'pricing_strategy': _get_pricing_strategy(market_ctx),
+        'marketing_tips': _get_marketing_tips(market_ctx, seasonal_ctx),
+        'success_metrics': _get_success_metrics(segment),
+        'timing_optimization': _get_timing_optimization(seasonal_ctx)
+    }
+    
+    return {
+        'status': 'success',
+        'segment': segment,
+        'data': recommendations
+    }
+
+def _build_trending_now(context_service) -> Dict[str, Any]:
+    """Data của /trending-now (chạy khi refresh snapshot, không chạy mỗi request)"""
+    now = datetime.now()
+    seasonal_ctx, _ = context_service.get_current_context(now)
+
+    return {
+        'current_season': seasonal_ctx.season,
+        'hot_events': seasonal_ctx.events,
+        'trending_flavors': seasonal_ctx.trending_flavors,
+        'popular_occasions': seasonal_ctx.popular_occasions,
+        'temperature_context': f"{seasonal_ctx.temperature}°C",
+        'demand_factor': seasonal_ctx.demand_factor,
+        'month_insights': _get_month_specific_insights(now.month),
+        'week_forecast': _get_weekly_forecast(now, context_service.event_calendar),
+        'viral_keywords': _get_viral_keywords_now(),
+        'opportunity_score': _calculate_current_opportunity_score(seasonal_ctx)
+    }
+
+def _forecast_points(forecast: TrendForecast, resolution: str, max_points: Optional[int]) -> List[Dict[str, Any]]:
+    """Series của forecast theo resolution (mỗi điểm kèm trending flavors của mùa)"""
+    points = forecast.weekly() if resolution == "weekly" else forecast.daily(max_points)
+    if resolution == "weekly" and max_points and len(points) > max_points:
+        points = forecast.daily(max_points)
+    return points
+
+async def _gather_bounded(items: List[Any], worker, limit: int, timeout: float) -> List[Dict[str, Any]]:
+    """Chạy worker(item, run_blocking) song song, tối đa `limit` cùng lúc, mỗi item tối đa `timeout` giây.
+
+    Phần blocking của worker chạy qua `await run_blocking(func, **kwargs)` trên executor riêng của
+    batch (max_workers=limit): func nhận thêm `context=RequestContext(deadline_seconds=timeout)`.
+    - Timeout của item tính từ lúc job của nó bắt đầu chạy trên executor: thời gian xếp hàng sau
+      thread của item quá hạn trước đó không bị tính.
+    - Item quá hạn bị bỏ và context của nó bị huỷ; thread vẫn giữ slot tới khi thoát ở checkpoint
+      kế tiếp (không gọi thêm Gemini), nên số thread không vượt `limit`.
+
+    Kết quả giữ thứ tự items; item lỗi / quá hạn trả về {'status': 'failed' | 'timeout', 'error': ...}
+    thay vì làm hỏng cả batch.
+    """
+    limit = max(1, limit)
+    semaphore = asyncio.Semaphore(limit)
+    executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix="gather-bounded")
+    loop = asyncio.get_running_loop()
+
+    async def _run(item) -> Dict[str, Any]:
+        async with semaphore:
+            contexts: List[RequestContext] = []
+            state = {'deadline': loop.time() + timeout, 'queued': 0}
+            job_started = asyncio.Event()
+
+            def _on_job_start():
+                state['queued'] -= 1
+                state['deadline'] = loop.time() + timeout
+                job_started.set()
+
+            def run_blocking(func, *args, **kwargs):
+                def job():
+                    context = RequestContext(deadline_seconds=timeout)
+                    contexts.append(context)
+                    loop.call_soon_threadsafe(_on_job_start)
+                    return func(*args, context=context, **kwargs)
+
+                state['queued'] += 1
+                return loop.run_in_executor(executor, job)
+
+            work = asyncio.ensure_future(worker(item, run_blocking))
+            try:
+                while not work.done():
+                    # Job đang chờ slot executor: chưa tính giờ, chỉ chờ tới lúc nó chạy
+                    wait_for = None if state['queued'] else state['deadline'] - loop.time()
+                    if wait_for is not None and wait_for <= 0:
+                        raise asyncio.TimeoutError
+                    waker = asyncio.ensure_future(job_started.wait())
+                    await asyncio.wait({work, waker}, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                    waker.cancel()
+                    job_started.clear()
+                return work.result()
+            except asyncio.TimeoutError:
+                for context in contexts:
+                    context.cancel("event timed out")
+                work.cancel()
+                return {'status': 'timeout', 'error': f"Timed out after {timeout:.0f}s"}
+            except Exception as e:
+                return {'status': 'failed', 'error': str(e)}
+
+    try:
+        return await asyncio.gather(*(_run(item) for item in items))
+    finally:
+        executor.shutdown(wait=False)  # thread của item quá hạn chạy nốt tới checkpoint kế tiếp
+
+def _candidate_temperatures(k: int) -> List[float]:
+    """K temperature rải quanh DEFAULT_TEMPERATURE (±0.3) cho K candidate"""
+    base = settings.DEFAULT_TEMPERATURE
+    if k == 1:
+        return [base]
+    step = 0.6 / (k - 1)
+    return [round(min(max(base - 0.3 + i * step, 0.0), 2.0), 2) for i in range(k)]
+
+async def _generate_best_candidate(services: ServiceContainer, segment: str, target_date: datetime,
+                                   custom_trend: Optional[str], k: int, deadline: float,
+                                   include_market_analysis: bool = True):
+    """Sinh K candidate song song (mỗi candidate một temperature), chấm điểm, trả về candidate tốt nhất.
+
+    Deadline dùng chung cho cả K: hết giờ thì chọn trong các candidate đã xong; nếu chưa có
+    candidate nào thì chờ candidate đầu tiên thêm tối đa SMART_RECIPE_GRACE_SECONDS, quá nữa thì 504.
+    Candidate chưa xong bị bỏ: RequestContext của nó bị huỷ để thread không gọi thêm Gemini.
+
+    Returns:
+        ((recipe, analytics, market_insights, viral_score), tóm tắt từng candidate)
+    """
+    temperatures = _candidate_temperatures(k)
+    grace = settings.SMART_RECIPE_GRACE_SECONDS
+    contexts = [RequestContext(deadline_seconds=deadline + grace) for _ in temperatures]
+    tasks = [
+        asyncio.create_task(asyncio.to_thread(
+            services.context_service.generate_context_aware_recipe,
+            user_segment=segment, target_date=target_date, custom_trend=custom_trend, temperature=temperature,
+            context=context
+        ))
+        for temperature, context in zip(temperatures, contexts)
+    ]
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        loop = asyncio.get_running_loop()
+        hard_stop = loop.time() + grace
+        while pending and not any(task.exception() is None for task in done):
+            finished, pending = await asyncio.wait(pending, timeout=max(0.0, hard_stop - loop.time()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+            if not finished:
+                raise HTTPException(status_code=504,
+                                    detail=f"No candidate recipe finished within {deadline + grace:.0f}s")
+            done |= finished
+    finally:
+        for task, context in zip(tasks, contexts):
+            if not task.done():
+                context.cancel("candidate abandoned")
+                task.cancel()
+
+    scored, summary = [], []
+    for index, (task, temperature) in enumerate(zip(tasks, temperatures)):
+        entry = {'candidate': index, 'temperature': temperature}
+        if task not in done:
+            summary.append({**entry, 'status': 'timeout'})
+            continue
+        if task.exception() is not None:
+            summary.append({**entry, 'status': 'failed', 'error': str(task.exception())})
+            continue
+        recipe = task.result()
+        analytics = await _memoized_recipe_performance(services, recipe, segment, target_date)
+        market_insights = await _memoized_market_insights(services, segment, target_date) if include_market_analysis else {}
+        viral_score = _calculate_viral_potential(recipe, analytics, market_insights)
+        scored.append((viral_score, index, (recipe, analytics, market_insights, viral_score)))
+        summary.append({**entry, 'status': 'success', 'title': recipe.title,
+                        'viral_potential_score': viral_score, 'selected': False})
+
+    if not scored:
+        raise RuntimeError(summary[0].get('error', 'No candidate recipe generated'))
+    _, best_index, best = max(scored, key=lambda item: (item[0], -item[1]))
+    summary[best_index]['selected'] = True
+    return best, summary
+
+def _date_bucket(target_date: datetime) -> str:
+    """Bucket ngày cho memo key: seasonal / market context chỉ phụ thuộc tháng"""
+    return target_date.strftime("%Y-%m")
+
+async def _memoized_recipe_performance(services: ServiceContainer, recipe, segment: str,
+                                       target_date: datetime) -> Dict[str, Any]:
+    """_analyze_recipe_performance nhớ theo (fingerprint, segment, tháng)"""
+    memo = services.memo('recipe-analytics', settings.ANALYTICS_MEMO_SIZE)
+    key = (recipe.fingerprint(), segment, _date_bucket(target_date))
+    analytics = memo.get(key)
+    if analytics is None:
+        analytics = await _analyze_recipe_performance(services.context_service, recipe, segment, target_date)
+        memo.put(key, analytics)
+    return dict(analytics)  # bản sao: caller không sửa được entry trong cache
+
+async def _memoized_market_insights(services: ServiceContainer, segment: str, target_date: datetime) -> Dict[str, Any]:
+    """_get_market_insights nhớ theo (segment, tháng) - không phụ thuộc recipe"""
+    memo = services.memo('market-insights', settings.ANALYTICS_MEMO_SIZE)
+    key = (segment, _date_bucket(target_date))
+    insights = memo.get(key)
+    if insights is None:
+        insights = await _get_market_insights(services.context_service, segment, target_date)
+        memo.put(key, insights)
+    return dict(insights)
+
+def _scoring_context(context_service, segment: str, target_date: datetime,
+                     include_market_analysis: bool = True) -> ScoringContext:
+    """Context chấm điểm batch, dựng giống _analyze_recipe_performance + _get_market_insights"""
+    seasonal_ctx, market_ctx = context_service.get_current_context(target_date)
+    growth = _analyze_growth_potential(context_service._get_market_context(segment)) if include_market_analysis else 0.5
+    return ScoringContext(
+        trending_flavors=tuple(seasonal_ctx.trending_flavors),
+        season=seasonal_ctx.season,
+        price_sensitivity=market_ctx.price_sensitivity,
+        timing_score=_score_timing_alignment(target_date, seasonal_ctx),
+        growth_potential=growth,
+    )
+
+async def _analyze_recipe_performance(context_service, recipe, segment: str, target_date: datetime) -> Dict[str, Any]:
     """Phân tích performance potential của recipe"""
     
     seasonal_ctx, market_ctx = context_service.get_current_context(target_date)
@@ -479,7 +805,7 @@ async def _analyze_recipe_performance(recipe, segment: str, target_date: datetim
         'preparation_feasibility': _score_preparation_feasibility(recipe)
     }
 
-async def _get_market_insights(segment: str, target_date: datetime) -> Dict[str, Any]:
+async def _get_market_insights(context_service, segment: str, target_date: datetime) -> Dict[str, Any]:
     """Lấy market insights cho segment"""
     
     market_ctx = context_service._get_market_context(segment)
@@ -509,11 +835,11 @@ def _calculate_viral_potential(recipe, analytics: Dict, market_insights: Dict) -
     
     # Calculate weighted score
     viral_score = (
-        ingredient_trend * 0.25 +
-        timing_opt * 0.20 +
-        segment_fit * 0.20 +
-        viral_elements * 0.20 +
-        market_potential * 0.15
+        ingredient_trend * VIRAL_WEIGHTS['ingredient_trend_alignment'] +
+        timing_opt * VIRAL_WEIGHTS['timing_optimization'] +
+        segment_fit * VIRAL_WEIGHTS['segment_fit_score'] +
+        viral_elements * VIRAL_WEIGHTS['viral_elements'] +
+        market_potential * VIRAL_WEIGHTS['growth_potential']
     )
     
     return min(viral_score, 1.0)
@@ -521,27 +847,13 @@ def _calculate_viral_potential(recipe, analytics: Dict, market_insights: Dict) -
 def _identify_success_factors(recipe, analytics: Dict, market_insights: Dict) -> List[str]:
     """Identify key success factors"""
     
-    factors = []
-    
-    if analytics.get('ingredient_trend_alignment', 0) > 0.7:
-        factors.append("✅ Ingredients align perfectly with current trends")
-    
-    if analytics.get('timing_optimization', 0) > 0.7:
-        factors.append("✅ Perfect timing for seasonal demand")
-    
-    if analytics.get('segment_fit_score', 0) > 0.7:
-        factors.append("✅ Excellent match for target segment preferences")
-    
-    if len(analytics.get('viral_elements', [])) >= 3:
-        factors.append("✅ Contains multiple viral-worthy elements")
-    
-    if market_insights.get('growth_potential', 0) > 0.6:
-        factors.append("✅ High market growth potential")
-    
-    if analytics.get('cost_efficiency', 0) > 0.6:
-        factors.append("✅ Cost-efficient ingredient selection")
-    
-    return factors
+    values = {
+        **analytics,
+        'viral_element_count': len(analytics.get('viral_elements', [])),
+        'growth_potential': market_insights.get('growth_potential', 0),
+    }
+    return [message for column, threshold, message in SUCCESS_FACTOR_RULES
+            if values.get(column, 0) > threshold]
 
 # Additional helper functions for comprehensive analysis
 def _score_ingredient_alignment(ingredients, trending_flavors) -> float:
@@ -549,13 +861,9 @@ def _score_ingredient_alignment(ingredients, trending_flavors) -> float:
     if not trending_flavors:
         return 0.5
     
-    alignment_count = 0
+    matcher = keyword_matcher(tuple(trending_flavors))
+    alignment_count = matcher.count(ingredient.name for ingredient in ingredients or [])
     total = max(len(ingredients or []), 1)
-    for ingredient in ingredients or []:
-        for flavor in trending_flavors:
-            if flavor.lower() in ingredient.name.lower():
-                alignment_count += 1
-                break
     
     return min(alignment_count / total, 1.0)
 
@@ -583,42 +891,22 @@ def _score_segment_fit(recipe, market_ctx) -> float:
     """Score recipe fit với market segment"""
     
     # Simple scoring based on complexity and preferences
-    complexity_map = {'easy': 0.8, 'medium': 0.6, 'hard': 0.3}
-    complexity_score = complexity_map.get(recipe.difficulty, 0.5)
+    complexity_score = SEGMENT_COMPLEXITY_SCORES[difficulty_key(recipe.difficulty)]
     
     # Price sensitivity alignment (simple heuristic)
-    if market_ctx.price_sensitivity == 'thấp':
-        price_score = 0.9 if recipe.difficulty == 'hard' else 0.6
-    elif market_ctx.price_sensitivity == 'cao':
-        price_score = 0.9 if recipe.difficulty == 'easy' else 0.4
-    else:
-        price_score = 0.7
+    price_score = price_fit_score(recipe.difficulty, market_ctx.price_sensitivity)
     
     return (complexity_score + price_score) / 2
 
 def _score_complexity(difficulty: str) -> float:
     """Score recipe complexity"""
-    complexity_scores = {'easy': 0.9, 'medium': 0.7, 'hard': 0.4}
-    return complexity_scores.get(difficulty, 0.5)
+    return COMPLEXITY_SCORES[difficulty_key(difficulty)]
 
 def _score_seasonality(recipe, seasonal_ctx) -> float:
     """Score seasonal relevance"""
     
-    seasonal_ingredients = {
-        'Xuân': ['strawberry', 'dâu', 'green tea', 'trà xanh'],
-        'Hè': ['mango', 'xoài', 'coconut', 'dừa', 'lemon'],
-        'Thu': ['pumpkin', 'bí đỏ', 'apple', 'táo', 'cinnamon'],
-        'Đông': ['chocolate', 'gingerbread', 'orange', 'cam']
-    }
-    
-    season_ingredients = seasonal_ingredients.get(seasonal_ctx.season, [])
-    
-    match_count = 0
-    for ingredient in recipe.ingredients:
-        for seasonal_ing in season_ingredients:
-            if seasonal_ing.lower() in ingredient.name.lower():
-                match_count += 1
-                break
+    match_count = SEASONAL_INGREDIENTS.count((ingredient.name for ingredient in recipe.ingredients),
+                                             category=seasonal_ctx.season)
     
     return min(match_count / max(len(recipe.ingredients), 1), 1.0)
 
@@ -628,17 +916,15 @@ def _identify_viral_elements(recipe) -> List[str]:
     viral_elements = []
     
     # Check title for viral words
-    viral_keywords = ['trending', 'viral', 'hot', 'new', 'special', 'unique', 'amazing']
-    if any(word in recipe.title.lower() for word in viral_keywords):
+    if VIRAL_TITLE_KEYWORDS.matches(recipe.title):
         viral_elements.append("Viral title keywords")
     
     # Check for seasonal relevance
-    if any(tag in ['Halloween', 'Christmas', 'Valentine', 'Tết'] for tag in recipe.tags):
+    if not EVENT_TAGS.isdisjoint(recipe.tags):
         viral_elements.append("Seasonal event tie-in")
     
     # Check for trending ingredients
-    trending_ingredients = ['matcha', 'taro', 'ube', 'brown sugar', 'cheese foam']
-    if any(ing.name.lower() in trending_ingredients for ing in recipe.ingredients):
+    if any(normalize_text(ing.name) in TRENDING_INGREDIENTS for ing in recipe.ingredients):
         viral_elements.append("Trending ingredients")
     
     # Check difficulty (easier = more viral potential)
@@ -650,12 +936,7 @@ def _identify_viral_elements(recipe) -> List[str]:
 def _estimate_cost_efficiency(ingredients) -> float:
     """Estimate cost efficiency of ingredients"""
     
-    # Simple cost categories (would be better with real pricing data)
-    expensive_ingredients = ['vanilla', 'chocolate', 'cream', 'butter', 'nuts']
-    cheap_ingredients = ['flour', 'sugar', 'milk', 'eggs']
-    
-    expensive_count = sum(1 for ing in ingredients 
-                         if any(exp in ing.name.lower() for exp in expensive_ingredients))
+    expensive_count = COST_CATEGORIES.count((ing.name for ing in ingredients), category='expensive')
     
     total_ingredients = len(ingredients)
     if total_ingredients == 0:
@@ -668,31 +949,16 @@ def _score_preparation_feasibility(recipe) -> float:
     """Score how feasible the recipe is to prepare"""
     
     # Factor in prep time, cook time, complexity
-    try:
-        prep_minutes = int(recipe.prep_time.split()[0]) if recipe.prep_time else 30
-        cook_minutes = int(recipe.cook_time.split()[0]) if recipe.cook_time else 30
-        
-        total_time = prep_minutes + cook_minutes
-        
-        # Score based on total time (shorter = higher feasibility)
-        if total_time <= 60:
-            time_score = 0.9
-        elif total_time <= 120:
-            time_score = 0.7
-        else:
-            time_score = 0.4
-        
-        # Factor in difficulty
-        difficulty_scores = {'easy': 0.9, 'medium': 0.6, 'hard': 0.3}
-        difficulty_score = difficulty_scores.get(recipe.difficulty, 0.5)
-        
-        return (time_score + difficulty_score) / 2
-        
-    except:
+    minutes = total_minutes(recipe)
+    if minutes is None:
         return 0.5
+    
+    # Score based on total time (shorter = higher feasibility), then difficulty
+    difficulty_score = FEASIBILITY_DIFFICULTY_SCORES[difficulty_key(recipe.difficulty)]
+    return (time_feasibility_score(minutes) + difficulty_score) / 2
 
 # Additional helper functions for market insights
-async def _get_comprehensive_market_insights(segment: str, target_date: datetime, include_competition: bool) -> MarketInsightResponse:
+async def _get_comprehensive_market_insights(context_service, segment: str, target_date: datetime, include_competition: bool) -> MarketInsightResponse:
     """Get comprehensive market insights"""
     
     market_ctx = context_service._get_market_context(segment)
@@ -803,17 +1069,20 @@ def _get_month_specific_insights(month: int) -> Dict[str, Any]:
         'recommended_colors': ['Natural tones']
     })
 
-def _get_weekly_forecast(current_date: datetime) -> Dict[str, Any]:
+def _get_weekly_forecast(current_date: datetime, calendar: EventCalendar) -> Dict[str, Any]:
     """Get forecast for next week"""
     
     next_week = current_date + timedelta(days=7)
+    next_event = calendar.next_event(current_date)
     
     return {
         'target_date': next_week.strftime("%Y-%m-%d"),
         'predicted_demand': "Medium to High",
         'recommended_prep_time': "3-4 days ahead",
         'optimal_launch_day': "Friday or Saturday",
-        'expected_engagement': "Peak on weekends"
+        'expected_engagement': "Peak on weekends",
+        'daily_events': calendar.daily(current_date, 7),
+        'next_event': next_event.to_dict() if next_event else None
     }
 
 def _get_viral_keywords_now() -> List[str]:
@@ -1062,7 +1331,7 @@ def _identify_competitive_advantages(market_ctx, seasonal_ctx) -> List[str]:
 def _get_recommended_ingredients(self, seasonal_ctx, market_ctx, trend_strength: float) -> List[str]:
     """Get recommended ingredients based on context"""
     
-    base_ingredients = seasonal_ctx.trending_flavors.copy()
+    base_ingredients = list(seasonal_ctx.trending_flavors)
     
     # Add segment-specific ingredients
     segment_ingredients = {
@@ -0,0 +1,116 @@
+# app/routers/jobs.py
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+
+from app.container import ServiceContainer, get_services
+from app.jobs import TERMINAL_STATUSES, JobQueueFull
+from app.routers import analytics, recipes
+from configs.settings import settings
+from domain.services.request_context import RequestContext
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+CALLBACK_QUERY = Query(None, description="POST kết quả (ký HMAC, header X-RCM-Signature) tới URL này khi job xong")
+
+
+class IngredientsBatchRequest(BaseModel):
+    items: List[recipes.IngredientsRequest]
+
+
+def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+    view = {key: value for key, value in job.items() if key != 'expires_at'}
+    view['status_url'] = f"{settings.API_V1_PREFIX}/jobs/{job['id']}"
+    return view
+
+
+async def _submit(services: ServiceContainer, kind: str, run, response: Response,
+                  callback_url: Optional[str] = None) -> Dict[str, Any]:
+    if callback_url:
+        if not services.webhooks.enabled:
+            raise HTTPException(status_code=400, detail="Webhook callbacks are not configured (WEBHOOK_SECRET)")
+        try:
+            await asyncio.to_thread(services.webhooks.validate_url, callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        job = await services.jobs.submit(kind, run, callback_url=callback_url)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': '30'})
+    response.status_code = 202
+    return _public(job)
+
+
+@router.post("/forecast-and-generate", status_code=202)
+async def submit_forecast_and_generate(request: analytics.ForecastAndGenerateRequest, response: Response,
+                                       callback_url: Optional[str] = CALLBACK_QUERY,
+                                       services: ServiceContainer = Depends(get_services)):
+    """⏳ Chạy /analytics/forecast-and-generate ở background, trả về job id ngay"""
+    return await _submit(services, 'forecast-and-generate',
+                         lambda: analytics.forecast_and_generate(request, services), response, callback_url)
+
+
+@router.post("/generate-smart-recipe", status_code=202)
+async def submit_generate_smart_recipe(request: analytics.RecipeAnalyticsRequest, response: Response,
+                                       callback_url: Optional[str] = CALLBACK_QUERY,
+                                       services: ServiceContainer = Depends(get_services)):
+    """⏳ Chạy /analytics/generate-smart-recipe ở background, trả về job id ngay"""
+    return await _submit(services, 'generate-smart-recipe',
+                         lambda: analytics.generate_smart_recipe(request, services), response, callback_url)
+
+
+@router.post("/generate-from-ingredients", status_code=202)
+async def submit_generate_from_ingredients(request: IngredientsBatchRequest, response: Response,
+                                           callback_url: Optional[str] = CALLBACK_QUERY,
+                                           services: ServiceContainer = Depends(get_services)):
+    """⏳ Sinh nhiều công thức từ nguyên liệu (lần lượt từng item) ở background"""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="items must not be empty")
+
+    async def run():
+        context = RequestContext()
+        results = []
+        try:
+            for item in request.items:
+                results.append(await asyncio.to_thread(
+                    services.recipe_use_case.execute_from_ingredients,
+                    ingredients=item.ingredients, language=item.language, use_t5=item.use_t5, context=context,
+                ))
+        except asyncio.CancelledError:
+            context.cancel("job cancelled")  # thread đang chạy dừng ở checkpoint kế tiếp
+            raise
+        return {'count': len(results), 'results': results}
+
+    return await _submit(services, 'generate-from-ingredients', run, response, callback_url)
+
+
+@router.get("/metrics")
+async def get_job_metrics(services: ServiceContainer = Depends(get_services)):
+    """📈 Độ sâu hàng đợi, số job đang chạy, thống kê theo trạng thái và giao webhook"""
+    return {**services.jobs.metrics(), 'webhooks': services.webhooks.metrics()}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str,
+                  wait: Optional[float] = Query(None, ge=0, description="Long-poll: chờ tối đa N giây tới khi xong"),
+                  services: ServiceContainer = Depends(get_services)):
+    """Trạng thái / kết quả job; `wait` để long-poll"""
+    if wait:
+        job = await services.jobs.wait(job_id, timeout=min(wait, settings.JOB_LONG_POLL_MAX_SECONDS))
+    else:
+        job = services.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return _public(job)
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str, services: ServiceContainer = Depends(get_services)):
+    """Huỷ job đang chờ / đang chạy"""
+    job = services.jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if job['status'] in TERMINAL_STATUSES and job['status'] != 'cancelled':
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return _public(job)
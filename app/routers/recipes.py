@@ -1,11 +1,22 @@
 # app/routers/recipes.py
-from fastapi import APIRouter, HTTPException, Query
+import hashlib
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional
-from application.use_cases.generate_personalized_recipe_use_case import GeneratePersonalizedRecipeUseCase
+from app.cancellation import run_until_disconnected
+from app.container import ServiceContainer, get_services
+from app.idempotency import IdempotencyInProgress, IdempotencyKeyReused
+from configs.settings import settings
+from domain.services.request_context import RequestCancelled
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
-use_case = GeneratePersonalizedRecipeUseCase()
+
+IDEMPOTENCY_HEADER = Header(None, alias="Idempotency-Key", max_length=255,
+                            description="Retry với cùng key không chạy lại pipeline mà nhận lại response cũ")
+DEADLINE_HEADER = Header(None, alias="X-Request-Deadline", gt=0,
+                         description="Budget thời gian (giây) cho cả pipeline; thiếu thì bỏ qua bước tốn kém")
 
 class IngredientsRequest(BaseModel):
     ingredients: str
@@ -18,8 +29,42 @@ class TrendRequest(BaseModel):
     occasion: Optional[str] = None
     language: str = "vi"
 
+def _deadline_seconds(requested: Optional[float]) -> float:
+    if requested is None:
+        return settings.RECIPE_DEADLINE_SECONDS
+    return min(requested, settings.RECIPE_DEADLINE_MAX_SECONDS)
+
+async def _idempotent(services: ServiceContainer, scope: str, key: Optional[str], request: BaseModel, run):
+    """Chạy `run` (coroutine function) qua Idempotency-Key nếu client gửi header, ngược lại chạy thẳng"""
+    try:
+        return await _run_idempotent(services, scope, key, request, run)
+    except RequestCancelled:
+        # Client đã đi: không ai đọc response, 499 chỉ để log
+        raise HTTPException(status_code=499, detail="Client closed request")
+
+async def _run_idempotent(services: ServiceContainer, scope: str, key: Optional[str], request: BaseModel, run):
+    if not key:
+        return await run()
+
+    async def compute():
+        response = JSONResponse(content=jsonable_encoder(await run()))
+        return response.status_code, response.body
+
+    fingerprint = hashlib.sha1(request.model_dump_json().encode('utf-8')).hexdigest()
+    try:
+        (status_code, body), replayed = await services.idempotency.run(scope, key, fingerprint, compute)
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={'Retry-After': '5'})
+    headers = {'Idempotent-Replayed': 'true'} if replayed else None
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
 @router.post("/generate-from-ingredients")
-async def generate_from_ingredients(request: IngredientsRequest):
+async def generate_from_ingredients(request: IngredientsRequest, http_request: Request,
+                                    idempotency_key: Optional[str] = IDEMPOTENCY_HEADER,
+                                    deadline: Optional[float] = DEADLINE_HEADER,
+                                    services: ServiceContainer = Depends(get_services)):
     """
     Generate recipe from ingredients list.
     
@@ -27,29 +72,46 @@ async def generate_from_ingredients(request: IngredientsRequest):
     - T5 Mode (use_t5=true): Vietnamese → T5 → Gemini Translation
     - Gemini Mode (use_t5=false): Direct Gemini generation
     """
-    try:
-        result = use_case.execute_from_ingredients(
-            ingredients=request.ingredients,
-            language=request.language,
-            use_t5=request.use_t5
-        )
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def run():
+        try:
+            return await run_until_disconnected(
+                http_request,
+                services.recipe_use_case.execute_from_ingredients,
+                deadline_seconds=_deadline_seconds(deadline),
+                ingredients=request.ingredients,
+                language=request.language,
+                use_t5=request.use_t5
+            )
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await _idempotent(services, 'generate-from-ingredients', idempotency_key, request, run)
 
 @router.post("/generate-from-trend")
-async def generate_from_trend(request: TrendRequest):
+async def generate_from_trend(request: TrendRequest, http_request: Request,
+                              idempotency_key: Optional[str] = IDEMPOTENCY_HEADER,
+                              deadline: Optional[float] = DEADLINE_HEADER,
+                              services: ServiceContainer = Depends(get_services)):
     """Generate recipe from trend and user segment"""
-    try:
-        result = use_case.execute_from_trend(
-            trend=request.trend,
-            user_segment=request.user_segment,
-            occasion=request.occasion,
-            language=request.language
-        )
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    async def run():
+        try:
+            return await run_until_disconnected(
+                http_request,
+                services.recipe_use_case.execute_from_trend,
+                deadline_seconds=_deadline_seconds(deadline),
+                trend=request.trend,
+                user_segment=request.user_segment,
+                occasion=request.occasion,
+                language=request.language
+            )
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await _idempotent(services, 'generate-from-trend', idempotency_key, request, run)
 
 @router.get("/health")
 async def health_check():
@@ -0,0 +1,158 @@
+# app/snapshots.py
+"""
+Response snapshot: payload tính sẵn, serialize sẵn thành JSON bytes, phục vụ kèm ETag.
+
+- refresh(): gọi builder, serialize; nếu data không đổi thì giữ nguyên body/ETag/version
+- get(): trả snapshot hiện tại ngay cả khi hơi cũ (stale-while-revalidate), đồng thời
+  refresh ở background thread; quá cả khoảng stale thì refresh đồng bộ
+- get_nowait(): như get() nhưng không bao giờ build trong thread gọi; None nếu cần refresh
+  đồng bộ (endpoint async gọi get() qua asyncio.to_thread)
+- invalidate(): đánh dấu cần refresh (khi reload model / dữ liệu)
+
+MaterializedViews: như trên nhưng cho một tập key cố định (mỗi key một response).
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Iterable, Mapping, Optional
+
+
+@dataclass(frozen=True)
+class SnapshotPayload:
+    body: bytes
+    etag: str
+    version: int
+    built_at: float  # time.monotonic() lúc build
+
+
+class ResponseSnapshot:
+    """Payload tính sẵn cho một endpoint đọc nhiều, đổi ít"""
+
+    def __init__(self, name: str, builder: Callable[[], Dict[str, Any]],
+                 max_age_seconds: float, stale_seconds: float):
+        self.name = name
+        self.builder = builder
+        self.max_age_seconds = max_age_seconds
+        self.stale_seconds = stale_seconds
+
+        self._lock = threading.Lock()
+        self._current: Optional[SnapshotPayload] = None
+        self._invalidated = False
+        self._background = threading.Lock()
+
+    @property
+    def cache_control(self) -> str:
+        return f"public, max-age={int(self.max_age_seconds)}, stale-while-revalidate={int(self.stale_seconds)}"
+
+    @property
+    def needs_refresh(self) -> bool:
+        return self._invalidated or self.age() >= self.max_age_seconds
+
+    def age(self) -> float:
+        current = self._current
+        return time.monotonic() - current.built_at if current is not None else float('inf')
+
+    def refresh(self) -> SnapshotPayload:
+        """Build lại payload; version/ETag chỉ đổi khi data đổi"""
+        with self._lock:
+            self._invalidated = False
+            data = self.builder()
+            data_bytes = json.dumps(data, ensure_ascii=False, default=str, separators=(',', ':')).encode('utf-8')
+            etag = '"' + hashlib.sha1(data_bytes).hexdigest()[:20] + '"'
+
+            current = self._current
+            if current is not None and current.etag == etag:
+                self._current = SnapshotPayload(current.body, etag, current.version, time.monotonic())
+                return self._current
+
+            version = (current.version if current is not None else 0) + 1
+            # Ghép envelope quanh data đã serialize (không dump lại data)
+            envelope = json.dumps({'status': 'success', 'timestamp': datetime.now().isoformat(),
+                                   'version': version}, separators=(',', ':')).encode('utf-8')
+            body = envelope[:-1] + b',"data":' + data_bytes + b'}'
+            self._current = SnapshotPayload(body, etag, version, time.monotonic())
+            return self._current
+
+    def invalidate(self):
+        self._invalidated = True
+
+    def get(self) -> SnapshotPayload:
+        """Snapshot để phục vụ ngay; cũ thì kích hoạt refresh ở background"""
+        current = self.get_nowait()
+        return current if current is not None else self.refresh()
+
+    def get_nowait(self) -> Optional[SnapshotPayload]:
+        """Snapshot hiện tại nếu còn phục vụ được (cũ thì refresh ở background), None nếu chưa có / quá stale"""
+        current = self._current
+        age = self.age()
+        if current is None or age > self.max_age_seconds + self.stale_seconds:
+            return None
+        if self._invalidated or age > self.max_age_seconds:
+            self._refresh_in_background()
+        return current
+
+    def _refresh_in_background(self):
+        if not self._background.acquire(blocking=False):
+            return  # đang có refresh khác chạy
+
+        def _run():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Snapshot '{self.name}' refresh failed: {e}")
+            finally:
+                self._background.release()
+
+        threading.Thread(target=_run, name=f"snapshot-{self.name}", daemon=True).start()
+
+
+class MaterializedViews:
+    """Response tính sẵn cho một tập key cố định (ví dụ các segment đã biết).
+
+    Toàn bộ view được build cùng lúc thành một mapping immutable key -> JSON bytes.
+    Build lại khi epoch đổi (ví dụ sang tháng mới) hoặc sau invalidate(); key lạ trả về None
+    để endpoint tự tính như bình thường.
+    """
+
+    def __init__(self, name: str, keys: Callable[[], Iterable[str]], builder: Callable[[str], Dict[str, Any]],
+                 epoch: Callable[[], Hashable]):
+        self.name = name
+        self.keys = keys
+        self.builder = builder
+        self.epoch = epoch
+
+        self._lock = threading.Lock()
+        self._bodies: Mapping[str, bytes] = MappingProxyType({})
+        self._epoch: Optional[Hashable] = None
+        self._invalidated = True
+
+    @property
+    def needs_refresh(self) -> bool:
+        return self._invalidated or self._epoch != self.epoch()
+
+    def refresh(self, only_if_needed: bool = False) -> Mapping[str, bytes]:
+        with self._lock:
+            if only_if_needed and not self.needs_refresh:
+                return self._bodies  # thread khác vừa refresh xong
+            epoch = self.epoch()
+            bodies = {
+                key: json.dumps(self.builder(key), ensure_ascii=False, default=str,
+                                separators=(',', ':')).encode('utf-8')
+                for key in dict.fromkeys(self.keys())
+            }
+            # Gán một lần: request đang đọc mapping cũ không bị ảnh hưởng
+            self._bodies = MappingProxyType(bodies)
+            self._epoch = epoch
+            self._invalidated = False
+            return self._bodies
+
+    def invalidate(self):
+        self._invalidated = True
+
+    def get(self, key: str) -> Optional[bytes]:
+        bodies = self.refresh(only_if_needed=True) if self.needs_refresh else self._bodies
+        return bodies.get(key)
@@ -0,0 +1,316 @@
+# app/webhooks.py
+"""
+Webhook callback khi job kết thúc: POST kết quả tới `callback_url` của client, ký HMAC-SHA256.
+
+Header gửi kèm:
+- X-RCM-Event: job.succeeded | job.failed | job.cancelled
+- X-RCM-Delivery: id của lần giao (giữ nguyên qua các lần retry, dùng để chống trùng)
+- X-RCM-Timestamp: epoch giây
+- X-RCM-Signature: "sha256=" + HMAC(secret, f"{timestamp}." + body)
+
+Giao qua hàng đợi có giới hạn, retry với exponential backoff (lỗi mạng, 5xx, 408, 429),
+giới hạn số request đồng thời cho mỗi endpoint (host). Hết lượt retry / lỗi 4xx / hàng đợi đầy
+thì ghi vào dead-letter log (JSON lines).
+
+Chống SSRF: callback_url phải resolve ra địa chỉ public (không private / loopback / link-local /
+reserved), trừ host nằm trong allowed_hosts; kiểm tra lúc nhận job và lại trước mỗi lần gửi.
+Lần gửi kết nối thẳng tới địa chỉ vừa kiểm tra (Host header / SNI giữ hostname gốc) nên DNS
+rebinding không đổi được đích, và không đi theo redirect (3xx = lỗi, không retry).
+"""
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import socket
+import time
+import uuid
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+RETRYABLE_STATUS = frozenset({408, 429})
+
+
+def sign_payload(secret: str, timestamp: str, body: bytes) -> str:
+    digest = hmac.new(secret.encode('utf-8'), timestamp.encode('utf-8') + b'.' + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(secret: str, timestamp: str, body: bytes, signature: str) -> bool:
+    """Cho phía nhận (storefront) kiểm tra chữ ký"""
+    return hmac.compare_digest(sign_payload(secret, timestamp, body), signature)
+
+
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split('%', 1)[0])  # bỏ scope id của IPv6 link-local
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return not (ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved
+                or ip.is_multicast or ip.is_unspecified)
+
+
+def resolve_callback_url(url: str, allowed_hosts: Iterable[str] = ()) -> Optional[str]:
+    """Kiểm tra callback_url, trả về địa chỉ IP (public) để gửi tới; None nếu host nằm trong
+    allowed_hosts (được tin cậy, ví dụ storefront nội bộ). Blocking (resolve DNS).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.netloc or not parts.hostname:
+        raise ValueError("callback_url must be an absolute http(s) URL")
+    host = parts.hostname.lower()
+    if host in {allowed.lower() for allowed in allowed_hosts}:
+        return None
+
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    try:
+        addresses = list(dict.fromkeys(info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)))
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"callback_url host cannot be resolved: {host}") from e
+    if not addresses or not all(_is_public_address(address) for address in addresses):
+        raise ValueError(f"callback_url must resolve to a public address: {host}")
+    return addresses[0]
+
+
+def validate_callback_url(url: str, allowed_hosts: Iterable[str] = ()) -> str:
+    """Kiểm tra callback_url; blocking (resolve DNS) nên gọi qua asyncio.to_thread trong event loop"""
+    resolve_callback_url(url, allowed_hosts)
+    return url
+
+
+def _pinned_url(url: str, address: str) -> str:
+    """URL trỏ thẳng tới address (giữ userinfo, port, path)"""
+    parts = urlsplit(url)
+    userinfo = parts.netloc.rpartition('@')[0]
+    host = f"[{address}]" if ':' in address else address
+    netloc = (f"{userinfo}@" if userinfo else '') + host + (f":{parts.port}" if parts.port else '')
+    return urlunsplit(parts._replace(netloc=netloc))
+
+
+def _post_with_requests(url: str, body: bytes, headers: Dict[str, str], timeout: float,
+                        address: Optional[str] = None) -> int:
+    """POST không theo redirect; address: kết nối tới IP đã kiểm tra thay vì resolve lại hostname"""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    class _PinnedHostAdapter(HTTPAdapter):
+        """HTTPS tới IP nhưng SNI / kiểm tra certificate theo hostname gốc"""
+
+        def __init__(self, hostname: str):
+            self.hostname = hostname
+            super().__init__()
+
+        def init_poolmanager(self, *args, **kwargs):
+            kwargs['server_hostname'] = self.hostname
+            kwargs['assert_hostname'] = self.hostname
+            super().init_poolmanager(*args, **kwargs)
+
+    parts = urlsplit(url)
+    with requests.Session() as session:
+        if address is not None:
+            headers = {**headers, 'Host': parts.hostname + (f":{parts.port}" if parts.port else '')}
+            url = _pinned_url(url, address)
+            if parts.scheme == 'https':
+                session.mount('https://', _PinnedHostAdapter(parts.hostname))
+        return session.post(url, data=body, headers=headers, timeout=timeout, allow_redirects=False).status_code
+
+
+class WebhookDispatcher:
+    """Hàng đợi giao webhook với retry, dead-letter và giới hạn đồng thời theo endpoint.
+
+    Endpoint đã đủ `per_endpoint_concurrency` lần giao đang chạy thì delivery mới của nó được
+    gửi lại (park) cho worker đang giữ slot của endpoint đó, nên một host chậm chiếm tối đa
+    `per_endpoint_concurrency` worker, các host khác không phải chờ.
+    """
+
+    def __init__(self, secret: Optional[str], max_queue: int = 500, workers: int = 4, max_attempts: int = 6,
+                 backoff_seconds: float = 2.0, backoff_max_seconds: float = 300.0,
+                 per_endpoint_concurrency: int = 2, timeout_seconds: float = 10.0,
+                 dead_letter_path: Optional[Path] = None, allowed_hosts: Iterable[str] = (),
+                 sender: Callable[[str, bytes, Dict[str, str], float, Optional[str]], int] = _post_with_requests):
+        self.secret = secret
+        self.max_queue = max(1, max_queue)
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.per_endpoint_concurrency = max(1, per_endpoint_concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.dead_letter_path = dead_letter_path
+        self.allowed_hosts = frozenset(host.lower() for host in allowed_hosts)
+        self.sender = sender
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list = []
+        self._retries: set = set()
+        self._endpoint_active: Dict[str, int] = defaultdict(int)
+        self._parked: Dict[str, deque] = defaultdict(deque)
+        self._parked_count = 0
+        self.dead_letters: deque = deque(maxlen=100)
+        self._counters = {'enqueued': 0, 'delivered': 0, 'failed_attempts': 0, 'dead_lettered': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.secret)
+
+    def validate_url(self, url: str) -> str:
+        """validate_callback_url với allowed_hosts của dispatcher (blocking: resolve DNS)"""
+        return validate_callback_url(url, self.allowed_hosts)
+
+    async def start(self):
+        self._ensure_started()
+
+    def _ensure_started(self):
+        """Khởi động workers trên event loop đang chạy (idempotent)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._endpoint_active.clear()
+        self._parked.clear()
+        self._parked_count = 0
+        self._tasks = [asyncio.create_task(self._worker(), name=f"webhook-worker-{i}") for i in range(self.workers)]
+
+    async def stop(self):
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        self._retries.clear()
+
+    def enqueue(self, url: str, event: str, payload: Dict[str, Any]) -> str:
+        """Đưa một lần giao vào hàng đợi (gọi trong event loop); trả về delivery id"""
+        delivery = {
+            'id': uuid.uuid4().hex, 'url': url, 'event': event, 'attempt': 0,
+            'body': json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'),
+        }
+        self._ensure_started()
+        self._counters['enqueued'] += 1
+        self._put(delivery)
+        return delivery['id']
+
+    def enqueue_job(self, job: Dict[str, Any]):
+        """Hook của JobManager: gửi kết quả job tới callback_url (nếu có)"""
+        url = job.get('callback_url')
+        if url:
+            payload = {key: value for key, value in job.items() if key not in ('expires_at', 'callback_url')}
+            self.enqueue(url, f"job.{job['status']}", payload)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': (self._queue.qsize() if self._queue is not None else 0) + self._parked_count,
+            'max_queue': self.max_queue,
+            'pending_retries': len(self._retries),
+            **self._counters,
+        }
+
+    def _put(self, delivery: Dict[str, Any]):
+        if self._queue.qsize() + self._parked_count >= self.max_queue:
+            self._dead_letter(delivery, 'delivery queue full')
+            return
+        try:
+            self._queue.put_nowait(delivery)
+        except asyncio.QueueFull:
+            self._dead_letter(delivery, 'delivery queue full')
+
+    def _headers(self, delivery: Dict[str, Any]) -> Dict[str, str]:
+        timestamp = str(int(time.time()))
+        return {
+            'Content-Type': 'application/json',
+            'X-RCM-Event': delivery['event'],
+            'X-RCM-Delivery': delivery['id'],
+            'X-RCM-Timestamp': timestamp,
+            'X-RCM-Signature': sign_payload(self.secret or '', timestamp, delivery['body']),
+        }
+
+    async def _worker(self):
+        while True:
+            delivery = await self._queue.get()
+            try:
+                endpoint = urlsplit(delivery['url']).netloc
+                if self._endpoint_active[endpoint] >= self.per_endpoint_concurrency:
+                    # Endpoint đã đủ slot: để worker đang giữ slot giao tiếp, worker này lấy việc khác
+                    self._parked[endpoint].append(delivery)
+                    self._parked_count += 1
+                    continue
+                await self._drain_endpoint(endpoint, delivery)
+            finally:
+                self._queue.task_done()
+
+    async def _drain_endpoint(self, endpoint: str, delivery: Dict[str, Any]):
+        """Giữ một slot của endpoint, giao delivery rồi các delivery đang park của endpoint đó"""
+        self._endpoint_active[endpoint] += 1
+        try:
+            while delivery is not None:
+                try:
+                    await self._deliver(delivery)
+                except Exception as e:
+                    self._dead_letter(delivery, f"dispatcher error: {e}")
+                parked = self._parked.get(endpoint)
+                delivery = parked.popleft() if parked else None
+                if delivery is not None:
+                    self._parked_count -= 1
+        finally:
+            self._endpoint_active[endpoint] -= 1
+            if not self._endpoint_active[endpoint] and not self._parked.get(endpoint):
+                self._endpoint_active.pop(endpoint, None)
+                self._parked.pop(endpoint, None)
+
+    async def _deliver(self, delivery: Dict[str, Any]):
+        delivery['attempt'] += 1
+        try:
+            # Resolve lại lúc gửi: DNS của host có thể đã đổi sang địa chỉ nội bộ sau khi nhận job;
+            # gửi thẳng tới địa chỉ vừa kiểm tra để không bị resolve lần nữa (DNS rebinding)
+            address = await asyncio.to_thread(resolve_callback_url, delivery['url'], self.allowed_hosts)
+        except ValueError as e:
+            self._dead_letter(delivery, f"blocked callback_url: {e}")
+            return
+        try:
+            status = await asyncio.to_thread(self.sender, delivery['url'], delivery['body'],
+                                             self._headers(delivery), self.timeout_seconds, address)
+            if 200 <= status < 300:
+                error = None
+            elif 300 <= status < 400:
+                # Không theo redirect (có thể trỏ vào địa chỉ nội bộ): lỗi, không retry
+                error = f"HTTP {status} redirect not followed"
+            else:
+                error = f"HTTP {status}"
+        except Exception as e:
+            status, error = None, str(e)
+
+        if error is None:
+            self._counters['delivered'] += 1
+            return
+        self._counters['failed_attempts'] += 1
+        retryable = status is None or status >= 500 or status in RETRYABLE_STATUS
+        if not retryable or delivery['attempt'] >= self.max_attempts:
+            self._dead_letter(delivery, error)
+            return
+
+        delay = min(self.backoff_seconds * 2 ** (delivery['attempt'] - 1), self.backoff_max_seconds)
+        task = asyncio.create_task(self._retry_later(delivery, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _retry_later(self, delivery: Dict[str, Any], delay: float):
+        await asyncio.sleep(delay)
+        self._put(delivery)
+
+    def _dead_letter(self, delivery: Dict[str, Any], reason: str):
+        record = {
+            'delivery_id': delivery['id'], 'url': delivery['url'], 'event': delivery['event'],
+            'attempts': delivery['attempt'], 'reason': reason, 'failed_at': time.time(),
+            'body': delivery['body'].decode('utf-8'),
+        }
+        self.dead_letters.append(record)
+        self._counters['dead_lettered'] += 1
+        print(f"⚠️ Webhook {delivery['event']} -> {delivery['url']} dead-lettered: {reason}")
+        if self.dead_letter_path is not None:
+            try:
+                self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            except OSError as e:
+                print(f"⚠️ Could not write webhook dead letter: {e}")
@@ -2,18 +2,21 @@
 from typing import Dict, Optional
 from domain.services.recipe_generation_service import RecipeGenerationService
 from domain.entities.recipe import Recipe
+from domain.services.request_context import RequestContext
 
 class GeneratePersonalizedRecipeUseCase:
-    def __init__(self, use_t5: bool = True):
+    def __init__(self, use_t5: bool = True, recipe_service: Optional[RecipeGenerationService] = None):
         """
         Initialize use case with T5 model option.
         
         Args:
             use_t5: Enable T5 model for recipe generation (default: True)
+            recipe_service: Shared service instance (bỏ qua use_t5 nếu truyền vào)
         """
-        self.recipe_service = RecipeGenerationService(use_t5=use_t5)
+        self.recipe_service = recipe_service or RecipeGenerationService(use_t5=use_t5)
     
-    def execute_from_ingredients(self, ingredients: str, language: str = "vi", use_t5: Optional[bool] = None) -> Dict:
+    def execute_from_ingredients(self, ingredients: str, language: str = "vi", use_t5: Optional[bool] = None,
+                                 context: Optional[RequestContext] = None) -> Dict:
         """
         Generate recipe from ingredients.
         
@@ -21,39 +24,38 @@ class GeneratePersonalizedRecipeUseCase:
             ingredients: Comma-separated ingredients
             language: Output language ('vi' or 'en')
             use_t5: Override T5 usage for this request
+            context: Request context (huỷ khi client ngắt kết nối, deadline)
         """
-        # Override service T5 setting if specified
-        if use_t5 is not None:
-            original_setting = self.recipe_service.use_t5
-            self.recipe_service.use_t5 = use_t5
-            
-            try:
-                recipe = self.recipe_service.generate_from_ingredients(ingredients, language)
-            finally:
-                self.recipe_service.use_t5 = original_setting
-        else:
-            recipe = self.recipe_service.generate_from_ingredients(ingredients, language)
+        context = context or RequestContext()
+        # use_t5 truyền theo request: service dùng chung giữa các request đồng thời, không sửa state của nó
+        recipe = self.recipe_service.generate_from_ingredients(ingredients, language, context=context, use_t5=use_t5)
+        t5_used = self.recipe_service.t5_enabled(use_t5) and 't5_generation' not in context.skipped_stages
         
         return {
             "status": "success",
-            "model_used": "T5 + Gemini" if self.recipe_service.use_t5 else "Gemini",
-            "data": recipe.dict()
+            "model_used": "T5 + Gemini" if t5_used else "Gemini",
+            "data": recipe.dict(),
+            "skipped_stages": list(context.skipped_stages)
         }
     
     def execute_from_trend(self, 
                           trend: str,
                           user_segment: str,
                           occasion: Optional[str] = None,
-                          language: str = "vi") -> Dict:
+                          language: str = "vi",
+                          context: Optional[RequestContext] = None) -> Dict:
         """Generate recipe from trend and user segment"""
+        context = context or RequestContext()
         recipe = self.recipe_service.generate_from_trend(
             trend=trend,
             user_segment=user_segment,
             occasion=occasion,
-            language=language
+            language=language,
+            context=context
         )
         
         return {
             "status": "success",
-            "data": recipe.dict()
+            "data": recipe.dict(),
+            "skipped_stages": list(context.skipped_stages)
         }
\ No newline at end of file
@@ -1,5 +1,6 @@
 # configs/settings.py
 from pydantic_settings import BaseSettings
+from typing import List, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -33,6 +34,62 @@ class Settings(BaseSettings):
     # DEFAULT_GEMINI_MODEL: str = "gemini-2.5-flash"  # Changed from gemini-2.5-pro - free tier has 15 RPM
     DEFAULT_TEMPERATURE: float = 0.7
     MAX_OUTPUT_TOKENS: int = 4096
+    
+    # Trend model compression (latency budget cho predict 1 dòng, cả 3 model)
+    TREND_LATENCY_BUDGET_MS: float = 2.0
+    TREND_ACCURACY_TOLERANCE: float = 0.02
+    
+    # Drift monitor (PSI so với baseline lúc train); tự retrain khi vượt ngưỡng chỉ khi bật DRIFT_AUTO_RETRAIN
+    DRIFT_PSI_THRESHOLD: float = 0.2
+    DRIFT_MIN_SAMPLES: int = 200
+    DRIFT_RETRAIN_COOLDOWN_SECONDS: int = 6 * 3600
+    DRIFT_AUTO_RETRAIN: bool = False
+
+    # Forecast-and-generate: số event sinh recipe song song và timeout cho mỗi event
+    FORECAST_MAX_CONCURRENCY: int = 3
+    FORECAST_EVENT_TIMEOUT_SECONDS: float = 60.0
+
+    # Generate-smart-recipe: tối đa số candidate sinh song song và deadline chung (giây, client ghi đè tối đa MAX)
+    SMART_RECIPE_MAX_CANDIDATES: int = 5
+    SMART_RECIPE_DEADLINE_SECONDS: float = 45.0
+    SMART_RECIPE_DEADLINE_MAX_SECONDS: float = 120.0
+    # Quá deadline mà chưa candidate nào xong: chờ thêm tối đa chừng này rồi trả 504
+    SMART_RECIPE_GRACE_SECONDS: float = 15.0
+
+    # Background jobs: store (memory:// | sqlite:///path | redis://...), worker pool, hàng đợi, TTL kết quả
+    JOB_STORE_URL: str = "memory://"
+    JOB_MAX_WORKERS: int = 2
+    JOB_MAX_QUEUE: int = 100
+    JOB_TTL_SECONDS: int = 3600
+    JOB_LONG_POLL_MAX_SECONDS: float = 25.0
+
+    # Webhook callback của job: secret ký HMAC (chưa cấu hình thì không nhận callback_url), retry, giới hạn
+    WEBHOOK_SECRET: Optional[str] = None
+    WEBHOOK_MAX_QUEUE: int = 500
+    WEBHOOK_WORKERS: int = 4
+    WEBHOOK_MAX_ATTEMPTS: int = 6
+    WEBHOOK_BACKOFF_SECONDS: float = 2.0
+    WEBHOOK_BACKOFF_MAX_SECONDS: float = 300.0
+    WEBHOOK_PER_ENDPOINT_CONCURRENCY: int = 2
+    WEBHOOK_TIMEOUT_SECONDS: float = 10.0
+    # Host được phép dù resolve ra IP nội bộ (storefront trong cùng mạng); host khác phải là IP public
+    WEBHOOK_ALLOWED_HOSTS: List[str] = []
+
+    # Idempotency-Key cho /recipes/generate-*: nơi lưu response (cùng dạng URL với JOB_STORE_URL), thời gian giữ
+    IDEMPOTENCY_STORE_URL: str = "memory://"
+    IDEMPOTENCY_RETENTION_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 300
+
+    # Deadline mặc định của /recipes/generate-* (client ghi đè bằng header X-Request-Deadline, tối đa MAX)
+    RECIPE_DEADLINE_SECONDS: float = 30.0
+    RECIPE_DEADLINE_MAX_SECONDS: float = 120.0
+
+    # Snapshot tính sẵn của /analytics/trending-now (refresh định kỳ, stale-while-revalidate)
+    TRENDING_REFRESH_SECONDS: int = 15 * 60
+    TRENDING_STALE_SECONDS: int = 60 * 60
+
+    # Số kết quả analytics / market insights giữ trong memo cache (LRU)
+    ANALYTICS_MEMO_SIZE: int = 2048
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8", "extra": "ignore"}
 
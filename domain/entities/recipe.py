@@ -1,4 +1,7 @@
 # domain/entities/recipe.py
+import hashlib
+import json
+
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
@@ -24,4 +27,10 @@ class Recipe(BaseModel):
     created_at: datetime = datetime.now()
     language: str = "vi"
     trend_context: Optional[str] = None
-    user_segment: Optional[str] = None
\ No newline at end of file
+    user_segment: Optional[str] = None
+
+    def fingerprint(self) -> str:
+        """Hash nội dung công thức (bỏ id, created_at): cùng nội dung -> cùng fingerprint"""
+        content = self.model_dump(mode='json', exclude={'id', 'created_at'})
+        canonical = json.dumps(content, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
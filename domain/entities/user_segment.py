@@ -1,6 +1,16 @@
 # domain/entities/user_segment.py
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+# Segment code từ API -> tên nhóm trong dữ liệu (nhom_doi_tuong / consumer_group)
+SEGMENT_MAPPING = {
+    'genz': 'Gen Z',
+    'gen_z': 'Gen Z',
+    'millennials': 'Millennials',
+    'gym': 'Người Tập Gym',
+    'kids': 'Trẻ Em',
+    'health': 'Người Ăn Healthy'
+}
 
 class UserSegment(BaseModel):
     code: str  # genz, kids, gym, elderly
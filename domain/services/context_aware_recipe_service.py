@@ -1,34 +1,88 @@
 # domain/services/context_aware_recipe_service.py
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import json
 from pathlib import Path
 
 from domain.entities.recipe import Recipe
 from domain.entities.ingredient import Ingredient
+from domain.entities.user_segment import SEGMENT_MAPPING
+from domain.services.keyword_matcher import KeywordMatcher
+from domain.services.request_context import RequestContext
 from infrastructure.ai.gemini_client import GeminiClient
+from infrastructure.data.event_calendar import EventCalendar
+from infrastructure.data.reference_snapshot import (
+    DEFAULT_SNAPSHOT_PATH,
+    ReferenceSnapshot,
+    load_or_build_snapshot,
+)
 from infrastructure.ml_models.trend_predictor import TrendPredictor
 
-@dataclass
+RAW_DATA_DIR = Path("data/raw")
+REFERENCE_SNAPSHOT_PATH = DEFAULT_SNAPSHOT_PATH
+
+# Bảng tra theo tháng (cố định, dùng chung cho mọi instance)
+SEASON_BY_MONTH = {
+    12: 'Đông', 1: 'Đông', 2: 'Đông',
+    3: 'Xuân', 4: 'Xuân', 5: 'Xuân',
+    6: 'Hè', 7: 'Hè', 8: 'Hè',
+    9: 'Thu', 10: 'Thu', 11: 'Thu'
+}
+
+# Nhiệt độ ước lượng (simplified)
+TEMPERATURE_BY_MONTH = {
+    12: 20, 1: 18, 2: 22, 3: 25, 4: 28, 5: 30,
+    6: 32, 7: 33, 8: 32, 9: 29, 10: 26, 11: 23
+}
+
+# Sự kiện theo tháng: chỉ dùng khi không có lịch sự kiện thật (EventCalendar rỗng)
+EVENTS_BY_MONTH = {
+    10: ('Halloween', 'Tháng ma quỷ', 'Thu hoạch'),
+    2: ('Tết Nguyên Đán', 'Valentine', 'Xuân về'),
+    6: ('Mùa hè', 'Du lịch', 'Nghỉ học'),
+    7: ('Mùa hè', 'Du lịch', 'Nghỉ học'),
+    8: ('Mùa hè', 'Du lịch', 'Nghỉ học'),
+    12: ('Giáng sinh', 'Năm mới', 'Đông'),
+}
+
+# Category nguyên liệu: nguyên liệu theo mùa trước, rồi nhóm chuẩn (thứ tự = ưu tiên)
+INGREDIENT_CATEGORIES = KeywordMatcher({
+    'seasonal_xuân': ['strawberry', 'dâu', 'sakura', 'hoa anh đào', 'green tea', 'trà xanh'],
+    'seasonal_hè': ['mango', 'xoài', 'coconut', 'dừa', 'lemon', 'chanh', 'passion fruit'],
+    'seasonal_thu': ['pumpkin', 'bí đỏ', 'cinnamon', 'quế', 'apple', 'táo', 'caramel'],
+    'seasonal_đông': ['chocolate', 'socola', 'gingerbread', 'bánh gừng', 'peppermint', 'orange', 'cam'],
+    'base_ingredients': ['flour', 'bột', 'sugar', 'đường'],
+    'fruits': ['fruit', 'trái cây', 'berry'],
+    'luxury_ingredients': ['chocolate', 'cream', 'kem'],
+})
+
+DEFAULT_SEGMENT = "Gen Z"
+# Giới hạn cache cho segment tự do từ request (tránh cache phình vô hạn)
+MAX_CACHED_SEGMENTS = 256
+# Sự kiện của seasonal context: đang diễn ra hoặc bắt đầu trong N ngày tới (thời gian chuẩn bị / ra mắt)
+EVENT_LOOKAHEAD_DAYS = 14
+MAX_CACHED_DAYS = 366
+
+@dataclass(frozen=True)
 class SeasonalContext:
-    """Context về mùa vụ và sự kiện"""
+    """Context về mùa vụ và sự kiện (immutable, dùng chung giữa các request)"""
     season: str
     month: int
     temperature: float
-    events: List[str]
-    trending_flavors: List[str]
-    popular_occasions: List[str]
+    events: Tuple[str, ...]
+    trending_flavors: Tuple[str, ...]
+    popular_occasions: Tuple[str, ...]
     demand_factor: float
 
-@dataclass
+@dataclass(frozen=True)
 class MarketContext:
-    """Context về thị trường và khách hàng"""
+    """Context về thị trường và khách hàng (immutable, dùng chung giữa các request)"""
     target_segment: str
     market_potential: float
     competition_level: float
     growth_trend: str
-    preferred_flavors: List[str]
+    preferred_flavors: Tuple[str, ...]
     price_sensitivity: str
     purchase_frequency: str
 
@@ -41,80 +95,32 @@ class ContextAwareRecipeService:
     - Dự đoán từ ML models
     """
     
-    def __init__(self):
-        self.gemini = GeminiClient()
-        self.trend_predictor = TrendPredictor()
-        
-        # Load trained model nếu có
-        self.trend_predictor.load_models()
-        
-        # Load context data
-        self._load_seasonal_data()
-        self._load_market_data()
-    
-    def _load_seasonal_data(self):
-        """Load dữ liệu mùa vụ từ CSV"""
-        try:
-            import pandas as pd
-            
-            # Load seasonal trends
-            seasonal_df = pd.read_csv("data/raw/seasonal_trends_20250920_061904.csv")
-            self.seasonal_data = {}
-            
-            for _, row in seasonal_df.iterrows():
-                self.seasonal_data[row['season']] = {
-                    'trending_flavors': eval(row['trending_flavors']) if isinstance(row['trending_flavors'], str) else [],
-                    'popular_occasions': eval(row['popular_occasions']) if isinstance(row['popular_occasions'], str) else [],
-                    'average_orders': row['average_orders'],
-                    'peak_months': row['peak_months']
-                }
-            
-            # Load Vietnam events
-            events_df = pd.read_csv("data/raw/vietnam_seasonal_events_2025.csv")
-            self.events_data = events_df.to_dict('records')
-            
-        except Exception as e:
-            print(f"Warning: Could not load seasonal data: {e}")
-            self.seasonal_data = {}
-            self.events_data = []
-    
-    def _load_market_data(self):
-        """Load dữ liệu thị trường từ CSV"""
-        try:
-            import pandas as pd
-            
-            # Load consumer groups
-            consumer_df = pd.read_csv("data/raw/consumer_groups_detailed_20250921_133329.csv")
-            self.market_data = {}
-            
-            for _, row in consumer_df.iterrows():
-                self.market_data[row['consumer_group']] = {
-                    'market_potential': row['market_potential'],
-                    'competition_level': row['competition_level'],
-                    'growth_trend': row['growth_trend'],
-                    'avg_engagement_rate': row['avg_engagement_rate'],
-                    'top_keywords': row['top_5_keywords'].split(', ') if isinstance(row['top_5_keywords'], str) else []
-                }
-            
-            # Load consumer profiles
-            profiles_df = pd.read_csv("data/raw/consumer_profiles_20250920_061904.csv")
-            self.profile_data = {}
-            
-            for _, row in profiles_df.iterrows():
-                if pd.notna(row.get('preferred_flavors')):
-                    self.profile_data[row.index] = {
-                        'age_range': row.get('age_range'),
-                        'characteristics': eval(row['characteristics']) if isinstance(row.get('characteristics'), str) else [],
-                        'preferred_flavors': eval(row['preferred_flavors']) if isinstance(row.get('preferred_flavors'), str) else [],
-                        'price_sensitivity': row.get('price_sensitivity'),
-                        'purchase_frequency': row.get('purchase_frequency'),
-                        'preferred_channels': eval(row['preferred_channels']) if isinstance(row.get('preferred_channels'), str) else []
-                    }
-                    
-        except Exception as e:
-            print(f"Warning: Could not load market data: {e}")
-            self.market_data = {}
-            self.profile_data = {}
+    def __init__(self,
+                 reference: Optional[ReferenceSnapshot] = None,
+                 gemini: Optional[GeminiClient] = None,
+                 trend_predictor: Optional[TrendPredictor] = None):
+        self.gemini = gemini or GeminiClient()
+        # TrendPredictor tự load trained model nếu có (auto_load)
+        self.trend_predictor = trend_predictor or TrendPredictor()
+        
+        # Load context data (snapshot đã parse sẵn, build lại nếu CSV nguồn thay đổi)
+        self.reference = reference or load_or_build_snapshot(RAW_DATA_DIR, REFERENCE_SNAPSHOT_PATH)
+        self.seasonal_data = self.reference.seasonal
+        self.events_data = self.reference.events
+        self.market_data = self.reference.market
+        self.profile_data = self.reference.profiles
+        # Interval index trên các sự kiện có ngày thật (multi-year, gồm ngày lễ âm lịch)
+        self.event_calendar = EventCalendar.from_reference(self.events_data)
+
+        # Field mùa vụ chỉ phụ thuộc vào tháng / segment -> tính sẵn một lần, lookup O(1);
+        # sự kiện tra theo ngày từ event_calendar (cache theo ngày)
+        self._seasonal_table: Dict[int, SeasonalContext] = {
+            month: self._build_seasonal_context(month) for month in range(1, 13)
+        }
+        self._seasonal_by_day: Dict = {}
+        self._market_cache: Dict[str, MarketContext] = {}
+        for segment in (*SEGMENT_MAPPING.values(), *self.market_data):
+            self._get_market_context(segment)
     
     def get_current_context(self, target_date: Optional[datetime] = None) -> Tuple[SeasonalContext, MarketContext]:
         """Lấy context hiện tại dựa trên ngày"""
@@ -126,88 +132,82 @@ class ContextAwareRecipeService:
         seasonal_ctx = self._get_seasonal_context(target_date)
         
         # Market context (có thể customize theo yêu cầu)
-        market_ctx = self._get_market_context("Gen Z")  # Default segment
+        market_ctx = self._get_market_context(DEFAULT_SEGMENT)
         
         return seasonal_ctx, market_ctx
     
     def _get_seasonal_context(self, date: datetime) -> SeasonalContext:
-        """Tạo seasonal context từ ngày"""
-        
-        # Determine season
-        month = date.month
-        season_map = {
-            12: 'Đông', 1: 'Đông', 2: 'Đông',
-            3: 'Xuân', 4: 'Xuân', 5: 'Xuân',
-            6: 'Hè', 7: 'Hè', 8: 'Hè', 
-            9: 'Thu', 10: 'Thu', 11: 'Thu'
-        }
-        
-        season = season_map.get(month, 'Xuân')
-        
-        # Get seasonal data
-        season_info = self.seasonal_data.get(season, {})
-        
-        # Determine events for current month
-        current_events = []
-        if month == 10:
-            current_events = ['Halloween', 'Tháng ma quỷ', 'Thu hoạch']
-        elif month == 2:
-            current_events = ['Tết Nguyên Đán', 'Valentine', 'Xuân về']
-        elif month in [6, 7, 8]:
-            current_events = ['Mùa hè', 'Du lịch', 'Nghỉ học']
-        elif month == 12:
-            current_events = ['Giáng sinh', 'Năm mới', 'Đông']
-        
-        # Estimate temperature (simplified)
-        temp_map = {
-            12: 20, 1: 18, 2: 22, 3: 25, 4: 28, 5: 30,
-            6: 32, 7: 33, 8: 32, 9: 29, 10: 26, 11: 23
-        }
+        """Seasonal context của ngày: field mùa vụ theo tháng, sự kiện từ event_calendar
+        (đang diễn ra hoặc bắt đầu trong EVENT_LOOKAHEAD_DAYS ngày tới)"""
+        base = self._seasonal_table[date.month]
+        if not len(self.event_calendar):
+            return base
+
+        day = date.date() if isinstance(date, datetime) else date
+        cached = self._seasonal_by_day.get(day)
+        if cached is not None:
+            return cached
+
+        upcoming = self.event_calendar.between(day, day + timedelta(days=EVENT_LOOKAHEAD_DAYS))
+        seasonal_ctx = replace(base, events=tuple(dict.fromkeys(event.name for event in upcoming)))
+        if len(self._seasonal_by_day) >= MAX_CACHED_DAYS:
+            self._seasonal_by_day.clear()
+        self._seasonal_by_day[day] = seasonal_ctx
+        return seasonal_ctx
+
+    def _build_seasonal_context(self, month: int) -> SeasonalContext:
+        """Tạo seasonal context cho một tháng từ reference data (events theo tháng chỉ là fallback)"""
+        season = SEASON_BY_MONTH.get(month, 'Xuân')
+        season_info = self.seasonal_data.get(season)
         
         return SeasonalContext(
             season=season,
             month=month,
-            temperature=temp_map.get(month, 25),
-            events=current_events,
-            trending_flavors=season_info.get('trending_flavors', []),
-            popular_occasions=season_info.get('popular_occasions', []),
-            demand_factor=season_info.get('average_orders', 100) / 100
+            temperature=TEMPERATURE_BY_MONTH.get(month, 25),
+            events=EVENTS_BY_MONTH.get(month, ()),
+            trending_flavors=season_info.trending_flavors if season_info else (),
+            popular_occasions=season_info.popular_occasions if season_info else (),
+            demand_factor=(season_info.average_orders if season_info else 100) / 100
         )
     
     def _get_market_context(self, segment: str) -> MarketContext:
+        """Market context của segment (cache theo tên segment)"""
+        cached = self._market_cache.get(segment)
+        if cached is not None:
+            return cached
+
+        market_ctx = self._build_market_context(segment)
+        if len(self._market_cache) < MAX_CACHED_SEGMENTS:
+            self._market_cache[segment] = market_ctx
+        return market_ctx
+
+    def _build_market_context(self, segment: str) -> MarketContext:
         """Tạo market context từ segment"""
-        
-        # Map segment names
-        segment_mapping = {
-            'genz': 'Gen Z',
-            'gen_z': 'Gen Z', 
-            'millennials': 'Millennials',
-            'gym': 'Người Tập Gym',
-            'kids': 'Trẻ Em',
-            'health': 'Người Ăn Healthy'
-        }
-        
-        mapped_segment = segment_mapping.get(segment.lower(), segment)
+        mapped_segment = SEGMENT_MAPPING.get(segment.lower(), segment)
         
         # Get market data
-        market_info = self.market_data.get(mapped_segment, {})
-        profile_info = self.profile_data.get(mapped_segment.lower(), {})
+        market_info = self.market_data.get(mapped_segment)
+        profile_info = self.profile_data.get(mapped_segment.lower())
         
         return MarketContext(
             target_segment=mapped_segment,
-            market_potential=0.8 if market_info.get('market_potential') == 'Cao' else 0.5,
-            competition_level=0.9 if market_info.get('competition_level') == 'Rất cao' else 0.6,
-            growth_trend=market_info.get('growth_trend', 'Tăng'),
-            preferred_flavors=profile_info.get('preferred_flavors', []),
-            price_sensitivity=profile_info.get('price_sensitivity', 'trung bình'),
-            purchase_frequency=profile_info.get('purchase_frequency', 'trung bình')
+            market_potential=0.8 if market_info and market_info.market_potential == 'Cao' else 0.5,
+            competition_level=0.9 if market_info and market_info.competition_level == 'Rất cao' else 0.6,
+            growth_trend=market_info.growth_trend if market_info else 'Tăng',
+            preferred_flavors=profile_info.preferred_flavors if profile_info else (),
+            price_sensitivity=(profile_info and profile_info.price_sensitivity) or 'trung bình',
+            purchase_frequency=(profile_info and profile_info.purchase_frequency) or 'trung bình'
         )
     
     def generate_context_aware_recipe(self, 
                                     user_segment: str,
                                     target_date: Optional[datetime] = None,
-                                    custom_trend: Optional[str] = None) -> Recipe:
-        """Tạo công thức dựa trên context đầy đủ"""
+                                    custom_trend: Optional[str] = None,
+                                    temperature: Optional[float] = None,
+                                    context: Optional[RequestContext] = None) -> Recipe:
+        """Tạo công thức dựa trên context đầy đủ (temperature: ghi đè temperature của Gemini).
+        context: bị huỷ (candidate bị bỏ) thì dừng trước lời gọi Gemini và không parse kết quả"""
+        context = context or RequestContext()
         
         # Get contexts
         seasonal_ctx, market_ctx = self.get_current_context(target_date)
@@ -234,9 +234,11 @@ class ContextAwareRecipeService:
             trend_strength = 0.5
         
         # Build enhanced prompt
+        context.raise_if_cancelled()
         recipe_data = self._generate_enhanced_recipe(
-            seasonal_ctx, market_ctx, custom_trend, trend_strength
+            seasonal_ctx, market_ctx, custom_trend, trend_strength, temperature, timeout=context.call_timeout()
         )
+        context.raise_if_cancelled()
         
         return self._parse_recipe_response(recipe_data, seasonal_ctx, market_ctx)
     
@@ -244,8 +246,10 @@ class ContextAwareRecipeService:
                                 seasonal_ctx: SeasonalContext,
                                 market_ctx: MarketContext,
                                 custom_trend: Optional[str],
-                                trend_strength: float) -> str:
-        """Tạo công thức với Gemini sử dụng context đầy đủ"""
+                                trend_strength: float,
+                                temperature: Optional[float] = None,
+                                timeout: Optional[float] = None) -> str:
+        """Tạo công thức với Gemini sử dụng context đầy đủ (timeout: giây cho lời gọi Gemini)"""
         
         # Build comprehensive prompt
         prompt = f"""
@@ -315,7 +319,9 @@ Hãy tạo công thức ĐỈNH CAO kết hợp data science + culinary art!
                 trend=custom_trend or f"{seasonal_ctx.season} {', '.join(seasonal_ctx.events)}",
                 user_segment=market_ctx.target_segment,
                 occasion=', '.join(seasonal_ctx.popular_occasions),
-                language='vi'
+                language='vi',
+                temperature=temperature,
+                timeout=timeout
             )
             return response
             
@@ -400,7 +406,7 @@ Hãy tạo công thức ĐỈNH CAO kết hợp data science + culinary art!
                 market_ctx.target_segment,
                 f"month_{seasonal_ctx.month}",
                 f"temp_{int(seasonal_ctx.temperature)}C"
-            ] + seasonal_ctx.events,
+            ] + list(seasonal_ctx.events),
             language='vi',
             trend_context=f"Generated for {seasonal_ctx.season} season targeting {market_ctx.target_segment}",
             user_segment=market_ctx.target_segment
@@ -424,28 +430,7 @@ Hãy tạo công thức ĐỈNH CAO kết hợp data science + culinary art!
     
     def _categorize_ingredient(self, ingredient_name: str) -> str:
         """Categorize ingredient"""
-        ingredient_lower = ingredient_name.lower()
-        
-        seasonal_categories = {
-            'xuân': ['strawberry', 'dâu', 'sakura', 'hoa anh đào', 'green tea', 'trà xanh'],
-            'hè': ['mango', 'xoài', 'coconut', 'dừa', 'lemon', 'chanh', 'passion fruit'],
-            'thu': ['pumpkin', 'bí đỏ', 'cinnamon', 'quế', 'apple', 'táo', 'caramel'],
-            'đông': ['chocolate', 'socola', 'gingerbread', 'bánh gừng', 'peppermint', 'orange', 'cam']
-        }
-        
-        for season, items in seasonal_categories.items():
-            if any(item in ingredient_lower for item in items):
-                return f'seasonal_{season}'
-        
-        # Standard categories
-        if any(word in ingredient_lower for word in ['flour', 'bột', 'sugar', 'đường']):
-            return 'base_ingredients'
-        elif any(word in ingredient_lower for word in ['fruit', 'trái cây', 'berry']):
-            return 'fruits'
-        elif any(word in ingredient_lower for word in ['chocolate', 'cream', 'kem']):
-            return 'luxury_ingredients'
-        else:
-            return 'other'
+        return INGREDIENT_CATEGORIES.first(ingredient_name, default='other')
 
 if __name__ == "__main__":
     # Test the service
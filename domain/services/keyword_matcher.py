@@ -0,0 +1,102 @@
+# domain/services/keyword_matcher.py
+"""
+Keyword matcher biên dịch sẵn: thay cho các vòng `any(word in text for word in words)`.
+
+Bảng category -> keywords (theo thứ tự ưu tiên) được gộp thành một regex duy nhất dạng trie
+(các keyword chung tiền tố dùng chung nhánh), quét mỗi chuỗi một lần và trả về toàn bộ
+category có keyword xuất hiện (so khớp substring như code cũ).
+
+Chuẩn hoá: Unicode NFC + casefold, để "Dâu" gõ dạng tổ hợp (NFD) vẫn khớp "dâu". Không bỏ dấu:
+"bơ" / "bột", "cam" / "cám" là các nguyên liệu khác nhau.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    text = text or ''
+    if not text.isascii():
+        text = unicodedata.normalize('NFC', text)
+    return text.casefold()
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Regex cho trie; '' đánh dấu hết keyword (nhánh dài hơn được thử trước)"""
+    terminal = '' in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if terminal:
+        return '(?:' + body + ')?'
+    return body
+
+
+class KeywordMatcher:
+    """Match nhiều keyword (nhóm theo category) trong một lượt quét"""
+
+    def __init__(self, table: Mapping[str, Iterable[str]], cache_size: int = 4096):
+        self.categories: Tuple[str, ...] = tuple(table)
+        self._rank = {category: rank for rank, category in enumerate(self.categories)}
+
+        keyword_categories: Dict[str, set] = {}
+        always = set()  # keyword rỗng: `'' in text` luôn đúng
+        for category, keywords in table.items():
+            for keyword in keywords:
+                keyword = normalize_text(keyword)
+                if keyword:
+                    keyword_categories.setdefault(keyword, set()).add(category)
+                else:
+                    always.add(category)
+        self._always = frozenset(always)
+
+        # Regex chỉ trả keyword dài nhất bắt đầu tại mỗi vị trí; các keyword ngắn hơn bắt đầu
+        # cùng vị trí là tiền tố của nó -> gộp category của các tiền tố vào trước
+        self._categories_of: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset().union(*(keyword_categories[keyword[:end]]
+                                         for end in range(1, len(keyword) + 1)
+                                         if keyword[:end] in keyword_categories))
+            for keyword in keyword_categories
+        }
+
+        trie: Dict[str, dict] = {}
+        for keyword in keyword_categories:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        # Lookahead để bắt cả các keyword chồng lấn nhau
+        self._pattern = re.compile('(?=(' + _trie_pattern(trie) + '))') if trie else None
+        self.hits = lru_cache(maxsize=cache_size)(self._hits)
+
+    def _hits(self, text: str) -> FrozenSet[str]:
+        """Tất cả category có keyword xuất hiện trong text"""
+        if self._pattern is None:
+            return self._always
+        keywords = self._pattern.findall(normalize_text(text))
+        if not keywords:
+            return self._always
+        if len(keywords) == 1 and not self._always:
+            return self._categories_of[keywords[0]]
+        return self._always.union(*(self._categories_of[keyword] for keyword in keywords))
+
+    def first(self, text: str, default: Optional[str] = None) -> Optional[str]:
+        """Category ưu tiên cao nhất (thứ tự trong bảng) có match"""
+        found = self.hits(text)
+        return min(found, key=self._rank.__getitem__) if found else default
+
+    def matches(self, text: str, category: Optional[str] = None) -> bool:
+        found = self.hits(text)
+        return bool(found) if category is None else category in found
+
+    def count(self, texts: Iterable[str], category: Optional[str] = None) -> int:
+        """Số chuỗi có match (ví dụ số nguyên liệu khớp)"""
+        return sum(1 for text in texts if self.matches(text, category))
+
+
+@lru_cache(maxsize=256)
+def keyword_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    """Matcher một category cho danh sách keyword động (ví dụ trending flavors theo tháng)"""
+    return KeywordMatcher({'match': keywords})
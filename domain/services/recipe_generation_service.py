@@ -4,6 +4,8 @@ import re
 import os
 from domain.entities.recipe import Recipe, DifficultyLevel
 from domain.entities.ingredient import Ingredient
+from domain.services.keyword_matcher import KeywordMatcher
+from domain.services.request_context import DeadlineExceeded, RequestCancelled, RequestContext
 from infrastructure.ai.gemini_client import GeminiClient
 from infrastructure.ai.translator_service import TranslatorService
 from infrastructure.ai.recipe_parser import RecipeParser
@@ -19,6 +21,25 @@ except (ImportError, ModuleNotFoundError) as e:
     T5Client = None
 
 
+# Category nguyên liệu theo keyword (thứ tự = ưu tiên), biên dịch một lần
+INGREDIENT_CATEGORIES = KeywordMatcher({
+    'dry_ingredients': ['flour', 'bột', 'sugar', 'đường', 'salt', 'muối', 'baking'],
+    'dairy_eggs': ['egg', 'trứng', 'milk', 'sữa', 'butter', 'bơ', 'cream'],
+    'fruits': ['fruit', 'trái cây', 'berry', 'strawberry', 'dâu'],
+    'flavorings': ['chocolate', 'socola', 'cocoa', 'vanilla'],
+})
+
+# Thời gian (giây) tối thiểu phải còn trong deadline để chạy từng bước; thiếu thì bỏ qua / dùng cách rẻ hơn
+STAGE_MIN_SECONDS = {
+    'translate_ingredients': 2.0,   # thiếu: đưa nguyên liệu gốc vào T5
+    't5_generation': 4.0,           # thiếu: bỏ T5, sinh thẳng bằng Gemini
+    't5_beam_search': 8.0,          # thiếu: T5 greedy (num_beams=1)
+    'gemini_enhancement': 8.0,      # thiếu: parse trực tiếp output T5
+    'translate_t5_output': 4.0,     # thiếu: giữ nguyên văn tiếng Anh của T5
+    'translate_t5_line': 1.0,       # kiểm tra trước mỗi dòng: thiếu thì các dòng còn lại giữ tiếng Anh
+    'parse_fallback': 6.0,          # thiếu: trả về phần đã parse được
+}
+
 QUANTITY_UNIT_PATTERN = re.compile(
     r"^(?:[-\s]*)?(?P<qty>(?:\d+[\/,\.]?\d*|\d*\.?\d+))\s*(?P<unit>(?:g|kg|mg|ml|l|tsp|tbsp|teaspoon|tablespoon|cup|cups|gram|grams|kilogram|liter|liters|ounce|oz|lb|lbs|muỗng|thìa|muong|ml|lít|gr|chén|cốc)\b)?\s*(?P<name>.*)$",
     re.IGNORECASE,
@@ -44,9 +65,15 @@ def parse_ingredient_line(line: str) -> Ingredient:
     return Ingredient(name=cleaned)
 
 
+def _request_options(context: RequestContext) -> Optional[Dict]:
+    """Giới hạn thời gian lời gọi Gemini theo phần deadline còn lại"""
+    timeout = context.call_timeout()
+    return {"timeout": timeout} if timeout is not None else None
+
+
 class RecipeGenerationService:
-    def __init__(self, use_t5: bool = True):
-        self.gemini = GeminiClient()
+    def __init__(self, use_t5: bool = True, gemini: Optional[GeminiClient] = None):
+        self.gemini = gemini or GeminiClient()
         self.translator = TranslatorService()
         self.parser = RecipeParser()
         
@@ -71,7 +98,9 @@ class RecipeGenerationService:
             else:
                 self.t5_client = None
     
-    def generate_from_ingredients(self, ingredients: str, language: str = "vi") -> Recipe:
+    def generate_from_ingredients(self, ingredients: str, language: str = "vi",
+                                  context: Optional[RequestContext] = None,
+                                  use_t5: Optional[bool] = None) -> Recipe:
         """
         Generate recipe from ingredients using T5 model + Gemini translation.
         
@@ -79,70 +108,101 @@ class RecipeGenerationService:
         1. Translate Vietnamese ingredients → English (if needed)
         2. Generate recipe with T5 model (English output)
         3. Enhance & translate recipe to Vietnamese with Gemini (if needed)
+
+        context: huỷ giữa chừng (client ngắt kết nối) -> RequestCancelled, không fallback;
+        deadline gần hết -> bỏ qua các bước trong STAGE_MIN_SECONDS (ghi vào context.skipped_stages)
+        use_t5: bật / tắt T5 cho request này (None = theo self.use_t5); không sửa state của service dùng chung
         """
+        context = context or RequestContext()
         
         # Strategy 1: Use T5 + Gemini Translation
-        if self.use_t5 and self.t5_client:
+        if self.t5_enabled(use_t5) and context.allow('t5_generation', STAGE_MIN_SECONDS['t5_generation']):
             try:
                 print(f"🤖 Using T5 Model for recipe generation...")
                 
                 # Step 1: Translate ingredients to English if Vietnamese
-                if language == "vi":
+                if language == "vi" and context.allow(
+                        'translate_ingredients',
+                        STAGE_MIN_SECONDS['translate_ingredients'] + STAGE_MIN_SECONDS['t5_generation']):
                     print(f"🔄 Translating ingredients: {ingredients[:50]}...")
-                    en_ingredients = self.translator.vi_to_en(ingredients)
+                    en_ingredients = self.translator.vi_to_en(ingredients, context=context)
                     print(f"✅ Translated to: {en_ingredients[:50]}...")
                 else:
                     en_ingredients = ingredients
                 
                 # Step 2: Generate recipe with T5 (English output)
                 print(f"🍰 Generating recipe with T5...")
-                t5_recipe_text = self.t5_client.generate_recipe(en_ingredients)
+                beam = context.allow('t5_beam_search', STAGE_MIN_SECONDS['t5_beam_search'])
+                t5_recipe_text = self.t5_client.generate_recipe(
+                    en_ingredients, context=context, num_beams=None if beam else 1,
+                    min_seconds=STAGE_MIN_SECONDS['t5_generation']
+                )
                 print(f"✅ T5 generated: {t5_recipe_text[:100]}...")
                 if "directions:" not in t5_recipe_text.lower():
                     print(f"⚠️ Warning: T5 output missing 'directions' section")
                 
                 # Step 3: Enhance and translate with Gemini
-                if language == "vi":
+                if not context.allow('gemini_enhancement', STAGE_MIN_SECONDS['gemini_enhancement']):
+                    enhanced_recipe = (self._parse_and_translate_t5_text(t5_recipe_text, en_ingredients, context=context)
+                                       if language == "vi" else t5_recipe_text)
+                elif language == "vi":
                     print(f"🔄 Translating & enhancing with Gemini...")
                     enhanced_recipe = self._enhance_and_translate_t5_output(
-                        t5_recipe_text, en_ingredients, language
+                        t5_recipe_text, en_ingredients, language, context=context
                     )
                 else:
-                    enhanced_recipe = self._enhance_t5_output(t5_recipe_text, en_ingredients)
+                    enhanced_recipe = self._enhance_t5_output(t5_recipe_text, en_ingredients, context=context)
                 
                 print(f"✅ T5 pipeline completed successfully!")
-                return self._parse_recipe_response(enhanced_recipe, language)
+                return self._parse_recipe_response(enhanced_recipe, language, context=context)
                 
+            except RequestCancelled:
+                raise
+            except DeadlineExceeded as e:
+                # Chờ lượt dùng T5 quá lâu: bỏ T5, dùng phần budget còn lại cho Gemini
+                context.skip('t5_generation', str(e))
             except Exception as e:
                 print(f"⚠️ T5 pipeline failed: {e}")
                 print(f"   Falling back to Gemini-only mode...")
         
         # Strategy 2: Fallback to Gemini-only
         print(f"🤖 Using Gemini for recipe generation...")
-        recipe_text = self.gemini.generate_recipe_from_ingredients(ingredients, language)
-        return self._parse_recipe_response(recipe_text, language)
+        context.raise_if_cancelled()
+        recipe_text = self.gemini.generate_recipe_from_ingredients(ingredients, language, timeout=context.call_timeout())
+        return self._parse_recipe_response(recipe_text, language, context=context)
     
+    def t5_enabled(self, use_t5: Optional[bool] = None) -> bool:
+        """T5 có được dùng cho request không (T5 không load được thì luôn False)"""
+        return bool(self.use_t5 if use_t5 is None else use_t5) and self.t5_client is not None
+
     def generate_from_trend(self, 
                           trend: str, 
                           user_segment: str,
                           occasion: Optional[str] = None,
-                          language: str = "vi") -> Recipe:
+                          language: str = "vi",
+                          context: Optional[RequestContext] = None) -> Recipe:
         """Generate creative recipe based on trend and user segment"""
+        context = context or RequestContext()
+        context.raise_if_cancelled()
         recipe_data = self.gemini.generate_creative_recipe(
             trend=trend,
             user_segment=user_segment,
             occasion=occasion,
-            language=language
+            language=language,
+            timeout=context.call_timeout()
         )
         # Parse, có fallback nếu thiếu dữ liệu
         return self._parse_recipe_response(
-            recipe_data, language, trend=trend, user_segment=user_segment, occasion=occasion
+            recipe_data, language, trend=trend, user_segment=user_segment, occasion=occasion, context=context
         )
     
-    def _parse_recipe_response(self, response: str, language: str, *, trend: Optional[str] = None, user_segment: Optional[str] = None, occasion: Optional[str] = None) -> Recipe:
+    def _parse_recipe_response(self, response: str, language: str, *, trend: Optional[str] = None, user_segment: Optional[str] = None, occasion: Optional[str] = None,
+                               context: Optional[RequestContext] = None) -> Recipe:
         """Parse model response into Recipe entity using improved parser.
         Nếu dữ liệu thiếu (title/ingredients/instructions), fallback sinh công thức chi tiết rồi parse lại.
         """
+        context = context or RequestContext()
+        context.raise_if_cancelled()
         # Parse lần 1
         parsed_data = self.parser.parse_gemini_output(response)
         
@@ -160,13 +220,15 @@ class RecipeGenerationService:
                 print(f"   ✅ Recipe complete!")
             return is_incomplete
 
-        # Fallback: generate simple detailed recipe theo ngôn ngữ yêu cầu
-        if _is_incomplete(parsed_data):
+        # Fallback: generate simple detailed recipe theo ngôn ngữ yêu cầu (nếu còn thời gian)
+        if _is_incomplete(parsed_data) and context.allow('parse_fallback', STAGE_MIN_SECONDS['parse_fallback']):
+            context.raise_if_cancelled()
             fallback_text = self.gemini._generate_simple_recipe(
                 trend=trend or 'bánh ngọt',
                 user_segment=user_segment or 'khách hàng',
                 occasion=occasion or 'hàng ngày',
-                language=language
+                language=language,
+                timeout=context.call_timeout()
             )
             parsed_data = self.parser.parse_gemini_output(fallback_text)
 
@@ -205,20 +267,10 @@ class RecipeGenerationService:
     
     def _categorize_ingredient(self, ingredient_name: str) -> str:
         """Categorize ingredient based on name"""
-        ingredient_lower = ingredient_name.lower()
-        
-        if any(word in ingredient_lower for word in ['flour', 'bột', 'sugar', 'đường', 'salt', 'muối', 'baking']):
-            return 'dry_ingredients'
-        elif any(word in ingredient_lower for word in ['egg', 'trứng', 'milk', 'sữa', 'butter', 'bơ', 'cream']):
-            return 'dairy_eggs'
-        elif any(word in ingredient_lower for word in ['fruit', 'trái cây', 'berry', 'strawberry', 'dâu']):
-            return 'fruits'
-        elif any(word in ingredient_lower for word in ['chocolate', 'socola', 'cocoa', 'vanilla', 'vanilla']):
-            return 'flavorings'
-        else:
-            return 'other'
+        return INGREDIENT_CATEGORIES.first(ingredient_name, default='other')
     
-    def _enhance_and_translate_t5_output(self, t5_text: str, ingredients: str, language: str) -> str:
+    def _enhance_and_translate_t5_output(self, t5_text: str, ingredients: str, language: str,
+                                         context: Optional[RequestContext] = None) -> str:
         """
         Enhance T5 output và translate sang Vietnamese với Gemini.
         T5 thường output format đơn giản, cần enhance thêm details.
@@ -261,6 +313,8 @@ YÊU CẦU OUTPUT (JSON format tiếng Việt):
 Chỉ trả về JSON, không thêm text khác.
 """
         
+        context = context or RequestContext()
+        context.raise_if_cancelled()
         try:
             import google.generativeai as genai
             model = genai.GenerativeModel(self.gemini.model)
@@ -275,7 +329,8 @@ Chỉ trả về JSON, không thêm text khác.
                     {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
                     {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
                     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-                ]
+                ],
+                request_options=_request_options(context)
             )
             
             # Xử lý response an toàn
@@ -298,14 +353,16 @@ Chỉ trả về JSON, không thêm text khác.
             
             # Fallback: parse T5 text and translate
             print("⚠️ Gemini response empty hoặc bị block, parsing T5 output directly...")
-            return self._parse_and_translate_t5_text(t5_text, ingredients)
+            return self._parse_and_translate_t5_text(t5_text, ingredients, context=context)
                 
+        except RequestCancelled:
+            raise
         except Exception as e:
             print(f"⚠️ Gemini enhancement failed: {e}")
             # Fallback: parse T5 text and translate to structured format
-            return self._parse_and_translate_t5_text(t5_text, ingredients)
+            return self._parse_and_translate_t5_text(t5_text, ingredients, context=context)
     
-    def _enhance_t5_output(self, t5_text: str, ingredients: str) -> str:
+    def _enhance_t5_output(self, t5_text: str, ingredients: str, context: Optional[RequestContext] = None) -> str:
         """
         Enhance T5 output (English) với Gemini - không translate.
         Thêm details, format chuẩn JSON.
@@ -344,6 +401,8 @@ REQUIREMENTS - Output in JSON format:
 Return only JSON, no additional text.
 """
         
+        context = context or RequestContext()
+        context.raise_if_cancelled()
         try:
             import google.generativeai as genai
             model = genai.GenerativeModel(self.gemini.model)
@@ -358,7 +417,8 @@ Return only JSON, no additional text.
                     {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
                     {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
                     {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-                ]
+                ],
+                request_options=_request_options(context)
             )
             
             # Xử lý response an toàn
@@ -386,13 +446,24 @@ Return only JSON, no additional text.
             print(f"⚠️ Gemini enhancement failed: {e}")
             return t5_text
     
-    def _parse_and_translate_t5_text(self, t5_text: str, original_ingredients: str) -> str:
+    def _parse_and_translate_t5_text(self, t5_text: str, original_ingredients: str,
+                                     context: Optional[RequestContext] = None) -> str:
         """
         Parse T5 raw output và convert sang JSON format tiếng Việt.
         Fallback khi Gemini enhancement fail.
         """
+        context = context or RequestContext()
         import json
         import re
+
+        # Không đủ thời gian dịch: giữ nguyên văn tiếng Anh. Mỗi dòng là một lời gọi dịch nên
+        # kiểm tra lại budget trước từng dòng (dòng sau khi hết budget giữ tiếng Anh)
+        translate = context.allow('translate_t5_output', STAGE_MIN_SECONDS['translate_t5_output'])
+
+        def to_vi(text: str) -> str:
+            if translate and context.allow('translate_t5_line', STAGE_MIN_SECONDS['translate_t5_line']):
+                return self.translator.en_to_vi(text, context=context)
+            return text
         
         print(f"📝 Parsing T5 output: {t5_text[:100]}...")
         
@@ -417,7 +488,7 @@ Return only JSON, no additional text.
             title_match = re.search(r'title:\s*([^\n]+?)(?:\s+ingredients:|$)', t5_text, re.IGNORECASE)
             if title_match:
                 en_title = title_match.group(1).strip()
-                result["title"] = self.translator.en_to_vi(en_title) if en_title else "Bánh Tự Tạo"
+                result["title"] = to_vi(en_title) if en_title else "Bánh Tự Tạo"
                 print(f"  ✅ Title: {en_title} → {result['title']}")
             
             # Extract ingredients
@@ -443,7 +514,7 @@ Return only JSON, no additional text.
                         name_en = ing_parsed.group(3).strip()
                         
                         # Translate ingredient name
-                        name_vi = self.translator.en_to_vi(name_en)
+                        name_vi = to_vi(name_en)
                         
                         result["ingredients"].append({
                             "name": name_vi,
@@ -465,7 +536,7 @@ Return only JSON, no additional text.
                 for i, step in enumerate(steps, 1):
                     step = step.strip()
                     if len(step) > 10:  # Filter out too short steps
-                        step_vi = self.translator.en_to_vi(step)
+                        step_vi = to_vi(step)
                         result["instructions"].append(f"Bước {i}: {step_vi}")
                 
                 print(f"  ✅ Parsed {len(result['instructions'])} steps")
@@ -509,6 +580,8 @@ Return only JSON, no additional text.
             
             print(f"✅ Parsed successfully: {result['title']}")
             
+        except RequestCancelled:
+            raise
         except Exception as e:
             print(f"⚠️ Parsing failed: {e}, using minimal template")
             result["title"] = "Bánh Tự Tạo"
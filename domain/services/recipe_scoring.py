@@ -0,0 +1,261 @@
+# domain/services/recipe_scoring.py
+"""
+Chấm điểm / xếp hạng nhiều công thức cùng lúc.
+
+RecipeFeatures dựng ma trận đặc trưng của N công thức một lần (độ khó, thời gian, số nguyên
+liệu theo mùa / đắt tiền, ...; nguyên liệu lưu dạng vocab + chỉ số để match keyword một lần
+cho mỗi tên). score_recipes() tính toàn bộ sub-score và viral score cho một context
+(segment / ngày) bằng phép toán mảng NumPy, cùng công thức với các helper chấm từng công thức
+trong app/routers/analytics.py (dùng chung các bảng dưới đây).
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from domain.services.keyword_matcher import KeywordMatcher, keyword_matcher, normalize_text
+
+SEASONS = ('Xuân', 'Hè', 'Thu', 'Đông')
+
+# Bảng keyword cho scoring, biên dịch một lần
+SEASONAL_INGREDIENTS = KeywordMatcher({
+    'Xuân': ['strawberry', 'dâu', 'green tea', 'trà xanh'],
+    'Hè': ['mango', 'xoài', 'coconut', 'dừa', 'lemon'],
+    'Thu': ['pumpkin', 'bí đỏ', 'apple', 'táo', 'cinnamon'],
+    'Đông': ['chocolate', 'gingerbread', 'orange', 'cam'],
+})
+VIRAL_TITLE_KEYWORDS = KeywordMatcher({
+    'viral': ['trending', 'viral', 'hot', 'new', 'special', 'unique', 'amazing'],
+})
+# So khớp nguyên tên (không phải substring)
+TRENDING_INGREDIENTS = frozenset({'matcha', 'taro', 'ube', 'brown sugar', 'cheese foam'})
+EVENT_TAGS = frozenset({'Halloween', 'Christmas', 'Valentine', 'Tết'})
+# Phân loại chi phí đơn giản (nên thay bằng dữ liệu giá thật)
+COST_CATEGORIES = KeywordMatcher({
+    'expensive': ['vanilla', 'chocolate', 'cream', 'butter', 'nuts'],
+    'cheap': ['flour', 'sugar', 'milk', 'eggs'],
+})
+
+# Điểm theo độ khó; độ khó khác / None dùng giá trị 'other'
+DIFFICULTIES = ('easy', 'medium', 'hard')
+COMPLEXITY_SCORES = {'easy': 0.9, 'medium': 0.7, 'hard': 0.4, 'other': 0.5}
+SEGMENT_COMPLEXITY_SCORES = {'easy': 0.8, 'medium': 0.6, 'hard': 0.3, 'other': 0.5}
+FEASIBILITY_DIFFICULTY_SCORES = {'easy': 0.9, 'medium': 0.6, 'hard': 0.3, 'other': 0.5}
+DEFAULT_MINUTES = 30
+
+# Trọng số viral potential (tổng = 1)
+VIRAL_WEIGHTS = {
+    'ingredient_trend_alignment': 0.25,
+    'timing_optimization': 0.20,
+    'segment_fit_score': 0.20,
+    'viral_elements': 0.20,      # số viral element / 10
+    'growth_potential': 0.15,
+}
+
+# (score, ngưỡng (>), thông điệp)
+SUCCESS_FACTOR_RULES = (
+    ('ingredient_trend_alignment', 0.7, "✅ Ingredients align perfectly with current trends"),
+    ('timing_optimization', 0.7, "✅ Perfect timing for seasonal demand"),
+    ('segment_fit_score', 0.7, "✅ Excellent match for target segment preferences"),
+    ('viral_element_count', 2, "✅ Contains multiple viral-worthy elements"),
+    ('growth_potential', 0.6, "✅ High market growth potential"),
+    ('cost_efficiency', 0.6, "✅ Cost-efficient ingredient selection"),
+)
+
+
+def difficulty_key(difficulty) -> str:
+    return difficulty if difficulty in DIFFICULTIES else 'other'
+
+
+def price_fit_score(difficulty, price_sensitivity: str) -> float:
+    """Độ hợp giữa độ khó và độ nhạy giá của segment"""
+    if price_sensitivity == 'thấp':
+        return 0.9 if difficulty == 'hard' else 0.6
+    if price_sensitivity == 'cao':
+        return 0.9 if difficulty == 'easy' else 0.4
+    return 0.7
+
+
+def total_minutes(recipe) -> Optional[int]:
+    """prep + cook (phút, lấy số đầu tiên); None nếu không parse được"""
+    try:
+        prep_minutes = int(recipe.prep_time.split()[0]) if recipe.prep_time else DEFAULT_MINUTES
+        cook_minutes = int(recipe.cook_time.split()[0]) if recipe.cook_time else DEFAULT_MINUTES
+    except Exception:
+        return None
+    return prep_minutes + cook_minutes
+
+
+def time_feasibility_score(minutes: float) -> float:
+    if minutes <= 60:
+        return 0.9
+    if minutes <= 120:
+        return 0.7
+    return 0.4
+
+
+def _lookup(table: Dict[str, float], codes: np.ndarray) -> np.ndarray:
+    return np.array([table[key] for key in (*DIFFICULTIES, 'other')])[codes]
+
+
+@dataclass(frozen=True)
+class ScoringContext:
+    """Phần phụ thuộc segment / ngày (giống nhau cho mọi công thức trong batch)"""
+    trending_flavors: Tuple[str, ...]
+    season: str
+    price_sensitivity: str
+    timing_score: float
+    growth_potential: float = 0.5
+
+
+@dataclass(frozen=True)
+class RecipeFeatures:
+    """Ma trận đặc trưng (không phụ thuộc context) của N công thức"""
+    n_ingredients: np.ndarray
+    difficulty: np.ndarray           # chỉ số trong DIFFICULTIES, len(DIFFICULTIES) = khác
+    minutes: np.ndarray              # NaN: không parse được thời gian
+    viral_title: np.ndarray
+    event_tag: np.ndarray
+    trending_ingredient: np.ndarray
+    expensive_count: np.ndarray
+    season_counts: np.ndarray        # (N, len(SEASONS))
+    ingredient_vocab: Tuple[str, ...]
+    ingredient_recipe: np.ndarray    # recipe của từng nguyên liệu
+    ingredient_index: np.ndarray     # chỉ số tên nguyên liệu trong vocab
+
+    def __len__(self) -> int:
+        return len(self.n_ingredients)
+
+    @classmethod
+    def from_recipes(cls, recipes: Sequence[Any]) -> "RecipeFeatures":
+        n = len(recipes)
+        vocab: Dict[str, int] = {}
+        ingredient_recipe: List[int] = []
+        ingredient_index: List[int] = []
+        difficulty_codes = {key: code for code, key in enumerate(DIFFICULTIES)}
+
+        difficulty = np.empty(n, dtype=np.int8)
+        minutes = np.empty(n, dtype=float)
+        viral_title = np.empty(n, dtype=bool)
+        event_tag = np.empty(n, dtype=bool)
+        for row, recipe in enumerate(recipes):
+            for ingredient in recipe.ingredients:
+                ingredient_recipe.append(row)
+                ingredient_index.append(vocab.setdefault(ingredient.name, len(vocab)))
+            difficulty[row] = difficulty_codes.get(recipe.difficulty, len(DIFFICULTIES))
+            parsed = total_minutes(recipe)
+            minutes[row] = np.nan if parsed is None else parsed
+            viral_title[row] = VIRAL_TITLE_KEYWORDS.matches(recipe.title)
+            event_tag[row] = not EVENT_TAGS.isdisjoint(recipe.tags)
+
+        names = tuple(vocab)
+        recipe_of = np.array(ingredient_recipe, dtype=np.intp)
+        index = np.array(ingredient_index, dtype=np.intp)
+
+        # Match keyword một lần cho mỗi tên nguyên liệu, rồi cộng dồn theo recipe
+        def per_recipe(name_flags: np.ndarray) -> np.ndarray:
+            return np.bincount(recipe_of, weights=name_flags[index], minlength=n)
+
+        season_hits = [SEASONAL_INGREDIENTS.hits(name) for name in names]
+        season_counts = np.column_stack([
+            per_recipe(np.array([season in hits for hits in season_hits], dtype=float)) for season in SEASONS
+        ]) if n else np.zeros((0, len(SEASONS)))
+        expensive = np.array([COST_CATEGORIES.matches(name, 'expensive') for name in names], dtype=float)
+        trending = np.array([normalize_text(name) in TRENDING_INGREDIENTS for name in names], dtype=float)
+
+        return cls(
+            n_ingredients=np.bincount(recipe_of, minlength=n),
+            difficulty=difficulty,
+            minutes=minutes,
+            viral_title=viral_title,
+            event_tag=event_tag,
+            trending_ingredient=per_recipe(trending) > 0,
+            expensive_count=per_recipe(expensive),
+            season_counts=season_counts,
+            ingredient_vocab=names,
+            ingredient_recipe=recipe_of,
+            ingredient_index=index,
+        )
+
+    def flavor_counts(self, trending_flavors: Tuple[str, ...]) -> np.ndarray:
+        """Số nguyên liệu của mỗi recipe khớp ít nhất một trending flavor"""
+        matcher = keyword_matcher(tuple(trending_flavors))
+        flags = np.array([matcher.matches(name) for name in self.ingredient_vocab], dtype=float)
+        return np.bincount(self.ingredient_recipe, weights=flags[self.ingredient_index], minlength=len(self))
+
+
+@dataclass
+class RecipeScores:
+    """Sub-score và viral score của cả batch (mỗi cột là một mảng độ dài N)"""
+    columns: Dict[str, np.ndarray]
+    viral_potential: np.ndarray
+
+    def ranking(self, top_k: Optional[int] = None) -> np.ndarray:
+        """Chỉ số recipe theo viral score giảm dần (ổn định khi bằng điểm)"""
+        order = np.argsort(-self.viral_potential, kind='stable')
+        return order if top_k is None else order[:max(top_k, 0)]
+
+    def row(self, index: int) -> Dict[str, float]:
+        return {name: float(values[index]) for name, values in self.columns.items()}
+
+    def success_factors(self, index: int) -> List[str]:
+        return [message for column, threshold, message in SUCCESS_FACTOR_RULES
+                if self.columns[column][index] > threshold]
+
+
+def score_recipes(features: RecipeFeatures, context: ScoringContext) -> RecipeScores:
+    """Tính toàn bộ sub-score + viral score cho N công thức trong một context"""
+    n = len(features)
+    divisor = np.maximum(features.n_ingredients, 1)
+    codes = features.difficulty
+
+    if context.trending_flavors:
+        ingredient_alignment = np.minimum(features.flavor_counts(context.trending_flavors) / divisor, 1.0)
+    else:
+        ingredient_alignment = np.full(n, 0.5)
+
+    if context.season in SEASONS:
+        seasonality = np.minimum(features.season_counts[:, SEASONS.index(context.season)] / divisor, 1.0)
+    else:
+        seasonality = np.zeros(n)
+
+    price_fit = np.array([price_fit_score(key, context.price_sensitivity) for key in (*DIFFICULTIES, 'other')])[codes]
+    segment_fit = (_lookup(SEGMENT_COMPLEXITY_SCORES, codes) + price_fit) / 2
+
+    viral_count = (features.viral_title.astype(int) + features.event_tag + features.trending_ingredient
+                   + (codes == DIFFICULTIES.index('easy')))
+
+    cost_efficiency = np.where(features.n_ingredients == 0, 0.5,
+                               np.maximum(0, 1 - features.expensive_count / divisor))
+
+    minutes = features.minutes
+    time_score = np.where(minutes <= 60, 0.9, np.where(minutes <= 120, 0.7, 0.4))
+    feasibility = np.where(np.isnan(minutes), 0.5,
+                           (time_score + _lookup(FEASIBILITY_DIFFICULTY_SCORES, codes)) / 2)
+
+    timing = np.full(n, float(context.timing_score))
+    growth = np.full(n, float(context.growth_potential))
+
+    viral = np.minimum(
+        ingredient_alignment * VIRAL_WEIGHTS['ingredient_trend_alignment']
+        + timing * VIRAL_WEIGHTS['timing_optimization']
+        + segment_fit * VIRAL_WEIGHTS['segment_fit_score']
+        + viral_count / 10 * VIRAL_WEIGHTS['viral_elements']
+        + growth * VIRAL_WEIGHTS['growth_potential'],
+        1.0,
+    )
+
+    return RecipeScores(
+        columns={
+            'ingredient_trend_alignment': ingredient_alignment,
+            'timing_optimization': timing,
+            'segment_fit_score': segment_fit,
+            'complexity_score': _lookup(COMPLEXITY_SCORES, codes),
+            'seasonality_match': seasonality,
+            'viral_element_count': viral_count,
+            'cost_efficiency': cost_efficiency,
+            'preparation_feasibility': feasibility,
+            'growth_potential': growth,
+        },
+        viral_potential=viral,
+    )
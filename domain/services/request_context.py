@@ -0,0 +1,77 @@
+# domain/services/request_context.py
+"""
+Trạng thái theo request, truyền qua các bước của pipeline sinh công thức.
+
+Pipeline chạy blocking trong thread (T5, Gemini SDK), nên không huỷ được bằng asyncio: router
+gọi `cancel()` khi client ngắt kết nối, còn mỗi bước gọi `raise_if_cancelled()` trước khi tốn
+CPU / token cho bước tiếp theo.
+
+Deadline: mỗi bước hỏi `allow(stage, min_seconds)` trước khi chạy; không đủ thời gian thì bước đó
+bị bỏ qua (hoặc dùng cách rẻ hơn) và được ghi vào `skipped_stages` để trả về cho client.
+"""
+import threading
+import time
+from typing import List, Optional
+
+
+class RequestCancelled(Exception):
+    """Request đã bị huỷ (client ngắt kết nối / job bị huỷ)"""
+
+
+# Timeout (giây) cho lời gọi upstream khi deadline đã hết (SDK không nhận timeout 0)
+EXHAUSTED_CALL_TIMEOUT = 0.01
+
+
+class DeadlineExceeded(Exception):
+    """Không còn đủ thời gian trong deadline để chạy bước hiện tại (vd. chờ lượt dùng T5 quá lâu)"""
+
+
+class RequestContext:
+    def __init__(self, deadline_seconds: Optional[float] = None):
+        self._cancelled = threading.Event()
+        self.cancel_reason: Optional[str] = None
+        self.deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+        self.skipped_stages: List[str] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._cancelled.is_set():
+            self.cancel_reason = reason
+            self._cancelled.set()
+
+    def raise_if_cancelled(self):
+        if self._cancelled.is_set():
+            raise RequestCancelled(self.cancel_reason)
+
+    def remaining(self) -> float:
+        """Số giây còn lại trước deadline (vô hạn nếu không đặt deadline)"""
+        if self.deadline is None:
+            return float('inf')
+        return max(0.0, self.deadline - time.monotonic())
+
+    def call_timeout(self, floor: float = 1.0) -> Optional[float]:
+        """Timeout cho một lời gọi upstream: phần budget còn lại (None nếu không có deadline).
+        floor chỉ áp dụng khi còn budget; đã hết budget thì lời gọi gần như fail ngay
+        (EXHAUSTED_CALL_TIMEOUT) thay vì vượt deadline thêm floor giây."""
+        if self.deadline is None:
+            return None
+        remaining = self.remaining()
+        if remaining <= 0:
+            return EXHAUSTED_CALL_TIMEOUT
+        return max(floor, remaining)
+
+    def allow(self, stage: str, min_seconds: float) -> bool:
+        """True nếu còn ít nhất `min_seconds` cho stage; không thì ghi stage vào skipped_stages"""
+        if self.remaining() >= min_seconds:
+            return True
+        self.skip(stage, f"needs {min_seconds:.1f}s")
+        return False
+
+    def skip(self, stage: str, reason: str = ""):
+        """Ghi stage vào skipped_stages (một lần)"""
+        if stage not in self.skipped_stages:
+            self.skipped_stages.append(stage)
+            print(f"⏱️ Skipping {stage}: {self.remaining():.1f}s left{', ' + reason if reason else ''}")
@@ -0,0 +1,202 @@
+# domain/services/trend_forecast_service.py
+"""
+Dự báo xu hướng theo ngày cho horizon dài (tới 365 ngày).
+
+Toàn bộ context của horizon được dựng thành ma trận một lần (tra bảng theo tháng của
+ContextAwareRecipeService + lịch sự kiện), predict bằng một lần gọi mỗi model
+(TrendPredictor.predict_batch), rồi tổng hợp series tuần và điểm sự kiện bằng NumPy.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+MAX_HORIZON_DAYS = 365
+
+# Dùng khi model chưa train (giống fallback cũ của forecast-and-generate)
+FALLBACK_PREDICTIONS = {
+    'popularity_score': 0.65,
+    'engagement_score': 0.6,
+    'trend_score': 0.55,
+    'overall_trend_strength': 0.6,
+}
+
+
+@dataclass
+class TrendForecast:
+    """Kết quả dự báo: series theo ngày (mảng độ dài horizon) và điểm sự kiện"""
+    start: date
+    dates: np.ndarray                       # datetime64[D]
+    months: np.ndarray
+    seasons: Tuple[str, ...]                # season của từng ngày
+    predictions: Dict[str, np.ndarray]
+    event_scores: Dict[str, float] = field(default_factory=dict)
+    event_first_day: Dict[str, int] = field(default_factory=dict)
+    daily_events: List[List[str]] = field(default_factory=list)
+    flavors_by_month: Tuple[Tuple[str, ...], ...] = ()  # index 1..12, trending flavors của mùa
+    model_used: bool = True
+
+    @property
+    def horizon_days(self) -> int:
+        return len(self.dates)
+
+    @property
+    def strength(self) -> np.ndarray:
+        return self.predictions['overall_trend_strength']
+
+    def top_events(self, k: int) -> List[str]:
+        return [name for name, _ in sorted(self.event_scores.items(), key=lambda item: item[1], reverse=True)[:k]]
+
+    def event_date(self, name: str) -> date:
+        """Ngày đầu tiên sự kiện active trong horizon (ngày đầu horizon nếu không có)"""
+        return self.start + timedelta(days=self.event_first_day.get(name, 0))
+
+    def weekly(self) -> List[Dict[str, Any]]:
+        """Series tuần: trung bình mỗi 7 ngày + các sự kiện trong tuần"""
+        return self._bucketed(7)
+
+    def daily(self, max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Series ngày; max_points giới hạn payload bằng cách gộp các ngày liên tiếp (trung bình)"""
+        if max_points and max_points < self.horizon_days:
+            return self._bucketed(int(np.ceil(self.horizon_days / max_points)))
+        return self._bucketed(1)
+
+    def _bucketed(self, size: int) -> List[Dict[str, Any]]:
+        starts = np.arange(0, self.horizon_days, size)
+        counts = np.diff(np.append(starts, self.horizon_days))
+        means = {name: np.add.reduceat(values, starts) / counts for name, values in self.predictions.items()}
+
+        points = []
+        for i, offset in enumerate(starts):
+            end = offset + counts[i]
+            events = list(dict.fromkeys(
+                name for day_events in self.daily_events[offset:end] for name in day_events
+            ))
+            points.append({
+                'date': str(self.dates[offset]),
+                'days': int(counts[i]),
+                'season': self.seasons[offset],
+                'events': events,
+                'trending_flavors': list(self.flavors_by_month[self.months[offset]]) if self.flavors_by_month else [],
+                **{name: round(float(values[i]), 4) for name, values in means.items()},
+            })
+        return points
+
+    def summary(self) -> Dict[str, Any]:
+        strength = self.strength
+        peak = int(np.argmax(strength))
+        return {
+            'avg_trend_strength': round(float(strength.mean()), 3),
+            'peak_date': str(self.dates[peak]),
+            'peak_trend_strength': round(float(strength[peak]), 3),
+            'seasons_in_window': sorted(set(self.seasons)),
+            'model_used': self.model_used,
+        }
+
+
+class TrendForecastService:
+    """Engine dự báo theo ngày dùng context tables + event calendar + batch predict"""
+
+    def __init__(self, context_service, trend_predictor):
+        self.context_service = context_service
+        self.trend_predictor = trend_predictor
+
+        # Bảng theo tháng (index 1..12) từ seasonal table đã tính sẵn
+        contexts = [self.context_service.get_current_context(datetime(2000, month, 1))[0] for month in range(1, 13)]
+        self._season_by_month = np.array([''] + [ctx.season for ctx in contexts], dtype=object)
+        self._temperature_by_month = np.array([0.0] + [float(ctx.temperature) for ctx in contexts])
+        self._demand_by_month = np.array([0.0] + [float(ctx.demand_factor) for ctx in contexts])
+        self._events_by_month = [()] + [ctx.events for ctx in contexts]
+        self._flavors_by_month = ((),) + tuple(tuple(ctx.trending_flavors) for ctx in contexts)
+
+    def forecast(self, user_segment: str, start: Optional[datetime] = None,
+                 horizon_days: int = 30, custom_context: Optional[Dict[str, Any]] = None) -> TrendForecast:
+        """Dự báo từng ngày trong [start, start + horizon_days).
+
+        Args:
+            user_segment: Segment khách hàng
+            start: Ngày bắt đầu (mặc định hôm nay)
+            horizon_days: Số ngày, giới hạn trong [1, MAX_HORIZON_DAYS]
+            custom_context: Giá trị context ghi đè cho mọi ngày (như predict_trends)
+
+        Returns:
+            TrendForecast
+        """
+        horizon_days = max(1, min(int(horizon_days), MAX_HORIZON_DAYS))
+        start = start or datetime.now()
+        first = start.date() if isinstance(start, datetime) else start
+        dates = np.datetime64(first, 'D') + np.arange(horizon_days)
+
+        # Thành phần ngày (vectorized)
+        months = (dates.astype('datetime64[M]').astype(int) % 12) + 1
+        day_of_year = (dates - dates.astype('datetime64[Y]')).astype(int) + 1
+        weekday = (dates.astype('datetime64[D]').astype(int) + 3) % 7  # 1970-01-01 là thứ Năm
+        seasons = self._season_by_month[months]
+
+        market_ctx = self.context_service._get_market_context(user_segment)
+        columns: Dict[str, Any] = {
+            'month': months,
+            'day_of_year': day_of_year,
+            'weekday': weekday,
+            'temperature': self._temperature_by_month[months],
+            'bakery_demand': self._demand_by_month[months],
+            'season': seasons,
+            'user_segment': user_segment,
+            'market_potential': market_ctx.market_potential,
+            'competition_level': market_ctx.competition_level,
+        }
+        if custom_context:
+            columns.update(custom_context)
+
+        try:
+            predictions = self.trend_predictor.predict_batch(columns, horizon_days)
+            model_used = True
+        except Exception as e:
+            print(f"Warning: batch prediction unavailable, using fallback: {e}")
+            predictions = {name: np.full(horizon_days, value) for name, value in FALLBACK_PREDICTIONS.items()}
+            model_used = False
+
+        forecast = TrendForecast(
+            start=first,
+            dates=dates,
+            months=months,
+            seasons=tuple(seasons),
+            predictions=predictions,
+            flavors_by_month=self._flavors_by_month,
+            model_used=model_used,
+        )
+        self._score_events(forecast)
+        return forecast
+
+    def _score_events(self, forecast: TrendForecast):
+        """Điểm sự kiện = tổng trend strength trên các ngày sự kiện active (prefix sum, O(1) mỗi sự kiện)"""
+        horizon_days = forecast.horizon_days
+        last = forecast.start + timedelta(days=horizon_days - 1)
+        cumulative = np.concatenate(([0.0], np.cumsum(forecast.strength)))
+        daily_events: List[List[str]] = [[] for _ in range(horizon_days)]
+
+        calendar = self.context_service.event_calendar
+        if len(calendar):
+            intervals = [
+                (event.name, max((event.start - forecast.start).days, 0),
+                 min((event.end - forecast.start).days, horizon_days - 1) + 1)
+                for event in calendar.between(forecast.start, last)
+            ]
+        else:
+            # Không có lịch sự kiện thật -> sự kiện theo tháng của seasonal context
+            month_starts = np.flatnonzero(np.diff(forecast.months, prepend=-1))
+            month_ends = np.append(month_starts[1:], horizon_days)
+            intervals = [
+                (name, int(lo), int(hi))
+                for lo, hi in zip(month_starts, month_ends)
+                for name in self._events_by_month[forecast.months[lo]]
+            ]
+
+        for name, lo, hi in intervals:
+            forecast.event_scores[name] = forecast.event_scores.get(name, 0.0) + float(cumulative[hi] - cumulative[lo])
+            forecast.event_first_day.setdefault(name, lo)
+            for day in range(lo, hi):
+                daily_events[day].append(name)
+
+        forecast.daily_events = daily_events
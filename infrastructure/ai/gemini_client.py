@@ -19,8 +19,14 @@ class GeminiClient:
             genai.configure(api_key=settings.GEMINI_API_KEY)
             self._configured = True
     
-    def generate_recipe_from_ingredients(self, ingredients: str, language: str = "vi") -> str:
-        """Generate recipe from ingredients using Gemini"""
+    @staticmethod
+    def _request_options(timeout: Optional[float]) -> Optional[dict]:
+        """request_options cho SDK: timeout (giây) của lời gọi, None = mặc định của SDK"""
+        return {"timeout": timeout} if timeout is not None else None
+
+    def generate_recipe_from_ingredients(self, ingredients: str, language: str = "vi",
+                                         timeout: Optional[float] = None) -> str:
+        """Generate recipe from ingredients using Gemini (timeout: giây, thường là context.call_timeout())"""
         self._ensure_config()
         model = genai.GenerativeModel(self.model)
         
@@ -68,21 +74,26 @@ Hãy tạo công thức chi tiết, khả thi cho tiệm bánh nhỏ. Chỉ tr
                 {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
                 {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
                 {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-            ]
+            ],
+            request_options=self._request_options(timeout)
         )
         
         # Prefer response text nếu có
         if getattr(response, "text", None):
             return response.text
         # Fallback: tạo công thức chi tiết theo ngôn ngữ
-        return self._generate_simple_recipe(trend="từ nguyên liệu", user_segment="general", occasion="hàng ngày", language=language)
+        return self._generate_simple_recipe(trend="từ nguyên liệu", user_segment="general", occasion="hàng ngày", language=language,
+                                           timeout=timeout)
     
     def generate_creative_recipe(self, 
                                trend: str,
                                user_segment: str,
                                occasion: Optional[str] = None,
-                               language: str = "vi") -> str:
-        """Generate creative recipe based on trend and user segment"""
+                               language: str = "vi",
+                               temperature: Optional[float] = None,
+                               timeout: Optional[float] = None) -> str:
+        """Generate creative recipe based on trend and user segment (temperature mặc định: self.temperature)
+        timeout: giây cho lời gọi Gemini, thường là context.call_timeout()"""
         self._ensure_config()
         model = genai.GenerativeModel(self.model)
         
@@ -192,7 +203,7 @@ CHỈ TRẢ VỀ JSON, KHÔNG THÊM TEXT KHÁC.
         response = model.generate_content(
             prompt,
             generation_config={
-                "temperature": self.temperature,
+                "temperature": self.temperature if temperature is None else temperature,
                 "max_output_tokens": self.max_tokens
             },
             safety_settings=[
@@ -200,18 +211,22 @@ CHỈ TRẢ VỀ JSON, KHÔNG THÊM TEXT KHÁC.
                 {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
                 {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
                 {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"}
-            ]
+            ],
+            request_options=self._request_options(timeout)
         )
         
         if getattr(response, "text", None):
             return response.text
-        return self._generate_simple_recipe(trend=trend, user_segment=user_segment, occasion=occasion or "hàng ngày", language=language)
+        return self._generate_simple_recipe(trend=trend, user_segment=user_segment, occasion=occasion or "hàng ngày", language=language,
+                                           timeout=timeout)
     
     def _get_language_name(self, code: str) -> str:
         return "tiếng Việt" if code == "vi" else "tiếng Anh"
     
-    def _generate_simple_recipe(self, trend: str, user_segment: str, occasion: str, language: str) -> str:
-        """Generate simple recipe when main generation fails"""
+    def _generate_simple_recipe(self, trend: str, user_segment: str, occasion: str, language: str,
+                                timeout: Optional[float] = None) -> str:
+        """Generate simple recipe when main generation fails
+        (template cục bộ, không gọi mạng; timeout nhận cho cùng interface với các hàm trên)"""
         if language == "vi":
             return f"""{{
   "title": "Bánh {trend} Đặc Biệt",
@@ -1,6 +1,7 @@
 # infrastructure/ai/translator_service.py
-from typing import Literal
+from typing import Literal, Optional
 from configs.settings import settings
+from domain.services.request_context import RequestContext
 
 try:
     import google.generativeai as genai  # optional
@@ -18,28 +19,33 @@ class TranslatorService:
         else:
             self._model = None
     
-    def translate(self, text: str, src: Literal['vi','en'] = 'vi', dest: Literal['vi','en'] = 'en') -> str:
-        """Translate text giữa vi <-> en. Nếu không có Gemini, trả về nguyên văn."""
+    def translate(self, text: str, src: Literal['vi','en'] = 'vi', dest: Literal['vi','en'] = 'en',
+                  context: Optional[RequestContext] = None) -> str:
+        """Translate text giữa vi <-> en. Nếu không có Gemini, trả về nguyên văn.
+        context đã huỷ -> RequestCancelled, không gọi Gemini nữa."""
         if not text:
             return text
         if not self._enabled or src == dest:
             return text
+        if context is not None:
+            context.raise_if_cancelled()
         try:
             model = genai.GenerativeModel(self._model)
             prompt = f"Dịch chính xác và tự nhiên từ {self._lang_name(src)} sang {self._lang_name(dest)}:\n\n{text}\n\nChỉ trả về bản dịch, không thêm giải thích."
+            timeout = context.call_timeout() if context is not None else None
             resp = model.generate_content(prompt, generation_config={
                 "temperature": 0.2,
                 "max_output_tokens": min(len(text) * 2, settings.MAX_OUTPUT_TOKENS)
-            })
+            }, request_options={"timeout": timeout} if timeout is not None else None)
             return (resp.text or text).strip()
         except Exception:
             return text
     
-    def vi_to_en(self, text: str) -> str:
-        return self.translate(text, src='vi', dest='en')
+    def vi_to_en(self, text: str, context: Optional[RequestContext] = None) -> str:
+        return self.translate(text, src='vi', dest='en', context=context)
     
-    def en_to_vi(self, text: str) -> str:
-        return self.translate(text, src='en', dest='vi')
+    def en_to_vi(self, text: str, context: Optional[RequestContext] = None) -> str:
+        return self.translate(text, src='en', dest='vi', context=context)
     
     def _lang_name(self, code: str) -> str:
         return "tiếng Việt" if code == 'vi' else "tiếng Anh'" if code == 'en' else code
\ No newline at end of file
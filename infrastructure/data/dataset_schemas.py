@@ -0,0 +1,264 @@
+# infrastructure/data/dataset_schemas.py
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import pandas as pd
+
+# Ưu tiên parser pyarrow (đa luồng) nếu có, fallback về C engine của pandas
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+SEASON_CATEGORIES = ['Xuân', 'Hè', 'Thu', 'Đông']
+
+
+@dataclass(frozen=True)
+class DatasetSchema:
+    """Schema cố định cho một file CSV trong data/raw.
+
+    - dtypes: kiểu dữ liệu tường minh (float32/int16/...) thay vì để pandas tự suy luận
+    - categoricals: các cột text lặp lại nhiều -> dtype 'category'
+    - parse_dates: các cột ngày cần parse
+    - projections: các tập cột (usecols) theo từng nơi sử dụng
+    """
+    filename: str
+    dtypes: Dict[str, str] = field(default_factory=dict)
+    categoricals: Tuple[str, ...] = ()
+    parse_dates: Tuple[str, ...] = ()
+    projections: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+    def columns_for(self, projection: Optional[str]) -> Optional[Tuple[str, ...]]:
+        """Trả về usecols cho projection, None nghĩa là đọc tất cả cột"""
+        if projection is None:
+            return None
+        if projection not in self.projections:
+            raise KeyError(f"Unknown projection '{projection}' for {self.filename}")
+        return self.projections[projection]
+
+    def read_kwargs(self, usecols: Optional[Tuple[str, ...]] = None) -> Dict:
+        """Build kwargs cho pd.read_csv, chỉ khai báo dtype cho các cột được đọc"""
+        wanted = set(usecols) if usecols is not None else None
+
+        def _selected(col: str) -> bool:
+            return wanted is None or col in wanted
+
+        dtype = {col: t for col, t in self.dtypes.items() if _selected(col)}
+        dtype.update({col: 'category' for col in self.categoricals if _selected(col)})
+        kwargs = {'dtype': dtype}
+        parse_dates = [col for col in self.parse_dates if _selected(col)]
+        if parse_dates:
+            kwargs['parse_dates'] = parse_dates
+        if usecols is not None:
+            kwargs['usecols'] = list(usecols)
+        return kwargs
+
+
+YOUTUBE_TRENDS = DatasetSchema(
+    filename="youtube_bakery_gaming_trends_cleaned.csv",
+    dtypes={
+        'so_ngay_tu_khi_dang': 'float32',
+        'luot_xem': 'float32',
+        'luot_thich': 'float32',
+        'luot_binh_luan': 'float32',
+        'engagement_rate_%': 'float32',
+        'so_loai_thuc_pham': 'float32',
+        'so_loai_banh_ngot': 'float32',
+        'diem_noi_tieng': 'float32',
+    },
+    categoricals=(
+        'chu_de', 'tu_khoa_tim_kiem', 'tac_gia', 'muc_do_viral', 'nhom_doi_tuong',
+        'do_tuoi', 'muc_do_noi_tieng', 'game_franchise', 'is_gaming_content',
+    ),
+    parse_dates=('ngay_dang',),
+    projections={
+        # Cột text chỉ dùng cho bakery filter + các cột feature/target
+        'training': (
+            'chu_de', 'tu_khoa_tim_kiem', 'tieu_de', 'mo_ta', 'tags', 'ngay_dang',
+            'so_ngay_tu_khi_dang', 'luot_xem', 'luot_thich', 'luot_binh_luan',
+            'engagement_rate_%', 'muc_do_viral', 'nhom_doi_tuong', 'so_loai_thuc_pham',
+            'banh_ngot_phat_hien', 'banh_ngot_yeu_thich', 'so_loai_banh_ngot', 'diem_noi_tieng',
+        ),
+    },
+)
+
+CONSUMER_GROUPS = DatasetSchema(
+    filename="consumer_groups_detailed_20250921_133329.csv",
+    dtypes={
+        'total_keywords': 'float32',
+        'avg_youtube_views': 'float32',
+        'avg_engagement_rate': 'float32',
+        'total_videos_analyzed': 'float32',
+        'trending_up_keywords': 'float32',
+        'trending_stable_keywords': 'float32',
+        'trending_down_keywords': 'float32',
+        'avg_search_interest': 'float32',
+        'total_products': 'float32',
+        'estimated_monthly_revenue': 'float64',
+        'avg_profit_margin': 'float32',
+    },
+    categoricals=('market_potential', 'competition_level', 'growth_trend'),
+    projections={
+        'training': (
+            'consumer_group', 'market_potential', 'competition_level',
+            'growth_trend', 'avg_engagement_rate',
+        ),
+        'market': (
+            'consumer_group', 'market_potential', 'competition_level', 'growth_trend',
+            'avg_engagement_rate', 'top_5_keywords',
+        ),
+    },
+)
+
+CONSUMER_PROFILES = DatasetSchema(
+    filename="consumer_profiles_20250920_061904.csv",
+    categoricals=('price_sensitivity', 'purchase_frequency'),
+    projections={
+        'market': (
+            'Unnamed: 0', 'age_range', 'characteristics', 'preferred_flavors',
+            'price_sensitivity', 'purchase_frequency', 'preferred_channels',
+        ),
+    },
+)
+
+SEASONAL_TRENDS = DatasetSchema(
+    filename="seasonal_trends_20250920_061904.csv",
+    dtypes={'average_orders': 'float32'},
+    projections={
+        'context': ('season', 'trending_flavors', 'popular_occasions', 'average_orders', 'peak_months'),
+    },
+)
+
+VIETNAM_EVENTS = DatasetSchema(
+    filename="vietnam_seasonal_events_2025.csv",
+    dtypes={
+        'year': 'int16',
+        'month': 'int8',
+        'quarter': 'int8',
+        'day_of_week': 'int8',
+        'day_of_month': 'int8',
+        'day_of_year': 'int16',
+        'week_of_year': 'int8',
+        'temperature_celsius': 'float32',
+        'rainfall_probability': 'float32',
+        'vietnam_bakery_demand_factor': 'float32',
+        'cold_drink_demand': 'float32',
+        'hot_beverage_demand': 'float32',
+        'ice_cream_cake_demand': 'float32',
+        'vietnam_event_impact': 'float32',
+        'days_to_next_vn_event': 'float32',
+        'domestic_tourism_factor': 'float32',
+        'expat_tourism_factor': 'float32',
+    },
+    categoricals=('vietnam_season', 'vietnam_event_name', 'vietnam_event_type'),
+    parse_dates=('date',),
+    projections={
+        'training': (
+            'date', 'temperature_celsius', 'rainfall_probability', 'vietnam_bakery_demand_factor',
+            'cold_drink_demand', 'hot_beverage_demand', 'ice_cream_cake_demand',
+            'domestic_tourism_factor',
+        ),
+        'reference': (
+            'date', 'is_vietnam_special_event', 'vietnam_event_name', 'vietnam_event_type',
+            'vietnam_event_impact',
+        ),
+    },
+)
+
+FOOD_PREFERENCES = DatasetSchema(
+    filename="comprehensive_food_preferences_raw_20250920_074528.csv",
+    dtypes={
+        'view_count': 'float32',
+        'like_count': 'float32',
+        'comment_count': 'float32',
+        'engagement_rate': 'float32',
+        'popularity_score': 'float32',
+        'trend_strength': 'float32',
+    },
+    categoricals=('data_type', 'group_or_food_name', 'search_keyword', 'channel_name', 'content_type'),
+    # Chưa có feature nào dùng bảng này, chỉ cần đếm số bản ghi khi training
+    projections={'training': ('data_type',)},
+)
+
+CALENDAR_WEATHER = DatasetSchema(
+    filename="vn_calendar_weather_2022-01-01_2025-09-20.csv",
+    dtypes={
+        'dow': 'int8',
+        'weekend': 'int8',
+        'is_holiday': 'int8',
+        'is_special': 'int8',
+        'temp_avg': 'float32',
+        'temp_min': 'float32',
+        'temp_max': 'float32',
+        'precip_mm': 'float32',
+        'snow': 'float32',
+        'wdir': 'float32',
+        'wspd': 'float32',
+        'wpgt': 'float32',
+        'pres': 'float32',
+        'tsun': 'float32',
+    },
+    categoricals=('holiday_name', 'special_event', 'season'),
+    parse_dates=('date',),
+)
+
+DATASET_SCHEMAS: Dict[str, DatasetSchema] = {
+    'youtube_trends': YOUTUBE_TRENDS,
+    'consumer_groups': CONSUMER_GROUPS,
+    'consumer_profiles': CONSUMER_PROFILES,
+    'seasonal_trends': SEASONAL_TRENDS,
+    'vietnam_events': VIETNAM_EVENTS,
+    'food_preferences': FOOD_PREFERENCES,
+    'calendar_weather': CALENDAR_WEATHER,
+}
+
+
+def schema_for_file(filename: str) -> Optional[DatasetSchema]:
+    """Tìm schema theo tên file CSV (None nếu file chưa được đăng ký)"""
+    for schema in DATASET_SCHEMAS.values():
+        if schema.filename == filename:
+            return schema
+    return None
+
+
+def read_dataset(name: str,
+                 data_dir: Path,
+                 projection: Optional[str] = None,
+                 chunksize: Optional[int] = None) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Đọc dataset đã đăng ký với dtype tường minh và usecols projection.
+
+    Args:
+        name: Tên dataset trong DATASET_SCHEMAS
+        data_dir: Thư mục chứa file CSV (thường là data/raw)
+        projection: Tên projection (usecols), None để đọc tất cả cột
+        chunksize: Nếu có, trả về iterator các chunk thay vì một DataFrame
+
+    Returns:
+        DataFrame hoặc iterator các DataFrame nếu dùng chunksize
+
+    Raises:
+        KeyError: Nếu dataset hoặc projection chưa được đăng ký
+    """
+    schema = DATASET_SCHEMAS[name]
+    kwargs = schema.read_kwargs(schema.columns_for(projection))
+    path = Path(data_dir) / schema.filename
+
+    if chunksize is not None:
+        # pyarrow engine không hỗ trợ đọc theo chunk
+        return pd.read_csv(path, engine="c", chunksize=chunksize, **kwargs)
+    return pd.read_csv(path, engine=CSV_ENGINE, **kwargs)
+
+
+def dataframe_memory_mb(df: pd.DataFrame) -> float:
+    """Dung lượng RAM thực tế của DataFrame (MB, tính cả object strings)"""
+    return round(float(df.memory_usage(deep=True).sum()) / 1024 / 1024, 3)
+
+
+def memory_report(frames: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, float]]:
+    """Báo cáo số dòng và RAM của từng dataset đã load"""
+    return {
+        name: {'rows': len(df), 'memory_mb': dataframe_memory_mb(df)}
+        for name, df in frames.items()
+    }
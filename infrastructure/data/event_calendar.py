@@ -0,0 +1,204 @@
+# infrastructure/data/event_calendar.py
+"""
+Lịch sự kiện Việt Nam dạng interval index, build từ các sự kiện có ngày thật trong
+vietnam_seasonal_events_2025.csv (ReferenceSnapshot.events).
+
+- Ngày liên tiếp cùng tên sự kiện được gộp thành một interval [start, end]
+- Multi-year: sự kiện dương lịch lặp lại theo (tháng, ngày); sự kiện âm lịch (Tết,
+  Trung Thu) lấy ngày dương tương ứng từ bảng LUNAR_HOLIDAY_DATES
+- Interval sort theo start (ordinal), query bằng bisect: O(log n + k) với k là số kết quả
+"""
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Ngày dương lịch của các ngày lễ âm lịch (mùng 1 tháng Giêng, rằm tháng Tám)
+LUNAR_HOLIDAY_DATES: Dict[str, Dict[int, date]] = {
+    'Tết Nguyên Đán': {
+        2020: date(2020, 1, 25), 2021: date(2021, 2, 12), 2022: date(2022, 2, 1),
+        2023: date(2023, 1, 22), 2024: date(2024, 2, 10), 2025: date(2025, 1, 29),
+        2026: date(2026, 2, 17), 2027: date(2027, 2, 6), 2028: date(2028, 1, 26),
+        2029: date(2029, 2, 13), 2030: date(2030, 2, 3),
+    },
+    'Tết Trung Thu': {
+        2020: date(2020, 10, 1), 2021: date(2021, 9, 21), 2022: date(2022, 9, 10),
+        2023: date(2023, 9, 29), 2024: date(2024, 9, 17), 2025: date(2025, 10, 6),
+        2026: date(2026, 9, 25), 2027: date(2027, 9, 15), 2028: date(2028, 10, 3),
+        2029: date(2029, 9, 22), 2030: date(2030, 9, 12),
+    },
+}
+
+# Khoảng ảnh hưởng quanh ngày chính (ngày trước, ngày sau), ví dụ mua bánh từ 23 tháng Chạp
+EVENT_WINDOWS: Dict[str, Tuple[int, int]] = {
+    'Tết Nguyên Đán': (7, 4),
+    'Tết Trung Thu': (7, 0),
+}
+
+DateLike = Union[date, datetime]
+
+
+def _as_date(value: DateLike) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def lunar_holiday_key(name: str) -> Optional[str]:
+    """Tên trong bảng âm lịch nếu sự kiện là ngày lễ âm lịch ('Tết Trung Thu 2025' -> 'Tết Trung Thu')"""
+    lowered = name.lower()
+    for key in LUNAR_HOLIDAY_DATES:
+        if key.lower() in lowered:
+            return key
+    return None
+
+
+@dataclass(frozen=True)
+class CalendarEvent:
+    """Một lần diễn ra của sự kiện (interval đóng [start, end])"""
+    name: str
+    event_type: str
+    impact: float
+    start: date
+    end: date
+    peak: date
+    lunar: bool = False
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'event_type': self.event_type,
+            'impact': self.impact,
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+            'peak': self.peak.isoformat(),
+            'lunar': self.lunar,
+        }
+
+
+def _merge_consecutive(events: Sequence) -> List[CalendarEvent]:
+    """Gộp các ngày liên tiếp cùng tên (CSV ghi mỗi ngày Tết một dòng) thành một interval"""
+    merged: List[CalendarEvent] = []
+    last_by_name: Dict[str, int] = {}
+    for event in sorted(events, key=lambda e: e.date):
+        day = date.fromisoformat(event.date)
+        index = last_by_name.get(event.name)
+        if index is not None and merged[index].end >= day - timedelta(days=1):
+            previous = merged[index]
+            peak = previous.peak if previous.impact >= event.impact else day
+            merged[index] = CalendarEvent(
+                name=previous.name, event_type=previous.event_type, impact=max(previous.impact, event.impact),
+                start=previous.start, end=day, peak=peak, lunar=previous.lunar,
+            )
+            continue
+        last_by_name[event.name] = len(merged)
+        merged.append(CalendarEvent(
+            name=event.name, event_type=event.event_type, impact=event.impact,
+            start=day, end=day, peak=day, lunar=lunar_holiday_key(event.name) is not None,
+        ))
+    return merged
+
+
+def _shift_to_year(event: CalendarEvent, year: int) -> Optional[CalendarEvent]:
+    """Chiếu một lần diễn ra sang năm khác (âm lịch theo bảng, dương lịch theo tháng/ngày)"""
+    lunar_key = lunar_holiday_key(event.name)
+    if lunar_key is not None:
+        peak = LUNAR_HOLIDAY_DATES[lunar_key].get(year)
+        if peak is None:
+            return None
+        offset = peak - event.peak
+    else:
+        try:
+            offset = event.peak.replace(year=year) - event.peak
+        except ValueError:  # 29/2
+            return None
+    return CalendarEvent(
+        name=event.name, event_type=event.event_type, impact=event.impact,
+        start=event.start + offset, end=event.end + offset, peak=event.peak + offset,
+        lunar=lunar_key is not None,
+    )
+
+
+def _apply_window(event: CalendarEvent) -> CalendarEvent:
+    lunar_key = lunar_holiday_key(event.name)
+    before, after = EVENT_WINDOWS.get(lunar_key or event.name, (0, 0))
+    if not (before or after):
+        return event
+    return CalendarEvent(
+        name=event.name, event_type=event.event_type, impact=event.impact,
+        start=min(event.start, event.peak - timedelta(days=before)),
+        end=max(event.end, event.peak + timedelta(days=after)),
+        peak=event.peak, lunar=event.lunar,
+    )
+
+
+class EventCalendar:
+    """Index interval của sự kiện: query theo ngày / khoảng ngày bằng bisect"""
+
+    def __init__(self, events: Iterable[CalendarEvent]):
+        self.events: Tuple[CalendarEvent, ...] = tuple(sorted(events, key=lambda e: (e.start, e.end, e.name)))
+        self._starts = [event.start.toordinal() for event in self.events]
+        # Độ dài interval lớn nhất: interval chứa ngày D phải có start >= D - max_span
+        self._max_span = max((event.end - event.start).days for event in self.events) if self.events else 0
+
+    @classmethod
+    def from_reference(cls, reference_events: Sequence, years: Optional[Iterable[int]] = None) -> "EventCalendar":
+        """Build từ ReferenceSnapshot.events.
+
+        Args:
+            reference_events: Các EventReference (mỗi dòng một ngày)
+            years: Các năm cần có lịch; mặc định từ năm đầu của dữ liệu tới năm hiện tại + 2
+        """
+        occurrences = _merge_consecutive(reference_events)
+        if not occurrences:
+            return cls([])
+
+        source_years = {event.peak.year for event in occurrences}
+        if years is None:
+            years = range(min(source_years), max(max(source_years), date.today().year + 2) + 1)
+
+        # Dữ liệu thật của năm nào thì giữ nguyên; năm khác chiếu từ lần diễn ra gần nhất
+        latest: Dict[str, CalendarEvent] = {}
+        for event in occurrences:
+            latest[event.name] = event
+        present = {(event.name, event.peak.year) for event in occurrences}
+        events = list(occurrences)
+        for year in years:
+            for name, template in latest.items():
+                if (name, year) in present:
+                    continue
+                shifted = _shift_to_year(template, year)
+                if shifted is not None:
+                    events.append(shifted)
+        return cls(_apply_window(event) for event in events)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def between(self, start: DateLike, end: DateLike) -> List[CalendarEvent]:
+        """Các sự kiện có interval giao với [start, end]"""
+        start_ordinal = _as_date(start).toordinal()
+        end_ordinal = _as_date(end).toordinal()
+        lo = bisect_left(self._starts, start_ordinal - self._max_span)
+        hi = bisect_right(self._starts, end_ordinal)
+        return [event for event in self.events[lo:hi] if event.end.toordinal() >= start_ordinal]
+
+    def active_on(self, day: DateLike) -> List[CalendarEvent]:
+        """Các sự kiện đang diễn ra (trong window) vào ngày day"""
+        return self.between(day, day)
+
+    def next_event(self, day: DateLike) -> Optional[CalendarEvent]:
+        """Sự kiện bắt đầu sớm nhất từ ngày day trở đi"""
+        index = bisect_left(self._starts, _as_date(day).toordinal())
+        return self.events[index] if index < len(self.events) else None
+
+    def daily(self, start: DateLike, days: int) -> List[Dict]:
+        """Tên sự kiện active từng ngày trong [start, start + days) (một range query + quét tuyến tính)"""
+        first = _as_date(start)
+        window = self.between(first, first + timedelta(days=days - 1))
+        return [
+            {
+                'date': (first + timedelta(days=offset)).isoformat(),
+                'events': [event.name for event in window
+                           if event.start <= first + timedelta(days=offset) <= event.end],
+            }
+            for offset in range(days)
+        ]
@@ -0,0 +1,228 @@
+# infrastructure/data/reference_snapshot.py
+"""
+Snapshot dữ liệu tham chiếu cho ContextAwareRecipeService (mùa vụ, sự kiện, thị trường,
+consumer profiles) đã parse sẵn thành cấu trúc typed.
+
+Build offline từ CSV trong data/raw (parse list bằng ast.literal_eval, không eval),
+lưu thành một file pickle và load bằng một lần đọc khi khởi động.
+
+Build: python scripts/build_reference_snapshot.py
+"""
+import ast
+import hashlib
+import os
+import pickle
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from infrastructure.data.dataset_schemas import DATASET_SCHEMAS, read_dataset
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_PATH = Path("data/processed/reference_snapshot.pkl")
+SOURCE_DATASETS = ('seasonal_trends', 'vietnam_events', 'consumer_groups', 'consumer_profiles')
+
+
+@dataclass(frozen=True)
+class SeasonReference:
+    trending_flavors: Tuple[str, ...]
+    popular_occasions: Tuple[str, ...]
+    average_orders: float
+    peak_months: Tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class EventReference:
+    date: str
+    name: str
+    event_type: str
+    impact: float
+
+
+@dataclass(frozen=True)
+class MarketReference:
+    market_potential: str
+    competition_level: str
+    growth_trend: str
+    avg_engagement_rate: float
+    top_keywords: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class ProfileReference:
+    age_range: Optional[str]
+    characteristics: Tuple[str, ...]
+    preferred_flavors: Tuple[str, ...]
+    price_sensitivity: Optional[str]
+    purchase_frequency: Optional[str]
+    preferred_channels: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class ReferenceSnapshot:
+    """Toàn bộ dữ liệu tham chiếu; profiles key theo tên nhóm viết thường"""
+    seasonal: Dict[str, SeasonReference] = field(default_factory=dict)
+    events: Tuple[EventReference, ...] = ()
+    market: Dict[str, MarketReference] = field(default_factory=dict)
+    profiles: Dict[str, ProfileReference] = field(default_factory=dict)
+    source_fingerprint: str = ''
+    built_at: str = ''
+    version: int = SNAPSHOT_VERSION
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.seasonal or self.events or self.market or self.profiles)
+
+
+def parse_literal_list(value) -> tuple:
+    """"['a', 'b']" -> ('a', 'b') bằng ast.literal_eval; giá trị lỗi / không phải list -> ()"""
+    if not isinstance(value, str):
+        return ()
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return ()
+    return tuple(parsed) if isinstance(parsed, (list, tuple)) else ()
+
+
+def _optional_str(value) -> Optional[str]:
+    return None if pd.isna(value) else str(value)
+
+
+def source_fingerprint(data_dir: Path) -> str:
+    """Hash (tên, size, mtime) các CSV nguồn; rỗng nếu không có file nào"""
+    parts = []
+    for name in SOURCE_DATASETS:
+        path = Path(data_dir) / DATASET_SCHEMAS[name].filename
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest() if parts else ''
+
+
+def _build_seasonal(data_dir: Path) -> Dict[str, SeasonReference]:
+    df = read_dataset('seasonal_trends', data_dir, projection='context')
+    return {
+        str(row['season']): SeasonReference(
+            trending_flavors=parse_literal_list(row['trending_flavors']),
+            popular_occasions=parse_literal_list(row['popular_occasions']),
+            average_orders=float(row['average_orders']) if pd.notna(row['average_orders']) else 100.0,
+            peak_months=tuple(int(m) for m in parse_literal_list(row['peak_months'])),
+        )
+        for row in df.to_dict('records')
+    }
+
+
+def _build_events(data_dir: Path) -> Tuple[EventReference, ...]:
+    df = read_dataset('vietnam_events', data_dir, projection='reference')
+    special = df[df['is_vietnam_special_event'].astype(bool)]
+    return tuple(
+        EventReference(
+            date=pd.Timestamp(row['date']).date().isoformat(),
+            name=str(row['vietnam_event_name']),
+            event_type=_optional_str(row['vietnam_event_type']) or '',
+            impact=float(row['vietnam_event_impact']) if pd.notna(row['vietnam_event_impact']) else 0.0,
+        )
+        for row in special.to_dict('records')
+    )
+
+
+def _build_market(data_dir: Path) -> Dict[str, MarketReference]:
+    df = read_dataset('consumer_groups', data_dir, projection='market')
+    return {
+        str(row['consumer_group']): MarketReference(
+            market_potential=_optional_str(row['market_potential']) or '',
+            competition_level=_optional_str(row['competition_level']) or '',
+            growth_trend=_optional_str(row['growth_trend']) or 'Tăng',
+            avg_engagement_rate=float(row['avg_engagement_rate']) if pd.notna(row['avg_engagement_rate']) else 0.0,
+            top_keywords=tuple(row['top_5_keywords'].split(', ')) if isinstance(row['top_5_keywords'], str) else (),
+        )
+        for row in df.to_dict('records')
+    }
+
+
+def _build_profiles(data_dir: Path) -> Dict[str, ProfileReference]:
+    df = read_dataset('consumer_profiles', data_dir, projection='market')
+    profiles = {}
+    for row in df.to_dict('records'):
+        # Cột index không tên của CSV là tên nhóm (Gen Z, Millennials, ...)
+        name = row.get('Unnamed: 0')
+        if pd.isna(name) or pd.isna(row.get('preferred_flavors')):
+            continue
+        profiles[str(name).lower()] = ProfileReference(
+            age_range=_optional_str(row.get('age_range')),
+            characteristics=parse_literal_list(row.get('characteristics')),
+            preferred_flavors=parse_literal_list(row.get('preferred_flavors')),
+            price_sensitivity=_optional_str(row.get('price_sensitivity')),
+            purchase_frequency=_optional_str(row.get('purchase_frequency')),
+            preferred_channels=parse_literal_list(row.get('preferred_channels')),
+        )
+    return profiles
+
+
+def build_snapshot(data_dir: Path) -> ReferenceSnapshot:
+    """Parse CSV nguồn thành snapshot; dataset lỗi / thiếu thì phần đó rỗng"""
+    sections = {}
+    builders = {
+        'seasonal': _build_seasonal,
+        'events': _build_events,
+        'market': _build_market,
+        'profiles': _build_profiles,
+    }
+    for section, builder in builders.items():
+        try:
+            sections[section] = builder(data_dir)
+        except Exception as e:
+            print(f"Warning: Could not load {section} reference data: {e}")
+
+    return ReferenceSnapshot(
+        **sections,
+        source_fingerprint=source_fingerprint(data_dir),
+        built_at=datetime.now().isoformat(timespec='seconds'),
+    )
+
+
+def save_snapshot(snapshot: ReferenceSnapshot, path: Path = DEFAULT_SNAPSHOT_PATH) -> Path:
+    """Ghi atomic (file tạm + rename) để process khác không đọc phải file dở"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(path: Path = DEFAULT_SNAPSHOT_PATH) -> Optional[ReferenceSnapshot]:
+    """Đọc snapshot (một lần đọc file); None nếu không có hoặc khác version"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read reference snapshot {path}: {e}")
+        return None
+    if not isinstance(snapshot, ReferenceSnapshot) or snapshot.version != SNAPSHOT_VERSION:
+        return None
+    return snapshot
+
+
+def load_or_build_snapshot(data_dir: Path, path: Path = DEFAULT_SNAPSHOT_PATH) -> ReferenceSnapshot:
+    """Dùng snapshot nếu còn khớp CSV nguồn (hoặc không có CSV, ví dụ image deploy), ngược lại build lại"""
+    snapshot = load_snapshot(path)
+    fingerprint = source_fingerprint(data_dir)
+    if snapshot is not None and (not fingerprint or snapshot.source_fingerprint == fingerprint):
+        return snapshot
+
+    snapshot = build_snapshot(data_dir)
+    if not snapshot.is_empty:
+        try:
+            save_snapshot(snapshot, path)
+        except OSError as e:
+            print(f"Warning: Could not save reference snapshot: {e}")
+    return snapshot
@@ -0,0 +1,154 @@
+# infrastructure/db/job_store.py
+"""
+Lưu trạng thái / kết quả của background job (xem app/jobs.py).
+
+Mỗi job là một dict JSON-serializable có 'id' và 'expires_at' (epoch giây). Store chọn theo URL:
+- memory://                 trong process (mặc định, dev / test)
+- sqlite:///path/to/jobs.db nhiều worker process trên cùng máy
+- redis://host:port/db      production (TTL do Redis tự xoá)
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class JobStore:
+    """Interface chung của các store"""
+
+    def save(self, job: Dict[str, Any]):
+        raise NotImplementedError
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def claim(self, job: Dict[str, Any]) -> bool:
+        """Lưu job nếu id chưa có (hoặc bản cũ đã hết hạn), atomic; False nếu đã có người giữ"""
+        raise NotImplementedError
+
+    def delete(self, job_id: str):
+        raise NotImplementedError
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        """Xoá job hết hạn, trả về số job đã xoá"""
+        raise NotImplementedError
+
+
+class InMemoryJobStore(JobStore):
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job['expires_at'] < time.time():
+            return None
+        return dict(job)
+
+    def claim(self, job: Dict[str, Any]) -> bool:
+        with self._lock:
+            current = self._jobs.get(job['id'])
+            if current is not None and current['expires_at'] >= time.time():
+                return False
+            self._jobs[job['id']] = dict(job)
+            return True
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job['expires_at'] < now]
+            for job_id in expired:
+                del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, expires_at REAL NOT NULL, data TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)")
+
+    def save(self, job: Dict[str, Any]):
+        data = json.dumps(job, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO jobs (id, expires_at, data) VALUES (?, ?, ?)",
+                               (job['id'], job['expires_at'], data))
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ? AND expires_at >= ?",
+                                     (job_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, job: Dict[str, Any]) -> bool:
+        data = json.dumps(job, ensure_ascii=False, default=str)
+        with self._lock:
+            # Một câu lệnh: process khác không chen vào giữa kiểm tra và ghi; chỉ ghi đè bản đã hết hạn
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (id, expires_at, data) VALUES (?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET expires_at = excluded.expires_at, data = excluded.data "
+                "WHERE jobs.expires_at < ?",
+                (job['id'], job['expires_at'], data, time.time()),
+            )
+            return cursor.rowcount == 1
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._conn.execute("DELETE FROM jobs WHERE expires_at < ?", (now,)).rowcount
+
+
+class RedisJobStore(JobStore):
+    def __init__(self, url: str, prefix: str = "rcm:job:"):
+        import redis  # optional dependency (requirements.txt)
+
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def save(self, job: Dict[str, Any]):
+        ttl = max(1, int(job['expires_at'] - time.time()))
+        self._client.set(self.prefix + job['id'], json.dumps(job, ensure_ascii=False, default=str), ex=ttl)
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = self._client.get(self.prefix + job_id)
+        return json.loads(data) if data else None
+
+    def claim(self, job: Dict[str, Any]) -> bool:
+        ttl = max(1, int(job['expires_at'] - time.time()))
+        data = json.dumps(job, ensure_ascii=False, default=str)
+        return bool(self._client.set(self.prefix + job['id'], data, ex=ttl, nx=True))
+
+    def delete(self, job_id: str):
+        self._client.delete(self.prefix + job_id)
+
+    def purge_expired(self, now: Optional[float] = None) -> int:
+        return 0  # Redis tự xoá theo TTL
+
+
+def build_job_store(url: str) -> JobStore:
+    if url.startswith("memory://"):
+        return InMemoryJobStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://")):
+        return RedisJobStore(url)
+    raise ValueError(f"Unsupported job store URL: {url}")
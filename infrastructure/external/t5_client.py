@@ -1,8 +1,24 @@
 # infrastructure/external/t5_client.py
+import threading
 from typing import Optional
-from transformers import AutoTokenizer, T5ForConditionalGeneration
+from transformers import AutoTokenizer, StoppingCriteria, StoppingCriteriaList, T5ForConditionalGeneration
 import torch
 
+from domain.services.request_context import DeadlineExceeded, RequestContext
+
+# Chu kỳ kiểm tra huỷ khi đang chờ tới lượt dùng model
+QUEUE_POLL_SECONDS = 0.05
+
+
+class _StopWhenCancelled(StoppingCriteria):
+    """Dừng beam search ngay khi request bị huỷ"""
+
+    def __init__(self, context: RequestContext):
+        self.context = context
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.context.cancelled
+
 
 class T5Client:
     """Client cho model T5 sinh công thức từ nguyên liệu.
@@ -13,6 +29,8 @@ class T5Client:
 
     _tokenizer = None
     _model = None
+    # Model dùng chung: các request chạy lần lượt, request bị huỷ khi đang chờ thì bỏ luôn
+    _generate_lock = threading.Lock()
 
     def __init__(self, model_name: str = "flax-community/t5-recipe-generation",
                  max_length: int = 300, num_beams: int = 4):
@@ -30,23 +48,47 @@ class T5Client:
         self.tokenizer = T5Client._tokenizer
         self.model = T5Client._model
 
-    def generate_recipe(self, ingredients: str) -> str:
+    @classmethod
+    def release(cls):
+        """Bỏ model/tokenizer cache ở class-level (gọi khi shutdown app)"""
+        cls._tokenizer = None
+        cls._model = None
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def generate_recipe(self, ingredients: str, context: Optional[RequestContext] = None,
+                        num_beams: Optional[int] = None, min_seconds: float = 0.0) -> str:
         """Sinh công thức từ chuỗi nguyên liệu, phân tách bằng dấu phẩy.
 
         Ví dụ: "flour, sugar, eggs, butter, matcha powder"
+        context bị huỷ khi đang chờ / đang beam search -> RequestCancelled
+        num_beams: ghi đè self.num_beams (1 = greedy, nhanh hơn khi sắp hết deadline)
+        min_seconds: thời gian tối thiểu phải còn trong deadline khi tới lượt; chờ tới lúc
+        context.remaining() < min_seconds -> DeadlineExceeded (caller chuyển sang Gemini-only)
         """
-        input_text = f"generate recipe: {ingredients}"
-        inputs = self.tokenizer(input_text, return_tensors="pt", truncation=True).to(self.device)
-
-        with torch.no_grad():
-            output_ids = self.model.generate(
-                input_ids=inputs["input_ids"],
-                attention_mask=inputs.get("attention_mask"),
-                max_length=self.max_length,
-                num_beams=self.num_beams,
-                no_repeat_ngram_size=3,  # Prevent repetition
-                early_stopping=True
-            )
+        context = context or RequestContext()
+        while not T5Client._generate_lock.acquire(timeout=QUEUE_POLL_SECONDS):
+            context.raise_if_cancelled()
+            if context.remaining() < min_seconds:
+                raise DeadlineExceeded(f"T5 queue wait left {context.remaining():.1f}s, needs {min_seconds:.1f}s")
+        try:
+            context.raise_if_cancelled()
+            input_text = f"generate recipe: {ingredients}"
+            inputs = self.tokenizer(input_text, return_tensors="pt", truncation=True).to(self.device)
+
+            with torch.no_grad():
+                output_ids = self.model.generate(
+                    input_ids=inputs["input_ids"],
+                    attention_mask=inputs.get("attention_mask"),
+                    max_length=self.max_length,
+                    num_beams=num_beams or self.num_beams,
+                    no_repeat_ngram_size=3,  # Prevent repetition
+                    early_stopping=True,
+                    stopping_criteria=StoppingCriteriaList([_StopWhenCancelled(context)]),
+                )
+        finally:
+            T5Client._generate_lock.release()
+        context.raise_if_cancelled()  # beam search dừng giữa chừng: bỏ kết quả dở
 
         decoded = self.tokenizer.decode(output_ids[0], skip_special_tokens=True)
         return decoded
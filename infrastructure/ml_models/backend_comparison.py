@@ -0,0 +1,98 @@
+# infrastructure/ml_models/backend_comparison.py
+"""
+So sánh các estimator backend của TrendPredictor trên cùng một time-based split:
+fit time, predict latency (1 dòng và cả batch), dung lượng model khi pickle, MAE/R².
+
+Chạy: python -m infrastructure.ml_models.backend_comparison [data_dir] [output.json]
+"""
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from infrastructure.ml_models.estimator_backends import ESTIMATOR_BACKENDS, pickled_size_kb
+from infrastructure.ml_models.trend_predictor import TrendPredictor
+
+
+def _median_latency_ms(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings)) * 1000, 4)
+
+
+def compare_backends(data_dir: Path,
+                     backends: Optional[Iterable[str]] = None,
+                     latency_runs: int = 50) -> Dict[str, Dict]:
+    """Benchmark từng backend trên cùng một split.
+
+    Args:
+        data_dir: Thư mục data/raw
+        backends: Danh sách tên backend, mặc định tất cả trong ESTIMATOR_BACKENDS
+        latency_runs: Số lần đo để lấy median latency
+
+    Returns:
+        Dict backend -> {fit_seconds, predict_single_ms, predict_batch_ms, batch_rows,
+        model_size_kb, metrics}
+    """
+    backends = list(backends or ESTIMATOR_BACKENDS)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        predictor = TrendPredictor(model_path=Path(tmp_dir), auto_load=False)
+        split = predictor.prepare_training_split(data_dir)
+
+        report = {}
+        for name in backends:
+            started = time.perf_counter()
+            metrics = predictor.fit_backend(name, split, verbose=False)
+            fit_seconds = time.perf_counter() - started
+
+            models = [predictor.popularity_model, predictor.engagement_model, predictor.trend_classifier]
+            first_row = split.X_test.iloc[:1]
+            batch = predictor._transform_features(split.X_test)
+
+            def _predict_single():
+                # Tính cả transform vì backend không scaler tiết kiệm được bước này
+                row = predictor._transform_features(first_row)
+                for model in models:
+                    model.predict(row)
+
+            def _predict_batch():
+                for model in models:
+                    model.predict(batch)
+
+            report[name] = {
+                'fit_seconds': round(fit_seconds, 4),
+                'predict_single_ms': _median_latency_ms(_predict_single, latency_runs),
+                'predict_batch_ms': _median_latency_ms(_predict_batch, max(1, latency_runs // 5)),
+                'batch_rows': len(split.X_test),
+                'model_size_kb': pickled_size_kb({
+                    'models': models,
+                    'scaler': predictor.scaler,
+                    'label_encoders': predictor.label_encoders,
+                }),
+                'metrics': metrics,
+            }
+            print(f"⏱️ {name}: fit {report[name]['fit_seconds']}s, "
+                  f"single {report[name]['predict_single_ms']}ms, "
+                  f"batch {report[name]['predict_batch_ms']}ms, "
+                  f"size {report[name]['model_size_kb']}KB")
+
+    return report
+
+
+if __name__ == "__main__":
+    data_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("data/raw")
+    output_path = Path(sys.argv[2]) if len(sys.argv) > 2 else Path("data/models/backend_comparison.json")
+
+    results = compare_backends(data_dir)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"✅ Backend comparison saved to {output_path}")
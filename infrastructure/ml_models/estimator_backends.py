@@ -0,0 +1,111 @@
+# infrastructure/ml_models/estimator_backends.py
+import io
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+import joblib
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import SGDRegressor
+
+TARGETS = ('popularity', 'engagement', 'trend_score')
+
+# HistGradientBoosting chỉ hỗ trợ native categorical khi số nhãn <= max_bins
+MAX_NATIVE_CATEGORIES = 255
+
+
+@dataclass(frozen=True)
+class EstimatorBackend:
+    """Một bộ estimator cho 3 target của TrendPredictor.
+
+    - uses_scaler: True nếu cần StandardScaler trước khi fit/predict
+    - build: nhận danh sách index các cột categorical (đã label-encode),
+      trả về dict target -> estimator chưa fit
+    """
+    name: str
+    uses_scaler: bool
+    build: Callable[[List[int]], Dict[str, object]]
+    description: str = ""
+
+
+def _build_random_forest(categorical_indices: List[int]) -> Dict[str, object]:
+    return {
+        'popularity': RandomForestRegressor(n_estimators=100, random_state=42),
+        'engagement': GradientBoostingRegressor(n_estimators=100, random_state=42),
+        'trend_score': RandomForestRegressor(n_estimators=50, random_state=42),
+    }
+
+
+def _build_hist_gradient_boosting(categorical_indices: List[int]) -> Dict[str, object]:
+    categorical = list(categorical_indices) or None
+    return {
+        target: HistGradientBoostingRegressor(
+            max_iter=200,
+            learning_rate=0.1,
+            categorical_features=categorical,
+            random_state=42,
+        )
+        for target in TARGETS
+    }
+
+
+def _build_sgd(categorical_indices: List[int]) -> Dict[str, object]:
+    return {target: SGDRegressor(random_state=42) for target in TARGETS}
+
+
+def _build_compact(categorical_indices: List[int]) -> Dict[str, object]:
+    # Vài chục cây nông: vài chục KB mỗi model, predict 1 dòng nhanh hơn forest 100 cây
+    return {
+        target: GradientBoostingRegressor(n_estimators=40, max_depth=3, random_state=42)
+        for target in TARGETS
+    }
+
+
+ESTIMATOR_BACKENDS: Dict[str, EstimatorBackend] = {
+    'random_forest': EstimatorBackend(
+        name='random_forest',
+        uses_scaler=True,
+        build=_build_random_forest,
+        description='RandomForest (100/50 trees) + GradientBoosting, StandardScaler',
+    ),
+    'hist_gradient_boosting': EstimatorBackend(
+        name='hist_gradient_boosting',
+        uses_scaler=False,
+        build=_build_hist_gradient_boosting,
+        description='HistGradientBoosting với native categorical, không cần scaler',
+    ),
+    'sgd': EstimatorBackend(
+        name='sgd',
+        uses_scaler=True,
+        build=_build_sgd,
+        description='SGDRegressor tuyến tính, hỗ trợ partial_fit (streaming)',
+    ),
+    'compact': EstimatorBackend(
+        name='compact',
+        uses_scaler=True,
+        build=_build_compact,
+        description='GradientBoosting 40 cây depth 3, dùng cho model theo segment',
+    ),
+}
+
+DEFAULT_BACKEND = 'random_forest'
+
+
+def get_backend(name: str) -> EstimatorBackend:
+    """Lấy backend theo tên
+
+    Raises:
+        ValueError: Nếu tên backend không tồn tại
+    """
+    try:
+        return ESTIMATOR_BACKENDS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown estimator backend '{name}'. Available: {sorted(ESTIMATOR_BACKENDS)}"
+        ) from None
+
+
+def pickled_size_kb(obj) -> float:
+    """Dung lượng khi joblib.dump (KB), giống cách save_models lưu ra đĩa"""
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer)
+    return round(buffer.tell() / 1024, 2)
@@ -0,0 +1,269 @@
+# infrastructure/ml_models/hyperparameter_search.py
+"""
+Tuning hyperparameter cho estimator backend của TrendPredictor.
+
+- Rolling-origin time-series CV (TimeSeriesSplit) trên phần train đã sort theo ngay_dang
+- Random search + successive halving: rung đầu chỉ chạy vài fold, giữ lại 1/eta config tốt nhất
+- Các (config, fold) chạy song song bằng joblib trên tất cả core
+- Time budget: hết giờ thì dừng và chọn config tốt nhất trong số đã đánh giá
+- Mỗi fold đã chạy được ghi vào trial log JSONL, chạy lại sẽ dùng lại kết quả cũ
+"""
+import hashlib
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit
+from sklearn.preprocessing import StandardScaler
+
+from infrastructure.ml_models.estimator_backends import get_backend
+
+# Không gian tìm kiếm theo backend, rồi theo loại estimator trong backend
+# (random_forest dùng RandomForest cho popularity/trend và GradientBoosting cho engagement)
+SEARCH_SPACES: Dict[str, Dict[str, Dict[str, List]]] = {
+    'random_forest': {
+        'RandomForestRegressor': {
+            'n_estimators': [50, 100, 200],
+            'max_depth': [None, 6, 10, 16],
+            'min_samples_leaf': [1, 2, 5, 10],
+            'max_features': [1.0, 0.5, 'sqrt'],
+        },
+        'GradientBoostingRegressor': {
+            'n_estimators': [50, 100, 200],
+            'max_depth': [2, 3, 5],
+            'learning_rate': [0.03, 0.1, 0.2],
+            'subsample': [0.7, 1.0],
+        },
+    },
+    'hist_gradient_boosting': {
+        'HistGradientBoostingRegressor': {
+            'max_iter': [100, 200, 400],
+            'learning_rate': [0.03, 0.1, 0.2],
+            'max_leaf_nodes': [15, 31, 63],
+            'min_samples_leaf': [5, 20, 50],
+            'l2_regularization': [0.0, 0.1, 1.0],
+        },
+    },
+    'sgd': {
+        'SGDRegressor': {
+            'alpha': [1e-5, 1e-4, 1e-3, 1e-2],
+            'penalty': ['l2', 'l1', 'elasticnet'],
+            'learning_rate': ['invscaling', 'adaptive'],
+        },
+    },
+    'compact': {
+        'GradientBoostingRegressor': {
+            'n_estimators': [20, 40, 80],
+            'max_depth': [2, 3, 4],
+            'learning_rate': [0.05, 0.1, 0.2],
+            'subsample': [0.7, 1.0],
+        },
+    },
+}
+
+
+@dataclass(frozen=True)
+class TuningConfig:
+    """Cấu hình tuning.
+
+    - n_candidates: số config random ở rung đầu
+    - n_splits: số fold rolling-origin ở rung cuối
+    - eta: hệ số successive halving (giữ 1/eta config mỗi rung)
+    - time_budget_seconds: tổng thời gian tối đa cho việc search
+    """
+    n_candidates: int = 20
+    n_splits: int = 4
+    eta: int = 3
+    time_budget_seconds: float = 600.0
+    n_jobs: int = -1
+    seed: int = 42
+
+
+def apply_params(models: Dict[str, object], params: Dict[str, Dict]) -> Dict[str, object]:
+    """Set param cho từng estimator theo loại: params = {tên class estimator: {param: giá trị}}"""
+    for model in models.values():
+        model.set_params(**params.get(type(model).__name__, {}))
+    return models
+
+
+def _flatten_space(space: Dict[str, Dict[str, List]]) -> Dict[str, List]:
+    """{'RandomForestRegressor': {'max_depth': [...]}} -> {'RandomForestRegressor__max_depth': [...]}"""
+    return {f"{estimator}__{name}": values for estimator, params in space.items() for name, values in params.items()}
+
+
+def _nest_params(flat: Dict) -> Dict[str, Dict]:
+    nested: Dict[str, Dict] = {}
+    for key, value in flat.items():
+        estimator, name = key.split('__', 1)
+        nested.setdefault(estimator, {})[name] = value
+    return nested
+
+
+def config_id(params: Dict) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def _evaluate_fold(backend: str, params: Dict, categorical_indices: List[int], uses_scaler: bool,
+                   X: np.ndarray, y: Dict[str, np.ndarray], train_idx, test_idx) -> Dict:
+    """Fit 3 model trên một fold, trả về MAE chuẩn hóa theo std của target (trung bình 3 target)"""
+    started = time.perf_counter()
+    X_train, X_test = X[train_idx], X[test_idx]
+    if uses_scaler:
+        scaler = StandardScaler().fit(X_train)
+        X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+
+    models = apply_params(get_backend(backend).build(categorical_indices), params)
+    maes = {}
+    normalized = []
+    for target_name, model in models.items():
+        model.fit(X_train, y[target_name][train_idx])
+        mae = mean_absolute_error(y[target_name][test_idx], model.predict(X_test))
+        maes[target_name] = float(mae)
+        normalized.append(mae / (np.std(y[target_name][train_idx]) or 1.0))
+    return {'score': float(np.mean(normalized)), 'mae': maes, 'seconds': round(time.perf_counter() - started, 3)}
+
+
+def _load_trials(log_path: Path, signature: str) -> Dict[str, Dict[int, Dict]]:
+    """config_id -> {fold: kết quả} từ trial log của cùng signature (backend + hash dữ liệu + số fold)"""
+    trials: Dict[str, Dict[int, Dict]] = {}
+    if not log_path.exists():
+        return trials
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                trial = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # dòng ghi dở khi process bị kill
+            if trial.get('signature') == signature:
+                trials.setdefault(trial['config_id'], {})[trial['fold']] = trial
+    return trials
+
+
+def _rung_folds(n_splits: int, eta: int) -> List[int]:
+    """Số fold dùng ở mỗi rung, ví dụ n_splits=4, eta=3 -> [1, 4]; n_splits=9 -> [1, 3, 9]"""
+    rungs = {n_splits}
+    folds = n_splits
+    while eta > 1 and folds // eta >= 1:
+        folds //= eta
+        rungs.add(folds)
+    return sorted(rungs)
+
+
+def search_hyperparameters(X: np.ndarray, y: Dict[str, np.ndarray], backend: str,
+                           categorical_indices: List[int], config: TuningConfig,
+                           log_path: Optional[Path] = None) -> Dict:
+    """Random search + successive halving trên rolling-origin CV.
+
+    Args:
+        X: Ma trận feature train (đã sort theo thời gian), chưa scale
+        y: target -> giá trị, cùng thứ tự với X
+        backend: Tên estimator backend
+        categorical_indices: Index cột categorical (cho HistGradientBoosting)
+        config: TuningConfig
+        log_path: File JSONL để ghi / resume trial
+
+    Returns:
+        Dict gồm best_params, best_score, số fold của best, leaderboard và thông tin budget
+    """
+    from joblib import Parallel, delayed, effective_n_jobs, hash as content_hash
+
+    started = time.perf_counter()
+    spec = get_backend(backend)
+    space = SEARCH_SPACES.get(backend)
+    if not space:
+        raise ValueError(f"Không có search space cho backend '{backend}'")
+
+    folds = list(TimeSeriesSplit(n_splits=config.n_splits).split(X))
+    flat_space = _flatten_space(space)
+    candidates = [_nest_params(params) for params in
+                  ParameterSampler(flat_space, n_iter=min(config.n_candidates, _space_size(flat_space)),
+                                   random_state=config.seed)]
+    params_by_id = {config_id(params): params for params in candidates}
+
+    # Hash nội dung (X, y): cùng số dòng nhưng dữ liệu khác thì không dùng lại trial cũ
+    signature = config_id({'backend': backend, 'data': content_hash((X, y)), 'n_splits': config.n_splits})
+    trials = _load_trials(log_path, signature) if log_path else {}
+    resumed = sum(len(folds_done) for cid, folds_done in trials.items() if cid in params_by_id)
+    if log_path:
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _mean_score(cid: str, n_folds: int) -> float:
+        return float(np.mean([trials[cid][fold]['score'] for fold in range(n_folds)]))
+
+    alive = list(params_by_id)
+    evaluated_folds = 0
+    out_of_time = False
+    with Parallel(n_jobs=config.n_jobs) as parallel:
+        for n_folds in _rung_folds(config.n_splits, config.eta):
+            pending = [(cid, fold) for cid in alive for fold in range(n_folds)
+                       if fold not in trials.get(cid, {})]
+
+            # Dispatch theo batch để kiểm tra time budget giữa các batch
+            batch_size = 2 * effective_n_jobs(config.n_jobs)
+            for start in range(0, len(pending), batch_size):
+                if time.perf_counter() - started > config.time_budget_seconds:
+                    out_of_time = True
+                    break
+                batch = pending[start:start + batch_size]
+                results = parallel(
+                    delayed(_evaluate_fold)(backend, params_by_id[cid], categorical_indices, spec.uses_scaler,
+                                            X, y, *folds[fold])
+                    for cid, fold in batch
+                )
+                for (cid, fold), result in zip(batch, results):
+                    trial = {'signature': signature, 'config_id': cid, 'fold': fold,
+                             'params': params_by_id[cid], **result}
+                    trials.setdefault(cid, {})[fold] = trial
+                    evaluated_folds += 1
+                    if log_path:
+                        with open(log_path, 'a', encoding='utf-8') as f:
+                            f.write(json.dumps(trial, ensure_ascii=False, default=str) + "\n")
+            if out_of_time:
+                break
+
+            # Successive halving: giữ 1/eta config tốt nhất sau rung này
+            complete = [cid for cid in alive if all(fold in trials.get(cid, {}) for fold in range(n_folds))]
+            complete.sort(key=lambda cid: _mean_score(cid, n_folds))
+            alive = complete[:max(1, math.ceil(len(complete) / config.eta))] if n_folds < config.n_splits else complete
+
+    # Best = config được đánh giá trên nhiều fold nhất (fold liên tiếp từ 0), score thấp nhất
+    def _folds_done(cid: str) -> int:
+        done = 0
+        while done in trials.get(cid, {}):
+            done += 1
+        return done
+
+    ranked = sorted(
+        (cid for cid in params_by_id if _folds_done(cid) > 0),
+        key=lambda cid: (-_folds_done(cid), _mean_score(cid, _folds_done(cid)))
+    )
+    if not ranked:
+        raise TimeoutError("Time budget hết trước khi đánh giá xong config nào")
+
+    best = ranked[0]
+    return {
+        'backend': backend,
+        'best_config_id': best,
+        'best_params': params_by_id[best],
+        'best_score': round(_mean_score(best, _folds_done(best)), 6),
+        'best_folds': _folds_done(best),
+        'leaderboard': [
+            {'config_id': cid, 'params': params_by_id[cid], 'folds': _folds_done(cid),
+             'score': round(_mean_score(cid, _folds_done(cid)), 6)}
+            for cid in ranked[:10]
+        ],
+        'candidates': len(params_by_id),
+        'folds_evaluated': evaluated_folds,
+        'folds_resumed': resumed,
+        'out_of_time': out_of_time,
+        'elapsed_seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+def _space_size(space: Dict[str, List]) -> int:
+    return int(np.prod([len(values) for values in space.values()]))
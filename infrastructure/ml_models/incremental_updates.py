@@ -0,0 +1,186 @@
+# infrastructure/ml_models/incremental_updates.py
+"""
+Cập nhật TrendPredictor theo mini-batch quan sát mới (đơn hàng, đánh giá) mà không train lại từ đầu.
+
+- SGDRegressor: partial_fit
+- RandomForest: giữ nguyên "core" (cây fit trên dataset đầy đủ), thêm cây fit trên batch mới vào
+  một vòng cây gần đây có giới hạn; vượt giới hạn thì bỏ cây gần đây cũ nhất, không bao giờ bỏ core
+- GradientBoosting: thêm stage fit trên residual của batch mới sau core; vượt giới hạn thì thay
+  các stage cuối (stage sau phụ thuộc residual của stage trước nên chỉ cắt được từ cuối)
+- Estimator khác (HistGradientBoosting...) bị bỏ qua: warm_start fit lại bin mapper trên batch nhỏ
+
+Số cây / stage thêm vào tối đa RECENT_FRACTION của core nên latency dự đoán (budget của
+compress_models) chỉ tăng có giới hạn và batch nhỏ không lấn át model train trên dữ liệu thật.
+Scaler và label encoders giữ nguyên để cây/hệ số cũ vẫn đúng không gian feature.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble._forest import BaseForest
+
+FOREST_GROWTH = 10
+BOOSTING_GROWTH = 10
+# Cây / stage từ các batch incremental tối đa bằng tỉ lệ này của core (ít nhất một lượt GROWTH)
+RECENT_FRACTION = 0.2
+
+# Quy đổi tín hiệu bán hàng về thang của target training (dataset YouTube, xem _build_targets):
+# - popularity = log1p(luot_xem): coi một sản phẩm được đặt ~ 1.000 lượt xem video về món đó
+#   (giả định, chưa có dữ liệu chuyển đổi view -> đơn; chỉnh khi có số liệu thật)
+# - engagement = engagement_rate_% (phần lớn 0-10%): rating 1-5 sao -> 2-10%
+# - trend_score = diem_noi_tieng (0-100): rating 1-5 sao -> 20-100
+# Vì là giả định, model core không bị thay (xem RECENT_FRACTION): sai số quy đổi chỉ ảnh hưởng
+# phần cây / stage gần đây.
+VIEWS_PER_ORDERED_UNIT = 1_000
+ENGAGEMENT_PER_RATING_POINT = 2.0
+TREND_SCORE_PER_RATING_POINT = 20.0
+
+SEASON_BY_MONTH = {
+    12: 'Đông', 1: 'Đông', 2: 'Đông',
+    3: 'Xuân', 4: 'Xuân', 5: 'Xuân',
+    6: 'Hè', 7: 'Hè', 8: 'Hè',
+    9: 'Thu', 10: 'Thu', 11: 'Thu',
+}
+
+
+def _core_size(model, fitted: int) -> int:
+    """Số cây / stage core: ghi lại ở lần cập nhật đầu (lưu cùng model khi pickle)"""
+    if not hasattr(model, 'incremental_core_'):
+        model.incremental_core_ = fitted
+    return model.incremental_core_
+
+
+def _max_recent(core: int, growth: int) -> int:
+    return max(growth, int(round(core * RECENT_FRACTION)))
+
+
+def incremental_update(model, X, y) -> str:
+    """Cập nhật một estimator đã fit bằng batch (X, y), trả về cách đã dùng"""
+    if len(y) == 0:
+        return 'skipped'
+    if hasattr(model, 'partial_fit'):
+        model.partial_fit(X, y)
+        return 'partial_fit'
+    if isinstance(model, BaseForest):
+        core = _core_size(model, len(model.estimators_))
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + FOREST_GROWTH)
+        model.fit(X, y)
+        recent = model.estimators_[core:][-_max_recent(core, FOREST_GROWTH):]
+        model.estimators_ = model.estimators_[:core] + recent
+        model.n_estimators = len(model.estimators_)
+        return 'warm_start_forest'
+    if isinstance(model, GradientBoostingRegressor):
+        core = _core_size(model, model.n_estimators_)
+        keep = min(model.n_estimators_, core + _max_recent(core, BOOSTING_GROWTH) - BOOSTING_GROWTH)
+        _truncate_boosting(model, keep)
+        model.set_params(warm_start=True, n_estimators=keep + BOOSTING_GROWTH)
+        model.fit(X, y)
+        return 'warm_start_boosting'
+    return 'skipped'
+
+
+def _truncate_boosting(model: GradientBoostingRegressor, n_stages: int):
+    """Bỏ các stage sau n_stages (warm_start fit tiếp từ đó)"""
+    if n_stages >= model.estimators_.shape[0]:
+        return
+    model.estimators_ = model.estimators_[:n_stages]
+    model.train_score_ = model.train_score_[:n_stages]
+    if hasattr(model, 'oob_improvement_'):
+        model.oob_improvement_ = model.oob_improvement_[:n_stages]
+        model.oob_scores_ = model.oob_scores_[:n_stages]
+    model.n_estimators_ = n_stages
+
+
+def _mongo_date(value) -> Optional[datetime]:
+    """Đọc {'$date': '...Z'} hoặc chuỗi ISO từ bản export MongoDB"""
+    if isinstance(value, dict):
+        value = value.get('$date')
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def _mongo_id(value) -> Optional[str]:
+    return value.get('$oid') if isinstance(value, dict) else value
+
+
+def load_mongo_export(path: Path) -> List[Dict]:
+    """Đọc file JSON export (mảng document) như data/test/test.orders.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _day_context(day: datetime) -> Dict:
+    return {
+        'month': day.month,
+        'day_of_year': day.timetuple().tm_yday,
+        'weekday': day.weekday(),
+        'season': SEASON_BY_MONTH[day.month],
+    }
+
+
+def user_segments_from_users(users: Iterable[Dict], field: str = 'userSegment') -> Dict[str, str]:
+    """Map userId -> segment từ bản export users (bỏ user chưa có segment)"""
+    return {_mongo_id(user.get('_id')): user[field] for user in users if user.get(field)}
+
+
+def observations_from_orders_and_ratings(orders: Iterable[Dict], ratings: Iterable[Dict],
+                                         since: Optional[datetime] = None,
+                                         user_segments: Optional[Dict[str, str]] = None) -> List[Dict]:
+    """Gom đơn hàng và đánh giá theo (sản phẩm, ngày, segment) thành quan sát có nhãn.
+
+    Đơn hàng cho target popularity (log số lượng quy đổi lượt xem), đánh giá cho
+    engagement và trend_score. Quan sát chỉ có target nào có tín hiệu.
+
+    Args:
+        orders: Document đơn hàng (orderItems, userId, createdAt)
+        ratings: Document đánh giá (productId, userId, rating, createdAt)
+        since: Chỉ lấy record tạo sau mốc này (watermark của lần cập nhật trước)
+        user_segments: userId -> segment; quan sát có segment cập nhật cả model của segment đó
+
+    Returns:
+        List dict context (month, day_of_year, weekday, season, user_segment) + 'targets' + 'observed_at'
+    """
+    user_segments = user_segments or {}
+    quantities = defaultdict(float)
+    rating_values = defaultdict(list)
+
+    for order in orders:
+        created = _mongo_date(order.get('createdAt'))
+        if created is None or (since and created <= since):
+            continue
+        segment = user_segments.get(_mongo_id(order.get('userId')))
+        for item in order.get('orderItems', []):
+            quantities[(_mongo_id(item.get('product')), created.date(), segment)] += item.get('quantity', 0)
+
+    for rating in ratings:
+        created = _mongo_date(rating.get('createdAt'))
+        if created is None or (since and created <= since) or rating.get('rating') is None:
+            continue
+        segment = user_segments.get(_mongo_id(rating.get('userId')))
+        rating_values[(_mongo_id(rating.get('productId')), created.date(), segment)].append(float(rating['rating']))
+
+    observations = []
+    for key in sorted(set(quantities) | set(rating_values), key=lambda k: (k[1], str(k[0]), k[2] or '')):
+        day = datetime.combine(key[1], datetime.min.time())
+        targets = {}
+        if key in quantities:
+            targets['popularity'] = float(np.log1p(quantities[key] * VIEWS_PER_ORDERED_UNIT))
+        if key in rating_values:
+            mean_rating = float(np.mean(rating_values[key]))
+            targets['engagement'] = mean_rating * ENGAGEMENT_PER_RATING_POINT
+            targets['trend_score'] = mean_rating * TREND_SCORE_PER_RATING_POINT
+        observations.append({**_day_context(day), 'user_segment': key[2], 'targets': targets,
+                             'observed_at': day.isoformat()})
+    return observations
+
+
+def latest_created_at(*collections: Iterable[Dict]) -> Optional[datetime]:
+    """Mốc createdAt mới nhất, dùng làm watermark cho lần cập nhật sau"""
+    dates = [_mongo_date(doc.get('createdAt')) for docs in collections for doc in docs]
+    dates = [d for d in dates if d is not None]
+    return max(dates) if dates else None
@@ -0,0 +1,145 @@
+# infrastructure/ml_models/model_compression.py
+"""
+Nén ensemble đã fit theo latency budget: sweep số cây (n_estimators) và max_depth,
+đo MAE / latency predict (1 dòng và batch) / dung lượng pickle, rồi chọn model nhỏ nhất
+vẫn nằm trong latency budget và accuracy tolerance.
+
+Cắt số cây không cần fit lại (lấy k cây đầu của ensemble đã fit); giảm max_depth
+thì fit lại một lần cho mỗi depth rồi cắt số cây trên model đó.
+"""
+import copy
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+
+from infrastructure.ml_models.estimator_backends import pickled_size_kb
+
+# Các depth thử thêm (chỉ lấy depth nhỏ hơn depth gốc)
+DEPTH_CANDIDATES = (16, 10, 6, 2)
+# Tỉ lệ số cây giữ lại so với ensemble gốc
+ESTIMATOR_FRACTIONS = (1.0, 0.5, 0.25, 0.1)
+
+
+@dataclass(frozen=True)
+class CompressionBudget:
+    """Ràng buộc cho bước nén.
+
+    - latency_budget_ms: budget predict 1 dòng cho cả 3 model (chia đều mỗi target)
+    - accuracy_tolerance: MAE được phép tăng tối đa (tỉ lệ so với model gốc, 0.02 = 2%)
+    """
+    latency_budget_ms: float = 2.0
+    accuracy_tolerance: float = 0.02
+    latency_runs: int = 20
+
+
+def is_compressible(model) -> bool:
+    return isinstance(model, (RandomForestRegressor, GradientBoostingRegressor))
+
+
+def truncate_ensemble(model, n_estimators: int):
+    """Bản sao của ensemble đã fit chỉ giữ n_estimators cây đầu tiên"""
+    truncated = copy.copy(model)
+    truncated.estimators_ = model.estimators_[:n_estimators]
+    truncated.n_estimators = n_estimators
+    if isinstance(model, GradientBoostingRegressor):
+        truncated.n_estimators_ = n_estimators
+        truncated.train_score_ = model.train_score_[:n_estimators]
+    return truncated
+
+
+def _median_ms(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return round(float(np.median(timings)) * 1000, 4)
+
+
+def _estimator_grid(n_estimators: int) -> List[int]:
+    return sorted({max(1, int(n_estimators * fraction)) for fraction in ESTIMATOR_FRACTIONS}, reverse=True)
+
+
+def _depth_grid(max_depth: Optional[int]) -> List[Optional[int]]:
+    return [max_depth] + [d for d in DEPTH_CANDIDATES if max_depth is None or d < max_depth]
+
+
+def _pareto_frontier(candidates: List[Dict]) -> List[Dict]:
+    """Candidate không bị candidate khác trội hơn về cả MAE, latency và dung lượng"""
+    keys = ('mae', 'predict_single_ms', 'size_kb')
+    frontier = []
+    for candidate in candidates:
+        dominated = any(
+            all(other[k] <= candidate[k] for k in keys) and any(other[k] < candidate[k] for k in keys)
+            for other in candidates
+        )
+        if not dominated:
+            frontier.append(candidate)
+    return frontier
+
+
+def compress_model(model, X_train, y_train, X_test, y_test,
+                   latency_budget_ms: float, accuracy_tolerance: float,
+                   latency_runs: int = 20) -> Tuple[object, Dict]:
+    """Sweep (max_depth, n_estimators) cho một ensemble đã fit và chọn bản nhỏ nhất đạt budget.
+
+    Args:
+        model: RandomForestRegressor / GradientBoostingRegressor đã fit
+        X_train, y_train: Dữ liệu để fit lại khi giảm max_depth
+        X_test, y_test: Dữ liệu đánh giá MAE và đo batch latency
+        latency_budget_ms: Budget predict 1 dòng của riêng model này
+        accuracy_tolerance: MAE tăng tối đa so với model gốc (tỉ lệ)
+        latency_runs: Số lần đo để lấy median latency
+
+    Returns:
+        (model được chọn, report gồm baseline, frontier và chosen)
+    """
+    if not is_compressible(model):
+        return model, {'compressed': False, 'reason': f'{type(model).__name__} không hỗ trợ nén'}
+
+    single_row = X_test[:1]
+    original_depth = model.max_depth
+    candidates = []
+    fitted = {}
+    for depth in _depth_grid(original_depth):
+        base = model if depth == original_depth else clone(model).set_params(max_depth=depth).fit(X_train, y_train)
+        for n_estimators in _estimator_grid(model.n_estimators):
+            candidate = truncate_ensemble(base, n_estimators)
+            fitted[(depth, n_estimators)] = candidate
+            candidates.append({
+                'max_depth': depth,
+                'n_estimators': n_estimators,
+                'mae': float(mean_absolute_error(y_test, candidate.predict(X_test))),
+                'predict_single_ms': _median_ms(lambda: candidate.predict(single_row), latency_runs),
+                'predict_batch_ms': _median_ms(lambda: candidate.predict(X_test), max(1, latency_runs // 5)),
+                'size_kb': pickled_size_kb(candidate),
+            })
+
+    baseline = candidates[0]
+    for candidate in candidates:
+        candidate['accuracy_loss'] = round(
+            (candidate['mae'] - baseline['mae']) / baseline['mae'] if baseline['mae'] else 0.0, 6
+        )
+
+    eligible = [
+        c for c in candidates
+        if c['predict_single_ms'] <= latency_budget_ms and c['accuracy_loss'] <= accuracy_tolerance
+    ]
+    chosen = min(eligible, key=lambda c: (c['size_kb'], c['predict_single_ms'])) if eligible else baseline
+
+    report = {
+        'compressed': chosen is not baseline,
+        'meets_budget': bool(eligible),
+        'latency_budget_ms': latency_budget_ms,
+        'accuracy_tolerance': accuracy_tolerance,
+        'baseline': baseline,
+        'chosen': chosen,
+        'frontier': _pareto_frontier(candidates),
+        'candidates_evaluated': len(candidates),
+    }
+    return fitted[(chosen['max_depth'], chosen['n_estimators'])], report
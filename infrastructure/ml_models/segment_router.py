@@ -0,0 +1,37 @@
+# infrastructure/ml_models/segment_router.py
+from typing import Dict, List, Optional
+
+from domain.entities.user_segment import SEGMENT_MAPPING
+from infrastructure.ml_models.estimator_backends import pickled_size_kb
+
+
+def normalize_segment(segment: Optional[str]) -> str:
+    """Chuẩn hóa segment về key so khớp (alias + casefold)"""
+    if not segment:
+        return ''
+    segment = segment.strip()
+    return SEGMENT_MAPPING.get(segment.lower(), segment).casefold()
+
+
+class SegmentModelRouter:
+    """Dispatch prediction tới bộ model riêng của từng segment.
+
+    Segment không có model riêng (hoặc quá ít dữ liệu lúc train) trả về None
+    để TrendPredictor dùng global model làm fallback.
+    """
+
+    def __init__(self, segment_models: Dict[str, Dict[str, object]]):
+        self.segment_models = segment_models
+        self._routes = {normalize_segment(name): models for name, models in segment_models.items()}
+
+    def route(self, segment: Optional[str]) -> Optional[Dict[str, object]]:
+        """Bộ model (target -> estimator) cho segment, None nếu không có"""
+        return self._routes.get(normalize_segment(segment))
+
+    @property
+    def segments(self) -> List[str]:
+        return sorted(self.segment_models)
+
+    def size_kb(self) -> float:
+        """Tổng dung lượng pickle của tất cả model segment"""
+        return pickled_size_kb(self.segment_models)
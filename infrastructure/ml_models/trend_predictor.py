@@ -2,8 +2,7 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from typing import Dict, List, NamedTuple, Tuple, Optional
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
@@ -11,6 +10,73 @@ import joblib
 import json
 from pathlib import Path
 
+from infrastructure.data.dataset_schemas import SEASON_CATEGORIES, memory_report, read_dataset
+from infrastructure.ml_models.estimator_backends import (
+    DEFAULT_BACKEND,
+    MAX_NATIVE_CATEGORIES,
+    get_backend,
+)
+from infrastructure.ml_models.hyperparameter_search import TuningConfig, apply_params, search_hyperparameters
+from infrastructure.ml_models.incremental_updates import incremental_update
+from infrastructure.ml_models.model_compression import CompressionBudget, compress_model
+from infrastructure.ml_models.segment_router import SegmentModelRouter
+from infrastructure.monitoring.drift_monitor import DistributionBaseline, DriftMonitor
+
+PREDICTION_OUTPUTS = ('popularity_score', 'engagement_score', 'trend_score')
+
+# feature -> (key trong context, giá trị mặc định); None = lấy theo ngày hiện tại
+CONTEXT_FEATURES = {
+    'month': ('month', None),
+    'day_of_year': ('day_of_year', None),
+    'weekday': ('weekday', None),
+    'temperature_celsius': ('temperature', 25.0),
+    'rainfall_probability': ('rainfall_prob', 0.3),
+    'vietnam_bakery_demand_factor': ('bakery_demand', 1.0),
+    'cold_drink_demand': ('cold_drink_demand', 0.5),
+    'hot_beverage_demand': ('hot_beverage_demand', 0.5),
+    'ice_cream_cake_demand': ('ice_cream_demand', 0.5),
+    'domestic_tourism_factor': ('tourism_factor', 1.0),
+    'market_potential_score': ('market_potential', 0.7),
+    'competition_level_score': ('competition_level', 0.6),
+    'growth_trend_score': ('growth_trend', 1.0),
+}
+
+# Cột label-encoded mà serving điền từ context: feature -> (key trong context, label encoder)
+CONTEXT_CATEGORICAL_FEATURES = {
+    'nhom_doi_tuong_encoded': ('user_segment', 'nhom_doi_tuong'),
+    'season_encoded': ('season', 'season'),
+}
+
+# Số dòng X_train tối đa dùng dựng baseline drift (đi qua _context_to_features từng dòng)
+DRIFT_BASELINE_MAX_ROWS = 5_000
+
+# Trọng số của overall_trend_strength
+TREND_STRENGTH_WEIGHTS = {'popularity_score': 0.4, 'engagement_score': 0.3, 'trend_score': 0.3}
+
+
+class TrainingSplit(NamedTuple):
+    """Time-based split dùng chung cho train() và benchmark backends"""
+    X_train: pd.DataFrame
+    X_test: pd.DataFrame
+    y_train: Dict[str, pd.Series]
+    y_test: Dict[str, pd.Series]
+
+
+def _fit_segment_models(backend: str, categorical_indices: List[int], X_train, y_train: Dict,
+                        X_test, y_test: Dict) -> Tuple[Dict[str, object], Dict[str, Dict]]:
+    """Fit bộ model compact cho một segment (chạy trong worker của joblib)"""
+    models = get_backend(backend).build(categorical_indices)
+    metrics = {}
+    for target_name, model in models.items():
+        model.fit(X_train, y_train[target_name])
+        if len(X_test):
+            metrics[target_name] = {
+                'mae': float(mean_absolute_error(y_test[target_name], model.predict(X_test))),
+                'test_rows': int(len(X_test)),
+            }
+    return models, metrics
+
+
 class TrendPredictor:
     """
     Mô hình ML dự đoán xu hướng bánh ngọt dựa trên:
@@ -24,10 +90,14 @@ class TrendPredictor:
         self.model_path = model_path or Path("data/models")
         self.model_path.mkdir(exist_ok=True, parents=True)
         
-        # Models cho từng task
-        self.popularity_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.engagement_model = GradientBoostingRegressor(n_estimators=100, random_state=42)
-        self.trend_classifier = RandomForestRegressor(n_estimators=50, random_state=42)
+        # Models cho từng task (RandomForest/GradientBoosting mặc định, xem estimator_backends)
+        self.backend = DEFAULT_BACKEND
+        self.hyperparameters = {}
+        self.tuning_report = {}
+        models = get_backend(self.backend).build([])
+        self.popularity_model = models['popularity']
+        self.engagement_model = models['engagement']
+        self.trend_classifier = models['trend_score']
         
         # Preprocessors
         self.scaler = StandardScaler()
@@ -36,6 +106,20 @@ class TrendPredictor:
         # Features được train
         self.feature_columns = []
         self.is_trained = False
+        self.memory_report = {}
+        
+        # Model riêng theo segment (tùy chọn), fallback về global models
+        self.segment_router: Optional[SegmentModelRouter] = None
+        self.segment_report = {}
+        self.compression_report = {}
+        
+        # Phiên bản model đang dùng và số mẫu đã học (train đầy đủ + incremental)
+        self.model_metadata = self._empty_metadata()
+        
+        # Baseline phân phối lúc train + monitor drift trên đường predict
+        self.drift_baseline: Optional[Dict[str, DistributionBaseline]] = None
+        self.drift_monitor = DriftMonitor()
+        self._drift_indices: List[int] = []
         
         # Auto-load trained artifacts nếu có
         if auto_load:
@@ -49,21 +133,31 @@ class TrendPredictor:
     def load_training_data(self, data_dir: Path) -> pd.DataFrame:
         """Load và merge tất cả dữ liệu training"""
         
-        # Load main datasets
-        trends_df = pd.read_csv(data_dir / "youtube_bakery_gaming_trends_cleaned.csv")
-        consumer_df = pd.read_csv(data_dir / "consumer_groups_detailed_20250921_133329.csv") 
-        seasonal_df = pd.read_csv(data_dir / "seasonal_trends_20250920_061904.csv")
-        events_df = pd.read_csv(data_dir / "vietnam_seasonal_events_2025.csv")
-        preferences_df = pd.read_csv(data_dir / "comprehensive_food_preferences_raw_20250920_074528.csv")
+        # Load main datasets (typed schema + usecols projection, xem dataset_schemas)
+        trends_df = read_dataset('youtube_trends', data_dir, projection='training')
+        consumer_df = read_dataset('consumer_groups', data_dir, projection='training')
+        seasonal_df = read_dataset('seasonal_trends', data_dir, projection='context')
+        events_df = read_dataset('vietnam_events', data_dir, projection='training')
+        preferences_df = read_dataset('food_preferences', data_dir, projection='training')
         
+        self.memory_report = memory_report({
+            'YouTube trends': trends_df,
+            'Consumer groups': consumer_df,
+            'Seasonal trends': seasonal_df,
+            'Vietnam events': events_df,
+            'Food preferences': preferences_df,
+        })
         print(f"Loaded datasets:")
-        print(f"- YouTube trends: {len(trends_df)} records")
-        print(f"- Consumer groups: {len(consumer_df)} records") 
-        print(f"- Seasonal trends: {len(seasonal_df)} records")
-        print(f"- Vietnam events: {len(events_df)} records")
-        print(f"- Food preferences: {len(preferences_df)} records")
+        for name, info in self.memory_report.items():
+            print(f"- {name}: {info['rows']} records ({info['memory_mb']} MB)")
         
-        # Bakery-only filter: giữ lại các bản ghi có liên quan food/bakery
+        trends_df = self._filter_bakery_rows(trends_df)
+
+        return self._merge_datasets(trends_df, consumer_df, seasonal_df, events_df, preferences_df)
+    
+    @staticmethod
+    def _filter_bakery_rows(trends_df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
+        """Bakery-only filter: giữ lại các bản ghi có liên quan food/bakery"""
         bakery_keywords = ['cake', 'bánh', 'dessert', 'bakery', 'chocolate', 'matcha', 'taro', 'mousse', 'cookie', 'macaron']
         def _is_bakery_row(row) -> bool:
             text = ' '.join([
@@ -77,16 +171,34 @@ class TrendPredictor:
             ]).lower()
             return any(kw in text for kw in bakery_keywords)
 
+        if trends_df.empty:
+            return trends_df
         try:
             before = len(trends_df)
             trends_df = trends_df[trends_df.apply(_is_bakery_row, axis=1)]
-            print(f"Filtered YouTube trends to bakery-only: {before} -> {len(trends_df)}")
+            if verbose:
+                print(f"Filtered YouTube trends to bakery-only: {before} -> {len(trends_df)}")
         except Exception as e:
             print(f"Warning: bakery filter failed: {e}")
-
-        return self._merge_datasets(trends_df, consumer_df, seasonal_df, events_df, preferences_df)
+        return trends_df
     
-    def _merge_datasets(self, trends_df, consumer_df, seasonal_df, events_df, preferences_df) -> pd.DataFrame:
+    @staticmethod
+    def _prepare_events(events_df: pd.DataFrame) -> pd.DataFrame:
+        """Bản sao events_df có date kiểu datetime + month / day_of_year (không sửa DataFrame gốc).
+        Đã chuẩn bị rồi thì trả về nguyên, nên train_streaming chỉ làm một lần trước vòng chunk."""
+        if 'date' not in events_df.columns:
+            return events_df
+        if (pd.api.types.is_datetime64_any_dtype(events_df['date'])
+                and {'month', 'day_of_year'}.issubset(events_df.columns)):
+            return events_df
+        events_df = events_df.copy()
+        events_df['date'] = pd.to_datetime(events_df['date'])
+        events_df['month'] = events_df['date'].dt.month
+        events_df['day_of_year'] = events_df['date'].dt.dayofyear
+        return events_df
+
+    def _merge_datasets(self, trends_df, consumer_df, seasonal_df, events_df, preferences_df,
+                        verbose: bool = True) -> pd.DataFrame:
         """Merge và prepare data cho training"""
         
         # Convert dates
@@ -96,10 +208,7 @@ class TrendPredictor:
             trends_df['day_of_year'] = trends_df['ngay_dang'].dt.dayofyear
             trends_df['weekday'] = trends_df['ngay_dang'].dt.weekday
         
-        if 'date' in events_df.columns:
-            events_df['date'] = pd.to_datetime(events_df['date'])
-            events_df['month'] = events_df['date'].dt.month
-            events_df['day_of_year'] = events_df['date'].dt.dayofyear
+        events_df = self._prepare_events(events_df)
         
         # Merge với seasonal data
         season_map = {
@@ -112,7 +221,9 @@ class TrendPredictor:
         
         # Add seasonal features
         if 'month' in training_data.columns:
-            training_data['season'] = training_data['month'].map(season_map)
+            training_data['season'] = pd.Categorical(
+                training_data['month'].map(season_map), categories=SEASON_CATEGORIES
+            )
         
         # Add event features (tính average cho mỗi tháng)
         if 'month' in training_data.columns and len(events_df) > 0:
@@ -139,24 +250,41 @@ class TrendPredictor:
                     'avg_engagement': row['avg_engagement_rate']
                 }
             
-            # Map consumer features
-            training_data['market_potential_score'] = training_data['nhom_doi_tuong'].map(
+            # Map consumer features (nhom_doi_tuong là categorical -> ép về float32)
+            segments = training_data['nhom_doi_tuong'].astype(object)
+            training_data['market_potential_score'] = segments.map(
                 lambda x: consumer_map.get(x, {}).get('market_potential_score', 0.5)
-            )
-            training_data['competition_level_score'] = training_data['nhom_doi_tuong'].map(
+            ).astype('float32')
+            training_data['competition_level_score'] = segments.map(
                 lambda x: consumer_map.get(x, {}).get('competition_level_score', 0.5)
-            )
-            training_data['growth_trend_score'] = training_data['nhom_doi_tuong'].map(
+            ).astype('float32')
+            training_data['growth_trend_score'] = segments.map(
                 lambda x: consumer_map.get(x, {}).get('growth_trend_score', 0)
-            )
+            ).astype('float32')
         
         # Clean missing values
-        training_data = training_data.fillna(0)
+        training_data = self._fill_missing(training_data)
         
-        print(f"Final training data shape: {training_data.shape}")
+        if verbose:
+            print(f"Final training data shape: {training_data.shape}")
         return training_data
     
-    def prepare_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    @staticmethod
+    def _fill_missing(df: pd.DataFrame) -> pd.DataFrame:
+        """fillna(0) an toàn với cột categorical (giá trị thiếu -> category '0')"""
+        for col in df.columns:
+            series = df[col]
+            if not series.isna().any():
+                continue
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                if '0' not in series.cat.categories:
+                    series = series.cat.add_categories(['0'])
+                df[col] = series.fillna('0')
+            else:
+                df[col] = series.fillna(0)
+        return df
+    
+    def prepare_features(self, df: pd.DataFrame, verbose: bool = True) -> pd.DataFrame:
         """Chuẩn bị features cho training"""
         
         feature_df = df.copy()
@@ -232,14 +360,56 @@ class TrendPredictor:
         feature_df[final_features] = feature_df[final_features].fillna(0)
         
         self.feature_columns = final_features
-        print(f"Prepared {len(final_features)} features: {final_features}")
+        if verbose:
+            print(f"Prepared {len(final_features)} features: {final_features}")
         
         return feature_df[final_features]
     
-    def train(self, data_dir: Path):
-        """Train models với time-based split và shifted targets để tránh leakage"""
+    def train(self, data_dir: Path, backend: str = DEFAULT_BACKEND, per_segment: bool = False,
+              segment_backend: str = 'compact', min_segment_rows: int = 30, n_jobs: int = -1,
+              compression: Optional[CompressionBudget] = None,
+              tuning: Optional[TuningConfig] = None):
+        """Train models với time-based split và shifted targets để tránh leakage
+
+        Args:
+            data_dir: Thư mục data/raw
+            backend: Tên estimator backend (xem estimator_backends.ESTIMATOR_BACKENDS)
+            per_segment: Train thêm một bộ model compact cho từng nhom_doi_tuong
+            segment_backend: Backend cho model theo segment
+            min_segment_rows: Segment ít dữ liệu train hơn ngưỡng này dùng global model
+            n_jobs: Số worker song song khi train model theo segment
+            compression: Nếu có, nén ensemble sau khi fit theo latency budget / accuracy tolerance
+            tuning: Nếu có, tìm hyperparameter bằng time-series CV trước khi fit model cuối
+        """
         
-        print("🚀 Bắt đầu training trend prediction models...")
+        print(f"🚀 Bắt đầu training trend prediction models (backend={backend})...")
+        
+        split = self.prepare_training_split(data_dir)
+        params = None
+        if tuning:
+            self.tuning_report = self.tune_hyperparameters(split, backend, tuning)
+            params = self.tuning_report['best_params']
+        else:
+            self.tuning_report = {}
+        results = self.fit_backend(backend, split, params=params)
+        self.compression_report = self.compress_models(split, compression) if compression else {}
+        self._record_version('full', len(split.X_train))
+        self._set_drift_baseline(self._build_drift_baseline(split))
+
+        if per_segment:
+            self.segment_router = self.fit_segment_models(
+                split, backend=segment_backend, min_rows=min_segment_rows, n_jobs=n_jobs
+            )
+        else:
+            self.segment_router = None
+            self.segment_report = {}
+
+        self.is_trained = True
+        self.save_models()
+        return results
+    
+    def prepare_training_split(self, data_dir: Path) -> TrainingSplit:
+        """Load data, build features/targets và chia time-based 80/20"""
         
         # Load data
         df = self.load_training_data(data_dir)
@@ -259,53 +429,405 @@ class TrendPredictor:
             df_shift['day_of_year_shift'] = 0
 
         # Targets (không dùng các cột target thô như feature)
-        targets = {}
-        if 'luot_xem' in df_shift.columns:
-            targets['popularity'] = np.log1p(df_shift['luot_xem'])
-        if 'engagement_rate_%' in df_shift.columns:
-            targets['engagement'] = df_shift['engagement_rate_%']
-        if 'diem_noi_tieng' in df_shift.columns:
-            targets['trend_score'] = df_shift['diem_noi_tieng']
+        targets = self._build_targets(df_shift)
 
         # Prepare features (drop direct target columns để giảm leakage)
-        X = self.prepare_features(df_shift)
-        for leak_col in ['luot_xem', 'diem_noi_tieng', 'engagement_rate_%']:
-            if leak_col in self.feature_columns:
-                self.feature_columns.remove(leak_col)
-                X = X.drop(columns=[leak_col], errors='ignore')
+        X = self._drop_leak_columns(self.prepare_features(df_shift))
 
         # Time-based split: 80% đầu làm train, 20% cuối làm test
         split_idx = int(len(X) * 0.8)
-        X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
+        return TrainingSplit(
+            X_train=X.iloc[:split_idx],
+            X_test=X.iloc[split_idx:],
+            y_train={name: y.iloc[:split_idx] for name, y in targets.items()},
+            y_test={name: y.iloc[split_idx:] for name, y in targets.items()},
+        )
+    
+    def tune_hyperparameters(self, split: TrainingSplit, backend: str, config: TuningConfig) -> Dict:
+        """Search hyperparameter trên phần train (rolling-origin CV), trial log lưu trong model_path/tuning"""
+        
+        print(f"🔍 Tuning {backend}: {config.n_candidates} configs, {config.n_splits} folds, "
+              f"budget {config.time_budget_seconds}s...")
+        report = search_hyperparameters(
+            split.X_train.to_numpy(dtype=np.float64),
+            {name: y.to_numpy(dtype=np.float64) for name, y in split.y_train.items()},
+            backend,
+            self._categorical_feature_indices(),
+            config,
+            log_path=self.model_path / "tuning" / f"{backend}_trials.jsonl",
+        )
+        print(f"✅ Best config {report['best_params']} (score {report['best_score']}, "
+              f"{report['best_folds']} folds, {report['elapsed_seconds']}s)")
+        return report
+    
+    def fit_backend(self, backend: str, split: TrainingSplit, verbose: bool = True,
+                    params: Optional[Dict] = None) -> Dict:
+        """Fit bộ estimator của backend trên split và đánh giá MAE/R² trên phần test"""
+        
+        spec = get_backend(backend)
+        models = apply_params(spec.build(self._categorical_feature_indices()), params or {})
+        self.backend = spec.name
+        self.hyperparameters = dict(params or {})
 
-        # Fit scaler trên train
-        X_train_scaled = self.scaler.fit_transform(X_train)
-        X_test_scaled = self.scaler.transform(X_test)
+        # Scaler chỉ cần cho backend tuyến tính / tree cũ
+        if spec.uses_scaler:
+            self.scaler = StandardScaler().fit(split.X_train)
+        else:
+            self.scaler = None
+        X_train_scaled = self._transform_features(split.X_train)
+        X_test_scaled = self._transform_features(split.X_test)
 
         # Train và evaluate
         results = {}
-        for target_name, y in targets.items():
-            print(f"\n📊 Training {target_name} model (time-based split)...")
-            y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
-
-            if target_name == 'popularity':
-                model = self.popularity_model
-            elif target_name == 'engagement':
-                model = self.engagement_model
-            else:
-                model = self.trend_classifier
+        for target_name, y_train in split.y_train.items():
+            if verbose:
+                print(f"\n📊 Training {target_name} model (time-based split)...")
+            y_test = split.y_test[target_name]
 
+            model = models[target_name]
             model.fit(X_train_scaled, y_train)
             y_pred = model.predict(X_test_scaled)
             mae = mean_absolute_error(y_test, y_pred)
             r2 = r2_score(y_test, y_pred)
             results[target_name] = {'mae': mae, 'r2': r2}
-            print(f"✅ {target_name} - MAE: {mae:.4f}, R²: {r2:.4f}")
+            if verbose:
+                print(f"✅ {target_name} - MAE: {mae:.4f}, R²: {r2:.4f}")
+
+        self.popularity_model = models['popularity']
+        self.engagement_model = models['engagement']
+        self.trend_classifier = models['trend_score']
+        return results
+    
+    def compress_models(self, split: TrainingSplit, budget: CompressionBudget) -> Dict[str, Dict]:
+        """Thay mỗi global model bằng bản nhỏ nhất đạt latency budget và accuracy tolerance
+
+        Latency budget là cho cả lần predict 1 dòng (3 model), chia đều cho từng target.
+        """
+        X_train = self._transform_features(split.X_train)
+        X_test = self._transform_features(split.X_test)
+        per_model_budget_ms = budget.latency_budget_ms / len(split.y_train)
+
+        attributes = {
+            'popularity': 'popularity_model',
+            'engagement': 'engagement_model',
+            'trend_score': 'trend_classifier',
+        }
+        report = {}
+        for target_name, attribute in attributes.items():
+            model, report[target_name] = compress_model(
+                getattr(self, attribute), X_train, split.y_train[target_name],
+                X_test, split.y_test[target_name],
+                latency_budget_ms=per_model_budget_ms,
+                accuracy_tolerance=budget.accuracy_tolerance,
+                latency_runs=budget.latency_runs,
+            )
+            setattr(self, attribute, model)
+            chosen = report[target_name].get('chosen')
+            if chosen:
+                print(f"🗜️ {target_name}: {chosen['n_estimators']} trees, depth={chosen['max_depth']}, "
+                      f"{chosen['predict_single_ms']}ms, {chosen['size_kb']}KB "
+                      f"(loss {chosen['accuracy_loss']:.2%})")
+        return report
+    
+    def fit_segment_models(self, split: TrainingSplit, backend: str = 'compact',
+                           min_rows: int = 30, n_jobs: int = -1) -> SegmentModelRouter:
+        """Train song song một bộ model nhỏ cho mỗi segment trên cùng time-based split
+
+        Raises:
+            ValueError: Nếu features không có cột nhom_doi_tuong_encoded
+        """
+        from joblib import Parallel, delayed
+
+        if 'nhom_doi_tuong_encoded' not in self.feature_columns:
+            raise ValueError("Per-segment training cần cột nhom_doi_tuong trong dữ liệu")
+
+        encoder = self.label_encoders['nhom_doi_tuong']
+
+        def _segment_labels(X: pd.DataFrame) -> np.ndarray:
+            return encoder.inverse_transform(X['nhom_doi_tuong_encoded'].astype(int))
+
+        train_labels = _segment_labels(split.X_train)
+        test_labels = _segment_labels(split.X_test)
+        X_train = self._transform_features(split.X_train)
+        X_test = self._transform_features(split.X_test)
+
+        jobs = []
+        for segment in sorted(set(train_labels)):
+            train_mask = train_labels == segment
+            if segment == '0' or train_mask.sum() < min_rows:
+                continue
+            test_mask = test_labels == segment
+            jobs.append((segment, delayed(_fit_segment_models)(
+                backend,
+                self._categorical_feature_indices(),
+                X_train[train_mask],
+                {name: y.to_numpy()[train_mask] for name, y in split.y_train.items()},
+                X_test[test_mask],
+                {name: y.to_numpy()[test_mask] for name, y in split.y_test.items()},
+            )))
+
+        fitted = Parallel(n_jobs=n_jobs)(job for _, job in jobs) if jobs else []
+        segment_models = {}
+        self.segment_report = {}
+        for (segment, _), (models, metrics) in zip(jobs, fitted):
+            segment_models[segment] = models
+            self.segment_report[segment] = metrics
+
+        router = SegmentModelRouter(segment_models)
+        print(f"✅ Per-segment models: {router.segments} ({router.size_kb()} KB)")
+        return router
+    
+    def _models_for_segment(self, segment: Optional[str]) -> Tuple[object, object, object]:
+        """(popularity, engagement, trend) models cho segment, fallback về global models"""
+        if self.segment_router is not None:
+            models = self.segment_router.route(segment)
+            if models is not None:
+                return models['popularity'], models['engagement'], models['trend_score']
+        return self.popularity_model, self.engagement_model, self.trend_classifier
+    
+    def _build_drift_baseline(self, split: TrainingSplit) -> Dict[str, DistributionBaseline]:
+        """Baseline feature và prediction lúc train.
+
+        Feature: chỉ các cột serving điền từ context (CONTEXT_FEATURES + segment/season),
+        dựng bằng cách đưa từng dòng X_train qua _context_to_features như predict_trends;
+        các cột còn lại serving luôn để 0 nên so với train sẽ luôn báo drift giả.
+        Prediction: trên X_test.
+        """
+        X_test = self._transform_features(split.X_test)
+        predictions = np.column_stack([
+            model.predict(X_test)
+            for model in (self.popularity_model, self.engagement_model, self.trend_classifier)
+        ])
+
+        names = self._drift_feature_names()
+        indices = [self.feature_columns.index(name) for name in names]
+        X_train = split.X_train
+        if len(X_train) > DRIFT_BASELINE_MAX_ROWS:
+            X_train = X_train.sample(DRIFT_BASELINE_MAX_ROWS, random_state=42)
+        vectors = [self._context_to_features(self._row_to_context(row))
+                   for row in X_train.to_dict('records')]
+        return {
+            'features': DistributionBaseline.from_matrix(names, np.asarray(vectors, dtype=np.float64)[:, indices]),
+            'predictions': DistributionBaseline.from_matrix(PREDICTION_OUTPUTS, predictions),
+        }
+
+    def _drift_feature_names(self) -> List[str]:
+        """Các cột feature mà serving lấy từ context (được theo dõi drift)"""
+        return [name for name in self.feature_columns
+                if name in CONTEXT_FEATURES or name in CONTEXT_CATEGORICAL_FEATURES]
+
+    def _row_to_context(self, row: Dict) -> Dict:
+        """Ngược của _context_to_features: một dòng feature train -> context dict"""
+        context = {key: row[name] for name, (key, _) in CONTEXT_FEATURES.items() if name in row}
+        for name, (key, encoder_name) in CONTEXT_CATEGORICAL_FEATURES.items():
+            encoder = self.label_encoders.get(encoder_name)
+            if name in row and encoder is not None and 0 <= int(row[name]) < len(encoder.classes_):
+                context[key] = encoder.classes_[int(row[name])]
+        return context
+    
+    def _set_drift_baseline(self, baseline: Optional[Dict[str, DistributionBaseline]]):
+        # Baseline cũ (dựng trên toàn bộ feature_columns) không khớp vector serving -> bỏ
+        if baseline is not None and list(baseline['features'].names) != self._drift_feature_names():
+            print("⚠️ Drift baseline không khớp feature serving, tắt drift monitor (train lại để có baseline mới)")
+            baseline = None
+        self.drift_baseline = baseline
+        self._drift_indices = [self.feature_columns.index(name) for name in baseline['features'].names] \
+            if baseline is not None else []
+        if baseline is None:
+            self.drift_monitor.set_baseline(None)
+        else:
+            self.drift_monitor.set_baseline(baseline['features'], baseline['predictions'])
+    
+    def _categorical_feature_indices(self) -> List[int]:
+        """Index các cột label-encoded có thể dùng native categorical"""
+        indices = []
+        for idx, column in enumerate(self.feature_columns):
+            if not column.endswith('_encoded'):
+                continue
+            encoder = self.label_encoders.get(column[:-len('_encoded')])
+            if encoder is not None and len(encoder.classes_) <= MAX_NATIVE_CATEGORIES:
+                indices.append(idx)
+        return indices
+    
+    def _transform_features(self, X: pd.DataFrame):
+        """Scale features nếu backend dùng scaler, ngược lại trả về ma trận float"""
+        if self.scaler is not None:
+            return self.scaler.transform(X)
+        return X.to_numpy(dtype=np.float64)
+    
+    def train_streaming(self, data_dir: Path, chunksize: int = 50_000, epochs: int = 3,
+                        train_fraction: float = 0.8) -> Dict:
+        """Out-of-core training: đọc YouTube trends theo chunk, RAM bị chặn bởi chunksize.
+
+        - Pass 1: quét ngay_dang + nhãn categorical để tìm mốc thời gian chia 80/20
+          (đếm theo ngày nên bộ nhớ chỉ phụ thuộc số ngày, không phụ thuộc số dòng)
+        - Pass 2: StandardScaler.partial_fit trên phần train
+        - Pass 3..: SGDRegressor.partial_fit cho từng target qua nhiều epoch
+        - Pass cuối: đánh giá MAE/R² cộng dồn trên phần test
+
+        Args:
+            data_dir: Thư mục data/raw
+            chunksize: Số dòng mỗi chunk
+            epochs: Số lần duyệt dữ liệu train cho SGD
+            train_fraction: Tỉ lệ dữ liệu (theo thời gian) dùng để train
+
+        Returns:
+            Dict target -> {'mae', 'r2'} giống train()
+        """
+        print(f"🚀 Streaming training (chunksize={chunksize}, epochs={epochs})...")
+
+        # Bảng phụ nhỏ (vài nghìn dòng) vẫn load toàn bộ
+        consumer_df = read_dataset('consumer_groups', data_dir, projection='training')
+        events_df = self._prepare_events(read_dataset('vietnam_events', data_dir, projection='training'))
+
+        # Pass 1: phân phối ngày đăng + tập nhãn categorical
+        day_counts: Dict[pd.Timestamp, int] = {}
+        categories: Dict[str, set] = {col: set() for col in ['chu_de', 'nhom_doi_tuong', 'muc_do_viral']}
+        missing_dates = 0
+        for chunk in self._iter_trend_chunks(data_dir, chunksize):
+            days = chunk['ngay_dang'].dt.normalize()
+            missing_dates += int(days.isna().sum())
+            for day, count in days.value_counts().items():
+                day_counts[day] = day_counts.get(day, 0) + int(count)
+            for col, seen in categories.items():
+                if col in chunk.columns:
+                    seen.update(chunk[col].dropna().astype(str).unique())
+
+        total_rows = sum(day_counts.values()) + missing_dates
+        if total_rows == 0:
+            raise ValueError("Không có dữ liệu training sau bakery filter")
+        cutoff = self._time_split_cutoff(day_counts, int(total_rows * train_fraction))
+        print(f"Streaming split: {total_rows} rows, train <= {cutoff.date() if cutoff is not None else 'N/A'}")
 
+        # Label encoders cố định từ pass 1 (thêm '0' cho giá trị thiếu như _fill_missing)
+        categories['season'] = set(SEASON_CATEGORIES)
+        self.label_encoders = {}
+        for col, seen in categories.items():
+            self.label_encoders[col] = LabelEncoder().fit(sorted(seen | {'0'}))
+
+        # Pass 2: scaler statistics cộng dồn
+        self.scaler = StandardScaler()
+        for X, _, is_train in self._iter_feature_chunks(data_dir, chunksize, consumer_df, events_df, cutoff):
+            if is_train.any():
+                self.scaler.partial_fit(X[is_train])
+
+        # Pass 3..: incremental estimators
+        models = get_backend('sgd').build([])
+        self.backend = 'sgd'
+        rng = np.random.default_rng(42)
+        for epoch in range(epochs):
+            for X, targets, is_train in self._iter_feature_chunks(data_dir, chunksize, consumer_df, events_df, cutoff):
+                if not is_train.any():
+                    continue
+                order = rng.permutation(int(is_train.sum()))
+                X_train = self.scaler.transform(X[is_train])[order]
+                for name, y in targets.items():
+                    models[name].partial_fit(X_train, y.to_numpy()[is_train][order])
+            print(f"  epoch {epoch + 1}/{epochs} done")
+
+        self.popularity_model = models['popularity']
+        self.engagement_model = models['engagement']
+        self.trend_classifier = models['trend_score']
+        # Scaler / encoders vừa fit lại: bỏ model theo segment và report của lần train trước như train()
+        self.hyperparameters = {}
+        self.tuning_report = {}
+        self.compression_report = {}
+        self.segment_router = None
+        self.segment_report = {}
+
+        # Pass cuối: metrics cộng dồn (không giữ toàn bộ y_test trong RAM)
+        stats = {name: {'n': 0, 'abs_err': 0.0, 'sq_err': 0.0, 'sum_y': 0.0, 'sum_y2': 0.0} for name in models}
+        for X, targets, is_train in self._iter_feature_chunks(data_dir, chunksize, consumer_df, events_df, cutoff):
+            is_test = ~is_train
+            if not is_test.any():
+                continue
+            X_test = self.scaler.transform(X[is_test])
+            for name, y in targets.items():
+                y_test = y.to_numpy(dtype=np.float64)[is_test]
+                err = y_test - models[name].predict(X_test)
+                acc = stats[name]
+                acc['n'] += len(y_test)
+                acc['abs_err'] += float(np.abs(err).sum())
+                acc['sq_err'] += float((err ** 2).sum())
+                acc['sum_y'] += float(y_test.sum())
+                acc['sum_y2'] += float((y_test ** 2).sum())
+
+        results = {}
+        for name, acc in stats.items():
+            if acc['n'] == 0:
+                continue
+            ss_tot = acc['sum_y2'] - acc['sum_y'] ** 2 / acc['n']
+            results[name] = {
+                'mae': acc['abs_err'] / acc['n'],
+                'r2': 1 - acc['sq_err'] / ss_tot if ss_tot > 0 else 0.0,
+            }
+            print(f"✅ {name} - MAE: {results[name]['mae']:.4f}, R²: {results[name]['r2']:.4f}")
+
+        self._record_version('streaming', int(np.max(self.scaler.n_samples_seen_)))
+        # Không giữ toàn bộ dữ liệu train trong RAM nên không có baseline drift
+        self._set_drift_baseline(None)
         self.is_trained = True
         self.save_models()
         return results
     
+    def _iter_trend_chunks(self, data_dir: Path, chunksize: int):
+        """Đọc YouTube trends theo chunk, đã áp dụng bakery filter"""
+        for chunk in read_dataset('youtube_trends', data_dir, projection='training', chunksize=chunksize):
+            chunk = self._filter_bakery_rows(chunk, verbose=False)
+            if len(chunk):
+                yield chunk
+    
+    def _iter_feature_chunks(self, data_dir: Path, chunksize: int, consumer_df: pd.DataFrame,
+                             events_df: pd.DataFrame, cutoff: Optional[pd.Timestamp]):
+        """Yield (X, targets, is_train_mask) cho từng chunk với encoders đã fit sẵn"""
+        for chunk in self._iter_trend_chunks(data_dir, chunksize):
+            posted = chunk['ngay_dang']
+            is_train = (posted.dt.normalize() <= cutoff).to_numpy() if cutoff is not None \
+                else np.zeros(len(chunk), dtype=bool)
+            merged = self._merge_datasets(chunk, consumer_df, None, events_df, None, verbose=False)
+            targets = self._build_targets(merged)
+            X = self._drop_leak_columns(self.prepare_features(merged, verbose=False))
+            yield X, targets, is_train
+    
+    @staticmethod
+    def _time_split_cutoff(day_counts: Dict[pd.Timestamp, int], n_train: int) -> Optional[pd.Timestamp]:
+        """Ngày cuối cùng thuộc phần train khi sắp xếp theo thời gian"""
+        cumulative = 0
+        cutoff = None
+        for day in sorted(day_counts):
+            if cumulative >= n_train:
+                break
+            cumulative += day_counts[day]
+            cutoff = day
+        return cutoff
+    
+    @staticmethod
+    def _build_targets(df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Targets cho 3 model (log views, engagement rate, điểm nổi tiếng)"""
+        targets = {}
+        if 'luot_xem' in df.columns:
+            targets['popularity'] = np.log1p(df['luot_xem'])
+        if 'engagement_rate_%' in df.columns:
+            targets['engagement'] = df['engagement_rate_%']
+        if 'diem_noi_tieng' in df.columns:
+            targets['trend_score'] = df['diem_noi_tieng']
+        return targets
+    
+    def _drop_leak_columns(self, X: pd.DataFrame) -> pd.DataFrame:
+        """Bỏ các cột target thô khỏi features để tránh leakage"""
+        for leak_col in ['luot_xem', 'diem_noi_tieng', 'engagement_rate_%']:
+            if leak_col in self.feature_columns:
+                self.feature_columns.remove(leak_col)
+                X = X.drop(columns=[leak_col], errors='ignore')
+        return X
+    
+    def _model_for_target(self, target_name: str):
+        if target_name == 'popularity':
+            return self.popularity_model
+        if target_name == 'engagement':
+            return self.engagement_model
+        return self.trend_classifier
+    
     def predict_trends(self, context: Dict) -> Dict:
         """Dự đoán xu hướng dựa trên context hiện tại"""
         
@@ -319,23 +841,74 @@ class TrendPredictor:
         import pandas as pd
         feature_df = pd.DataFrame([feature_vector], columns=self.feature_columns)
 
-        # Scale features
-        feature_vector_scaled = self.scaler.transform(feature_df)
+        # Scale features (bỏ qua nếu backend không dùng scaler)
+        feature_vector_scaled = self._transform_features(feature_df)
         
-        # Predict
+        # Predict (model riêng của segment nếu có)
+        popularity_model, engagement_model, trend_model = self._models_for_segment(context.get('user_segment'))
         predictions = {}
-        predictions['popularity_score'] = float(self.popularity_model.predict(feature_vector_scaled)[0])
-        predictions['engagement_score'] = float(self.engagement_model.predict(feature_vector_scaled)[0])
-        predictions['trend_score'] = float(self.trend_classifier.predict(feature_vector_scaled)[0])
+        predictions['popularity_score'] = float(popularity_model.predict(feature_vector_scaled)[0])
+        predictions['engagement_score'] = float(engagement_model.predict(feature_vector_scaled)[0])
+        predictions['trend_score'] = float(trend_model.predict(feature_vector_scaled)[0])
         
         # Calculate overall trend strength
-        predictions['overall_trend_strength'] = (
-            predictions['popularity_score'] * 0.4 +
-            predictions['engagement_score'] * 0.3 +
-            predictions['trend_score'] * 0.3
+        predictions['overall_trend_strength'] = sum(
+            predictions[name] * weight for name, weight in TREND_STRENGTH_WEIGHTS.items()
         )
         
+        if self.drift_monitor.active:
+            self.drift_monitor.observe([feature_vector[i] for i in self._drift_indices], predictions)
         return predictions
+
+    def predict_batch(self, columns: Dict[str, object], n_rows: int) -> Dict[str, np.ndarray]:
+        """Dự đoán cho n_rows context cùng lúc (một lần predict mỗi model).
+
+        Args:
+            columns: key context (giống predict_trends) -> mảng độ dài n_rows hoặc scalar;
+                'user_segment' và 'season' có thể là scalar hoặc mảng chuỗi
+            n_rows: Số dòng
+
+        Returns:
+            Dict output -> mảng (popularity_score, engagement_score, trend_score, overall_trend_strength)
+
+        Không ghi vào drift monitor: đây là context giả định (dự báo), không phải traffic thật.
+        """
+        if not self.is_trained:
+            raise ValueError("Model chưa được train! Gọi train() trước.")
+
+        now = datetime.now()
+        date_defaults = {'month': now.month, 'day_of_year': now.timetuple().tm_yday, 'weekday': now.weekday()}
+        matrix = np.zeros((n_rows, len(self.feature_columns)), dtype=np.float64)
+        for idx, feature_name in enumerate(self.feature_columns):
+            if feature_name in CONTEXT_FEATURES:
+                key, default = CONTEXT_FEATURES[feature_name]
+                value = columns.get(key, date_defaults.get(feature_name, default))
+                matrix[:, idx] = np.asarray(value, dtype=np.float64)
+            elif feature_name in ('nhom_doi_tuong_encoded', 'season_encoded'):
+                key = 'user_segment' if feature_name == 'nhom_doi_tuong_encoded' else 'season'
+                matrix[:, idx] = self._encode_values(feature_name[:-len('_encoded')], columns.get(key))
+
+        feature_df = pd.DataFrame(matrix, columns=self.feature_columns)
+        X = self._transform_features(feature_df)
+
+        segment = columns.get('user_segment')
+        models = self._models_for_segment(segment if isinstance(segment, str) else None)
+        predictions = {name: np.asarray(model.predict(X), dtype=np.float64)
+                       for name, model in zip(PREDICTION_OUTPUTS, models)}
+        predictions['overall_trend_strength'] = sum(
+            predictions[name] * weight for name, weight in TREND_STRENGTH_WEIGHTS.items()
+        )
+        return predictions
+
+    def _encode_values(self, column: str, values) -> np.ndarray:
+        """Label-encode scalar hoặc mảng; giá trị chưa thấy / thiếu encoder -> 0 (như _context_to_features)"""
+        encoder = self.label_encoders.get(column)
+        if encoder is None or values is None:
+            return np.zeros(1)
+        lookup = {value: float(code) for code, value in enumerate(encoder.classes_)}
+        if isinstance(values, str):
+            return np.array([lookup.get(values, 0.0)])
+        return np.array([lookup.get(value, 0.0) for value in values])
     
     def _context_to_features(self, context: Dict) -> List[float]:
         """Convert context thành feature vector"""
@@ -344,20 +917,11 @@ class TrendPredictor:
         features = [0.0] * len(self.feature_columns)
         
         # Map context to features
+        now = datetime.now()
+        date_defaults = {'month': now.month, 'day_of_year': now.timetuple().tm_yday, 'weekday': now.weekday()}
         feature_mapping = {
-            'month': context.get('month', datetime.now().month),
-            'day_of_year': context.get('day_of_year', datetime.now().timetuple().tm_yday),
-            'weekday': context.get('weekday', datetime.now().weekday()),
-            'temperature_celsius': context.get('temperature', 25.0),
-            'rainfall_probability': context.get('rainfall_prob', 0.3),
-            'vietnam_bakery_demand_factor': context.get('bakery_demand', 1.0),
-            'cold_drink_demand': context.get('cold_drink_demand', 0.5),
-            'hot_beverage_demand': context.get('hot_beverage_demand', 0.5),
-            'ice_cream_cake_demand': context.get('ice_cream_demand', 0.5),
-            'domestic_tourism_factor': context.get('tourism_factor', 1.0),
-            'market_potential_score': context.get('market_potential', 0.7),
-            'competition_level_score': context.get('competition_level', 0.6),
-            'growth_trend_score': context.get('growth_trend', 1.0)
+            feature_name: context.get(key, date_defaults.get(feature_name, default))
+            for feature_name, (key, default) in CONTEXT_FEATURES.items()
         }
         
         # Categorical mappings: encode an toàn nếu có label_encoders, tránh đưa chuỗi vào scaler
@@ -396,6 +960,80 @@ class TrendPredictor:
         
         return features
     
+    @staticmethod
+    def _empty_metadata() -> Dict:
+        return {'version': 0, 'samples_seen': 0, 'updated_at': None, 'watermark': None, 'history': []}
+    
+    def _record_version(self, kind: str, n_samples: int, max_history: int = 50):
+        """Tăng version; train đầy đủ reset samples_seen, incremental cộng dồn"""
+        metadata = self.model_metadata
+        metadata['version'] += 1
+        metadata['samples_seen'] = n_samples if kind != 'incremental' else metadata['samples_seen'] + n_samples
+        metadata['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        metadata['history'] = (metadata['history'] + [{
+            'version': metadata['version'],
+            'kind': kind,
+            'samples': n_samples,
+            'samples_seen': metadata['samples_seen'],
+            'updated_at': metadata['updated_at'],
+        }])[-max_history:]
+    
+    def update_incremental(self, observations: List[Dict], publish: bool = True,
+                           watermark: Optional[str] = None) -> Dict:
+        """Cập nhật models bằng mini-batch quan sát mới, không train lại từ đầu
+
+        Args:
+            observations: List dict context (như predict_trends) kèm 'targets':
+                {'popularity' | 'engagement' | 'trend_score': giá trị}; target thiếu thì bỏ qua
+            publish: Lưu ra model_path để các process khác nhận qua load_models()
+            watermark: Mốc dữ liệu nguồn đã xử lý (lưu vào metadata cho lần chạy sau)
+
+        Returns:
+            Dict gồm version, samples_seen, số mẫu và cách cập nhật theo target
+        """
+        if not self.is_trained:
+            raise ValueError("Model chưa được train! Gọi train() trước.")
+        if not observations:
+            return {'version': self.model_metadata['version'], 'samples': 0, 'updates': {}}
+
+        X = self._transform_features(pd.DataFrame(
+            [self._context_to_features(obs) for obs in observations], columns=self.feature_columns
+        ))
+        routed = [self.segment_router.route(obs.get('user_segment')) if self.segment_router else None
+                  for obs in observations]
+        segment_models = {id(models): models for models in routed if models is not None}
+
+        attributes = {
+            'popularity': 'popularity_model',
+            'engagement': 'engagement_model',
+            'trend_score': 'trend_classifier',
+        }
+        updates = {}
+        for target_name, attribute in attributes.items():
+            values = np.array([obs.get('targets', {}).get(target_name, np.nan) for obs in observations], dtype=float)
+            has_target = ~np.isnan(values)
+            method = incremental_update(getattr(self, attribute), X[has_target], values[has_target])
+            updates[target_name] = {'samples': int(has_target.sum()), 'method': method}
+
+            # Model theo segment chỉ học từ quan sát của segment đó
+            for models in segment_models.values():
+                in_segment = np.array([m is models for m in routed]) & has_target
+                incremental_update(models[target_name], X[in_segment], values[in_segment])
+
+        self._record_version('incremental', len(observations))
+        if watermark is not None:
+            self.model_metadata['watermark'] = watermark
+        if publish:
+            self.save_models()
+
+        print(f"🔄 Incremental update v{self.model_metadata['version']}: {len(observations)} samples")
+        return {
+            'version': self.model_metadata['version'],
+            'samples': len(observations),
+            'samples_seen': self.model_metadata['samples_seen'],
+            'updates': updates,
+        }
+    
     def save_models(self):
         """Save trained models"""
         
@@ -405,12 +1043,30 @@ class TrendPredictor:
             'trend_classifier': self.trend_classifier,
             'scaler': self.scaler,
             'label_encoders': self.label_encoders,
-            'feature_columns': self.feature_columns
+            'feature_columns': self.feature_columns,
+            'backend': self.backend,
+            'hyperparameters': self.hyperparameters
         }
         
         for name, model in models_to_save.items():
             joblib.dump(model, self.model_path / f"{name}.pkl")
         
+        # Model theo segment được train cùng feature_columns, xóa bản cũ nếu lần này không train
+        segment_path = self.model_path / "segment_models.pkl"
+        if self.segment_router is not None:
+            joblib.dump(self.segment_router.segment_models, segment_path)
+        elif segment_path.exists():
+            segment_path.unlink()
+        
+        baseline_path = self.model_path / "drift_baseline.pkl"
+        if self.drift_baseline is not None:
+            joblib.dump(self.drift_baseline, baseline_path)
+        elif baseline_path.exists():
+            baseline_path.unlink()
+        
+        with open(self.model_path / "model_metadata.json", 'w', encoding='utf-8') as f:
+            json.dump(self.model_metadata, f, ensure_ascii=False, indent=2)
+        
         print(f"✅ Models saved to {self.model_path}")
     
     def load_models(self):
@@ -423,6 +1079,20 @@ class TrendPredictor:
             self.scaler = joblib.load(self.model_path / "scaler.pkl")
             self.label_encoders = joblib.load(self.model_path / "label_encoders.pkl")
             self.feature_columns = joblib.load(self.model_path / "feature_columns.pkl")
+            backend_path = self.model_path / "backend.pkl"
+            self.backend = joblib.load(backend_path) if backend_path.exists() else DEFAULT_BACKEND
+            params_path = self.model_path / "hyperparameters.pkl"
+            self.hyperparameters = joblib.load(params_path) if params_path.exists() else {}
+            segment_path = self.model_path / "segment_models.pkl"
+            self.segment_router = SegmentModelRouter(joblib.load(segment_path)) if segment_path.exists() else None
+            metadata_path = self.model_path / "model_metadata.json"
+            if metadata_path.exists():
+                with open(metadata_path, 'r', encoding='utf-8') as f:
+                    self.model_metadata = json.load(f)
+            else:
+                self.model_metadata = self._empty_metadata()
+            baseline_path = self.model_path / "drift_baseline.pkl"
+            self._set_drift_baseline(joblib.load(baseline_path) if baseline_path.exists() else None)
             
             self.is_trained = True
             print(f"✅ Models loaded from {self.model_path}")
@@ -0,0 +1,209 @@
+# infrastructure/monitoring/drift_monitor.py
+"""
+Drift monitor cho TrendPredictor: so sánh phân phối feature / prediction lúc serving
+với baseline lúc train bằng PSI và KS (xấp xỉ trên bin).
+
+Mỗi lần predict chỉ cập nhật vài mảng numpy kích thước cố định (Welford mean/variance
+và histogram trên các quantile edge của baseline), nên bộ nhớ không đổi và overhead
+cỡ micro giây.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+N_BINS = 10
+# Tránh log(0) khi một bin trống
+_EPSILON = 1e-4
+
+# Ngưỡng PSI thông dụng: < 0.1 ổn định, 0.1-0.2 lệch nhẹ, > 0.2 drift
+PSI_WARNING = 0.1
+PSI_DRIFT = 0.2
+
+
+def _bin_indices(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Index bin (0..N_BINS-1) của từng giá trị; values (..., F), edges (F, N_BINS-1)"""
+    return (values[..., None] > edges).sum(axis=-1)
+
+
+@dataclass(frozen=True)
+class DistributionBaseline:
+    """Phân phối tham chiếu của một nhóm cột (feature hoặc prediction) lúc train"""
+    names: Tuple[str, ...]
+    edges: np.ndarray      # (F, N_BINS - 1) quantile cut points
+    expected: np.ndarray   # (F, N_BINS) tỉ lệ mẫu mỗi bin
+    mean: np.ndarray
+    std: np.ndarray
+
+    @classmethod
+    def from_matrix(cls, names: Sequence[str], values: np.ndarray) -> "DistributionBaseline":
+        values = np.asarray(values, dtype=float)
+        quantiles = np.linspace(0, 1, N_BINS + 1)[1:-1]
+        edges = np.quantile(values, quantiles, axis=0).T
+        bins = _bin_indices(values, edges)
+        expected = np.stack([np.bincount(bins[:, i], minlength=N_BINS) for i in range(values.shape[1])])
+        return cls(
+            names=tuple(names),
+            edges=edges,
+            expected=expected / max(len(values), 1),
+            mean=values.mean(axis=0),
+            std=values.std(axis=0),
+        )
+
+
+class StreamingSketch:
+    """Count / mean / variance (Welford) + histogram trên edges của baseline, bộ nhớ cố định"""
+
+    def __init__(self, baseline: DistributionBaseline):
+        n_columns = len(baseline.names)
+        self.baseline = baseline
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self._m2 = np.zeros(n_columns)
+        self.histogram = np.zeros((n_columns, N_BINS), dtype=np.int64)
+        self._rows = np.arange(n_columns)
+
+    def update(self, values: np.ndarray):
+        self.count += 1
+        delta = values - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (values - self.mean)
+        self.histogram[self._rows, _bin_indices(values, self.baseline.edges)] += 1
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self._m2 / self.count if self.count else np.zeros_like(self._m2)
+
+    def approx_quantile(self, q: float) -> np.ndarray:
+        """Quantile xấp xỉ: cận trên của bin chứa quantile q (theo edges baseline)"""
+        cumulative = np.cumsum(self.histogram, axis=1) / max(self.count, 1)
+        bins = np.minimum((cumulative < q).sum(axis=1), N_BINS - 2)
+        return self.baseline.edges[self._rows, bins]
+
+    def compare(self) -> Dict[str, Dict]:
+        """PSI, KS và độ lệch mean (theo std baseline) cho từng cột"""
+        expected = np.clip(self.baseline.expected, _EPSILON, None)
+        actual = np.clip(self.histogram / max(self.count, 1), _EPSILON, None)
+        psi = ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+        ks = np.abs(np.cumsum(self.histogram / max(self.count, 1), axis=1)
+                    - np.cumsum(self.baseline.expected, axis=1)).max(axis=1)
+        std = np.where(self.baseline.std > 0, self.baseline.std, 1.0)
+        mean_shift = (self.mean - self.baseline.mean) / std
+        median = self.approx_quantile(0.5)
+
+        return {
+            name: {
+                'psi': round(float(psi[i]), 4),
+                'ks': round(float(ks[i]), 4),
+                'mean': round(float(self.mean[i]), 4),
+                'baseline_mean': round(float(self.baseline.mean[i]), 4),
+                'std': round(float(np.sqrt(self.variance[i])), 4),
+                'mean_shift_std': round(float(mean_shift[i]), 4),
+                'approx_median': round(float(median[i]), 4),
+                'status': _psi_status(psi[i]),
+            }
+            for i, name in enumerate(self.baseline.names)
+        }
+
+
+def _psi_status(psi: float) -> str:
+    if psi > PSI_DRIFT:
+        return 'drift'
+    if psi > PSI_WARNING:
+        return 'warning'
+    return 'stable'
+
+
+class DriftMonitor:
+    """Theo dõi drift của feature và prediction trên đường predict.
+
+    - observe(): gọi sau mỗi lần predict, chỉ cập nhật sketch
+    - Mỗi check_every lần (khi đủ min_samples), nếu PSI lớn nhất vượt psi_threshold
+      thì gọi on_drift(report), tối đa một lần mỗi cooldown_seconds
+    """
+
+    def __init__(self, psi_threshold: float = PSI_DRIFT, min_samples: int = 200,
+                 check_every: int = 100, cooldown_seconds: float = 3600,
+                 on_drift: Optional[Callable[[Dict], None]] = None):
+        self.psi_threshold = psi_threshold
+        self.min_samples = min_samples
+        self.check_every = check_every
+        self.cooldown_seconds = cooldown_seconds
+        self.on_drift = on_drift
+
+        self._lock = threading.Lock()
+        self._features: Optional[StreamingSketch] = None
+        self._predictions: Optional[StreamingSketch] = None
+        self._last_triggered: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self._features is not None
+
+    def set_baseline(self, features: Optional[DistributionBaseline],
+                     predictions: Optional[DistributionBaseline] = None):
+        """Đổi baseline (sau train / load_models) và bỏ thống kê cũ"""
+        with self._lock:
+            self._features = StreamingSketch(features) if features is not None else None
+            self._predictions = StreamingSketch(predictions) if predictions is not None else None
+
+    def reset(self):
+        with self._lock:
+            if self._features is not None:
+                self._features = StreamingSketch(self._features.baseline)
+            if self._predictions is not None:
+                self._predictions = StreamingSketch(self._predictions.baseline)
+
+    def observe(self, feature_vector: Sequence[float], predictions: Optional[Dict[str, float]] = None):
+        if self._features is None:
+            return
+
+        with self._lock:
+            features = self._features
+            features.update(np.asarray(feature_vector, dtype=float))
+            if self._predictions is not None and predictions:
+                names = self._predictions.baseline.names
+                self._predictions.update(np.array([predictions.get(name, 0.0) for name in names], dtype=float))
+            should_check = features.count >= self.min_samples and features.count % self.check_every == 0
+
+        if should_check and self.on_drift is not None:
+            self._maybe_trigger()
+
+    def _maybe_trigger(self):
+        now = time.monotonic()
+        if self._last_triggered is not None and now - self._last_triggered < self.cooldown_seconds:
+            return
+        report = self.report()
+        if report['max_psi'] > self.psi_threshold:
+            self._last_triggered = now
+            self.on_drift(report)
+
+    def report(self) -> Dict:
+        """Kết quả so sánh hiện tại với baseline"""
+        with self._lock:
+            if self._features is None:
+                return {'active': False, 'samples': 0, 'max_psi': 0.0, 'drifted': False,
+                        'features': {}, 'predictions': {}}
+            features = self._features.compare()
+            predictions = self._predictions.compare() if self._predictions is not None else {}
+            samples = self._features.count
+
+        max_psi = max([stats['psi'] for stats in {**features, **predictions}.values()] or [0.0])
+        return {
+            'active': True,
+            'samples': samples,
+            'enough_samples': samples >= self.min_samples,
+            'psi_threshold': self.psi_threshold,
+            'max_psi': max_psi,
+            'drifted': samples >= self.min_samples and max_psi > self.psi_threshold,
+            'drifted_columns': sorted(
+                name for name, stats in {**features, **predictions}.items() if stats['psi'] > self.psi_threshold
+            ),
+            'last_triggered_seconds_ago': (
+                round(time.monotonic() - self._last_triggered, 1) if self._last_triggered is not None else None
+            ),
+            'features': features,
+            'predictions': predictions,
+        }
@@ -0,0 +1,89 @@
+# scripts/benchmark_keyword_matcher.py
+"""
+So sánh phân loại nguyên liệu bằng vòng `any(word in text ...)` cũ với KeywordMatcher
+trên N công thức sinh ngẫu nhiên (mặc định 5000).
+
+Chạy: python scripts/benchmark_keyword_matcher.py [n_recipes]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from domain.services.context_aware_recipe_service import INGREDIENT_CATEGORIES
+
+INGREDIENT_NAMES = [
+    'bột mì', 'đường cát', 'muối', 'trứng gà', 'sữa tươi', 'bơ lạt', 'kem tươi whipping', 'dâu tây',
+    'xoài cát', 'nước cốt dừa', 'bí đỏ nghiền', 'bột quế', 'táo xanh', 'socola đen', 'vỏ cam',
+    'trà xanh matcha', 'baking powder', 'vanilla extract', 'cream cheese', 'hạt óc chó', 'mật ong',
+    'Caramel sauce', 'Passion fruit puree', 'gelatin', 'chanh vàng', 'hoa anh đào muối',
+]
+
+
+def categorize_nested(ingredient_name: str) -> str:
+    """Cách cũ (ContextAwareRecipeService._categorize_ingredient trước khi dùng matcher)"""
+    ingredient_lower = ingredient_name.lower()
+    for category, keywords in INGREDIENT_TABLE.items():
+        if any(word in ingredient_lower for word in keywords):
+            return category
+    return 'other'
+
+
+INGREDIENT_TABLE = {
+    'seasonal_xuân': ['strawberry', 'dâu', 'sakura', 'hoa anh đào', 'green tea', 'trà xanh'],
+    'seasonal_hè': ['mango', 'xoài', 'coconut', 'dừa', 'lemon', 'chanh', 'passion fruit'],
+    'seasonal_thu': ['pumpkin', 'bí đỏ', 'cinnamon', 'quế', 'apple', 'táo', 'caramel'],
+    'seasonal_đông': ['chocolate', 'socola', 'gingerbread', 'bánh gừng', 'peppermint', 'orange', 'cam'],
+    'base_ingredients': ['flour', 'bột', 'sugar', 'đường'],
+    'fruits': ['fruit', 'trái cây', 'berry'],
+    'luxury_ingredients': ['chocolate', 'cream', 'kem'],
+}
+
+
+def _timed(fn, recipes) -> float:
+    started = time.perf_counter()
+    for recipe in recipes:
+        for name in recipe:
+            fn(name)
+    return time.perf_counter() - started
+
+
+def run_benchmark(n_recipes: int = 5000, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    recipes = [[f"{rng.choice(INGREDIENT_NAMES)}" for _ in range(rng.randint(5, 12))] for _ in range(n_recipes)]
+    names = [name for recipe in recipes for name in recipe]
+
+    mismatches = [name for name in set(names)
+                  if INGREDIENT_CATEGORIES.first(name, default='other') != categorize_nested(name)]
+
+    nested = _timed(categorize_nested, recipes)
+    INGREDIENT_CATEGORIES.hits.cache_clear()
+    matcher = _timed(lambda name: INGREDIENT_CATEGORIES.first(name, default='other'), recipes)
+    # Tên không lặp lại: đo riêng phần quét regex (không có cache)
+    unique = [f"{name} {i}" for i, name in enumerate(names)]
+    nested_unique = _timed(categorize_nested, [unique])
+    INGREDIENT_CATEGORIES.hits.cache_clear()
+    matcher_unique = _timed(lambda name: INGREDIENT_CATEGORIES.first(name, default='other'), [unique])
+
+    return {
+        'recipes': n_recipes,
+        'ingredients': len(names),
+        'mismatches': mismatches,
+        'nested_ms': round(nested * 1000, 2),
+        'matcher_ms': round(matcher * 1000, 2),
+        'nested_unique_ms': round(nested_unique * 1000, 2),
+        'matcher_unique_ms': round(matcher_unique * 1000, 2),
+    }
+
+
+if __name__ == "__main__":
+    n_recipes = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    result = run_benchmark(n_recipes)
+    print(f"📊 {result['recipes']} recipes / {result['ingredients']} ingredients")
+    print(f"   nested any():   {result['nested_ms']} ms (unique names: {result['nested_unique_ms']} ms)")
+    print(f"   KeywordMatcher: {result['matcher_ms']} ms (unique names: {result['matcher_unique_ms']} ms)")
+    if result['mismatches']:
+        print(f"❌ Mismatches: {result['mismatches']}")
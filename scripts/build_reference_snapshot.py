@@ -0,0 +1,26 @@
+# scripts/build_reference_snapshot.py
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from infrastructure.data.reference_snapshot import DEFAULT_SNAPSHOT_PATH, build_snapshot, save_snapshot
+
+
+def build_reference_snapshot(data_dir: Path = ROOT_DIR / "data" / "raw",
+                             output_path: Path = ROOT_DIR / DEFAULT_SNAPSHOT_PATH) -> Path:
+    snapshot = build_snapshot(data_dir)
+    if snapshot.is_empty:
+        raise SystemExit(f"❌ Không đọc được dữ liệu tham chiếu nào trong {data_dir}")
+
+    save_snapshot(snapshot, output_path)
+    print(f"✅ Reference snapshot saved to {output_path} ({output_path.stat().st_size / 1024:.1f} KB): "
+          f"{len(snapshot.seasonal)} seasons, {len(snapshot.events)} events, "
+          f"{len(snapshot.market)} consumer groups, {len(snapshot.profiles)} profiles")
+    return output_path
+
+
+if __name__ == "__main__":
+    data_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else ROOT_DIR / "data" / "raw"
+    build_reference_snapshot(data_dir)
@@ -0,0 +1,132 @@
+# tests/conftest.py
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+SEGMENTS = ['Gen Z', 'Millennials', 'Người Tập Gym', 'Trẻ Em']
+TOPICS = ['bánh kem', 'chocolate cake', 'matcha mousse', 'cookie']
+VIRAL_LEVELS = ['Thấp', 'Trung bình', 'Cao']
+
+
+def _write_csv(path: Path, header: list, rows: list) -> None:
+    import csv
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def build_raw_dataset(data_dir: Path, n_videos: int = 240, seed: int = 7) -> Path:
+    """Sinh bộ CSV nhỏ có cùng schema với data/raw để test pipeline training"""
+    rng = random.Random(seed)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    start = date(2024, 1, 1)
+    youtube_rows = []
+    for i in range(n_videos):
+        posted = start + timedelta(days=rng.randint(0, 600))
+        views = rng.randint(1_000, 2_000_000)
+        likes = int(views * rng.uniform(0.01, 0.08))
+        comments = int(likes * rng.uniform(0.02, 0.2))
+        engagement = round((likes + comments) / views * 100, 3)
+        youtube_rows.append([
+            f"vid{i}", f"https://youtu.be/vid{i}", rng.choice(TOPICS), 'bánh ngọt',
+            f"Video bánh {i}", f"kenh{i % 9}", 'mô tả bánh', 'cake;dessert', posted.isoformat(),
+            (date(2025, 9, 1) - posted).days, views, likes, comments, engagement,
+            rng.choice(VIRAL_LEVELS), rng.choice(SEGMENTS), '18-25', 'sữa', 'sữa', rng.randint(1, 5),
+            'bánh kem', 'bánh kem', rng.randint(1, 4), '', round(rng.uniform(10, 100), 2),
+            'Trung bình', '', False,
+        ])
+    _write_csv(data_dir / "youtube_bakery_gaming_trends_cleaned.csv", [
+        'video_id', 'url', 'chu_de', 'tu_khoa_tim_kiem', 'tieu_de', 'tac_gia', 'mo_ta', 'tags',
+        'ngay_dang', 'so_ngay_tu_khi_dang', 'luot_xem', 'luot_thich', 'luot_binh_luan',
+        'engagement_rate_%', 'muc_do_viral', 'nhom_doi_tuong', 'do_tuoi', 'thuc_pham_phat_hien',
+        'thuc_pham_yeu_thich', 'so_loai_thuc_pham', 'banh_ngot_phat_hien', 'banh_ngot_yeu_thich',
+        'so_loai_banh_ngot', 'nhan_vat_anime_game', 'diem_noi_tieng', 'muc_do_noi_tieng',
+        'game_franchise', 'is_gaming_content',
+    ], youtube_rows)
+
+    _write_csv(data_dir / "consumer_groups_detailed_20250921_133329.csv", [
+        'consumer_group', 'total_keywords', 'top_5_keywords', 'market_potential',
+        'competition_level', 'growth_trend', 'avg_youtube_views', 'avg_engagement_rate',
+        'total_videos_analyzed', 'trending_up_keywords', 'trending_stable_keywords',
+        'trending_down_keywords', 'avg_search_interest', 'total_products',
+        'estimated_monthly_revenue', 'avg_profit_margin',
+    ], [
+        [seg, 10, 'matcha, taro, cookie', 'Cao' if i % 2 == 0 else 'Trung bình',
+         'Rất cao' if i < 2 else 'Trung bình', 'Tăng mạnh' if i == 0 else 'Ổn định',
+         50000, 4.2, 30, 3, 4, 3, 55.0, 12, 150000000, 0.35]
+        for i, seg in enumerate(SEGMENTS)
+    ])
+
+    _write_csv(data_dir / "consumer_profiles_20250920_061904.csv", [
+        '', 'age_range', 'characteristics', 'preferred_flavors', 'price_sensitivity',
+        'purchase_frequency', 'preferred_channels', 'search_keywords', 'preferred_types',
+        'ingredients_avoid', 'ingredients_prefer', 'purchase_time', 'concerns',
+    ], [
+        ['Gen Z', '18-25', "['năng động', 'thích trend']", "['matcha', 'taro']", 'cao',
+         'hàng tuần', "['TikTok', 'Instagram']", "['bánh trend']", "['mousse']", "[]", "[]", 'tối', "[]"],
+        ['Millennials', '26-40', "['bận rộn']", "['dark chocolate']", 'trung bình',
+         'hàng tháng', "['Facebook']", "['bánh kem']", "['tart']", "[]", "[]", 'cuối tuần', "[]"],
+    ])
+
+    _write_csv(data_dir / "seasonal_trends_20250920_061904.csv", [
+        'season', 'trending_flavors', 'popular_occasions', 'average_orders', 'peak_months',
+    ], [
+        ['Xuân', "['dâu', 'trà xanh']", "['Tết', 'Valentine']", 120, '[2, 3]'],
+        ['Hè', "['xoài', 'dừa']", "['Sinh nhật']", 90, '[6, 7]'],
+        ['Thu', "['bí đỏ', 'caramel']", "['Trung Thu', 'Halloween']", 110, '[9, 10]'],
+        ['Đông', "['chocolate', 'cam']", "['Giáng sinh']", 140, '[12]'],
+    ])
+
+    event_rows = []
+    day = date(2024, 1, 1)
+    named = {
+        (2, 10): ('Tết Nguyên Đán', 'holiday'), (2, 14): ('Valentine', 'romance'),
+        (9, 17): ('Tết Trung Thu', 'holiday'), (10, 31): ('Halloween', 'festival'),
+        (12, 24): ('Giáng sinh', 'holiday'),
+    }
+    while day <= date(2025, 12, 31):
+        name, kind = named.get((day.month, day.day), ('', ''))
+        event_rows.append([
+            day.isoformat(), day.year, day.month, (day.month - 1) // 3 + 1, day.weekday(), day.day,
+            day.timetuple().tm_yday, day.isocalendar()[1], 'Khô' if day.month < 5 else 'Mưa',
+            round(20 + 12 * rng.random(), 1), day.month in (6, 7, 8), round(rng.random(), 2),
+            round(0.8 + 0.6 * rng.random(), 2), round(rng.random(), 2), round(rng.random(), 2),
+            round(rng.random(), 2), bool(name), name, kind, 0.8 if name else 0.0, 5,
+            day.weekday() >= 5, day.weekday() == 4, day.day == 1, False, False, False,
+            False, day.month in (6, 7), day.day in (1, 15), day.month == 12, day.month in (11, 12),
+            round(1 + rng.random(), 2), round(rng.random(), 2),
+        ])
+        day += timedelta(days=1)
+    _write_csv(data_dir / "vietnam_seasonal_events_2025.csv", [
+        'date', 'year', 'month', 'quarter', 'day_of_week', 'day_of_month', 'day_of_year',
+        'week_of_year', 'vietnam_season', 'temperature_celsius', 'is_rainy', 'rainfall_probability',
+        'vietnam_bakery_demand_factor', 'cold_drink_demand', 'hot_beverage_demand',
+        'ice_cream_cake_demand', 'is_vietnam_special_event', 'vietnam_event_name',
+        'vietnam_event_type', 'vietnam_event_impact', 'days_to_next_vn_event', 'is_weekend',
+        'is_friday', 'is_month_start', 'is_month_end', 'is_vietnam_school_holiday',
+        'is_vietnam_university_break', 'is_tet_holiday_period', 'is_summer_vacation_vn',
+        'is_vietnam_payday', 'is_bonus_season_vn', 'is_shopping_season_vn',
+        'domestic_tourism_factor', 'expat_tourism_factor',
+    ], event_rows)
+
+    _write_csv(data_dir / "comprehensive_food_preferences_raw_20250920_074528.csv", [
+        'data_type', 'group_or_food_name', 'search_keyword', 'video_title', 'channel_name',
+        'publish_date', 'view_count', 'like_count', 'comment_count', 'engagement_rate',
+        'content_type', 'description_snippet', 'video_id', 'video_url', 'popularity_score',
+        'trend_strength',
+    ], [
+        ['food', 'matcha', 'matcha cake', f'video {i}', 'kenh', '2025-01-01', 1000 + i, 50, 5,
+         5.5, 'recipe', 'snippet', f'f{i}', 'url', 0.7, 0.5]
+        for i in range(20)
+    ])
+    return data_dir
+
+
+@pytest.fixture(scope="session")
+def raw_data_dir(tmp_path_factory) -> Path:
+    return build_raw_dataset(tmp_path_factory.mktemp("raw"))
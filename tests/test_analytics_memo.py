@@ -0,0 +1,76 @@
+# tests/test_analytics_memo.py
+import asyncio
+from datetime import datetime
+
+from app.container import ServiceContainer
+from app.memo import MemoCache
+from app.routers import analytics
+from domain.entities.ingredient import Ingredient
+from domain.entities.recipe import Recipe
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from infrastructure.data.reference_snapshot import build_snapshot
+
+
+def _recipe(**overrides):
+    fields = dict(title='Bánh mousse matcha', description='Mousse matcha ít ngọt',
+                  ingredients=[Ingredient(name='matcha', quantity='20', unit='g'),
+                               Ingredient(name='kem tươi', quantity='200', unit='ml')],
+                  instructions=['Đánh kem', 'Trộn matcha'], difficulty='easy', tags=['matcha'])
+    fields.update(overrides)
+    return Recipe(**fields)
+
+
+def test_memo_cache_is_bounded_lru_with_hit_rate():
+    memo = MemoCache('test', maxsize=2)
+    assert memo.get_or_compute('a', lambda: 1) == 1
+    assert memo.get_or_compute('a', lambda: 2) == 1
+    memo.put('b', 2)
+    memo.get('a')        # 'a' mới dùng -> 'b' bị loại trước
+    memo.put('c', 3)
+    assert memo.get('b') is None and memo.get('a') == 1
+
+    stats = memo.stats()
+    assert stats['size'] == 2 and stats['evictions'] == 1
+    assert stats['hits'] == 3 and stats['misses'] == 2
+    assert stats['hit_rate'] == 0.6
+
+    # Fingerprint chỉ phụ thuộc nội dung
+    recipe = _recipe()
+    assert _recipe(id='x', created_at=datetime(2020, 1, 1)).fingerprint() == recipe.fingerprint()
+    assert _recipe(title='Bánh mousse xoài').fingerprint() != recipe.fingerprint()
+
+
+def test_recipe_analytics_are_memoized_per_fingerprint_segment_and_month(raw_data_dir, monkeypatch):
+    services = ServiceContainer(factories={
+        'context_service': lambda s: ContextAwareRecipeService(
+            reference=build_snapshot(raw_data_dir), gemini=object(), trend_predictor=object()),
+    })
+    calls = []
+    original = analytics._analyze_recipe_performance
+
+    async def counting(*args):
+        calls.append(args[1:])
+        return await original(*args)
+
+    monkeypatch.setattr(analytics, '_analyze_recipe_performance', counting)
+
+    async def run():
+        first = await analytics._memoized_recipe_performance(services, _recipe(), 'Gen Z', datetime(2026, 10, 3))
+        first['viral_elements'] = None  # sửa bản trả về không ảnh hưởng cache
+        replay = await analytics._memoized_recipe_performance(services, _recipe(id='replayed'), 'Gen Z',
+                                                              datetime(2026, 10, 28))
+        await analytics._memoized_recipe_performance(services, _recipe(), 'Gen Z', datetime(2026, 11, 3))
+        await analytics._memoized_market_insights(services, 'Gen Z', datetime(2026, 10, 3))
+        await analytics._memoized_market_insights(services, 'Gen Z', datetime(2026, 10, 20))
+        return replay
+
+    replay = asyncio.run(run())
+    assert len(calls) == 2  # tháng 10 tính một lần, tháng 11 tính lại
+    assert replay['viral_elements'] is not None
+
+    stats = services.memo_stats()
+    assert stats['recipe-analytics']['hits'] == 1 and stats['recipe-analytics']['misses'] == 2
+    assert stats['market-insights']['hit_rate'] == 0.5
+
+    services.memos['recipe-analytics'].clear()
+    assert len(services.memos['recipe-analytics']) == 0
@@ -0,0 +1,44 @@
+# tests/test_context_aware_service.py
+import dataclasses
+from datetime import datetime
+
+import pytest
+
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from infrastructure.data.reference_snapshot import build_snapshot
+
+
+@pytest.fixture(scope="module")
+def service(raw_data_dir):
+    # Gemini / predictor không dùng tới khi chỉ tra context
+    return ContextAwareRecipeService(reference=build_snapshot(raw_data_dir), gemini=object(), trend_predictor=object())
+
+
+def test_seasonal_context_uses_event_calendar_per_day(service):
+    first, _ = service.get_current_context(datetime(2026, 10, 20))
+    same_day, _ = service.get_current_context(datetime(2026, 10, 20, 23, 59))
+    early_october, _ = service.get_current_context(datetime(2026, 10, 1))
+
+    assert first is same_day
+    assert first.season == 'Thu'
+    assert first.trending_flavors == ('bí đỏ', 'caramel')
+    assert first.demand_factor == pytest.approx(1.1)
+    # Sự kiện theo ngày thật, không theo tháng: Halloween (31/10) chỉ có khi còn <= 14 ngày
+    assert first.events == ('Halloween',)
+    assert early_october.events == () and early_october.season == 'Thu'
+    # Tết âm lịch 2026 (17/2, window từ 10/2)
+    tet, _ = service.get_current_context(datetime(2026, 2, 12))
+    assert 'Tết Nguyên Đán' in tet.events
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.month = 11
+
+
+def test_market_context_lookup_is_cached_by_segment(service):
+    gen_z = service._get_market_context('gen_z')
+
+    assert gen_z is service._get_market_context('gen_z')
+    assert gen_z == service._get_market_context('Gen Z')
+    assert gen_z.market_potential == 0.8
+    assert gen_z.preferred_flavors == ('matcha', 'taro')
+    # Segment lạ vẫn có context mặc định
+    assert service._get_market_context('Sinh viên').growth_trend == 'Tăng'
@@ -0,0 +1,180 @@
+# tests/test_deadline_propagation.py
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import ServiceContainer
+from app.routers import recipes
+from application.use_cases.generate_personalized_recipe_use_case import GeneratePersonalizedRecipeUseCase
+from configs.settings import settings
+from domain.services.recipe_generation_service import RecipeGenerationService
+from domain.services.request_context import DeadlineExceeded, RequestContext
+
+
+class FakeGemini:
+    model = 'fake'
+
+    def __init__(self, response):
+        self.response = response
+        self.calls = []
+        self.timeouts = []
+
+    def _record(self, name, timeout):
+        self.calls.append(name)
+        self.timeouts.append(timeout)
+        return self.response
+
+    def generate_recipe_from_ingredients(self, ingredients, language="vi", timeout=None):
+        return self._record('from_ingredients', timeout)
+
+    def generate_creative_recipe(self, trend, user_segment, occasion=None, language="vi", temperature=None,
+                                 timeout=None):
+        return self._record('creative', timeout)
+
+    def _generate_simple_recipe(self, trend, user_segment, occasion, language, timeout=None):
+        return self._record('simple_fallback', timeout)
+
+
+class FakeTranslator:
+    def __init__(self):
+        self.calls = []
+
+    def vi_to_en(self, text, context=None):
+        self.calls.append(text)
+        return text
+
+    en_to_vi = vi_to_en
+
+
+class FakeT5:
+    def __init__(self, queue_busy=False):
+        self.num_beams = []
+        self.queue_busy = queue_busy
+
+    def generate_recipe(self, ingredients, context=None, num_beams=None, min_seconds=0.0):
+        if self.queue_busy:  # như T5Client: chờ lượt tới khi budget còn dưới min_seconds
+            raise DeadlineExceeded(f"needs {min_seconds:.1f}s")
+        self.num_beams.append(num_beams)
+        return "title: pumpkin cake ingredients: 200 g pumpkin 2 eggs directions: mix everything well. bake for 30 minutes."
+
+
+def _service(gemini, t5=None):
+    service = RecipeGenerationService(use_t5=False, gemini=gemini)
+    service.translator = FakeTranslator()
+    if t5 is not None:
+        service.use_t5, service.t5_client = True, t5
+    return service
+
+
+def test_tight_deadline_skips_expensive_stages_and_returns_parsed_t5_output():
+    gemini, t5 = FakeGemini(response=''), FakeT5()
+    service = _service(gemini, t5)
+    context = RequestContext(deadline_seconds=5)
+
+    recipe = service.generate_from_ingredients("bí đỏ, trứng", language="vi", context=context)
+
+    # 5s: không đủ dịch + T5 (6s), beam search (8s), enhancement (8s); vẫn đủ cho T5 greedy và dịch output
+    assert context.skipped_stages == ['translate_ingredients', 't5_beam_search', 'gemini_enhancement']
+    assert t5.num_beams == [1]
+    assert gemini.calls == []
+    assert recipe.title == 'pumpkin cake' and len(recipe.ingredients) == 2 and recipe.instructions
+    assert 'bí đỏ, trứng' not in service.translator.calls  # nguyên liệu đi thẳng vào T5
+
+
+def test_exhausted_deadline_skips_t5_and_parse_fallback():
+    gemini = FakeGemini(response='{"title": ""}')
+    service = _service(gemini, FakeT5())
+    context = RequestContext(deadline_seconds=0)
+
+    recipe = service.generate_from_ingredients("bí đỏ", language="vi", context=context)
+    assert context.skipped_stages == ['t5_generation', 'parse_fallback']
+    assert gemini.calls == ['from_ingredients']  # chỉ còn một lời gọi Gemini, không fallback thêm
+    assert recipe.ingredients == []
+
+    # Không deadline: vẫn fallback như trước
+    gemini = FakeGemini(response='{"title": ""}')
+    use_case = GeneratePersonalizedRecipeUseCase(recipe_service=_service(gemini))
+    result = use_case.execute_from_trend("matcha", "Gen Z")
+    assert gemini.calls == ['creative', 'simple_fallback'] and result['skipped_stages'] == []
+    assert gemini.timeouts == [None, None]  # không deadline: timeout mặc định của SDK
+
+
+def test_t5_queue_wait_past_deadline_falls_back_to_gemini_with_call_timeout():
+    gemini = FakeGemini(response='{"title": ""}')
+    service = _service(gemini, FakeT5(queue_busy=True))
+    context = RequestContext(deadline_seconds=7)
+
+    service.generate_from_ingredients("pumpkin, eggs", language="en", context=context)
+    assert context.skipped_stages[:2] == ['t5_beam_search', 't5_generation']
+    assert gemini.calls == ['from_ingredients', 'simple_fallback']
+    assert all(1.0 <= timeout <= 7 for timeout in gemini.timeouts)  # mỗi lời gọi Gemini bị chặn bởi deadline
+
+
+class ClockTranslator(FakeTranslator):
+    """Mỗi lời gọi dịch tốn `seconds` của deadline (dời deadline thay vì sleep)"""
+
+    def __init__(self, seconds):
+        super().__init__()
+        self.seconds = seconds
+
+    def vi_to_en(self, text, context=None):
+        context.deadline -= self.seconds
+        return super().vi_to_en(text, context=context)
+
+    en_to_vi = vi_to_en
+
+
+def test_t5_output_translation_checks_budget_before_each_line():
+    service = _service(FakeGemini(response=''), FakeT5())
+    service.translator = ClockTranslator(seconds=1.4)
+    context = RequestContext(deadline_seconds=7)
+
+    recipe = service.generate_from_ingredients("bí đỏ, trứng", language="vi", context=context)
+
+    # 7s: dịch nguyên liệu (còn 5.6s), title + 2 nguyên liệu + bước 1 (còn ~0s), bước 2 giữ tiếng Anh
+    assert len(service.translator.calls) == 5
+    assert recipe.instructions[-1].endswith('bake for 30 minutes')
+    assert 'translate_t5_line' in context.skipped_stages
+
+
+def test_call_timeout_has_no_floor_once_budget_is_used_up():
+    assert RequestContext().call_timeout() is None
+    assert RequestContext(deadline_seconds=0.5).call_timeout() == 1.0
+    assert 4 < RequestContext(deadline_seconds=5).call_timeout() <= 5
+    assert RequestContext(deadline_seconds=0).call_timeout() < 0.1
+
+
+class BudgetEchoUseCase:
+    def execute_from_trend(self, trend, user_segment, occasion=None, language="vi", context=None):
+        return {'remaining': context.remaining(), 'skipped_stages': context.skipped_stages}
+
+
+def test_deadline_header_is_propagated_and_capped():
+    app = FastAPI()
+    app.include_router(recipes.router)
+    app.state.services = ServiceContainer(factories={'recipe_use_case': lambda s: BudgetEchoUseCase()})
+    request = {'trend': 'matcha', 'user_segment': 'Gen Z'}
+
+    with TestClient(app) as client:
+        default = client.post("/recipes/generate-from-trend", json=request).json()
+        short = client.post("/recipes/generate-from-trend", json=request, headers={'X-Request-Deadline': '2.5'}).json()
+        huge = client.post("/recipes/generate-from-trend", json=request, headers={'X-Request-Deadline': '9999'}).json()
+        invalid = client.post("/recipes/generate-from-trend", json=request, headers={'X-Request-Deadline': '0'})
+
+    assert settings.RECIPE_DEADLINE_SECONDS - 1 < default['remaining'] <= settings.RECIPE_DEADLINE_SECONDS
+    assert 1.5 < short['remaining'] <= 2.5
+    assert huge['remaining'] <= settings.RECIPE_DEADLINE_MAX_SECONDS
+    assert invalid.status_code == 422
+
+
+def test_use_t5_override_is_per_request_and_reported():
+    gemini, t5 = FakeGemini(response='{"title": ""}'), FakeT5()
+    use_case = GeneratePersonalizedRecipeUseCase(recipe_service=_service(gemini, t5))
+
+    gemini_only = use_case.execute_from_ingredients("bí đỏ", language="en", use_t5=False)
+    assert gemini_only['model_used'] == 'Gemini' and gemini.calls[0] == 'from_ingredients'
+    assert use_case.recipe_service.use_t5 is True and t5.num_beams == []  # service dùng chung không bị sửa
+
+    # deadline 5s: bỏ bước Gemini enhancement (gọi genai trực tiếp), vẫn chạy T5
+    with_t5 = use_case.execute_from_ingredients("pumpkin, eggs", language="en",
+                                                context=RequestContext(deadline_seconds=5))
+    assert with_t5['model_used'] == 'T5 + Gemini' and len(t5.num_beams) == 1
@@ -0,0 +1,38 @@
+# tests/test_event_calendar.py
+from datetime import date, datetime
+
+from infrastructure.data.event_calendar import EventCalendar
+from infrastructure.data.reference_snapshot import EventReference, build_snapshot
+
+
+def _events(*rows):
+    return [EventReference(date=day, name=name, event_type='holiday', impact=impact) for day, name, impact in rows]
+
+
+def test_consecutive_days_merge_and_lunar_holidays_follow_table():
+    calendar = EventCalendar.from_reference(_events(
+        ('2025-01-28', 'Tết Nguyên Đán', 0.8), ('2025-01-29', 'Tết Nguyên Đán', 1.0),
+        ('2025-01-30', 'Tết Nguyên Đán', 0.9), ('2025-12-24', 'Giáng sinh', 0.7),
+    ), years=range(2025, 2028))
+
+    tet_2025 = [e for e in calendar.events if e.name == 'Tết Nguyên Đán' and e.peak.year == 2025]
+    assert len(tet_2025) == 1
+    assert tet_2025[0].peak == date(2025, 1, 29)
+    assert tet_2025[0].end == date(2025, 2, 2)  # window 4 ngày sau mùng 1
+
+    # Tết 2026 theo âm lịch (17/2), Giáng sinh giữ ngày dương
+    assert [e.name for e in calendar.active_on(date(2026, 2, 17))] == ['Tết Nguyên Đán']
+    assert [e.name for e in calendar.active_on(date(2026, 2, 10))] == ['Tết Nguyên Đán']
+    assert calendar.active_on(date(2026, 1, 29)) == []
+    assert [e.name for e in calendar.active_on(datetime(2027, 12, 24, 18))] == ['Giáng sinh']
+
+
+def test_range_queries_and_next_event(raw_data_dir):
+    calendar = EventCalendar.from_reference(build_snapshot(raw_data_dir).events, years=range(2024, 2027))
+
+    october = {e.name for e in calendar.between(date(2026, 10, 1), date(2026, 10, 31))}
+    assert october == {'Halloween'}
+    assert calendar.next_event(date(2026, 11, 1)).name == 'Giáng sinh'
+
+    daily = calendar.daily(date(2026, 10, 30), 3)
+    assert [day['events'] for day in daily] == [[], ['Halloween'], []]
@@ -0,0 +1,132 @@
+# tests/test_forecast_and_generate.py
+import asyncio
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import ServiceContainer
+from app.routers import analytics
+from domain.entities.recipe import Recipe
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from infrastructure.data.event_calendar import EventCalendar
+from infrastructure.data.reference_snapshot import EventReference, build_snapshot
+
+EVENTS = ['Tết Dương Lịch', 'Valentine', 'Halloween', 'Giáng sinh']
+
+
+class SlowRecipeService:
+    """Giả lập Gemini: mỗi lần gọi mất `delay` giây; 'Valentine' thì lỗi, 'Halloween' thì quá timeout"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.cancelled = []
+        self._lock = threading.Lock()
+
+    def generate_from_trend(self, trend, user_segment, occasion=None, language='vi', context=None):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay * (6 if occasion == 'Halloween' else 1))
+            if context is not None and context.cancelled:  # như pipeline thật: dừng trước lời gọi Gemini kế tiếp
+                self.cancelled.append(occasion)
+                context.raise_if_cancelled()
+            if occasion == 'Valentine':
+                raise RuntimeError("Gemini quota exceeded")
+            return Recipe(title=f"Bánh {occasion}", description=trend, ingredients=[], instructions=[])
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def client(raw_data_dir, monkeypatch):
+    recipe_service = SlowRecipeService(delay=0.25)
+
+    def _context_service(services):
+        service = ContextAwareRecipeService(reference=build_snapshot(raw_data_dir), gemini=object(),
+                                            trend_predictor=object())
+        # Bốn sự kiện trong tuần tới để top_k=4 luôn chọn đúng các event này
+        tomorrow = date.today() + timedelta(days=1)
+        service.event_calendar = EventCalendar.from_reference([
+            EventReference(date=(tomorrow + timedelta(days=i)).isoformat(), name=name, event_type='test', impact=1.0)
+            for i, name in enumerate(EVENTS)
+        ], years=[tomorrow.year])
+        return service
+
+    services = ServiceContainer(factories={
+        'context_service': _context_service,
+        'recipe_service': lambda s: recipe_service,
+        'trend_predictor': lambda s: object(),
+    })
+    monkeypatch.setattr(analytics.settings, 'FORECAST_MAX_CONCURRENCY', 3)
+    monkeypatch.setattr(analytics.settings, 'FORECAST_EVENT_TIMEOUT_SECONDS', 0.8)
+
+    app = FastAPI()
+    app.include_router(analytics.router)
+    app.state.services = services
+    return TestClient(app), recipe_service
+
+
+def test_gather_bounded_keeps_order_and_limits_concurrency():
+    running = {'now': 0, 'peak': 0}
+
+    async def worker(item, run_blocking):
+        running['now'] += 1
+        running['peak'] = max(running['peak'], running['now'])
+        await asyncio.sleep(0.05)
+        running['now'] -= 1
+        if item == 3:
+            raise ValueError("boom")
+        return {'item': item, 'status': 'success'}
+
+    results = asyncio.run(analytics._gather_bounded(list(range(6)), worker, limit=2, timeout=1.0))
+
+    assert [r.get('item') for r in results] == [0, 1, 2, None, 4, 5]
+    assert results[3] == {'status': 'failed', 'error': 'boom'}
+    assert running['peak'] == 2
+
+
+def test_gather_bounded_timed_out_threads_keep_their_slot():
+    service = SlowRecipeService(delay=0.1)
+
+    async def worker(item, run_blocking):
+        occasion = 'Halloween' if item < 2 else str(item)  # 2 item đầu chạy 0.6s, quá timeout
+        recipe = await run_blocking(service.generate_from_trend, 't', 'gen_z', occasion)
+        return {'status': 'success', 'recipe': recipe}
+
+    results = asyncio.run(analytics._gather_bounded(list(range(5)), worker, limit=2, timeout=0.3))
+
+    assert [r['status'] for r in results[:2]] == ['timeout', 'timeout']
+    assert service.peak == 2  # thread quá hạn vẫn giữ slot, không có thread thứ 3
+    assert service.cancelled == ['Halloween', 'Halloween']  # context bị huỷ: không gọi tiếp Gemini
+    # Item xếp hàng sau thread quá hạn chỉ tính giờ từ lúc chạy: không bị báo timeout oan
+    assert [r['status'] for r in results[2:]] == ['success'] * 3
+
+
+def test_forecast_and_generate_returns_partial_results(client):
+    http, recipe_service = client
+
+    started = time.perf_counter()
+    response = http.post("/analytics/forecast-and-generate",
+                         json={'user_segment': 'gen_z', 'horizon_days': 7, 'top_k': 4})
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    body = response.json()
+    results = {r['event']: r for r in body['recommended_recipes']}
+    assert set(results) == set(EVENTS)
+    assert results['Valentine']['status'] == 'failed'
+    assert 'quota' in results['Valentine']['error']
+    assert results['Halloween']['status'] == 'timeout'
+    assert results['Giáng sinh']['recipe']['title'] == 'Bánh Giáng sinh'
+    assert set(body['trends_summary']['failed_events']) == {'Valentine', 'Halloween'}
+    assert 1 < recipe_service.peak <= 3
+    # Song song: gần với event chậm nhất (timeout), không phải tổng 4 event
+    assert elapsed < 0.25 * 4 + 0.8
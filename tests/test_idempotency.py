@@ -0,0 +1,91 @@
+# tests/test_idempotency.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import ServiceContainer
+from app.idempotency import IdempotencyManager
+from app.routers import recipes
+from infrastructure.db.job_store import InMemoryJobStore
+
+
+class CountingUseCase:
+    """Đếm số lần pipeline thật sự chạy (mỗi lần = một lượt T5 + Gemini)"""
+
+    def __init__(self, delay=0.0, fail_first=False):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def execute_from_ingredients(self, ingredients, language="vi", use_t5=None, context=None):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay)
+        if self.fail_first and call == 1:
+            raise RuntimeError("Gemini timeout")
+        return {'success': True, 'recipe': {'title': f"Bánh {ingredients}", 'call': call}, 'language': language}
+
+
+def _client(use_case, retention_seconds=60):
+    app = FastAPI()
+    app.include_router(recipes.router)
+    app.state.services = ServiceContainer(factories={
+        'recipe_use_case': lambda s: use_case,
+        'idempotency': lambda s: IdempotencyManager(InMemoryJobStore(), retention_seconds=retention_seconds),
+    })
+    return TestClient(app)
+
+
+REQUEST = {'ingredients': 'bí đỏ, sữa', 'use_t5': False}
+
+
+def test_retry_after_completion_replays_stored_response():
+    use_case = CountingUseCase()
+    with _client(use_case) as client:
+        first = client.post("/recipes/generate-from-ingredients", json=REQUEST, headers={'Idempotency-Key': 'k1'})
+        retry = client.post("/recipes/generate-from-ingredients", json=REQUEST, headers={'Idempotency-Key': 'k1'})
+        other = client.post("/recipes/generate-from-ingredients", json=REQUEST, headers={'Idempotency-Key': 'k2'})
+        plain = client.post("/recipes/generate-from-ingredients", json=REQUEST)
+
+        assert first.status_code == retry.status_code == 200
+        assert retry.content == first.content  # đúng từng byte
+        assert retry.headers['Idempotent-Replayed'] == 'true' and 'Idempotent-Replayed' not in first.headers
+        assert other.json()['recipe']['call'] == 2 and plain.json()['recipe']['call'] == 3
+        assert use_case.calls == 3
+
+        reused = client.post("/recipes/generate-from-ingredients", json={**REQUEST, 'ingredients': 'bơ'},
+                             headers={'Idempotency-Key': 'k1'})
+        assert reused.status_code == 422
+
+
+def test_concurrent_retries_attach_to_in_flight_attempt():
+    use_case = CountingUseCase(delay=0.3)
+    with _client(use_case) as client:
+        def post(_):
+            return client.post("/recipes/generate-from-ingredients", json=REQUEST, headers={'Idempotency-Key': 'k'})
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(post, range(4)))
+
+        assert use_case.calls == 1
+        assert len({response.content for response in responses}) == 1
+        assert sum(response.headers.get('Idempotent-Replayed') == 'true' for response in responses) == 3
+        assert client.app.state.services.idempotency.metrics()['joined'] == 3
+
+
+def test_failures_are_not_stored_and_retention_expires():
+    use_case = CountingUseCase(fail_first=True)
+    with _client(use_case, retention_seconds=0.2) as client:
+        failed = client.post("/recipes/generate-from-ingredients", json=REQUEST, headers={'Idempotency-Key': 'k'})
+        assert failed.status_code == 500
+        retried = client.post("/recipes/generate-from-ingredients", json=REQUEST, headers={'Idempotency-Key': 'k'})
+        assert retried.status_code == 200 and retried.json()['recipe']['call'] == 2
+
+        time.sleep(0.3)  # hết thời gian giữ response: chạy lại như request mới
+        expired = client.post("/recipes/generate-from-ingredients", json=REQUEST, headers={'Idempotency-Key': 'k'})
+        assert expired.json()['recipe']['call'] == 3 and 'Idempotent-Replayed' not in expired.headers
@@ -0,0 +1,110 @@
+# tests/test_jobs.py
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import ServiceContainer
+from app.jobs import JobManager
+from app.routers import analytics, jobs
+from domain.entities.ingredient import Ingredient
+from domain.entities.recipe import Recipe
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from infrastructure.data.reference_snapshot import build_snapshot
+from infrastructure.db.job_store import InMemoryJobStore, SQLiteJobStore, build_job_store
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_job_store_roundtrip_and_ttl(backend, tmp_path):
+    store = build_job_store("memory://" if backend == 'memory' else f"sqlite:///{tmp_path / 'jobs.db'}")
+    assert isinstance(store, InMemoryJobStore if backend == 'memory' else SQLiteJobStore)
+
+    now = time.time()
+    store.save({'id': 'a', 'status': 'succeeded', 'result': {'title': 'Bánh bí đỏ'}, 'expires_at': now + 60})
+    store.save({'id': 'b', 'status': 'queued', 'result': None, 'expires_at': now - 1})
+    assert store.load('a')['result'] == {'title': 'Bánh bí đỏ'}
+    assert store.load('b') is None  # hết hạn thì không trả về nữa
+
+    assert store.purge_expired() == 1
+    store.delete('a')
+    assert store.load('a') is None
+
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_job_store_claim_is_first_writer_wins(backend, tmp_path):
+    url = "memory://" if backend == 'memory' else f"sqlite:///{tmp_path / 'jobs.db'}"
+    store = build_job_store(url)
+    now = time.time()
+
+    assert store.claim({'id': 'k', 'owner': 1, 'expires_at': now + 60})
+    other = store if backend == 'memory' else build_job_store(url)  # process khác dùng cùng file
+    assert not other.claim({'id': 'k', 'owner': 2, 'expires_at': now + 60})
+    assert store.load('k')['owner'] == 1
+
+    # Bản đã hết hạn thì claim lại được
+    store.save({'id': 'old', 'owner': 1, 'expires_at': now - 1})
+    assert other.claim({'id': 'old', 'owner': 2, 'expires_at': now + 60})
+    assert store.load('old')['owner'] == 2
+
+
+class SlowContextService(ContextAwareRecipeService):
+    def __init__(self, reference, delay):
+        super().__init__(reference=reference, gemini=object(), trend_predictor=object())
+        self.delay = delay
+
+    def generate_context_aware_recipe(self, user_segment, target_date=None, custom_trend=None, temperature=None,
+                                      context=None):
+        time.sleep(self.delay)
+        return Recipe(title='Bánh bí đỏ', description='', ingredients=[Ingredient(name='bí đỏ')], instructions=[])
+
+
+def _client(raw_data_dir, delay, max_workers=2, max_queue=10):
+    context_service = SlowContextService(build_snapshot(raw_data_dir), delay)
+    app = FastAPI()
+    app.include_router(analytics.router)
+    app.include_router(jobs.router)
+    app.state.services = ServiceContainer(factories={
+        'context_service': lambda s: context_service,
+        'jobs': lambda s: JobManager(InMemoryJobStore(), max_workers=max_workers, max_queue=max_queue, ttl_seconds=60),
+    })
+    return TestClient(app)
+
+
+REQUEST = {'user_segment': 'Gen Z', 'target_date': '2026-10-31'}
+
+
+def test_submit_then_long_poll_result(raw_data_dir):
+    with _client(raw_data_dir, delay=0.2) as client:
+        submitted = client.post("/jobs/generate-smart-recipe", json=REQUEST)
+        assert submitted.status_code == 202
+        job = submitted.json()
+        assert job['status'] == 'queued' and job['kind'] == 'generate-smart-recipe'
+
+        done = client.get(f"/jobs/{job['id']}", params={'wait': 5}).json()
+        assert done['status'] == 'succeeded'
+        assert done['result']['recipe']['title'] == 'Bánh bí đỏ'
+        assert client.get("/jobs/unknown").status_code == 404
+        assert client.get("/jobs/metrics").json()['succeeded'] == 1
+
+
+def test_bounded_queue_rejects_and_jobs_can_be_cancelled(raw_data_dir):
+    with _client(raw_data_dir, delay=1.0, max_workers=1, max_queue=1) as client:
+        running = client.post("/jobs/generate-smart-recipe", json=REQUEST).json()
+        time.sleep(0.1)  # worker lấy job đầu tiên
+        queued = client.post("/jobs/generate-smart-recipe", json=REQUEST).json()
+        rejected = client.post("/jobs/generate-smart-recipe", json=REQUEST)
+        assert rejected.status_code == 503
+
+        metrics = client.get("/jobs/metrics").json()
+        assert metrics['queue_depth'] == 1 and metrics['running'] == 1 and metrics['rejected'] == 1
+
+        assert client.delete(f"/jobs/{queued['id']}").json()['status'] == 'cancelled'
+        started = time.perf_counter()
+        assert client.delete(f"/jobs/{running['id']}").json()['status'] == 'cancelled'
+        assert client.get(f"/jobs/{running['id']}", params={'wait': 2}).json()['status'] == 'cancelled'
+        assert time.perf_counter() - started < 0.5  # không chờ thread đang chạy
+
+        time.sleep(0.1)
+        metrics = client.get("/jobs/metrics").json()
+        assert metrics['running'] == 0 and metrics['queue_depth'] == 0 and metrics['cancelled'] == 2
@@ -0,0 +1,52 @@
+# tests/test_keyword_matcher.py
+import random
+import unicodedata
+
+from domain.services.keyword_matcher import KeywordMatcher, keyword_matcher
+from domain.services.recipe_generation_service import INGREDIENT_CATEGORIES as GENERATION_CATEGORIES
+from scripts.benchmark_keyword_matcher import INGREDIENT_NAMES, run_benchmark
+
+TABLE = {
+    'fruits': ['berry', 'strawberry', 'dâu'],
+    'dairy': ['cream', 'kem', 'bơ'],
+    'flavor': ['straw', 'rawb', 'chocolate', 'cola'],
+    'dry': ['bột', 'đường'],
+}
+
+
+def _nested_hits(table, text):
+    text = text.lower()
+    return {category for category, words in table.items() if any(word in text for word in words)}
+
+
+def test_matcher_finds_overlapping_keywords_like_nested_scan():
+    matcher = KeywordMatcher(TABLE)
+    assert matcher.hits('Strawberry cream') == {'fruits', 'dairy', 'flavor'}  # straw / rawb / berry chồng nhau
+    assert matcher.first('socola đen', default='other') == 'flavor'
+    assert matcher.first('muối', default='other') == 'other'
+    # NFD (dấu tổ hợp) vẫn khớp; không bỏ dấu nên "bơ" không khớp "bột"
+    assert matcher.hits(unicodedata.normalize('NFD', 'Dâu tây')) == {'fruits'}
+    assert matcher.hits('bột mì') == {'dry'}
+    assert keyword_matcher(('matcha', '')).matches('bất kỳ')  # '' in text luôn đúng
+
+    rng = random.Random(7)
+    alphabet = 'strawbeycolakmdâuơộđ '
+    for _ in range(2000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+        assert matcher.hits(text) == _nested_hits(TABLE, text), text
+
+
+def test_categorization_unchanged_and_faster_on_thousands_of_recipes():
+    nested = {
+        'dry_ingredients': ['flour', 'bột', 'sugar', 'đường', 'salt', 'muối', 'baking'],
+        'dairy_eggs': ['egg', 'trứng', 'milk', 'sữa', 'butter', 'bơ', 'cream'],
+        'fruits': ['fruit', 'trái cây', 'berry', 'strawberry', 'dâu'],
+        'flavorings': ['chocolate', 'socola', 'cocoa', 'vanilla'],
+    }
+    for name in INGREDIENT_NAMES:
+        expected = next(iter(c for c in nested if _nested_hits({c: nested[c]}, name)), 'other')
+        assert GENERATION_CATEGORIES.first(name, default='other') == expected
+
+    result = run_benchmark(3000)
+    assert result['mismatches'] == []
+    assert result['matcher_ms'] < result['nested_ms']
@@ -0,0 +1,92 @@
+# tests/test_recipe_scoring.py
+import asyncio
+import random
+import time
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import ServiceContainer
+from app.routers import analytics
+from domain.entities.ingredient import Ingredient
+from domain.entities.recipe import Recipe
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from domain.services.recipe_scoring import RecipeFeatures, score_recipes
+from infrastructure.data.reference_snapshot import build_snapshot
+
+NAMES = ['bột mì', 'đường', 'Matcha', 'dâu tây', 'xoài', 'chocolate đen', 'kem tươi', 'butter', 'táo',
+         'bí đỏ', 'vỏ cam', 'taro', 'trứng', 'Vanilla', 'hạt dẻ', 'nuts', 'coconut milk']
+TITLES = ['Bánh mousse', 'Hot trend tart', 'Viral cheesecake', 'Bánh bông lan', 'Amazing roll']
+TIMES = ['15 phút', '45 phút', '90 phút', None, 'khoảng 1 giờ', '']
+
+
+def _random_recipes(n, seed=3):
+    rng = random.Random(seed)
+    return [
+        Recipe(
+            title=rng.choice(TITLES),
+            description='',
+            ingredients=[Ingredient(name=name) for name in rng.sample(NAMES, rng.randint(0, 8))],
+            instructions=[],
+            prep_time=rng.choice(TIMES),
+            cook_time=rng.choice(TIMES),
+            difficulty=rng.choice(['easy', 'medium', 'hard']),
+            tags=rng.sample(['Halloween', 'Tết', 'Gen Z', 'Thu'], rng.randint(0, 2)),
+        )
+        for _ in range(n)
+    ]
+
+
+@pytest.fixture(scope="module")
+def context_service(raw_data_dir):
+    return ContextAwareRecipeService(reference=build_snapshot(raw_data_dir), gemini=object(), trend_predictor=object())
+
+
+@pytest.mark.parametrize('target_date', [datetime(2026, 10, 31), datetime(2026, 6, 1), datetime(2026, 2, 10)])
+def test_batch_scores_match_single_recipe_helpers(context_service, target_date):
+    recipes = _random_recipes(60)
+    context = analytics._scoring_context(context_service, 'Gen Z', target_date)
+    scores = score_recipes(RecipeFeatures.from_recipes(recipes), context)
+
+    async def single(recipe):
+        result = await analytics._analyze_recipe_performance(context_service, recipe, 'Gen Z', target_date)
+        insights = await analytics._get_market_insights(context_service, 'Gen Z', target_date)
+        return result, insights
+
+    for index, recipe in enumerate(recipes):
+        result, insights = asyncio.run(single(recipe))
+        row = scores.row(index)
+        for column in ('ingredient_trend_alignment', 'timing_optimization', 'segment_fit_score', 'complexity_score',
+                       'seasonality_match', 'cost_efficiency', 'preparation_feasibility'):
+            assert row[column] == pytest.approx(result[column]), column
+        assert row['viral_element_count'] == len(result['viral_elements'])
+        assert scores.viral_potential[index] == pytest.approx(
+            analytics._calculate_viral_potential(recipe, result, insights))
+        assert scores.success_factors(index) == analytics._identify_success_factors(recipe, result, insights)
+
+
+def test_ranking_thousands_of_recipes_is_fast(context_service, raw_data_dir):
+    recipes = _random_recipes(5000)
+    features = RecipeFeatures.from_recipes(recipes)
+    context = analytics._scoring_context(context_service, 'Gen Z', datetime(2026, 10, 31))
+    score_recipes(features, context)  # warm up
+
+    started = time.perf_counter()
+    scores = score_recipes(features, context)
+    order = scores.ranking(10)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    assert elapsed_ms < 50
+    assert list(scores.viral_potential[order]) == sorted(scores.viral_potential, reverse=True)[:10]
+
+    app = FastAPI()
+    app.include_router(analytics.router)
+    app.state.services = ServiceContainer(factories={'context_service': lambda s: context_service})
+    body = TestClient(app).post("/analytics/rank-recipes", json={
+        'recipes': [recipe.model_dump(mode='json') for recipe in recipes[:200]],
+        'user_segment': 'Gen Z', 'target_date': '2026-10-31', 'top_k': 5,
+    }).json()
+    assert body['total_recipes'] == 200 and [item['rank'] for item in body['ranked']] == [1, 2, 3, 4, 5]
+    viral = [item['viral_potential_score'] for item in body['ranked']]
+    assert viral == sorted(viral, reverse=True)
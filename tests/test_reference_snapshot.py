@@ -0,0 +1,47 @@
+# tests/test_reference_snapshot.py
+import os
+
+from infrastructure.data.reference_snapshot import (
+    build_snapshot,
+    load_or_build_snapshot,
+    load_snapshot,
+    parse_literal_list,
+    save_snapshot,
+)
+
+
+def test_parse_literal_list_is_safe():
+    assert parse_literal_list("['matcha', 'taro']") == ('matcha', 'taro')
+    assert parse_literal_list("__import__('os').system('echo hi')") == ()
+    assert parse_literal_list(float('nan')) == ()
+
+
+def test_build_snapshot_parses_typed_reference_data(raw_data_dir):
+    snapshot = build_snapshot(raw_data_dir)
+
+    assert snapshot.seasonal['Thu'].trending_flavors == ('bí đỏ', 'caramel')
+    assert snapshot.seasonal['Xuân'].peak_months == (2, 3)
+    assert snapshot.market['Gen Z'].market_potential == 'Cao'
+    # Profiles key theo tên nhóm (cột index của CSV), không phải row.index
+    assert snapshot.profiles['gen z'].preferred_flavors == ('matcha', 'taro')
+    assert {event.name for event in snapshot.events} >= {'Halloween', 'Tết Trung Thu'}
+
+
+def test_snapshot_round_trip_and_rebuild_on_source_change(raw_data_dir, tmp_path):
+    path = tmp_path / "reference_snapshot.pkl"
+    built = load_or_build_snapshot(raw_data_dir, path)
+    assert path.exists()
+    assert load_snapshot(path) == built
+
+    # Không có CSV nguồn (image deploy) -> dùng snapshot sẵn có
+    assert load_or_build_snapshot(tmp_path / "missing", path) == built
+
+    # CSV nguồn đổi -> fingerprint khác -> build lại
+    source = raw_data_dir / "seasonal_trends_20250920_061904.csv"
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    rebuilt = load_or_build_snapshot(raw_data_dir, path)
+    assert rebuilt.source_fingerprint != built.source_fingerprint
+
+    save_snapshot(rebuilt, path)
+    assert load_snapshot(path).source_fingerprint == rebuilt.source_fingerprint
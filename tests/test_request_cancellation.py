@@ -0,0 +1,176 @@
+# tests/test_request_cancellation.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.cancellation import run_until_disconnected
+from domain.services.recipe_generation_service import RecipeGenerationService
+from domain.services.request_context import DeadlineExceeded, RequestCancelled, RequestContext
+
+COMPLETE_RECIPE = ('{"title": "Bánh bí đỏ", "ingredients": [{"name": "bí đỏ", "quantity": "200", "unit": "g"}],'
+                   ' "instructions": ["Bước 1: Trộn", "Bước 2: Nướng"]}')
+
+
+class FakeGemini:
+    model = 'fake'
+
+    def __init__(self, on_call=None, response=COMPLETE_RECIPE):
+        self.on_call = on_call
+        self.response = response
+        self.calls = []
+
+    def _record(self, name):
+        self.calls.append(name)
+        if self.on_call:
+            self.on_call()
+        return self.response
+
+    def generate_recipe_from_ingredients(self, ingredients, language="vi", timeout=None):
+        return self._record('from_ingredients')
+
+    def generate_creative_recipe(self, trend, user_segment, occasion=None, language="vi", temperature=None,
+                                 timeout=None):
+        return self._record('creative')
+
+    def _generate_simple_recipe(self, trend, user_segment, occasion, language, timeout=None):
+        return self._record('simple_fallback')
+
+
+class FakeTranslator:
+    def __init__(self):
+        self.calls = 0
+
+    def vi_to_en(self, text, context=None):
+        context.raise_if_cancelled()
+        self.calls += 1
+        return text
+
+    en_to_vi = vi_to_en
+
+
+class FakeT5:
+    def __init__(self, on_call=None):
+        self.on_call = on_call
+
+    def generate_recipe(self, ingredients, context=None, num_beams=None, min_seconds=0.0):
+        if self.on_call:
+            self.on_call()
+        context.raise_if_cancelled()  # như T5Client: beam search bị dừng thì bỏ kết quả
+        return "title: pumpkin cake ingredients: 200 g pumpkin directions: mix. bake for 30 minutes."
+
+
+def _service(gemini, t5=None):
+    service = RecipeGenerationService(use_t5=False, gemini=gemini)
+    service.translator = FakeTranslator()
+    if t5 is not None:
+        service.use_t5, service.t5_client = True, t5
+    return service
+
+
+def test_cancel_during_t5_skips_enhancement_and_gemini_fallback():
+    context = RequestContext()
+    gemini = FakeGemini()
+    service = _service(gemini, FakeT5(on_call=lambda: context.cancel("client disconnected")))
+
+    with pytest.raises(RequestCancelled, match="client disconnected"):
+        service.generate_from_ingredients("bí đỏ, sữa", language="vi", context=context)
+    assert gemini.calls == []  # không fallback sang Gemini-only khi đã huỷ
+    assert service.translator.calls == 1  # chỉ bước dịch trước T5
+
+
+def test_cancel_during_gemini_skips_parse_fallback():
+    context = RequestContext()
+    gemini = FakeGemini(on_call=lambda: context.cancel(), response='{"title": ""}')
+    service = _service(gemini)
+
+    with pytest.raises(RequestCancelled):
+        service.generate_from_trend("matcha", "Gen Z", context=context)
+    assert gemini.calls == ['creative']
+
+    # Không huỷ: kết quả thiếu vẫn đi fallback như trước
+    gemini = FakeGemini(response='{"title": ""}')
+    _service(gemini).generate_from_trend("matcha", "Gen Z")
+    assert gemini.calls == ['creative', 'simple_fallback']
+
+
+class FakeRequest:
+    class url:
+        path = '/recipes/generate-from-trend'
+
+    def __init__(self, disconnect_after):
+        self.polls = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.polls >= self.disconnect_after
+
+
+def test_client_disconnect_cancels_worker_thread():
+    stopped = threading.Event()
+
+    def pipeline(context):
+        while True:  # mô phỏng các bước nối tiếp, mỗi bước kiểm tra huỷ
+            time.sleep(0.01)
+            try:
+                context.raise_if_cancelled()
+            except RequestCancelled:
+                stopped.set()
+                raise
+
+    async def scenario():
+        started = time.perf_counter()
+        with pytest.raises(RequestCancelled):
+            await run_until_disconnected(FakeRequest(disconnect_after=2), pipeline, poll_seconds=0.05)
+        return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) < 0.5
+    assert stopped.wait(1)
+
+    async def finished():
+        return await run_until_disconnected(FakeRequest(disconnect_after=100), lambda context: 'ok',
+                                            poll_seconds=0.05)
+
+    assert asyncio.run(finished()) == 'ok'
+
+
+def test_queued_t5_request_is_dropped_when_cancelled():
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from infrastructure.external.t5_client import T5Client
+
+    class Model:
+        calls = 0
+
+        def generate(self, **kwargs):
+            Model.calls += 1
+
+    client = object.__new__(T5Client)
+    client.model = Model()
+    context = RequestContext()
+    errors = []
+
+    def queued():
+        try:
+            client.generate_recipe("flour, sugar", context=context)
+        except RequestCancelled as e:
+            errors.append(e)
+
+    with T5Client._generate_lock:  # một request khác đang dùng model
+        waiter = threading.Thread(target=queued)
+        waiter.start()
+        time.sleep(0.1)
+        context.cancel("client disconnected")
+        waiter.join(1)
+    assert errors and Model.calls == 0
+
+    # Deadline: chờ tới khi budget còn dưới min_seconds thì bỏ lượt, không đợi hết hàng đợi
+    context = RequestContext(deadline_seconds=0.3)
+    with T5Client._generate_lock:
+        started = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            client.generate_recipe("flour, sugar", context=context, min_seconds=0.2)
+        assert time.perf_counter() - started < 0.5
+    assert Model.calls == 0
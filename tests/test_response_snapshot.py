@@ -0,0 +1,136 @@
+# tests/test_response_snapshot.py
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import ServiceContainer
+from app.routers import analytics
+from app.snapshots import MaterializedViews, ResponseSnapshot
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from infrastructure.data.reference_snapshot import build_snapshot
+
+
+def test_etag_changes_only_when_data_changes():
+    state = {'value': 1, 'builds': 0}
+
+    def builder():
+        state['builds'] += 1
+        return {'value': state['value']}
+
+    snapshot = ResponseSnapshot('test', builder, max_age_seconds=60, stale_seconds=60)
+    first = snapshot.get()
+    assert json.loads(first.body)['data'] == {'value': 1}
+    assert snapshot.get() is first and state['builds'] == 1
+
+    assert snapshot.refresh().etag == first.etag  # data không đổi -> cùng ETag / version
+
+    state['value'] = 2
+    second = snapshot.refresh()
+    assert second.etag != first.etag
+    assert second.version == first.version + 1
+
+
+def test_stale_snapshot_is_served_while_refreshing_in_background():
+    state = {'value': 1}
+
+    def builder():
+        time.sleep(0.1)
+        return {'value': state['value']}
+
+    snapshot = ResponseSnapshot('test', builder, max_age_seconds=0.05, stale_seconds=60)
+    first = snapshot.get()
+    state['value'] = 2
+    time.sleep(0.06)
+
+    started = time.perf_counter()
+    assert snapshot.get() is first  # stale nhưng phục vụ ngay
+    assert time.perf_counter() - started < 0.05
+
+    time.sleep(0.3)
+    assert json.loads(snapshot.get().body)['data'] == {'value': 2}
+
+    snapshot.invalidate()
+    assert snapshot.needs_refresh
+
+
+def test_trending_now_serves_precomputed_bytes_with_etag(raw_data_dir):
+    services = ServiceContainer(factories={
+        'context_service': lambda s: ContextAwareRecipeService(
+            reference=build_snapshot(raw_data_dir), gemini=object(), trend_predictor=object()),
+    })
+    app = FastAPI()
+    app.include_router(analytics.router)
+    app.state.services = services
+    client = TestClient(app)
+
+    response = client.get("/analytics/trending-now")
+    assert response.status_code == 200
+    body = response.json()
+    assert body['status'] == 'success'
+    assert {'current_season', 'week_forecast', 'opportunity_score'} <= set(body['data'])
+    etag = response.headers['etag']
+    assert 'stale-while-revalidate' in response.headers['cache-control']
+
+    again = client.get("/analytics/trending-now")
+    assert again.content == response.content
+
+    not_modified = client.get("/analytics/trending-now", headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b''
+
+
+def test_materialized_views_rebuild_on_epoch_change_and_invalidate():
+    state = {'epoch': '2026-10', 'builds': 0}
+
+    def builder(key):
+        state['builds'] += 1
+        return {'segment': key, 'epoch': state['epoch']}
+
+    views = MaterializedViews('test', keys=lambda: ['genz', 'gym', 'genz'], builder=builder,
+                              epoch=lambda: state['epoch'])
+    assert json.loads(views.get('genz')) == {'segment': 'genz', 'epoch': '2026-10'}
+    assert views.get('unknown') is None
+    views.get('gym')
+    assert state['builds'] == 2  # build một lần cho mỗi key, không build theo request
+
+    state['epoch'] = '2026-11'
+    assert json.loads(views.get('gym'))['epoch'] == '2026-11'
+    assert state['builds'] == 4
+
+    views.invalidate()
+    views.get('gym')
+    assert state['builds'] == 6
+
+
+def test_segment_recommendations_served_from_views(raw_data_dir):
+    services = ServiceContainer(factories={
+        'context_service': lambda s: ContextAwareRecipeService(
+            reference=build_snapshot(raw_data_dir), gemini=object(), trend_predictor=object()),
+    })
+    app = FastAPI()
+    app.include_router(analytics.router)
+    app.state.services = services
+    client = TestClient(app)
+
+    analytics.warm_precomputed(services)
+    views = services.snapshots['segment-recommendations']
+    assert views.get('gym') is not None
+
+    known = client.get("/analytics/segment-recommendations/gym").json()
+    assert known['segment'] == 'gym'
+    assert known['data']['segment_profile']['name'] == 'Người Tập Gym'
+
+    # Segment lạ: tính trực tiếp, cùng format
+    unknown = client.get("/analytics/segment-recommendations/Sinh viên").json()
+    assert unknown['segment'] == 'Sinh viên'
+    assert set(unknown['data']) == set(known['data'])
+
+
+def test_cold_snapshot_is_not_built_on_the_caller_thread():
+    snapshot = ResponseSnapshot('test', lambda: {'value': 1}, max_age_seconds=60, stale_seconds=60)
+    assert snapshot.get_nowait() is None  # chưa có: caller phải build (endpoint dùng asyncio.to_thread)
+
+    first = snapshot.get()
+    assert snapshot.get_nowait() is first
@@ -0,0 +1,56 @@
+# tests/test_service_container.py
+import threading
+from collections import Counter
+
+from app.container import ServiceContainer
+
+
+def _counting_factories(counter):
+    def factory(name, build):
+        def _build(services):
+            counter[name] += 1
+            return build(services)
+        return _build
+
+    return {
+        'trend_predictor': factory('trend_predictor', lambda s: object()),
+        'gemini': factory('gemini', lambda s: object()),
+        'reference': factory('reference', lambda s: object()),
+        'context_service': factory('context_service', lambda s: (s.reference, s.gemini, s.trend_predictor)),
+        'trend_forecaster': factory('trend_forecaster', lambda s: (s.context_service, s.trend_predictor)),
+        'recipe_service': factory('recipe_service', lambda s: s.gemini),
+        'recipe_use_case': factory('recipe_use_case', lambda s: s.recipe_service),
+        'webhooks': factory('webhooks', lambda s: object()),
+        'jobs': factory('jobs', lambda s: object()),
+        'idempotency': factory('idempotency', lambda s: object()),
+    }
+
+
+def test_components_are_created_once_and_shared():
+    counter = Counter()
+    services = ServiceContainer(factories=_counting_factories(counter))
+
+    threads = [threading.Thread(target=services.warm_up) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    services.context_service
+    services.recipe_use_case
+
+    assert set(counter.values()) == {1}
+    assert len(counter) == 10
+    # Gemini client dùng chung giữa context service và recipe service
+    assert services.context_service[1] is services.gemini
+    assert services.recipe_service is services.gemini
+
+
+def test_close_drops_instances():
+    counter = Counter()
+    services = ServiceContainer(factories=_counting_factories(counter))
+    services.warm_up()
+    services.close()
+
+    assert services.created == []
+    services.gemini
+    assert counter['gemini'] == 2
@@ -0,0 +1,112 @@
+# tests/test_smart_recipe_candidates.py
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import ServiceContainer
+from app.routers import analytics
+from domain.entities.ingredient import Ingredient
+from domain.entities.recipe import Recipe
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from infrastructure.data.reference_snapshot import build_snapshot
+
+
+class CandidateContextService(ContextAwareRecipeService):
+    """Sinh recipe giả theo temperature: temperature cao -> recipe 'viral' hơn nhưng chậm hơn"""
+
+    def __init__(self, reference, delays):
+        super().__init__(reference=reference, gemini=object(), trend_predictor=object())
+        self.delays = delays
+        self.temperatures = []
+        self.contexts = []
+
+    def generate_context_aware_recipe(self, user_segment, target_date=None, custom_trend=None, temperature=None,
+                                      context=None):
+        self.temperatures.append(temperature)
+        self.contexts.append(context)
+        time.sleep(self.delays(temperature))
+        context.raise_if_cancelled()
+        if temperature is not None and temperature < 0.6:
+            raise RuntimeError("Gemini quota exceeded")
+        viral = temperature is not None and temperature >= 0.8
+        return Recipe(
+            title=f"{'Viral' if viral else 'Classic'} pumpkin tart {temperature}",
+            description='',
+            ingredients=[Ingredient(name='bí đỏ'), Ingredient(name='matcha' if viral else 'bột mì')],
+            instructions=[],
+            difficulty='easy' if viral else 'hard',
+            tags=['Halloween'] if viral else [],
+        )
+
+
+def _client(raw_data_dir, delays):
+    context_service = CandidateContextService(build_snapshot(raw_data_dir), delays)
+    app = FastAPI()
+    app.include_router(analytics.router)
+    app.state.services = ServiceContainer(factories={'context_service': lambda s: context_service})
+    return TestClient(app), context_service
+
+
+def test_best_of_k_candidates_is_returned(raw_data_dir):
+    client, context_service = _client(raw_data_dir, delays=lambda t: 0.01)
+    body = client.post("/analytics/generate-smart-recipe", json={
+        'user_segment': 'Gen Z', 'target_date': '2026-10-31', 'candidates': 4,
+    }).json()
+
+    assert sorted(context_service.temperatures) == analytics._candidate_temperatures(4) == [0.4, 0.6, 0.8, 1.0]
+    statuses = {c['temperature']: c['status'] for c in body['candidates']}
+    assert statuses == {0.4: 'failed', 0.6: 'success', 0.8: 'success', 1.0: 'success'}
+    selected = [c for c in body['candidates'] if c.get('selected')]
+    assert len(selected) == 1 and selected[0]['temperature'] == 0.8  # hoà điểm: lấy candidate đầu
+    assert body['recipe']['title'].startswith('Viral')
+    assert body['viral_potential_score'] == max(c.get('viral_potential_score', 0) for c in body['candidates'])
+
+
+def test_deadline_returns_best_of_finished_candidates(raw_data_dir):
+    client, context_service = _client(raw_data_dir, delays=lambda t: 1.5 if t >= 0.8 else 0.05)
+    with client:  # giữ event loop (như server thật): không chờ thread của candidate bị bỏ
+        started = time.perf_counter()
+        body = client.post("/analytics/generate-smart-recipe", json={
+            'user_segment': 'Gen Z', 'target_date': '2026-10-31', 'candidates': 4, 'deadline_seconds': 0.3,
+        }).json()
+        assert time.perf_counter() - started < 1.2
+
+    statuses = {c['temperature']: c['status'] for c in body['candidates']}
+    assert statuses == {0.4: 'failed', 0.6: 'success', 0.8: 'timeout', 1.0: 'timeout'}
+    assert body['recipe']['title'].startswith('Classic')
+    # Candidate bị bỏ: context bị huỷ, thread không gọi tiếp Gemini
+    assert sorted(c.cancelled for c in context_service.contexts) == [False, False, True, True]
+
+    # Chưa có candidate nào xong trước deadline: chờ candidate đầu tiên
+    client, _ = _client(raw_data_dir, delays=lambda t: 0.2)
+    body = client.post("/analytics/generate-smart-recipe", json={
+        'user_segment': 'Gen Z', 'target_date': '2026-10-31', 'deadline_seconds': 0.01,
+    }).json()
+    assert [c['status'] for c in body['candidates']] == ['success']
+
+
+def test_no_candidate_within_grace_period_returns_504(raw_data_dir, monkeypatch):
+    monkeypatch.setattr(analytics.settings, 'SMART_RECIPE_GRACE_SECONDS', 0.2)
+    client, context_service = _client(raw_data_dir, delays=lambda t: 1.0)
+    with client:
+        started = time.perf_counter()
+        response = client.post("/analytics/generate-smart-recipe", json={
+            'user_segment': 'Gen Z', 'target_date': '2026-10-31', 'candidates': 2, 'deadline_seconds': 0.1,
+        })
+        assert time.perf_counter() - started < 0.8
+
+    assert response.status_code == 504
+    assert all(context.cancelled for context in context_service.contexts)
+
+
+def test_invalid_candidates_or_deadline_is_rejected(raw_data_dir):
+    client, context_service = _client(raw_data_dir, delays=lambda t: 0.01)
+    base = {'user_segment': 'Gen Z', 'target_date': '2026-10-31'}
+    max_candidates = analytics.settings.SMART_RECIPE_MAX_CANDIDATES
+
+    for invalid in ({'deadline_seconds': 0}, {'deadline_seconds': -1},
+                    {'deadline_seconds': analytics.settings.SMART_RECIPE_DEADLINE_MAX_SECONDS + 1},
+                    {'candidates': 0}, {'candidates': max_candidates + 1}):
+        assert client.post("/analytics/generate-smart-recipe", json={**base, **invalid}).status_code == 422
+    assert context_service.temperatures == []  # không candidate nào được sinh
@@ -0,0 +1,65 @@
+# tests/test_trend_forecast_service.py
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from domain.services.trend_forecast_service import TrendForecastService
+from infrastructure.data.reference_snapshot import build_snapshot
+from infrastructure.ml_models.trend_predictor import TrendPredictor
+
+
+@pytest.fixture(scope="module")
+def forecaster(raw_data_dir, tmp_path_factory):
+    predictor = TrendPredictor(model_path=tmp_path_factory.mktemp("models"), auto_load=False)
+    predictor.train(raw_data_dir, backend='compact')
+    context_service = ContextAwareRecipeService(reference=build_snapshot(raw_data_dir), gemini=object(),
+                                                trend_predictor=predictor)
+    return TrendForecastService(context_service, predictor)
+
+
+def test_batch_forecast_matches_single_predictions(forecaster):
+    forecast = forecaster.forecast('Gen Z', start=datetime(2026, 10, 25), horizon_days=14)
+
+    context_service = forecaster.context_service
+    for offset in (0, 7, 13):
+        day = datetime(2026, 10, 25 + offset) if offset < 7 else datetime(2026, 11, offset - 6)
+        seasonal_ctx, _ = context_service.get_current_context(day)
+        market_ctx = context_service._get_market_context('Gen Z')
+        single = forecaster.trend_predictor.predict_trends({
+            'month': seasonal_ctx.month, 'day_of_year': day.timetuple().tm_yday, 'weekday': day.weekday(),
+            'temperature': seasonal_ctx.temperature, 'bakery_demand': seasonal_ctx.demand_factor,
+            'season': seasonal_ctx.season, 'user_segment': 'Gen Z',
+            'market_potential': market_ctx.market_potential, 'competition_level': market_ctx.competition_level,
+        })
+        assert forecast.strength[offset] == pytest.approx(single['overall_trend_strength'])
+
+    assert forecast.daily_events[6] == ['Halloween']
+    assert forecast.top_events(1) == ['Halloween']
+    assert forecast.event_date('Halloween').isoformat() == '2026-10-31'
+
+
+def test_year_long_daily_forecast_uses_one_batch_predict_and_downsamples(forecaster, monkeypatch):
+    predictor = forecaster.trend_predictor
+    calls = []
+    monkeypatch.setattr(predictor, 'predict_batch', lambda columns, n_rows: calls.append(n_rows) or
+                        TrendPredictor.predict_batch(predictor, columns, n_rows))
+    monkeypatch.setattr(predictor, 'predict_trends', lambda context: pytest.fail("per-day predict"))
+
+    forecast = forecaster.forecast('Millennials', start=datetime(2026, 1, 1), horizon_days=365)
+
+    assert forecast.horizon_days == 365
+    assert calls == [365]  # một lần predict cho cả năm, không predict từng ngày
+    assert len(forecast.daily()) == 365
+    assert len(forecast.weekly()) == 53
+
+    compact = forecast.daily(max_points=52)
+    assert len(compact) <= 52
+    assert sum(point['days'] for point in compact) == 365
+    assert np.mean([p['overall_trend_strength'] for p in compact]) == pytest.approx(forecast.strength.mean(), rel=0.05)
+    assert {'Tết Nguyên Đán', 'Giáng sinh'} <= set(forecast.event_scores)
+
+    seasonal_ctx, _ = forecaster.context_service.get_current_context(datetime(2026, 7, 1))
+    july = next(point for point in forecast.weekly() if point['date'].startswith('2026-07'))
+    assert july['trending_flavors'] == list(seasonal_ctx.trending_flavors)
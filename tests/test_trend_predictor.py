@@ -0,0 +1,235 @@
+# tests/test_trend_predictor.py
+from datetime import datetime
+
+import pandas as pd
+
+from infrastructure.data.dataset_schemas import read_dataset
+from infrastructure.ml_models.trend_predictor import TrendPredictor
+
+
+def test_read_dataset_uses_typed_schema(raw_data_dir):
+    df = read_dataset('youtube_trends', raw_data_dir, projection='training')
+
+    assert 'video_id' not in df.columns  # usecols projection
+    assert isinstance(df['nhom_doi_tuong'].dtype, pd.CategoricalDtype)
+    assert isinstance(df['muc_do_viral'].dtype, pd.CategoricalDtype)
+    assert df['luot_xem'].dtype == 'float32'
+    assert pd.api.types.is_datetime64_any_dtype(df['ngay_dang'])
+
+
+def test_train_and_predict(raw_data_dir, tmp_path):
+    predictor = TrendPredictor(model_path=tmp_path / "models", auto_load=False)
+    results = predictor.train(raw_data_dir)
+
+    assert set(results) == {'popularity', 'engagement', 'trend_score'}
+    assert 'YouTube trends' in predictor.memory_report
+
+    reloaded = TrendPredictor(model_path=tmp_path / "models")
+    predictions = reloaded.predict_trends({'month': 10, 'user_segment': 'Gen Z', 'season': 'Thu'})
+    assert set(predictions) >= {'popularity_score', 'overall_trend_strength'}
+
+
+def test_train_streaming(raw_data_dir, tmp_path):
+    predictor = TrendPredictor(model_path=tmp_path / "models", auto_load=False)
+    predictor.train(raw_data_dir, per_segment=True, min_segment_rows=10, n_jobs=1)
+    assert predictor.segment_router is not None
+    results = predictor.train_streaming(raw_data_dir, chunksize=50, epochs=2)
+
+    # Model theo segment dùng scaling cũ: không được route tới / lưu lại sau streaming
+    assert predictor.segment_router is None and predictor.segment_report == {}
+    assert not (tmp_path / "models" / "segment_models.pkl").exists()
+
+    assert set(results) == {'popularity', 'engagement', 'trend_score'}
+    assert all(metrics['mae'] >= 0 for metrics in results.values())
+    assert predictor.scaler.n_samples_seen_ > 0
+
+    predictions = predictor.predict_trends({'month': 2, 'user_segment': 'Millennials', 'season': 'Xuân'})
+    assert isinstance(predictions['overall_trend_strength'], float)
+
+
+def test_hist_gradient_boosting_backend_round_trip(raw_data_dir, tmp_path):
+    predictor = TrendPredictor(model_path=tmp_path / "models", auto_load=False)
+    predictor.train(raw_data_dir, backend='hist_gradient_boosting')
+    assert predictor.scaler is None
+
+    reloaded = TrendPredictor(model_path=tmp_path / "models")
+    assert reloaded.backend == 'hist_gradient_boosting'
+    assert 'trend_score' in reloaded.predict_trends({'month': 12, 'user_segment': 'Gen Z'})
+
+
+def test_compare_backends_reports_frontier(raw_data_dir):
+    from infrastructure.ml_models.backend_comparison import compare_backends
+
+    report = compare_backends(raw_data_dir, backends=['random_forest', 'hist_gradient_boosting'], latency_runs=3)
+
+    for name in ('random_forest', 'hist_gradient_boosting'):
+        assert report[name]['model_size_kb'] > 0
+        assert set(report[name]['metrics']) == {'popularity', 'engagement', 'trend_score'}
+
+
+def test_per_segment_models_route_with_global_fallback(raw_data_dir, tmp_path):
+    predictor = TrendPredictor(model_path=tmp_path / "models", auto_load=False)
+    predictor.train(raw_data_dir, per_segment=True, min_segment_rows=10, n_jobs=1)
+
+    router = predictor.segment_router
+    assert 'Gen Z' in router.segments
+    assert router.route('gen_z') is router.route('Gen Z')
+    assert router.route('unknown') is None
+    assert router.size_kb() < 3 * 1024
+
+    reloaded = TrendPredictor(model_path=tmp_path / "models")
+    assert reloaded.segment_router.segments == router.segments
+    gen_z = reloaded.predict_trends({'month': 10, 'user_segment': 'gen_z'})
+    fallback = reloaded.predict_trends({'month': 10, 'user_segment': 'unknown'})
+    assert gen_z != fallback
+
+    # Quan sát có segment cập nhật cả model của segment
+    from pathlib import Path
+
+    from infrastructure.ml_models.incremental_updates import load_mongo_export, observations_from_orders_and_ratings
+
+    orders = load_mongo_export(Path(__file__).resolve().parents[1] / "data" / "test" / "test.orders.json")
+    segments = {order['userId']['$oid']: 'gen_z' for order in orders if order.get('userId')}
+    observations = observations_from_orders_and_ratings(orders, [], user_segments=segments)
+    gen_z_models = reloaded.segment_router.route('Gen Z')
+    n_trees = len(gen_z_models['popularity'].estimators_)
+    reloaded.update_incremental(observations, publish=False)
+    assert len(gen_z_models['popularity'].estimators_) > n_trees
+
+
+def test_compression_picks_smallest_model_within_budget(raw_data_dir, tmp_path):
+    from infrastructure.ml_models.model_compression import CompressionBudget
+
+    predictor = TrendPredictor(model_path=tmp_path / "models", auto_load=False)
+    predictor.train(raw_data_dir, compression=CompressionBudget(
+        latency_budget_ms=1000.0, accuracy_tolerance=10.0, latency_runs=2
+    ))
+
+    popularity = predictor.compression_report['popularity']
+    assert popularity['meets_budget']
+    assert popularity['chosen']['size_kb'] < popularity['baseline']['size_kb']
+    assert predictor.popularity_model.n_estimators == popularity['chosen']['n_estimators']
+    assert popularity['frontier']
+
+    # Budget không thể đạt -> giữ model gốc
+    strict = TrendPredictor(model_path=tmp_path / "strict", auto_load=False)
+    strict.train(raw_data_dir, compression=CompressionBudget(latency_budget_ms=0.0, latency_runs=2))
+    assert not strict.compression_report['popularity']['compressed']
+    assert strict.popularity_model.n_estimators == 100
+
+
+def test_incremental_update_from_orders_and_ratings(raw_data_dir, tmp_path):
+    from pathlib import Path
+
+    from infrastructure.ml_models.incremental_updates import (
+        latest_created_at,
+        load_mongo_export,
+        observations_from_orders_and_ratings,
+    )
+
+    test_data = Path(__file__).resolve().parents[1] / "data" / "test"
+    orders = load_mongo_export(test_data / "test.orders.json")
+    ratings = load_mongo_export(test_data / "test.ratings.json")
+    observations = observations_from_orders_and_ratings(orders, ratings)
+    assert any('popularity' in obs['targets'] for obs in observations)
+    assert any('engagement' in obs['targets'] for obs in observations)
+    assert all(obs['user_segment'] is None for obs in observations)
+
+    # Đơn hàng của user có segment -> quan sát riêng cho segment đó
+    buyer = orders[0]['userId']['$oid']
+    segmented = observations_from_orders_and_ratings(orders, ratings, user_segments={buyer: 'Gen Z'})
+    assert any(obs['user_segment'] == 'Gen Z' and 'popularity' in obs['targets'] for obs in segmented)
+
+    predictor = TrendPredictor(model_path=tmp_path / "models", auto_load=False)
+    predictor.train(raw_data_dir)
+    trained_version = predictor.model_metadata['version']
+    trained_samples = predictor.model_metadata['samples_seen']
+    n_trees = len(predictor.popularity_model.estimators_)
+
+    watermark = latest_created_at(orders, ratings)
+    result = predictor.update_incremental(observations, watermark=watermark.isoformat())
+    assert result['version'] == trained_version + 1
+    assert result['updates']['popularity']['method'] == 'warm_start_forest'
+    assert len(predictor.popularity_model.estimators_) > n_trees
+
+    # Version mới publish qua load_models()
+    reloaded = TrendPredictor(model_path=tmp_path / "models")
+    assert reloaded.model_metadata['version'] == trained_version + 1
+    assert reloaded.model_metadata['samples_seen'] == trained_samples + len(observations)
+    assert observations_from_orders_and_ratings(
+        orders, ratings, since=datetime.fromisoformat(reloaded.model_metadata['watermark'])
+    ) == []
+
+
+def test_many_small_updates_keep_core_model_and_bounded_size():
+    import numpy as np
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+
+    from infrastructure.ml_models.incremental_updates import incremental_update
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 4))
+    y = 2 * X[:, 0] + X[:, 1] + rng.normal(scale=0.3, size=400)
+
+    def trees(model):  # forest: list cây, boosting: mảng stage x 1
+        return np.ravel(np.asarray(model.estimators_, dtype=object))
+
+    for model in (RandomForestRegressor(n_estimators=100, random_state=0), GradientBoostingRegressor(random_state=0)):
+        model.fit(X, y)
+        before = model.predict(X)
+        core = list(trees(model)[:100])
+        for _ in range(40):  # mỗi batch vài đơn hàng
+            idx = rng.choice(len(X), size=5)
+            incremental_update(model, X[idx], y[idx] + rng.normal(scale=0.3, size=5))
+
+        assert len(model.estimators_) <= 120  # core + tối đa 20% cây / stage gần đây
+        assert all(a is b for a, b in zip(core, trees(model)[:100]))  # core không bị thay
+        assert np.mean(np.abs(model.predict(X) - before)) < 0.25 * np.std(y)
+
+
+def test_tuning_writes_best_config_and_resumes(raw_data_dir, tmp_path):
+    from infrastructure.ml_models.hyperparameter_search import TuningConfig
+
+    tuning = TuningConfig(n_candidates=4, n_splits=3, eta=3, time_budget_seconds=120, n_jobs=2)
+    predictor = TrendPredictor(model_path=tmp_path / "models", auto_load=False)
+    predictor.train(raw_data_dir, backend='compact', tuning=tuning)
+
+    report = predictor.tuning_report
+    assert report['best_folds'] == 3
+    assert report['folds_evaluated'] == 4 + 2 * (3 - 1)  # rung 1 fold cho 4 config, rồi 3 fold cho 2 config
+    assert predictor.hyperparameters == report['best_params']
+    assert (tmp_path / "models" / "tuning" / "compact_trials.jsonl").exists()
+
+    reloaded = TrendPredictor(model_path=tmp_path / "models")
+    assert reloaded.hyperparameters == report['best_params']
+
+    # Chạy lại dùng trial log, không fit lại fold nào
+    rerun = TrendPredictor(model_path=tmp_path / "models", auto_load=False)
+    rerun.train(raw_data_dir, backend='compact', tuning=tuning)
+    assert rerun.tuning_report['folds_evaluated'] == 0
+    assert rerun.tuning_report['best_params'] == report['best_params']
+
+
+def test_search_space_per_estimator_and_data_hash_in_resume_signature(tmp_path):
+    import numpy as np
+
+    from infrastructure.ml_models.estimator_backends import get_backend
+    from infrastructure.ml_models.hyperparameter_search import TuningConfig, apply_params, search_hyperparameters
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(120, 4))
+    y = {name: X[:, 0] + rng.normal(scale=0.1, size=120) for name in ('popularity', 'engagement', 'trend_score')}
+    tuning = TuningConfig(n_candidates=2, n_splits=2, eta=2, time_budget_seconds=120, n_jobs=1)
+    log_path = tmp_path / "trials.jsonl"
+
+    report = search_hyperparameters(X, y, 'random_forest', [], tuning, log_path=log_path)
+    params = report['best_params']
+    assert set(params) == {'RandomForestRegressor', 'GradientBoostingRegressor'}
+    models = apply_params(get_backend('random_forest').build([]), params)
+    assert models['engagement'].get_params()['learning_rate'] == params['GradientBoostingRegressor']['learning_rate']
+    assert models['popularity'].get_params()['min_samples_leaf'] == params['RandomForestRegressor']['min_samples_leaf']
+
+    # Cùng shape nhưng khác dữ liệu -> không dùng lại trial cũ
+    assert search_hyperparameters(X, y, 'random_forest', [], tuning, log_path=log_path)['folds_resumed'] > 0
+    shifted = {name: values + 1.0 for name, values in y.items()}
+    assert search_hyperparameters(X, shifted, 'random_forest', [], tuning, log_path=log_path)['folds_resumed'] == 0
@@ -0,0 +1,283 @@
+# tests/test_webhooks.py
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.container import ServiceContainer
+from app.jobs import JobManager
+from app.routers import analytics, jobs
+from app.webhooks import WebhookDispatcher, verify_signature
+from domain.entities.ingredient import Ingredient
+from domain.entities.recipe import Recipe
+from domain.services.context_aware_recipe_service import ContextAwareRecipeService
+from infrastructure.data.reference_snapshot import build_snapshot
+from infrastructure.db.job_store import InMemoryJobStore
+
+SECRET = 'storefront-secret'
+
+
+@pytest.fixture
+def receiver():
+    """HTTP server cục bộ đóng vai storefront: ghi lại các POST, trả status theo `responses` (hết thì 200)"""
+    received, responses = [], []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            received.append({'path': self.path, 'headers': dict(self.headers), 'body': body})
+            self.send_response(responses.pop(0) if responses else 200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.received, server.responses = received, responses
+    server.url = f"http://127.0.0.1:{server.server_port}/hooks/rcm"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+class QuickContextService(ContextAwareRecipeService):
+    def __init__(self, reference):
+        super().__init__(reference=reference, gemini=object(), trend_predictor=object())
+
+    def generate_context_aware_recipe(self, user_segment, target_date=None, custom_trend=None, temperature=None,
+                                      context=None):
+        return Recipe(title='Bánh bí đỏ', description='', ingredients=[Ingredient(name='bí đỏ')], instructions=[])
+
+
+def _client(raw_data_dir, tmp_path, secret=SECRET, **dispatcher_kwargs):
+    context_service = QuickContextService(build_snapshot(raw_data_dir))
+    dispatcher = WebhookDispatcher(secret, backoff_seconds=0.05, dead_letter_path=tmp_path / 'dead.jsonl',
+                                   allowed_hosts=['127.0.0.1'], **dispatcher_kwargs)
+    app = FastAPI()
+    app.include_router(analytics.router)
+    app.include_router(jobs.router)
+    app.state.services = ServiceContainer(factories={
+        'context_service': lambda s: context_service,
+        'webhooks': lambda s: dispatcher,
+        'jobs': lambda s: JobManager(InMemoryJobStore(), ttl_seconds=60, on_complete=s.webhooks.enqueue_job),
+    })
+    return TestClient(app), dispatcher
+
+
+def test_job_result_is_posted_signed_to_callback(raw_data_dir, tmp_path, receiver):
+    client, dispatcher = _client(raw_data_dir, tmp_path)
+    with client:
+        job = client.post("/jobs/generate-smart-recipe", params={'callback_url': receiver.url},
+                          json={'user_segment': 'Gen Z', 'target_date': '2026-10-31'}).json()
+        assert _wait_for(lambda: receiver.received)
+
+        hook = receiver.received[0]
+        headers = {key.lower(): value for key, value in hook['headers'].items()}
+        assert hook['path'] == '/hooks/rcm'
+        assert headers['x-rcm-event'] == 'job.succeeded'
+        assert verify_signature(SECRET, headers['x-rcm-timestamp'], hook['body'], headers['x-rcm-signature'])
+        assert not verify_signature('wrong', headers['x-rcm-timestamp'], hook['body'], headers['x-rcm-signature'])
+
+        payload = json.loads(hook['body'])
+        assert payload['id'] == job['id'] and payload['status'] == 'succeeded'
+        assert payload['result']['recipe']['title'] == 'Bánh bí đỏ'
+        assert client.get("/jobs/metrics").json()['webhooks']['delivered'] == 1
+
+
+def test_callback_url_is_rejected_when_invalid_or_unsigned(raw_data_dir, tmp_path):
+    request = {'user_segment': 'Gen Z'}
+    client, _ = _client(raw_data_dir, tmp_path)
+    with client:
+        bad = client.post("/jobs/generate-smart-recipe", params={'callback_url': 'ftp://shop/hook'}, json=request)
+        assert bad.status_code == 400
+        # SSRF: địa chỉ nội bộ / metadata bị chặn nếu host không nằm trong allowed_hosts
+        for internal in ('http://169.254.169.254/latest/meta-data', 'http://10.0.0.5/hook', 'http://[::1]:8000/hook',
+                         'http://localhost:8000/hook'):
+            blocked = client.post("/jobs/generate-smart-recipe", params={'callback_url': internal}, json=request)
+            assert blocked.status_code == 400 and 'public address' in blocked.json()['detail']
+
+    client, _ = _client(raw_data_dir, tmp_path, secret=None)
+    with client:
+        unsigned = client.post("/jobs/generate-smart-recipe", params={'callback_url': 'http://shop/hook'}, json=request)
+        assert unsigned.status_code == 400
+
+
+def test_delivery_retries_with_backoff_then_succeeds(raw_data_dir, tmp_path, receiver):
+    receiver.responses.extend([500, 503])
+    client, dispatcher = _client(raw_data_dir, tmp_path)
+    with client:
+        client.post("/jobs/generate-smart-recipe", params={'callback_url': receiver.url}, json={'user_segment': 'Gen Z'})
+        assert _wait_for(lambda: dispatcher.metrics()['delivered'] == 1)
+
+    # Cùng delivery id qua các lần retry để phía nhận chống trùng
+    deliveries = {hook['headers']['X-RCM-Delivery'] for hook in receiver.received}
+    assert len(receiver.received) == 3 and len(deliveries) == 1
+    assert dispatcher.metrics()['failed_attempts'] == 2 and not dispatcher.dead_letters
+
+
+def test_exhausted_or_rejected_deliveries_are_dead_lettered(tmp_path):
+    attempts = []
+
+    def sender(url, body, headers, timeout, address=None):
+        attempts.append(url)
+        return 500 if url.endswith('/flaky') else 400
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(SECRET, max_attempts=3, backoff_seconds=0.01, sender=sender,
+                                       dead_letter_path=tmp_path / 'dead.jsonl', allowed_hosts=['shop.example'])
+        dispatcher.enqueue("http://shop.example/flaky", 'job.succeeded', {'id': 'a'})
+        dispatcher.enqueue("http://shop.example/gone", 'job.failed', {'id': 'b'})
+        while len(dispatcher.dead_letters) < 2:
+            await asyncio.sleep(0.02)
+        await dispatcher.stop()
+        return dispatcher
+
+    dispatcher = asyncio.run(asyncio.wait_for(scenario(), 5))
+    # 500 retry tới hết lượt, 400 bỏ ngay không retry
+    assert attempts.count("http://shop.example/flaky") == 3 and attempts.count("http://shop.example/gone") == 1
+    records = {record['event']: record for record in dispatcher.dead_letters}
+    assert records['job.succeeded']['reason'] == 'HTTP 500' and records['job.succeeded']['attempts'] == 3
+    assert records['job.failed']['reason'] == 'HTTP 400' and records['job.failed']['attempts'] == 1
+    lines = (tmp_path / 'dead.jsonl').read_text(encoding='utf-8').splitlines()
+    assert {json.loads(line)['delivery_id'] for line in lines} == {r['delivery_id'] for r in records.values()}
+
+
+def test_per_endpoint_concurrency_is_bounded(tmp_path):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow_sender(url, body, headers, timeout, address=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return 204
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(SECRET, workers=6, per_endpoint_concurrency=2, sender=slow_sender,
+                                       allowed_hosts=['shop.example'])
+        for i in range(8):
+            dispatcher.enqueue("http://shop.example/hook", 'job.succeeded', {'id': i})
+        while dispatcher.metrics()['delivered'] < 8:
+            await asyncio.sleep(0.02)
+        await dispatcher.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert peak[0] == 2
+
+
+def test_slow_endpoint_does_not_starve_other_endpoints():
+    delivered = []
+
+    def sender(url, body, headers, timeout, address=None):
+        time.sleep(0.3 if 'slow' in url else 0.0)
+        delivered.append(url)
+        return 204
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(SECRET, workers=2, per_endpoint_concurrency=1, sender=sender,
+                                       allowed_hosts=['slow.example', 'fast.example'])
+        for i in range(4):
+            dispatcher.enqueue("http://slow.example/hook", 'job.succeeded', {'id': i})
+        dispatcher.enqueue("http://fast.example/hook", 'job.succeeded', {'id': 'fast'})
+        while "http://fast.example/hook" not in delivered:
+            await asyncio.sleep(0.01)
+        slow_done = delivered.count("http://slow.example/hook")
+        while dispatcher.metrics()['delivered'] < 5:
+            await asyncio.sleep(0.02)
+        await dispatcher.stop()
+        return slow_done
+
+    # Host chậm chỉ giữ 1 worker: host nhanh được giao trước khi xong delivery chậm thứ hai
+    assert asyncio.run(asyncio.wait_for(scenario(), 5)) <= 1
+
+
+def test_callback_address_is_rechecked_at_send_time(tmp_path):
+    sent = []
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(SECRET, sender=lambda *args: sent.append(args) or 204)
+        dispatcher.enqueue("http://127.0.0.1:9/hook", 'job.succeeded', {'id': 'a'})
+        while not dispatcher.dead_letters:
+            await asyncio.sleep(0.02)
+        await dispatcher.stop()
+        return dispatcher
+
+    dispatcher = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert not sent
+    assert dispatcher.dead_letters[0]['reason'].startswith('blocked callback_url')
+
+
+def test_redirect_to_private_address_is_not_followed(receiver, tmp_path):
+    class Redirect(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers['Content-Length']))
+            self.send_response(307)
+            self.send_header('Location', receiver.url)  # endpoint "public" chuyển hướng vào địa chỉ nội bộ
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Redirect)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(SECRET, backoff_seconds=0.01, allowed_hosts=['127.0.0.1'])
+        dispatcher.enqueue(f"http://127.0.0.1:{server.server_port}/hook", 'job.succeeded', {'id': 'a'})
+        while not dispatcher.dead_letters:
+            await asyncio.sleep(0.02)
+        await dispatcher.stop()
+        return dispatcher
+
+    try:
+        dispatcher = asyncio.run(asyncio.wait_for(scenario(), 5))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert receiver.received == []
+    record = dispatcher.dead_letters[0]
+    assert record['reason'] == 'HTTP 307 redirect not followed' and record['attempts'] == 1
+
+
+def test_delivery_connects_to_the_validated_address(receiver, monkeypatch):
+    import socket
+
+    from app import webhooks
+
+    # Lần gửi dùng đúng IP đã kiểm tra, không resolve lại hostname (DNS rebinding)
+    addresses = []
+
+    async def scenario():
+        dispatcher = WebhookDispatcher(SECRET, sender=lambda *args: addresses.append(args[4]) or 204)
+        dispatcher.enqueue("https://hooks.shop.example/rcm", 'job.succeeded', {'id': 'a'})
+        while not dispatcher.metrics()['delivered']:
+            await asyncio.sleep(0.02)
+        await dispatcher.stop()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(webhooks.socket, 'getaddrinfo', lambda host, port, **kw: [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('93.184.216.34', port))])
+        asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert addresses == ['93.184.216.34']
+
+    # Sender mặc định kết nối tới address, Host header giữ hostname gốc
+    url = f"http://hooks.shop.example:{receiver.server_port}/hooks/rcm"
+    assert webhooks._post_with_requests(url, b'{}', {}, 2.0, address='127.0.0.1') == 200
+    assert receiver.received[0]['headers']['Host'] == f"hooks.shop.example:{receiver.server_port}"
@@ -30,10 +30,17 @@ except Exception:
     pass
 
 # Import our models
+from infrastructure.data.dataset_schemas import CSV_ENGINE, dataframe_memory_mb, schema_for_file
+from infrastructure.data.reference_snapshot import DEFAULT_SNAPSHOT_PATH, build_snapshot, save_snapshot
+from infrastructure.ml_models.estimator_backends import DEFAULT_BACKEND, ESTIMATOR_BACKENDS, get_backend
+from infrastructure.ml_models.hyperparameter_search import TuningConfig
+from infrastructure.ml_models.model_compression import CompressionBudget
 from infrastructure.ml_models.trend_predictor import TrendPredictor
 from domain.services.context_aware_recipe_service import ContextAwareRecipeService
 
-def main():
+def main(streaming: bool = False, chunksize: int = 50_000, backend: str = DEFAULT_BACKEND,
+         per_segment: bool = False, compression: CompressionBudget = None,
+         tuning: TuningConfig = None):
     print("🚀 Starting RCM_RECIPE_2 AI Training Pipeline...")
     print(f"Project root: {ROOT_DIR}")
     print(f"Training started at: {datetime.now()}")
@@ -70,13 +77,20 @@ def main():
     # Train ML models
     print("\n🤖 Training ML Trend Prediction Models...")
     try:
-        predictor = TrendPredictor(model_path=models_dir)
-        training_results = predictor.train(data_dir)
+        predictor = TrendPredictor(model_path=models_dir, auto_load=False)
+        if streaming:
+            training_results = predictor.train_streaming(data_dir, chunksize=chunksize)
+        else:
+            training_results = predictor.train(data_dir, backend=backend, per_segment=per_segment,
+                                               compression=compression, tuning=tuning)
         
         print("✅ ML Training completed successfully!")
         print("📊 Training Results:")
         for model_name, metrics in training_results.items():
             print(f"  {model_name}: MAE={metrics['mae']:.4f}, R²={metrics['r2']:.4f}")
+        for segment, segment_metrics in predictor.segment_report.items():
+            maes = ", ".join(f"{name}={m['mae']:.4f}" for name, m in segment_metrics.items())
+            print(f"  [{segment}] MAE: {maes}")
         
     except Exception as e:
         print(f"❌ ML Training failed: {e}")
@@ -104,10 +118,20 @@ def main():
     except Exception as e:
         print(f"⚠️ ML Testing failed: {e}")
     
+    # Build reference snapshot (dữ liệu mùa vụ / thị trường đã parse sẵn cho API)
+    print("\n📦 Building reference snapshot...")
+    reference = None
+    try:
+        reference = build_snapshot(data_dir)
+        save_snapshot(reference, ROOT_DIR / DEFAULT_SNAPSHOT_PATH)
+        print(f"✅ Reference snapshot saved to {ROOT_DIR / DEFAULT_SNAPSHOT_PATH}")
+    except Exception as e:
+        print(f"⚠️ Reference snapshot failed: {e}")
+    
     # Test Context-Aware Recipe Service
     print("\n🍰 Testing Context-Aware Recipe Generation...")
     try:
-        service = ContextAwareRecipeService()
+        service = ContextAwareRecipeService(reference=reference)
         
         # Test với Halloween context
         halloween_date = datetime(2025, 10, 31)
@@ -128,7 +152,14 @@ def main():
     # Generate training report
     print("\n📄 Generating Training Report...")
     try:
-        report = generate_training_report(data_dir, models_dir, training_results if 'training_results' in locals() else {})
+        report = generate_training_report(
+            data_dir, models_dir,
+            training_results if 'training_results' in locals() else {},
+            backend=predictor.backend if 'predictor' in locals() else backend,
+            segment_report=predictor.segment_report if 'predictor' in locals() else {},
+            compression_report=predictor.compression_report if 'predictor' in locals() else {},
+            tuning_report=predictor.tuning_report if 'predictor' in locals() else {}
+        )
         
         report_path = ROOT_DIR / "training_report.json"
         with open(report_path, 'w', encoding='utf-8') as f:
@@ -152,7 +183,9 @@ def main():
     
     return True
 
-def generate_training_report(data_dir: Path, models_dir: Path, training_results: dict) -> dict:
+def generate_training_report(data_dir: Path, models_dir: Path, training_results: dict,
+                             backend: str = DEFAULT_BACKEND, segment_report: dict = None,
+                             compression_report: dict = None, tuning_report: dict = None) -> dict:
     """Generate comprehensive training report"""
     
     # Analyze datasets
@@ -160,11 +193,15 @@ def generate_training_report(data_dir: Path, models_dir: Path, training_results:
     
     for csv_file in data_dir.glob("*.csv"):
         try:
-            df = pd.read_csv(csv_file)
+            schema = schema_for_file(csv_file.name)
+            read_kwargs = schema.read_kwargs() if schema else {}
+            df = pd.read_csv(csv_file, engine=CSV_ENGINE, **read_kwargs)
             datasets_info[csv_file.name] = {
                 'rows': len(df),
                 'columns': len(df.columns),
                 'size_mb': round(csv_file.stat().st_size / 1024 / 1024, 2),
+                'memory_mb': dataframe_memory_mb(df),
+                'typed_schema': schema is not None,
                 'column_names': df.columns.tolist(),
                 'missing_values': df.isnull().sum().sum(),
                 'numeric_columns': df.select_dtypes(include=[np.number]).columns.tolist()
@@ -186,13 +223,18 @@ def generate_training_report(data_dir: Path, models_dir: Path, training_results:
             'total_files': len(datasets_info),
             'total_rows': sum(info.get('rows', 0) for info in datasets_info.values()),
             'total_size_mb': sum(info.get('size_mb', 0) for info in datasets_info.values()),
+            'total_memory_mb': round(sum(info.get('memory_mb', 0) for info in datasets_info.values()), 3),
             'details': datasets_info
         },
         'models': {
             'total_trained': len(training_results),
             'model_files': [f.name for f in model_files],
             'training_results': training_results,
-            'model_types': ['RandomForestRegressor', 'GradientBoostingRegressor', 'StandardScaler']
+            'backend': backend,
+            'model_types': _backend_model_types(backend),
+            'segment_models': segment_report or {},
+            'compression': compression_report or {},
+            'tuning': tuning_report or {}
         },
         'features': {
             'ml_prediction': 'Trend strength, popularity, engagement prediction',
@@ -224,6 +266,52 @@ def generate_training_report(data_dir: Path, models_dir: Path, training_results:
     
     return report
 
+def _backend_model_types(backend: str) -> list:
+    """Tên các estimator (và scaler nếu có) của backend, không trùng lặp"""
+    spec = get_backend(backend)
+    model_types = list(dict.fromkeys(type(model).__name__ for model in spec.build([]).values()))
+    if spec.uses_scaler:
+        model_types.append('StandardScaler')
+    return model_types
+
 if __name__ == "__main__":
-    success = main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train RCM_RECIPE_2 trend models")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Out-of-core training theo chunk (cho dataset lớn hơn RAM)")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="Số dòng mỗi chunk khi --streaming")
+    parser.add_argument("--backend", choices=sorted(ESTIMATOR_BACKENDS), default=DEFAULT_BACKEND,
+                        help="Estimator backend khi train toàn bộ trong RAM")
+    parser.add_argument("--per-segment", action="store_true",
+                        help="Train thêm model compact riêng cho từng nhóm đối tượng")
+    parser.add_argument("--compress", action="store_true",
+                        help="Nén ensemble theo latency budget sau khi train")
+    parser.add_argument("--latency-budget-ms", type=float, default=None,
+                        help="Budget predict 1 dòng (mặc định settings.TREND_LATENCY_BUDGET_MS)")
+    parser.add_argument("--accuracy-tolerance", type=float, default=None,
+                        help="MAE tăng tối đa khi nén (mặc định settings.TREND_ACCURACY_TOLERANCE)")
+    parser.add_argument("--tune", action="store_true",
+                        help="Tìm hyperparameter (time-series CV + successive halving) trước khi train")
+    parser.add_argument("--tune-budget", type=float, default=600.0, help="Time budget cho tuning (giây)")
+    parser.add_argument("--tune-candidates", type=int, default=20, help="Số config random ở rung đầu")
+    args = parser.parse_args()
+
+    tuning = None
+    if args.tune:
+        tuning = TuningConfig(n_candidates=args.tune_candidates, time_budget_seconds=args.tune_budget)
+
+    compression = None
+    if args.compress:
+        from configs.settings import settings
+
+        compression = CompressionBudget(
+            latency_budget_ms=args.latency_budget_ms or settings.TREND_LATENCY_BUDGET_MS,
+            accuracy_tolerance=(args.accuracy_tolerance if args.accuracy_tolerance is not None
+                                else settings.TREND_ACCURACY_TOLERANCE),
+        )
+
+    success = main(streaming=args.streaming, chunksize=args.chunksize, backend=args.backend,
+                   per_segment=args.per_segment, compression=compression,
+                   tuning=tuning)
     exit(0 if success else 1)
\ No newline at end of file
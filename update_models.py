@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Incremental update cho trend models từ luồng đơn hàng / đánh giá (chạy định kỳ, ví dụ mỗi giờ)
+
+Script này sẽ:
+1. Load models hiện tại trong data/models
+2. Đọc đơn hàng + đánh giá mới hơn watermark của lần chạy trước
+3. Cập nhật models bằng warm-start / partial_fit và publish version mới
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[0]
+sys.path.insert(0, str(ROOT_DIR))
+
+try:
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(encoding="utf-8")
+    if hasattr(sys.stderr, "reconfigure"):
+        sys.stderr.reconfigure(encoding="utf-8")
+except Exception:
+    pass
+
+from infrastructure.ml_models.incremental_updates import (
+    latest_created_at,
+    load_mongo_export,
+    observations_from_orders_and_ratings,
+    user_segments_from_users,
+)
+from infrastructure.ml_models.trend_predictor import TrendPredictor
+
+
+def main(orders_path: Path, ratings_path: Path, users_path: Path,
+         models_dir: Path = ROOT_DIR / "data" / "models") -> bool:
+    print(f"🔄 Incremental model update at: {datetime.now()}")
+
+    predictor = TrendPredictor(model_path=models_dir)
+    if not predictor.is_trained:
+        print("❌ Chưa có model đã train, chạy train_models.py trước")
+        return False
+
+    orders = load_mongo_export(orders_path) if orders_path.exists() else []
+    ratings = load_mongo_export(ratings_path) if ratings_path.exists() else []
+    # User chưa có segment chỉ cập nhật global model
+    user_segments = user_segments_from_users(load_mongo_export(users_path)) if users_path.exists() else {}
+
+    watermark = predictor.model_metadata.get('watermark')
+    since = datetime.fromisoformat(watermark) if watermark else None
+    observations = observations_from_orders_and_ratings(orders, ratings, since=since,
+                                                        user_segments=user_segments)
+    if not observations:
+        print(f"✅ Không có dữ liệu mới sau {watermark}, giữ version {predictor.model_metadata['version']}")
+        return True
+
+    latest = latest_created_at(orders, ratings)
+    result = predictor.update_incremental(observations, watermark=latest.isoformat() if latest else watermark)
+    for target_name, update in result['updates'].items():
+        print(f"  {target_name}: {update['samples']} samples ({update['method']})")
+    print(f"✅ Published version {result['version']} ({result['samples_seen']} samples seen)")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incremental update RCM_RECIPE_2 trend models")
+    parser.add_argument("--orders", type=Path, default=ROOT_DIR / "data" / "test" / "test.orders.json")
+    parser.add_argument("--ratings", type=Path, default=ROOT_DIR / "data" / "test" / "test.ratings.json")
+    parser.add_argument("--users", type=Path, default=ROOT_DIR / "data" / "test" / "test.users.json")
+    args = parser.parse_args()
+
+    success = main(args.orders, args.ratings, args.users)
+    exit(0 if success else 1)